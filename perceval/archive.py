@@ -21,13 +21,27 @@
 #     Santiago Dueñas <sduenas@bitergia.com>
 #
 
+import datetime
 import hashlib
 import json
 import logging
 import os
 import pickle
+import queue
 import sqlite3
+import struct
+import threading
+import time
 import uuid
+import zlib
+
+import requests
+import requests.structures
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 from grimoirelab.toolkit.datetime import (datetime_utcnow,
                                           datetime_to_utc,
@@ -56,6 +70,31 @@ class Archive:
     initialized calling to `init_metadata` method after creating
     a new archive.
 
+    By default, each item is committed to the archive as soon as it
+    is stored. Calling `set_buffered_writes` switches the archive
+    to a buffered mode where the stored items are grouped in a single
+    transaction, which is committed every `buffer_size` items or
+    every `buffer_timeout` seconds. Pending items are also committed
+    when `flush` or `close` methods are called.
+
+    Archives are stored using the format defined by `FORMAT_VERSION`.
+    In the current format, HTTP responses are reduced to their status,
+    headers, encoding, URL and body, which is compressed using the codec
+    set in `codec` attribute (`zlib` or `zstd`). Archives created with
+    the first version of the format, which pickled whole objects,
+    are still supported and can be upgraded calling to `migrate`.
+
+    Archives can be replayed faster calling to `start_prefetching`.
+    Then, a background thread reads the entries in the same order they
+    were stored, in batches, and `retrieve` serves them from memory.
+
+    When `catalog` attribute is set to an `ArchiveCatalog` object,
+    the metadata of the archive will be registered on it once it
+    is initialized.
+
+    Items can be stored and retrieved from several threads; calls
+    to `store`, `retrieve` and `flush` are serialized.
+
     :param archive_path: path where this archive is stored
 
     :raises ArchiveError: when the archive does not exist or is invalid
@@ -64,6 +103,21 @@ class Archive:
     ARCHIVE_TABLE = "archive"
     METADATA_TABLE = "metadata"
 
+    DEFAULT_BUFFER_SIZE = 1000
+    DEFAULT_BUFFER_TIMEOUT = 10
+    DEFAULT_JOURNAL_MODE = 'WAL'
+    DEFAULT_SYNCHRONOUS = 'NORMAL'
+    SYNCHRONOUS_MODES = ['OFF', 'NORMAL', 'FULL', 'EXTRA']
+    JOURNAL_MODES = ['DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF']
+
+    DEFAULT_PREFETCH_BATCH_SIZE = 500
+    DEFAULT_PREFETCH_MAX_BATCHES = 4
+
+    FORMAT_VERSION = 2
+    SUPPORTED_FORMAT_VERSIONS = [1, 2]
+    PICKLE_PROTOCOL = 4
+    DEFAULT_CODEC = 'zlib'
+
     # Table structure
     ARCHIVE_CREATE_STMT = "CREATE TABLE " + ARCHIVE_TABLE + " ( " \
                           "id INTEGER PRIMARY KEY AUTOINCREMENT, " \
@@ -92,16 +146,169 @@ class Archive:
         self.category = None
         self.backend_params = None
         self.created_on = None
+        self.format_version = None
+        self.codec = self.DEFAULT_CODEC
+        self.catalog = None
 
-        self._db = sqlite3.connect(self.archive_path)
+        self.buffer_size = 1
+        self.buffer_timeout = None
+        self._pending = 0
+        self._last_flush = time.time()
+
+        self._prefetcher = None
+        self._prefetched = {}
+
+        # The connection is shared by the threads of a fetch process
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(self.archive_path, check_same_thread=False)
 
         self._verify_archive()
         self._load_metadata()
 
     def __del__(self):
+        self.close()
+
+    def set_buffered_writes(self, buffer_size=DEFAULT_BUFFER_SIZE,
+                            buffer_timeout=DEFAULT_BUFFER_TIMEOUT,
+                            journal_mode=DEFAULT_JOURNAL_MODE,
+                            synchronous=DEFAULT_SYNCHRONOUS):
+        """Group the stored items in transactions.
+
+        After calling this method, the items stored in the archive
+        will not be committed one by one. Instead, they will be
+        committed in a single transaction once `buffer_size` items
+        are pending or `buffer_timeout` seconds have passed since
+        the last commit.
+
+        The journal mode and the synchronous flag of the underlying
+        database can be tuned too. By default, the archive will use
+        write-ahead logging (`WAL`) with `NORMAL` synchronization,
+        which avoids most of the disk syncs while keeping the archive
+        consistent in case of a crash.
+
+        :param buffer_size: maximum number of items pending to commit
+        :param buffer_timeout: maximum number of seconds between commits;
+            when `None`, commits are only triggered by `buffer_size`
+        :param journal_mode: journal mode of the database; when `None`,
+            the current mode is kept
+        :param synchronous: synchronous flag of the database; when `None`,
+            the current flag is kept
+
+        :raises ArchiveError: when any of the parameters is invalid
+        """
+        if buffer_size < 1:
+            msg = "buffer size must be greater than 0; %s given" % buffer_size
+            raise ArchiveError(cause=msg)
+        if journal_mode and journal_mode.upper() not in self.JOURNAL_MODES:
+            msg = "invalid journal mode %s" % journal_mode
+            raise ArchiveError(cause=msg)
+        if synchronous and synchronous.upper() not in self.SYNCHRONOUS_MODES:
+            msg = "invalid synchronous flag %s" % synchronous
+            raise ArchiveError(cause=msg)
+
+        # Pending items are committed before changing the settings
+        self.flush()
+
+        try:
+            cursor = self._db.cursor()
+            if journal_mode:
+                cursor.execute("PRAGMA journal_mode = " + journal_mode.upper())
+            if synchronous:
+                cursor.execute("PRAGMA synchronous = " + synchronous.upper())
+            cursor.close()
+        except sqlite3.DatabaseError as e:
+            msg = "archive settings error; cause: %s" % str(e)
+            raise ArchiveError(cause=msg)
+
+        self.buffer_size = buffer_size
+        self.buffer_timeout = buffer_timeout
+
+        logger.debug("Buffered writes set in archive %s; size: %s, timeout: %s, "
+                     "journal: %s, synchronous: %s",
+                     self.archive_path, buffer_size, buffer_timeout,
+                     journal_mode, synchronous)
+
+    def flush(self):
+        """Commit the items pending to be written in the archive.
+
+        :raises ArchiveError: when an error occurs committing the items
+        """
+        with self._lock:
+            self._last_flush = time.time()
+
+            if not self._pending:
+                return
+
+            try:
+                self._db.commit()
+            except sqlite3.DatabaseError as e:
+                msg = "data storage error; cause: %s" % str(e)
+                raise ArchiveError(cause=msg)
+
+            logger.debug("%s pending entries committed in %s",
+                         self._pending, self.archive_path)
+
+            self._pending = 0
+
+    def close(self):
+        """Commit the pending items and close the archive."""
+
         conn = getattr(self, '_db', None)
-        if conn:
+
+        if not conn:
+            return
+
+        try:
+            self.stop_prefetching()
+            self.flush()
+        finally:
             conn.close()
+            self._db = None
+
+    def start_prefetching(self, batch_size=DEFAULT_PREFETCH_BATCH_SIZE,
+                          max_batches=DEFAULT_PREFETCH_MAX_BATCHES):
+        """Start reading entries ahead in a background thread.
+
+        Entries are read in the order they were stored, in batches
+        of `batch_size` entries, and kept in memory until they are
+        retrieved. At most `max_batches` batches are read ahead.
+
+        When an entry is not found in memory, the next batches are
+        loaded until the entry is found or `max_batches` batches
+        were loaded. If the entry is still not found, it will be
+        retrieved from the archive file. To keep memory bounded,
+        the oldest entries are discarded when there are more than
+        `batch_size * max_batches` entries in memory.
+
+        :param batch_size: number of entries read on each batch
+        :param max_batches: maximum number of batches read ahead
+
+        :raises ArchiveError: when any of the parameters is invalid
+        """
+        if batch_size < 1 or max_batches < 1:
+            msg = "batch size and number of batches must be greater than 0"
+            raise ArchiveError(cause=msg)
+
+        self.stop_prefetching()
+
+        # The prefetcher reads the entries using its own connection
+        self.flush()
+
+        self._prefetcher = ArchivePrefetcher(self.archive_path,
+                                             batch_size, max_batches)
+        self._prefetcher.start()
+
+        logger.debug("Prefetching entries of archive %s; batch size: %s, max batches: %s",
+                     self.archive_path, batch_size, max_batches)
+
+    def stop_prefetching(self):
+        """Stop reading entries ahead and free the prefetched entries."""
+
+        if self._prefetcher:
+            self._prefetcher.stop()
+            self._prefetcher = None
+
+        self._prefetched = {}
 
     def init_metadata(self, origin, backend_name, backend_version,
                       category, backend_params):
@@ -121,7 +328,7 @@ class Archive:
         """
         created_on = datetime_to_utc(datetime_utcnow())
         created_on_dumped = created_on.isoformat()
-        backend_params_dumped = pickle.dumps(backend_params, 0)
+        backend_params_dumped = self._dump_object(backend_params)
 
         metadata = (origin, backend_name, backend_version, category,
                     backend_params_dumped, created_on_dumped,)
@@ -147,6 +354,9 @@ class Archive:
         self.backend_params = backend_params
         self.created_on = created_on
 
+        if self.catalog:
+            self.catalog.update(self)
+
         logger.debug("Metadata of archive %s initialized to %s",
                      self.archive_path, metadata)
 
@@ -165,28 +375,37 @@ class Archive:
         :raises ArchiveError: when an error occurs storing the given data
         """
         hashcode = self.make_hashcode(uri, payload, headers)
-        payload_dump = pickle.dumps(payload, 0)
-        headers_dump = pickle.dumps(headers, 0)
-        data_dump = pickle.dumps(data, 0)
+        payload_dump = self._dump_object(payload)
+        headers_dump = self._dump_object(headers)
+
+        if self.format_version == 1:
+            data_dump = pickle.dumps(data, 0)
+        else:
+            data_dump = encode_archived_data(data, self.codec)
 
         logger.debug("Archiving %s with %s %s %s in %s",
                      hashcode, uri, payload, headers, self.archive_path)
 
-        try:
-            cursor = self._db.cursor()
-            insert_stmt = "INSERT INTO " + self.ARCHIVE_TABLE + " (" \
-                          "id, hashcode, uri, payload, headers, data) " \
-                          "VALUES(?,?,?,?,?,?)"
-            cursor.execute(insert_stmt, (None, hashcode, uri,
-                                         payload_dump, headers_dump, data_dump))
-            self._db.commit()
-            cursor.close()
-        except sqlite3.IntegrityError as e:
-            msg = "data storage error; cause: duplicated entry %s" % hashcode
-            raise ArchiveError(cause=msg)
-        except sqlite3.DatabaseError as e:
-            msg = "data storage error; cause: %s" % str(e)
-            raise ArchiveError(cause=msg)
+        with self._lock:
+            try:
+                cursor = self._db.cursor()
+                insert_stmt = "INSERT INTO " + self.ARCHIVE_TABLE + " (" \
+                              "id, hashcode, uri, payload, headers, data) " \
+                              "VALUES(?,?,?,?,?,?)"
+                cursor.execute(insert_stmt, (None, hashcode, uri,
+                                             payload_dump, headers_dump, data_dump))
+                cursor.close()
+            except sqlite3.IntegrityError as e:
+                msg = "data storage error; cause: duplicated entry %s" % hashcode
+                raise ArchiveError(cause=msg)
+            except sqlite3.DatabaseError as e:
+                msg = "data storage error; cause: %s" % str(e)
+                raise ArchiveError(cause=msg)
+
+            self._pending += 1
+
+            if self._pending >= self.buffer_size or self._is_flush_timeout():
+                self.flush()
 
         logger.debug("%s data archived in %s", hashcode, self.archive_path)
 
@@ -209,22 +428,29 @@ class Archive:
         logger.debug("Retrieving entry %s with %s %s %s in %s",
                      hashcode, uri, payload, headers, self.archive_path)
 
-        self._db.row_factory = sqlite3.Row
+        with self._lock:
+            if self._prefetcher:
+                data_dump = self._retrieve_prefetched(hashcode)
 
-        try:
-            cursor = self._db.cursor()
-            select_stmt = "SELECT data " \
-                          "FROM " + self.ARCHIVE_TABLE + " " \
-                          "WHERE hashcode = ?"
-            cursor.execute(select_stmt, (hashcode,))
-            row = cursor.fetchone()
-            cursor.close()
-        except sqlite3.DatabaseError as e:
-            msg = "data retrieval error; cause: %s" % str(e)
-            raise ArchiveError(cause=msg)
+                if data_dump is not None:
+                    return self._load_data(data_dump)
+
+            self._db.row_factory = sqlite3.Row
+
+            try:
+                cursor = self._db.cursor()
+                select_stmt = "SELECT data " \
+                              "FROM " + self.ARCHIVE_TABLE + " " \
+                              "WHERE hashcode = ?"
+                cursor.execute(select_stmt, (hashcode,))
+                row = cursor.fetchone()
+                cursor.close()
+            except sqlite3.DatabaseError as e:
+                msg = "data retrieval error; cause: %s" % str(e)
+                raise ArchiveError(cause=msg)
 
         if row:
-            found = pickle.loads(row['data'])
+            found = self._load_data(row['data'])
         else:
             msg = "entry %s not found in archive %s" % (hashcode, self.archive_path)
             raise ArchiveError(cause=msg)
@@ -251,6 +477,7 @@ class Archive:
         cursor = conn.cursor()
         cursor.execute(cls.METADATA_CREATE_STMT)
         cursor.execute(cls.ARCHIVE_CREATE_STMT)
+        cursor.execute("PRAGMA user_version = %d" % cls.FORMAT_VERSION)
         conn.commit()
 
         cursor.close()
@@ -262,6 +489,60 @@ class Archive:
 
         return archive
 
+    @classmethod
+    def migrate(cls, archive_path, codec=DEFAULT_CODEC):
+        """Convert an archive to the current format version.
+
+        The method rewrites the archive stored in `archive_path` using
+        the format defined by `FORMAT_VERSION`. Metadata, identifiers
+        and hash codes of the entries are kept. The new archive is built
+        in a temporary file that replaces the original one once all
+        the entries were converted. Archives that already use the
+        current format are not modified.
+
+        :param archive_path: path to the archive to migrate
+        :param codec: compression codec used by the migrated archive
+
+        :returns: the migrated `Archive` object
+
+        :raises ArchiveError: when the archive does not exist, is invalid
+            or an error occurs converting it
+        """
+        archive = cls(archive_path)
+
+        if archive.format_version == cls.FORMAT_VERSION:
+            logger.debug("Archive %s already in format version %s",
+                         archive_path, cls.FORMAT_VERSION)
+            return archive
+
+        migration_path = archive_path + '.migration'
+
+        if os.path.exists(migration_path):
+            os.remove(migration_path)
+
+        logger.debug("Migrating archive %s from format version %s to %s",
+                     archive_path, archive.format_version, cls.FORMAT_VERSION)
+
+        target = cls.create(migration_path)
+        target.codec = codec
+
+        try:
+            archive._copy_entries(target)
+        except Exception as e:
+            target.close()
+            os.remove(migration_path)
+            msg = "archive %s migration error; cause: %s" % (archive_path, str(e))
+            raise ArchiveError(cause=msg)
+
+        target.close()
+        archive.close()
+
+        os.replace(migration_path, archive_path)
+
+        logger.debug("Archive %s migrated", archive_path)
+
+        return cls(archive_path)
+
     @staticmethod
     def make_hashcode(uri, payload, headers):
         """Generate a SHA1 based on the given arguments.
@@ -282,12 +563,111 @@ class Archive:
         hashcode = hashlib.sha1(content.encode('utf-8'))
         return hashcode.hexdigest()
 
+    def _is_flush_timeout(self):
+        """Check whether pending items waited too long to be committed"""
+
+        if self.buffer_timeout is None:
+            return False
+
+        return (time.time() - self._last_flush) >= self.buffer_timeout
+
+    def _retrieve_prefetched(self, hashcode):
+        """Get an entry from the prefetched batches"""
+
+        prefetched = self._prefetched
+
+        if hashcode in prefetched:
+            return prefetched.pop(hashcode)
+
+        nbatches = 0
+
+        while nbatches < self._prefetcher.max_batches:
+            batch = self._prefetcher.next_batch()
+
+            if batch is None:
+                break
+
+            nbatches += 1
+
+            for entry_hashcode, data_dump in batch:
+                prefetched[entry_hashcode] = data_dump
+
+            # Discard the oldest entries
+            while len(prefetched) > self._prefetcher.max_entries:
+                del prefetched[next(iter(prefetched))]
+
+            if hashcode in prefetched:
+                return prefetched.pop(hashcode)
+
+        logger.debug("Entry %s not prefetched from %s", hashcode, self.archive_path)
+
+        return None
+
+    def _dump_object(self, obj):
+        """Pickle an object using the protocol of the archive format"""
+
+        protocol = 0 if self.format_version == 1 else self.PICKLE_PROTOCOL
+        return pickle.dumps(obj, protocol)
+
+    def _load_data(self, data_dump):
+        """Load archived data using the archive format"""
+
+        if self.format_version == 1:
+            return pickle.loads(data_dump)
+        else:
+            return decode_archived_data(data_dump)
+
+    def _copy_entries(self, target):
+        """Copy metadata and entries to the target archive"""
+
+        cursor = self._db.cursor()
+        select_stmt = "SELECT origin, backend_name, backend_version, " \
+                      "category, backend_params, created_on " \
+                      "FROM " + self.METADATA_TABLE
+        cursor.execute(select_stmt)
+
+        insert_stmt = "INSERT INTO " + self.METADATA_TABLE + " " \
+                      "(origin, backend_name, backend_version, " \
+                      "category, backend_params, created_on) " \
+                      "VALUES (?, ?, ?, ?, ?, ?)"
+
+        for row in cursor:
+            backend_params = target._dump_object(pickle.loads(row[4]))
+            target._db.execute(insert_stmt, row[0:4] + (backend_params, row[5]))
+
+        select_stmt = "SELECT id, hashcode, uri, payload, headers, data " \
+                      "FROM " + self.ARCHIVE_TABLE + " " \
+                      "ORDER BY id"
+        cursor.execute(select_stmt)
+
+        insert_stmt = "INSERT INTO " + self.ARCHIVE_TABLE + " (" \
+                      "id, hashcode, uri, payload, headers, data) " \
+                      "VALUES(?,?,?,?,?,?)"
+
+        for row in cursor:
+            payload_dump = target._dump_object(pickle.loads(row[3]))
+            headers_dump = target._dump_object(pickle.loads(row[4]))
+            data_dump = encode_archived_data(self._load_data(row[5]), target.codec)
+            target._db.execute(insert_stmt, row[0:3] + (payload_dump, headers_dump, data_dump))
+
+        cursor.close()
+        target._db.commit()
+
     def _verify_archive(self):
         """Check whether the archive is valid or not.
 
         This method will check if tables were created and if they
-        contain valid data.
+        contain valid data. The version of the archive format is
+        checked too. Archives without version are considered to be
+        in the first version of the format.
         """
+        self.format_version = self._read_format_version()
+
+        if self.format_version not in self.SUPPORTED_FORMAT_VERSIONS:
+            msg = "archive %s format version %s not supported" % (self.archive_path,
+                                                                  self.format_version)
+            raise ArchiveError(cause=msg)
+
         nentries = self._count_table_rows(self.ARCHIVE_TABLE)
         nmetadata = self._count_table_rows(self.METADATA_TABLE)
 
@@ -298,8 +678,24 @@ class Archive:
             msg = "archive %s metadata is empty but %s entries were achived" % (self.archive_path)
             raise ArchiveError(cause=msg)
 
-        logger.debug("Integrity of archive %s OK; entries: %s rows, metadata: %s rows",
-                     self.archive_path, nentries, nmetadata)
+        logger.debug("Integrity of archive %s OK; version: %s, entries: %s rows, metadata: %s rows",
+                     self.archive_path, self.format_version, nentries, nmetadata)
+
+    def _read_format_version(self):
+        """Read the version of the archive format"""
+
+        cursor = self._db.cursor()
+
+        try:
+            cursor.execute("PRAGMA user_version")
+            row = cursor.fetchone()
+        except sqlite3.DatabaseError as e:
+            msg = "invalid archive file; cause: %s" % str(e)
+            raise ArchiveError(cause=msg)
+        finally:
+            cursor.close()
+
+        return row[0] or 1
 
     def _load_metadata(self):
         """Load metadata from the archive file"""
@@ -345,6 +741,384 @@ class Archive:
         return row[0]
 
 
+class ArchivePrefetcher(threading.Thread):
+    """Thread which reads the entries of an archive ahead.
+
+    Entries are read in the order they were stored, in batches
+    of `batch_size` entries, using a connection owned by the
+    thread. Batches are put in a queue of `max_batches` elements,
+    so the thread waits when the queue is full. Once all the
+    entries were read, `next_batch` returns `None`.
+
+    :param archive_path: path to the archive
+    :param batch_size: number of entries read on each batch
+    :param max_batches: maximum number of batches read ahead
+    """
+    WAIT_TIMEOUT = 0.1
+
+    def __init__(self, archive_path, batch_size, max_batches):
+        super().__init__(daemon=True)
+        self.archive_path = archive_path
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self.max_entries = batch_size * max_batches
+        self._batches = queue.Queue(maxsize=max_batches)
+        self._stopped = threading.Event()
+        self._done = False
+
+    def run(self):
+        select_stmt = "SELECT id, hashcode, data " \
+                      "FROM " + Archive.ARCHIVE_TABLE + " " \
+                      "WHERE id > ? " \
+                      "ORDER BY id " \
+                      "LIMIT ?"
+        last_id = -1
+
+        conn = sqlite3.connect(self.archive_path)
+
+        try:
+            while not self._stopped.is_set():
+                cursor = conn.cursor()
+                cursor.execute(select_stmt, (last_id, self.batch_size))
+                rows = cursor.fetchall()
+                cursor.close()
+
+                if not rows:
+                    break
+
+                last_id = rows[-1][0]
+                self._put([(row[1], row[2]) for row in rows])
+        except sqlite3.DatabaseError as e:
+            logger.warning("Error prefetching entries from %s; cause: %s",
+                           self.archive_path, str(e))
+        finally:
+            conn.close()
+            self._put(None)
+
+    def next_batch(self):
+        """Get the next batch of entries.
+
+        :returns: a list of (hashcode, data) tuples or `None` when
+            there are not more entries
+        """
+        if self._done:
+            return None
+
+        batch = self._batches.get()
+
+        if batch is None:
+            self._done = True
+
+        return batch
+
+    def stop(self):
+        """Stop reading entries."""
+
+        self._stopped.set()
+        self.join()
+
+    def _put(self, batch):
+        while not self._stopped.is_set():
+            try:
+                self._batches.put(batch, timeout=self.WAIT_TIMEOUT)
+                return
+            except queue.Full:
+                continue
+
+
+class ArchivedResponse(requests.Response):
+    """HTTP response rebuilt from an archive.
+
+    The response only keeps the status, headers, encoding, URL and
+    body of the original one. The body is stored compressed and it
+    is not decompressed until it is accessed for the first time.
+
+    :param status_code: status code of the response
+    :param headers: list of (name, value) headers of the response
+    :param encoding: encoding of the response
+    :param url: final URL of the response
+    :param reason: textual reason of the status code
+    :param body: compressed body
+    :param codec: codec used to compress the body
+    """
+    def __init__(self, status_code, headers, encoding, url, reason,
+                 body, codec):
+        super().__init__()
+        self.status_code = status_code
+        self.headers = requests.structures.CaseInsensitiveDict(headers)
+        self.encoding = encoding
+        self.url = url
+        self.reason = reason
+        self._content_consumed = True
+        self._body = body
+        self._codec = codec
+
+    @property
+    def content(self):
+        if self._content is False:
+            self._content = _decompress(self._body, self._codec)
+            self._body = None
+        return self._content
+
+    def iter_content(self, *args, **kwargs):
+        _ = self.content
+        return super().iter_content(*args, **kwargs)
+
+
+ARCHIVED_RESPONSE = b'R'
+ARCHIVED_HTTP_ERROR = b'E'
+ARCHIVED_OBJECT = b'P'
+
+CODEC_IDS = {
+    'zlib': b'z',
+    'zstd': b's'
+}
+CODEC_NAMES = {v: k for k, v in CODEC_IDS.items()}
+
+
+def encode_archived_data(data, codec=Archive.DEFAULT_CODEC):
+    """Encode data to be stored in an archive.
+
+    HTTP responses and HTTP errors are reduced to the status,
+    headers, encoding, URL and body of the response. Any other
+    object is pickled. In both cases, the result is compressed
+    using the given `codec`.
+
+    The encoded data starts with a byte which identifies the type
+    of object, followed by a byte which identifies the codec.
+    Responses and errors store next the length of the compressed
+    metadata, packed in 4 bytes, the compressed metadata in JSON
+    and the compressed body.
+
+    :param data: data to encode
+    :param codec: compression codec; either 'zlib' or 'zstd'
+
+    :returns: the encoded data
+
+    :raises ArchiveError: when the codec is not supported
+    """
+    if codec not in CODEC_IDS:
+        raise ArchiveError(cause="codec %s not supported" % codec)
+
+    if isinstance(data, requests.exceptions.HTTPError) and \
+            isinstance(data.response, requests.Response):
+        kind = ARCHIVED_HTTP_ERROR
+        response = data.response
+    elif isinstance(data, requests.Response):
+        kind = ARCHIVED_RESPONSE
+        response = data
+    else:
+        obj = pickle.dumps(data, Archive.PICKLE_PROTOCOL)
+        return ARCHIVED_OBJECT + CODEC_IDS[codec] + _compress(obj, codec)
+
+    meta = {
+        'status_code': response.status_code,
+        'headers': list(response.headers.items()),
+        'encoding': response.encoding,
+        'url': response.url,
+        'reason': response.reason
+    }
+    if kind == ARCHIVED_HTTP_ERROR:
+        meta['error'] = str(data)
+
+    meta = _compress(json.dumps(meta).encode('utf-8'), codec)
+    body = _compress(response.content or b'', codec)
+
+    return kind + CODEC_IDS[codec] + struct.pack('>I', len(meta)) + meta + body
+
+
+def decode_archived_data(data):
+    """Decode data stored in an archive.
+
+    Responses are rebuilt as `ArchivedResponse` objects, which will
+    decompress their body when it is accessed.
+
+    :param data: data encoded with `encode_archived_data`
+
+    :returns: the decoded object
+
+    :raises ArchiveError: when the data is invalid or its codec
+        is not supported
+    """
+    kind, codec_id = data[0:1], data[1:2]
+
+    if codec_id not in CODEC_NAMES:
+        raise ArchiveError(cause="invalid archived data; unknown codec")
+
+    codec = CODEC_NAMES[codec_id]
+
+    if kind == ARCHIVED_OBJECT:
+        return pickle.loads(_decompress(data[2:], codec))
+    elif kind not in (ARCHIVED_RESPONSE, ARCHIVED_HTTP_ERROR):
+        raise ArchiveError(cause="invalid archived data; unknown type")
+
+    meta_len = struct.unpack('>I', data[2:6])[0]
+    meta = json.loads(_decompress(data[6:6 + meta_len], codec).decode('utf-8'))
+
+    response = ArchivedResponse(meta['status_code'], meta['headers'],
+                                meta['encoding'], meta['url'], meta['reason'],
+                                data[6 + meta_len:], codec)
+
+    if kind == ARCHIVED_HTTP_ERROR:
+        return requests.exceptions.HTTPError(meta['error'], response=response)
+    else:
+        return response
+
+
+def _compress(data, codec):
+    if codec == 'zstd':
+        _check_zstandard()
+        return zstandard.ZstdCompressor().compress(data)
+    else:
+        return zlib.compress(data)
+
+
+def _decompress(data, codec):
+    if codec == 'zstd':
+        _check_zstandard()
+        return zstandard.ZstdDecompressor().decompress(data)
+    else:
+        return zlib.decompress(data)
+
+
+def _check_zstandard():
+    if not zstandard:
+        raise ArchiveError(cause="zstd codec needs 'zstandard' package")
+
+
+class ArchiveCatalog:
+    """Catalog of the archives stored in a directory.
+
+    The catalog is a SQLite database, stored in the root of `dirpath`,
+    which indexes the metadata of the archives stored under that
+    directory. It allows to search archives by origin, backend,
+    category and creation date without opening each archive file.
+
+    Paths to the archives are stored relative to `dirpath`. The
+    database uses write-ahead logging, so the catalog can be shared
+    by several processes.
+
+    :param dirpath: path where the archives are stored
+
+    :raises ArchiveError: when the catalog file is invalid
+    """
+    CATALOG_NAME = 'catalog.db'
+    CATALOG_TABLE = 'catalog'
+
+    CATALOG_CREATE_STMT = "CREATE TABLE IF NOT EXISTS " + CATALOG_TABLE + " ( " \
+                          "archive_path TEXT PRIMARY KEY, " \
+                          "origin TEXT, " \
+                          "backend_name TEXT, " \
+                          "category TEXT, " \
+                          "created_on REAL)"
+
+    CATALOG_INDEX_STMT = "CREATE INDEX IF NOT EXISTS catalog_search " \
+                         "ON " + CATALOG_TABLE + " " \
+                         "(origin, backend_name, category, created_on)"
+
+    TIMEOUT = 60
+
+    def __init__(self, dirpath):
+        self.dirpath = dirpath
+        self.catalog_path = os.path.join(dirpath, self.CATALOG_NAME)
+
+        try:
+            self._db = sqlite3.connect(self.catalog_path, timeout=self.TIMEOUT)
+            self._db.execute("PRAGMA journal_mode = WAL")
+            self._db.execute(self.CATALOG_CREATE_STMT)
+            self._db.execute(self.CATALOG_INDEX_STMT)
+            self._db.commit()
+        except sqlite3.DatabaseError as e:
+            msg = "invalid catalog file %s; cause: %s" % (self.catalog_path, str(e))
+            raise ArchiveError(cause=msg)
+
+    def __del__(self):
+        conn = getattr(self, '_db', None)
+        if conn:
+            conn.close()
+
+    def add(self, archive_path):
+        """Add an archive without metadata to the catalog.
+
+        :param archive_path: path to the archive
+        """
+        insert_stmt = "INSERT OR REPLACE INTO " + self.CATALOG_TABLE + " " \
+                      "(archive_path) VALUES (?)"
+        self._execute(insert_stmt, (self._relpath(archive_path),))
+
+    def update(self, archive):
+        """Add an archive and its metadata to the catalog.
+
+        :param archive: `Archive` object
+        """
+        created_on = archive.created_on.timestamp() if archive.created_on else None
+        entry = (self._relpath(archive.archive_path), archive.origin,
+                 archive.backend_name, archive.category, created_on)
+
+        insert_stmt = "INSERT OR REPLACE INTO " + self.CATALOG_TABLE + " " \
+                      "(archive_path, origin, backend_name, category, created_on) " \
+                      "VALUES (?, ?, ?, ?, ?)"
+        self._execute(insert_stmt, entry)
+
+    def remove(self, archive_path):
+        """Remove an archive from the catalog.
+
+        :param archive_path: path to the archive
+        """
+        delete_stmt = "DELETE FROM " + self.CATALOG_TABLE + " " \
+                      "WHERE archive_path = ?"
+        self._execute(delete_stmt, (self._relpath(archive_path),))
+
+    def clear(self):
+        """Remove all the entries of the catalog."""
+
+        self._execute("DELETE FROM " + self.CATALOG_TABLE)
+
+    def search(self, origin, backend_name, category, archived_after):
+        """Search archives in the catalog.
+
+        :param origin: data origin
+        :param backend_name: backed used to fetch data
+        :param category: type of the items fetched by the backend
+        :param archived_after: get archives created on or after this date
+
+        :returns: a generator of tuples with the path and the creation
+            date of the archives, sorted by date
+        """
+        select_stmt = "SELECT archive_path, created_on " \
+                      "FROM " + self.CATALOG_TABLE + " " \
+                      "WHERE origin = ? AND backend_name = ? " \
+                      "AND category = ? AND created_on >= ? " \
+                      "ORDER BY created_on"
+        params = (origin, backend_name, category,
+                  datetime_to_utc(archived_after).timestamp())
+
+        try:
+            cursor = self._db.cursor()
+            cursor.execute(select_stmt, params)
+            rows = cursor.fetchall()
+            cursor.close()
+        except sqlite3.DatabaseError as e:
+            msg = "catalog search error; cause: %s" % str(e)
+            raise ArchiveError(cause=msg)
+
+        for row in rows:
+            archive_path = os.path.join(self.dirpath, row[0])
+            created_on = datetime.datetime.fromtimestamp(row[1], tz=datetime.timezone.utc)
+            yield archive_path, created_on
+
+    def _relpath(self, archive_path):
+        return os.path.relpath(archive_path, self.dirpath)
+
+    def _execute(self, stmt, params=()):
+        try:
+            self._db.execute(stmt, params)
+            self._db.commit()
+        except sqlite3.DatabaseError as e:
+            msg = "catalog update error; cause: %s" % str(e)
+            raise ArchiveError(cause=msg)
+
+
 class ArchiveManager:
     """Manager for handling archives in Perceval.
 
@@ -354,10 +1128,16 @@ class ArchiveManager:
     be the name of the subdirectory; the remaining bytes, the archive
     name.
 
+    The archives are registered in an `ArchiveCatalog`, stored in
+    the root of `dirpath`, which is used to search them. When the
+    catalog does not exist, it is built from the archive files.
+    Call `rebuild_catalog` to build it again if it gets out of sync.
+
     :param: dirpath: path where the archives are stored
     """
 
     STORAGE_EXT = '.sqlite3'
+    JOURNAL_SUFFIXES = ['-wal', '-shm']
 
     def __init__(self, dirpath):
         self.dirpath = dirpath
@@ -365,6 +1145,17 @@ class ArchiveManager:
         if not os.path.exists(self.dirpath):
             os.makedirs(self.dirpath)
 
+        catalog_path = os.path.join(self.dirpath, ArchiveCatalog.CATALOG_NAME)
+        build_catalog = not os.path.exists(catalog_path)
+
+        try:
+            self.catalog = ArchiveCatalog(self.dirpath)
+        except ArchiveError as e:
+            raise ArchiveManagerError(cause=str(e))
+
+        if build_catalog:
+            self.rebuild_catalog()
+
     def create_archive(self):
         """Create a new archive.
 
@@ -388,9 +1179,12 @@ class ArchiveManager:
 
         try:
             archive = Archive.create(archive_path)
+            self.catalog.add(archive_path)
         except ArchiveError as e:
             raise ArchiveManagerError(cause=str(e))
 
+        archive.catalog = self.catalog
+
         return archive
 
     def remove_archive(self, archive_path):
@@ -411,6 +1205,85 @@ class ArchiveManager:
 
         os.remove(archive_path)
 
+        # Remove journal files left by archives using WAL mode
+        for suffix in self.JOURNAL_SUFFIXES:
+            journal_path = archive_path + suffix
+            if os.path.exists(journal_path):
+                os.remove(journal_path)
+
+        try:
+            self.catalog.remove(archive_path)
+        except ArchiveError as e:
+            raise ArchiveManagerError(cause=str(e))
+
+    def rebuild_catalog(self):
+        """Build the catalog from the archive files.
+
+        The entries of the catalog are replaced by the metadata
+        read from the archives stored under `dirpath`. Invalid
+        archives are not registered.
+
+        :returns: number of archives registered in the catalog
+
+        :raises ArchiveManagerError: when an error occurs updating
+            the catalog
+        """
+        narchives = 0
+
+        try:
+            self.catalog.clear()
+
+            for archive_path in self._search_files():
+                try:
+                    archive = Archive(archive_path)
+                except ArchiveError:
+                    logger.debug("Invalid archive %s not registered in the catalog",
+                                 archive_path)
+                    continue
+
+                self.catalog.update(archive)
+                narchives += 1
+        except ArchiveError as e:
+            raise ArchiveManagerError(cause=str(e))
+
+        logger.debug("Catalog of %s rebuilt; %s archives registered",
+                     self.dirpath, narchives)
+
+        return narchives
+
+    def migrate_archives(self, codec=Archive.DEFAULT_CODEC):
+        """Convert the archives to the current format version.
+
+        Archives which are invalid or cannot be converted are skipped.
+
+        :param codec: compression codec used by the migrated archives
+
+        :returns: a list with the paths of the migrated archives
+        """
+        migrated = []
+
+        for archive_path in self._search_files():
+            try:
+                archive = Archive(archive_path)
+            except ArchiveError:
+                continue
+
+            if archive.format_version == Archive.FORMAT_VERSION:
+                continue
+
+            archive.close()
+
+            try:
+                Archive.migrate(archive_path, codec=codec)
+            except ArchiveError as e:
+                logger.warning("Skipping %s archive migration due to: %s",
+                               archive_path, str(e))
+                continue
+
+            migrated.append(archive_path)
+
+        return migrated
+
     def search(self, origin, backend_name, category, archived_after):
         """Search archives.
 
@@ -440,26 +1313,32 @@ class ArchiveManager:
     def _search_archives(self, origin, backend_name, category, archived_after):
         """Search archives using filters."""
 
-        for archive_path in self._search_files():
-            try:
-                archive = Archive(archive_path)
-            except ArchiveError:
-                continue
-
-            match = archive.origin == origin and \
-                archive.backend_name == backend_name and \
-                archive.category == category and \
-                archive.created_on >= archived_after
+        try:
+            archives = self.catalog.search(origin, backend_name,
+                                           category, archived_after)
+            archives = list(archives)
+        except ArchiveError as e:
+            raise ArchiveManagerError(cause=str(e))
 
-            if not match:
+        for archive_path, created_on in archives:
+            # Archives removed without using the manager
+            if not os.path.exists(archive_path):
+                logger.debug("Archive %s not found; removed from catalog", archive_path)
+                try:
+                    self.catalog.remove(archive_path)
+                except ArchiveError as e:
+                    raise ArchiveManagerError(cause=str(e))
                 continue
 
-            yield archive_path, archive.created_on
+            yield archive_path, created_on
 
     def _search_files(self):
         """Retrieve the file paths stored under the base path."""
 
         for root, _, files in os.walk(self.dirpath):
             for filename in files:
+                # Skip journal and temporary files
+                if not filename.endswith(self.STORAGE_EXT):
+                    continue
                 location = os.path.join(root, filename)
                 yield location
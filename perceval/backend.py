@@ -21,13 +21,18 @@
 #
 
 import argparse
+import collections
+import concurrent.futures
 import hashlib
+import heapq
 import importlib
-import json
 import logging
 import os
+import pickle
 import pkgutil
+import shutil
 import sys
+import tempfile
 
 from datetime import datetime as dt
 
@@ -35,7 +40,13 @@ from grimoirelab.toolkit.introspect import find_signature_parameters
 from grimoirelab.toolkit.datetime import str_to_datetime
 
 from .archive import Archive, ArchiveManager
+from .client import DEFAULT_POOL_SIZE, DEFAULT_PREFETCH_PAGES, HttpClient
 from .errors import ArchiveError, BackendError
+from .output import (COMPRESSIONS,
+                     JSON_FORMAT,
+                     OUTPUT_SINKS,
+                     create_output_sink,
+                     write_items)
 from ._version import __version__
 
 
@@ -43,6 +54,10 @@ logger = logging.getLogger(__name__)
 
 ARCHIVES_DEFAULT_PATH = '~/.perceval/archives/'
 
+ARCHIVE_ORDER = 'archive'
+UPDATED_ON_ORDER = 'updated_on'
+ARCHIVE_MERGE_ORDERS = [ARCHIVE_ORDER, UPDATED_ON_ORDER]
+
 
 class Backend:
     """Abstract class for backends.
@@ -108,7 +123,10 @@ class Backend:
     def fetch(self, category, **kwargs):
         """Fetch items from the repository.
 
-        The method retrieves items from a repository.
+        The method retrieves items from a repository. When an archive
+        was set, the raw data will be stored on it using buffered writes.
+        Pending data is written to the archive once the fetching process
+        ends, even when it fails.
 
         :param category: the category of the items fetched
         :param kwargs: a list of other parameters (e.g., from_date, offset, etc.
@@ -123,17 +141,28 @@ class Backend:
         if self.archive:
             self.archive.init_metadata(self.origin, self.__class__.__name__, self.version, category,
                                        kwargs)
+            self.archive.set_buffered_writes()
 
         self.client = self._init_client()
 
-        for item in self.fetch_items(category, **kwargs):
-            yield self.metadata(item)
+        try:
+            for item in self.fetch_items(category, **kwargs):
+                yield self.metadata(item)
+        finally:
+            if self.archive:
+                self.archive.flush()
+            if isinstance(self.client, HttpClient):
+                stats = self.client.connection_stats()
+                logger.info("HTTP connections: %s new, %s reused",
+                            stats['new'], stats['reused'])
 
     def fetch_from_archive(self):
         """Fetch the questions from an archive.
 
         It returns the items stored within an archive. If this method is called but
         no archive was provided, the method will raise a `ArchiveError` exception.
+        Archived data is read ahead in a background thread while the items
+        are generated.
 
         :returns: a generator of items
         :raises ArchiveError: raised when an error occurs accessing an archive
@@ -142,9 +171,13 @@ class Backend:
             raise ArchiveError(cause="archive instance was not provided")
 
         self.client = self._init_client(from_archive=True)
+        self.archive.start_prefetching()
 
-        for item in self.fetch_items(self.archive.category, **self.archive.backend_params):
-            yield self.metadata(item)
+        try:
+            for item in self.fetch_items(self.archive.category, **self.archive.backend_params):
+                yield self.metadata(item)
+        finally:
+            self.archive.stop_prefetching()
 
     def metadata(self, item):
         """Add metadata to an item.
@@ -208,6 +241,8 @@ class BackendCommandArgumentParser:
     :param basic_auth: set basic authentication arguments
     :param token_auth: set token/key authentication arguments
     :param archive: set archiving arguments
+    :param pagination: set pagination arguments
+    :param connection: set HTTP connection arguments
     :param aliases: define aliases for parsed arguments
 
     :raises AttributeArror: when both `from_date` and `offset` are set
@@ -215,10 +250,12 @@ class BackendCommandArgumentParser:
     """
     def __init__(self, from_date=False, to_date=False, offset=False,
                  basic_auth=False, token_auth=False, archive=False,
-                 aliases=None):
+                 pagination=False, connection=False, aliases=None):
         self._from_date = from_date
         self._to_date = to_date
         self._archive = archive
+        self._pagination = pagination
+        self._connection = connection
 
         self.aliases = aliases or {}
         self.parser = argparse.ArgumentParser()
@@ -251,6 +288,12 @@ class BackendCommandArgumentParser:
         if archive:
             self._set_archive_arguments()
 
+        if pagination:
+            self._set_pagination_arguments()
+
+        if connection:
+            self._set_connection_arguments()
+
         self._set_output_arguments()
 
     def parse(self, *args):
@@ -281,6 +324,16 @@ class BackendCommandArgumentParser:
             raise AttributeError("fetch-archive and no-archive arguments are not compatible")
         if self._archive and parsed_args.fetch_archive and not parsed_args.category:
             raise AttributeError("fetch-archive needs a category to work with")
+        if self._archive and parsed_args.archive_workers < 1:
+            raise AttributeError("archive-workers must be greater than 0")
+        if self._pagination and parsed_args.prefetch_pages < 0:
+            raise AttributeError("prefetch-pages must be greater than or equal to 0")
+        if self._connection and parsed_args.pool_size < 1:
+            raise AttributeError("pool-size must be greater than 0")
+        if parsed_args.output_compression and \
+                parsed_args.output_compression not in OUTPUT_SINKS[parsed_args.output_format].COMPRESSIONS:
+            msg = "output-compression %s not available for %s output format"
+            raise AttributeError(msg % (parsed_args.output_compression, parsed_args.output_format))
 
         # Set aliases
         for alias, arg in self.aliases.items():
@@ -316,6 +369,31 @@ class BackendCommandArgumentParser:
                            help="fetch data from the archives")
         group.add_argument('--archived-since', dest='archived_since', default='1970-01-01',
                            help="retrieve items archived since the given date")
+        group.add_argument('--archive-workers', dest='archive_workers',
+                           type=int, default=1,
+                           help="number of archives fetched in parallel")
+        group.add_argument('--archive-order', dest='archive_order',
+                           choices=ARCHIVE_MERGE_ORDERS, default=ARCHIVE_ORDER,
+                           help="order of the items fetched from several archives")
+
+    def _set_pagination_arguments(self):
+        """Activate pagination arguments parsing"""
+
+        group = self.parser.add_argument_group('pagination arguments')
+        group.add_argument('--prefetch-pages', dest='prefetch_pages',
+                           type=int, default=DEFAULT_PREFETCH_PAGES,
+                           help="number of pages fetched while the previous ones are processed")
+
+    def _set_connection_arguments(self):
+        """Activate HTTP connection arguments parsing"""
+
+        group = self.parser.add_argument_group('connection arguments')
+        group.add_argument('--pool-size', dest='pool_size',
+                           type=int, default=DEFAULT_POOL_SIZE,
+                           help="number of connections kept open for each host")
+        group.add_argument('--no-keep-alive', dest='keep_alive',
+                           action='store_false',
+                           help="close the connections after each request")
 
     def _set_output_arguments(self):
         """Activate output arguments parsing"""
@@ -324,6 +402,12 @@ class BackendCommandArgumentParser:
         group.add_argument('-o', '--output', type=argparse.FileType('w'),
                            dest='outfile', default=sys.stdout,
                            help="output file")
+        group.add_argument('--output-format', dest='output_format',
+                           choices=sorted(OUTPUT_SINKS), default=JSON_FORMAT,
+                           help="format of the output")
+        group.add_argument('--output-compression', dest='output_compression',
+                           choices=COMPRESSIONS, default=None,
+                           help="compress the output; available compressions depend on the output format")
 
 
 class BackendCommand:
@@ -360,7 +444,7 @@ class BackendCommand:
 
         This method runs the backend to fetch the items from the given
         origin. Items are converted to JSON objects and written to the
-        defined output.
+        defined output, using the format set in `output-format`.
 
         If `fetch-archive` parameter was given as an argument during
         the inizialization of the instance, the items will be retrieved
@@ -373,16 +457,18 @@ class BackendCommand:
             items = fetch_from_archive(self.BACKEND, backend_args,
                                        self.archive_manager,
                                        self.parsed_args.category,
-                                       self.parsed_args.archived_since)
+                                       self.parsed_args.archived_since,
+                                       workers=self.parsed_args.archive_workers,
+                                       order=self.parsed_args.archive_order)
         else:
             items = fetch(self.BACKEND, backend_args,
                           manager=self.archive_manager)
 
         try:
-            for item in items:
-                obj = json.dumps(item, indent=4, sort_keys=True)
-                self.outfile.write(obj)
-                self.outfile.write('\n')
+            sink = create_output_sink(self.parsed_args.output_format,
+                                      self.outfile,
+                                      compression=self.parsed_args.output_compression)
+            write_items(items, sink)
         except IOError as e:
             raise RuntimeError(str(e))
         except Exception as e:
@@ -487,7 +573,8 @@ def fetch(backend_class, backend_args, manager=None):
 
 
 def fetch_from_archive(backend_class, backend_args, manager,
-                       category, archived_after):
+                       category, archived_after, workers=1,
+                       order=ARCHIVE_ORDER):
     """Fetch items from an archive manager.
 
     Generator to get the items of a category (previously fetched
@@ -497,14 +584,33 @@ def fetch_from_archive(backend_class, backend_args, manager,
     The parameters needed to initialize `backend` and get the
     items are given using `backend_args` dict parameter.
 
+    When `workers` is greater than one, the archives are replayed
+    in parallel by a pool of processes. Each process writes the items
+    of an archive to a temporary file, which is read back when the
+    items are returned. No more than `workers` archives are replayed
+    at the same time. The items can be returned in the order of
+    the archives (`archive`), which is the same order used when
+    archives are replayed one after another, or merged by their
+    `updated_on` value (`updated_on`). The latter order waits until
+    every archive was replayed, keeping their files until then, and
+    expects the items of each archive to be sorted by that value.
+
     :param backend_class: backend class to retrive items
     :param backend_args: dict of arguments needed to retrieve the items
     :param manager: archive manager where the items will be retrieved
     :param category: category of the items to retrieve
     :param archived_after: return items archived after this date
+    :param workers: number of archives replayed in parallel
+    :param order: order of the items when using several workers;
+        either `archive` or `updated_on`
 
     :returns: a generator of archived items
+
+    :raises ValueError: when `order` is not a valid merge order
     """
+    if order not in ARCHIVE_MERGE_ORDERS:
+        raise ValueError("%s is not a valid archive merge order" % order)
+
     init_args = find_signature_parameters(backend_class.__init__,
                                           backend_args)
     backend = backend_class(**init_args)
@@ -514,6 +620,13 @@ def fetch_from_archive(backend_class, backend_args, manager,
                                category,
                                archived_after)
 
+    if workers > 1 and len(filepaths) > 1:
+        items = _fetch_from_archives_parallel(backend_class, init_args,
+                                              filepaths, workers, order)
+        for item in items:
+            yield item
+        return
+
     for filepath in filepaths:
         backend.archive = Archive(filepath)
         items = backend.fetch_from_archive()
@@ -525,6 +638,106 @@ def fetch_from_archive(backend_class, backend_args, manager,
             logger.warning("Ignoring %s archive due to: %s", filepath, str(e))
 
 
+def _fetch_from_archives_parallel(backend_class, init_args, filepaths,
+                                  workers, order):
+    """Replay a set of archives using a pool of processes"""
+
+    dirpath = tempfile.mkdtemp(prefix='perceval_')
+
+    logger.debug("Replaying %s archives with %s workers; order: %s",
+                 len(filepaths), workers, order)
+
+    executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+    pending = collections.deque()
+    filepaths = iter(filepaths)
+
+    def submit_next():
+        filepath = next(filepaths, None)
+
+        if filepath is not None:
+            pending.append(executor.submit(_replay_archive, backend_class, init_args,
+                                           filepath, dirpath))
+
+    try:
+        for _ in range(workers):
+            submit_next()
+
+        if order == ARCHIVE_ORDER:
+            while pending:
+                items_path = pending.popleft().result()
+                submit_next()
+
+                for item in _read_replayed_items(items_path):
+                    yield item
+        else:
+            readers = []
+
+            while pending:
+                items_path = pending.popleft().result()
+                submit_next()
+
+                readers.append(_sort_replayed_items(items_path, len(readers)))
+
+            for _, _, _, item in heapq.merge(*readers):
+                yield item
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+        shutil.rmtree(dirpath, ignore_errors=True)
+
+
+def _replay_archive(backend_class, init_args, filepath, dirpath):
+    """Write the items of an archive to a temporary file.
+
+    Items are pickled one after another. Errors accessing the archive
+    stop the replay, keeping the items written so far.
+
+    :returns: path to the file which stores the items
+    """
+    backend = backend_class(**init_args)
+    backend.archive = Archive(filepath)
+
+    fd, items_path = tempfile.mkstemp(dir=dirpath, suffix='.items')
+
+    with os.fdopen(fd, 'wb') as items_file:
+        try:
+            for item in backend.fetch_from_archive():
+                pickle.dump(item, items_file, pickle.HIGHEST_PROTOCOL)
+        except ArchiveError as e:
+            logger.warning("Ignoring %s archive due to: %s", filepath, str(e))
+
+    backend.archive.close()
+
+    return items_path
+
+
+def _read_replayed_items(items_path):
+    """Read the items written by `_replay_archive`"""
+
+    try:
+        with open(items_path, 'rb') as items_file:
+            while True:
+                try:
+                    yield pickle.load(items_file)
+                except EOFError:
+                    break
+    finally:
+        os.remove(items_path)
+
+
+def _sort_replayed_items(items_path, index):
+    """Read the items written by `_replay_archive` with their sort keys.
+
+    Items are decorated with the index of their archive and their
+    position on it, so ties are solved without comparing the items.
+    """
+    items = _read_replayed_items(items_path)
+
+    for position, item in enumerate(items):
+        yield item['updated_on'], index, position, item
+
+
 def find_backends(top_package):
     """Find available backends.
 
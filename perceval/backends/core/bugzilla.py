@@ -21,6 +21,7 @@
 #     Alvaro del Castillo San Felix <acs@bitergia.com>
 #
 
+import collections
 import csv
 import datetime
 import logging
@@ -34,14 +35,21 @@ from grimoirelab.toolkit.datetime import str_to_datetime
 from ...backend import (Backend,
                         BackendCommand,
                         BackendCommandArgumentParser)
-from ...client import HttpClient
+from ...client import (DEFAULT_POOL_SIZE,
+                       DEFAULT_PREFETCH_PAGES,
+                       DEFAULT_WORKERS,
+                       HttpClient,
+                       fetch_concurrently,
+                       read_ahead)
 from ...errors import BackendError, ParseError
-from ...utils import DEFAULT_DATETIME, xml_to_dict
+from ...utils import DEFAULT_DATETIME, xml_iter_dicts
 
 CATEGORY_BUG = "bug"
 MAX_BUGS = 200  # Maximum number of bugs per query
 MAX_BUGS_CSV = 10000  # Maximum number of bugs per CSV query
 
+EMPTY_ACTIVITY_RE = re.compile("No changes have been made to this (?:bug|issue) yet.")
+
 logger = logging.getLogger(__name__)
 
 
@@ -59,14 +67,22 @@ class Bugzilla(Backend):
     :param max_bugs: maximum number of bugs requested on the same query
     :param tag: label used to mark the data
     :param archive: archive to store/retrieve items
+    :param workers: number of threads used to fetch the activity
+        of several bugs at the same time
+    :param prefetch_pages: number of pages of the list of bugs fetched
+        while the details of the previous ones are fetched
+    :param pool_size: number of connections kept open for each host
+    :param keep_alive: reuse connections between requests
     """
-    version = '0.10.3'
+    version = '0.14.0'
 
     CATEGORIES = [CATEGORY_BUG]
 
     def __init__(self, url, user=None, password=None,
                  max_bugs=MAX_BUGS, max_bugs_csv=MAX_BUGS_CSV,
-                 tag=None, archive=None):
+                 tag=None, archive=None, workers=DEFAULT_WORKERS,
+                 prefetch_pages=DEFAULT_PREFETCH_PAGES,
+                 pool_size=DEFAULT_POOL_SIZE, keep_alive=True):
         origin = url
 
         super().__init__(origin, tag=tag, archive=archive)
@@ -76,6 +92,10 @@ class Bugzilla(Backend):
         self.max_bugs_csv = max_bugs_csv
         self.client = None
         self.max_bugs = max(1, max_bugs)
+        self.workers = workers
+        self.prefetch_pages = prefetch_pages
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive
 
     def fetch(self, category=CATEGORY_BUG, from_date=DEFAULT_DATETIME):
         """Fetch the bugs from the repository.
@@ -110,26 +130,16 @@ class Bugzilla(Backend):
         logger.info("Looking for bugs: '%s' updated from '%s'",
                     self.url, str(from_date))
 
-        buglist = [bug for bug in self.__fetch_buglist(from_date)]
+        buglist = self.__fetch_buglist(from_date)
+        bugs = self.__fetch_bugs_details(buglist)
 
         nbugs = 0
-        tbugs = len(buglist)
-
-        for i in range(0, tbugs, self.max_bugs):
-            chunk = buglist[i:i + self.max_bugs]
-            bugs_ids = [b['bug_id'] for b in chunk]
 
-            logger.info("Fetching bugs: %s/%s", i, tbugs)
-            bugs = self.__fetch_and_parse_bugs_details(bugs_ids)
-
-            for bug in bugs:
-                bug_id = bug['bug_id'][0]['__text__']
-                bug['activity'] = self.__fetch_and_parse_bug_activity(bug_id)
-                nbugs += 1
-                yield bug
+        for bug in fetch_concurrently(self.__fetch_activity, bugs, workers=self.workers):
+            nbugs += 1
+            yield bug
 
-        logger.info("Fetch process completed: %s/%s bugs fetched",
-                    nbugs, tbugs)
+        logger.info("Fetch process completed: %s bugs fetched", nbugs)
 
     @classmethod
     def has_archiving(cls):
@@ -203,7 +213,8 @@ class Bugzilla(Backend):
 
         This method returns a generator which parses the given XML,
         producing an iterator of dictionaries. Each dictionary stores
-        the information related to a parsed bug.
+        the information related to a parsed bug. Bugs are returned
+        as soon as they are parsed.
 
         If the given XML is invalid or does not contains any bug, the
         method will raise a ParseError exception.
@@ -215,15 +226,16 @@ class Bugzilla(Backend):
         :raises ParseError: raised when an error occurs parsing
             the given XML stream
         """
-        bugs = xml_to_dict(raw_xml)
+        nbugs = 0
 
-        if 'bug' not in bugs:
+        for bug in xml_iter_dicts(raw_xml, 'bug'):
+            nbugs += 1
+            yield bug
+
+        if not nbugs:
             cause = "No bugs found. XML stream seems to be invalid."
             raise ParseError(cause=cause)
 
-        for bug in bugs['bug']:
-            yield bug
-
     @staticmethod
     def parse_bug_activity(raw_html):
         """Parse a Bugzilla bug activity HTML stream.
@@ -242,10 +254,8 @@ class Bugzilla(Backend):
         :raises ParseError: raised when an error occurs parsing
             the given HTML stream
         """
-        def is_activity_empty(bs):
-            EMPTY_ACTIVITY = "No changes have been made to this (?:bug|issue) yet."
-            tag = bs.find(text=re.compile(EMPTY_ACTIVITY))
-            return tag is not None
+        def is_activity_empty(raw_html):
+            return EMPTY_ACTIVITY_RE.search(raw_html) is not None
 
         def find_activity_table(bs):
             # The first table with 5 columns is the table of activity
@@ -269,19 +279,21 @@ class Bugzilla(Backend):
             return s
 
         # Parsing starts here
-        bs = bs4.BeautifulSoup(raw_html, 'html.parser')
+        if is_activity_empty(raw_html):
+            return
 
-        if is_activity_empty(bs):
-            fields = []
-        else:
-            activity_tb = find_activity_table(bs)
-            remove_tags(activity_tb)
-            fields = activity_tb.find_all('td')
+        # Only tables are parsed; the rest of the page is skipped
+        bs = bs4.BeautifulSoup(raw_html, 'html.parser',
+                               parse_only=bs4.SoupStrainer('table'))
+
+        activity_tb = find_activity_table(bs)
+        remove_tags(activity_tb)
+        fields = collections.deque(activity_tb.find_all('td'))
 
         while fields:
             # First two fields: 'Who' and 'When'.
-            who = fields.pop(0)
-            when = fields.pop(0)
+            who = fields.popleft()
+            when = fields.popleft()
 
             # The attribute 'rowspan' of 'who' field tells how many
             # changes were made on the same date.
@@ -291,9 +303,9 @@ class Bugzilla(Backend):
             # 'What', 'Removed' and 'Added'. These chunks share
             # 'Who' and 'When' values.
             for _ in range(n):
-                what = fields.pop(0)
-                removed = fields.pop(0)
-                added = fields.pop(0)
+                what = fields.popleft()
+                removed = fields.popleft()
+                added = fields.popleft()
                 event = {'Who': format_text(who),
                          'When': format_text(when),
                          'What': format_text(what),
@@ -306,23 +318,33 @@ class Bugzilla(Backend):
 
         return BugzillaClient(self.url, user=self.user, password=self.password,
                               max_bugs_csv=self.max_bugs_csv,
-                              archive=self.archive, from_archive=from_archive)
+                              archive=self.archive, from_archive=from_archive,
+                              pool_size=self.pool_size, keep_alive=self.keep_alive)
 
     def __fetch_buglist(self, from_date):
+        pages = self.__fetch_buglist_pages(from_date)
+
+        # Next pages are fetched while the details
+        # of the bugs already listed are fetched
+        if self.prefetch_pages > 0:
+            pages = read_ahead(pages, self.prefetch_pages)
+
+        for buglist in pages:
+            for bug in buglist:
+                yield bug
+
+    def __fetch_buglist_pages(self, from_date):
         buglist = self.__fetch_and_parse_buglist_page(from_date)
 
         while buglist:
-            bug = buglist.pop(0)
-            last_date = bug['changeddate']
-            yield bug
+            yield buglist
 
             # Bugzilla does not support pagination. Due to this,
             # the next list of bugs is requested adding one second
             # to the last date obtained.
-            if not buglist:
-                from_date = str_to_datetime(last_date)
-                from_date += datetime.timedelta(seconds=1)
-                buglist = self.__fetch_and_parse_buglist_page(from_date)
+            from_date = str_to_datetime(buglist[-1]['changeddate'])
+            from_date += datetime.timedelta(seconds=1)
+            buglist = self.__fetch_and_parse_buglist_page(from_date)
 
     def __fetch_and_parse_buglist_page(self, from_date):
         logger.debug("Fetching and parsing buglist page from %s", str(from_date))
@@ -330,11 +352,42 @@ class Bugzilla(Backend):
         buglist = self.parse_buglist(raw_csv)
         return [bug for bug in buglist]
 
+    def __fetch_bugs_details(self, buglist):
+        """Fetch the details of the bugs as soon as a chunk is full"""
+
+        chunk = []
+        nchunks = 0
+
+        for bug in buglist:
+            chunk.append(bug['bug_id'])
+
+            if len(chunk) < self.max_bugs:
+                continue
+
+            nchunks += 1
+            logger.info("Fetching bugs: chunk %s", nchunks)
+
+            for bug_details in self.__fetch_and_parse_bugs_details(chunk):
+                yield bug_details
+            chunk = []
+
+        if chunk:
+            nchunks += 1
+            logger.info("Fetching bugs: chunk %s", nchunks)
+
+            for bug_details in self.__fetch_and_parse_bugs_details(chunk):
+                yield bug_details
+
     def __fetch_and_parse_bugs_details(self, *bug_ids):
         logger.debug("Fetching and parsing bugs details")
         raw_bugs = self.client.bugs(*bug_ids)
         return self.parse_bugs_details(raw_bugs)
 
+    def __fetch_activity(self, bug):
+        bug_id = bug['bug_id'][0]['__text__']
+        bug['activity'] = self.__fetch_and_parse_bug_activity(bug_id)
+        return bug
+
     def __fetch_and_parse_bug_activity(self, bug_id):
         logger.debug("Fetching and parsing bug #%s activity", bug_id)
         raw_activity = self.client.bug_activity(bug_id)
@@ -353,7 +406,9 @@ class BugzillaCommand(BackendCommand):
 
         parser = BackendCommandArgumentParser(from_date=True,
                                               basic_auth=True,
-                                              archive=True)
+                                              archive=True,
+                                              pagination=True,
+                                              connection=True)
 
         # Bugzilla options
         group = parser.parser.add_argument_group('Bugzilla arguments')
@@ -363,6 +418,9 @@ class BugzillaCommand(BackendCommand):
         group.add_argument('--max-bugs-csv', dest='max_bugs_csv',
                            type=int, default=MAX_BUGS_CSV,
                            help="Maximum number of bugs requested on CSV queries")
+        group.add_argument('--workers', dest='workers',
+                           type=int, default=DEFAULT_WORKERS,
+                           help="Number of threads used to fetch the activity of the bugs")
 
         # Required arguments
         parser.parser.add_argument('url',
@@ -387,6 +445,8 @@ class BugzillaClient(HttpClient):
     :param max_bugs_cvs: max bugs requested per CSV query
     :param archive: an archive to store/read fetched data
     :param from_archive: it tells whether to write/read the archive
+    :param pool_size: number of connections kept open for each host
+    :param keep_alive: reuse connections between requests
 
     :raises BackendError: when an error occurs initilizing the
         client
@@ -423,9 +483,11 @@ class BugzillaClient(HttpClient):
     CTYPE_XML = 'xml'
 
     def __init__(self, base_url, user=None, password=None,
-                 max_bugs_csv=MAX_BUGS_CSV, archive=None, from_archive=False):
+                 max_bugs_csv=MAX_BUGS_CSV, archive=None, from_archive=False,
+                 pool_size=DEFAULT_POOL_SIZE, keep_alive=True):
         self.version = None
-        super().__init__(base_url, archive=archive, from_archive=from_archive)
+        super().__init__(base_url, archive=archive, from_archive=from_archive,
+                         pool_size=pool_size, keep_alive=keep_alive)
 
         if user is not None and password is not None:
             self.login(user, password)
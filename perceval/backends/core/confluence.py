@@ -31,7 +31,7 @@ from grimoirelab.toolkit.uris import urijoin
 from ...backend import (Backend,
                         BackendCommand,
                         BackendCommandArgumentParser)
-from ...client import HttpClient
+from ...client import DEFAULT_PREFETCH_PAGES, HttpClient, LinkPaginator
 from ...utils import DEFAULT_DATETIME
 
 CATEGORY_HISTORICAL_CONTENT = "historical content"
@@ -51,16 +51,23 @@ class Confluence(Backend):
     :param url: URL of the server
     :param tag: label used to mark the data
     :param archive: archive to store/retrieve items
+    :param max_contents: maximum number of contents requested on the
+        same query
+    :param prefetch_pages: number of pages of contents fetched while
+        the previous ones are processed
     """
-    version = '0.9.2'
+    version = '0.10.0'
 
     CATEGORIES = [CATEGORY_HISTORICAL_CONTENT]
 
-    def __init__(self, url, tag=None, archive=None):
+    def __init__(self, url, tag=None, archive=None, max_contents=MAX_CONTENTS,
+                 prefetch_pages=DEFAULT_PREFETCH_PAGES):
         origin = url
 
         super().__init__(origin, tag=tag, archive=archive)
         self.url = url
+        self.max_contents = max_contents
+        self.prefetch_pages = prefetch_pages
         self.client = None
 
     def fetch(self, category=CATEGORY_HISTORICAL_CONTENT, from_date=DEFAULT_DATETIME):
@@ -215,11 +222,12 @@ class Confluence(Backend):
     def _init_client(self, from_archive=False):
         """Init client"""
 
-        return ConfluenceClient(self.url, archive=self.archive, from_archive=from_archive)
+        return ConfluenceClient(self.url, archive=self.archive, from_archive=from_archive,
+                                prefetch_pages=self.prefetch_pages)
 
     def __fetch_contents_summary(self, from_date):
         logger.debug("Fetching contents summary from %s", str(from_date))
-        for page in self.client.contents(from_date=from_date):
+        for page in self.client.contents(from_date=from_date, max_contents=self.max_contents):
             for cs in self.parse_contents_summary(page):
                 yield cs
 
@@ -273,7 +281,14 @@ class ConfluenceCommand(BackendCommand):
         """Returns the Bugzilla argument parser."""
 
         parser = BackendCommandArgumentParser(from_date=True,
-                                              archive=True)
+                                              archive=True,
+                                              pagination=True)
+
+        # Confluence options
+        group = parser.parser.add_argument_group('Confluence arguments')
+        group.add_argument('--max-contents', dest='max_contents',
+                           type=int, default=MAX_CONTENTS,
+                           help="maximum number of contents requested on the same query")
 
         # Required arguments
         parser.parser.add_argument('url',
@@ -291,6 +306,8 @@ class ConfluenceClient(HttpClient):
     :param base_url: URL of the Confluence server
     :param archive: an archive to store/read fetched data
     :param from_archive: it tells whether to write/read the archive
+    :param prefetch_pages: number of pages of contents fetched while
+        the previous ones are processed
     """
     URL = "%(base)s/rest/api/%(resource)s"
 
@@ -315,8 +332,10 @@ class ConfluenceClient(HttpClient):
     VEXPAND = ['body.storage', 'history', 'version']
     VHISTORICAL = 'historical'
 
-    def __init__(self, base_url, archive=None, from_archive=False):
+    def __init__(self, base_url, archive=None, from_archive=False,
+                 prefetch_pages=DEFAULT_PREFETCH_PAGES):
         super().__init__(base_url.rstrip('/'), archive=archive, from_archive=from_archive)
+        self.prefetch_pages = prefetch_pages
 
     def contents(self, from_date=DEFAULT_DATETIME,
                  offset=None, max_contents=MAX_CONTENTS):
@@ -346,7 +365,7 @@ class ConfluenceClient(HttpClient):
         if offset:
             params[self.PSTART] = offset
 
-        for response in self._call(resource, params):
+        for response in self._call(resource, params, prefetch=self.prefetch_pages):
             yield response
 
     def historical_content(self, content_id, version):
@@ -367,28 +386,32 @@ class ConfluenceClient(HttpClient):
         response = [response for response in self._call(resource, params)]
         return response[0]
 
-    def _call(self, resource, params):
+    def _call(self, resource, params, prefetch=0):
         """Retrive the given resource.
 
         :param resource: resource to retrieve
         :param params: dict with the HTTP parameters needed to retrieve
             the given resource
+        :param prefetch: number of pages fetched in advance
         """
         url = self.URL % {'base': self.base_url, 'resource': resource}
 
         logger.debug("Confluence client requests: %s params: %s",
                      resource, str(params))
 
-        while True:
-            r = self.fetch(url, payload=params)
+        pages = LinkPaginator(self, url, payload=params, prefetch=prefetch,
+                              next_url=self.__next_url, keep_payload=False)
+
+        for r in pages:
             yield r.text
 
-            # Pagination is available when 'next' link exists
-            j = r.json()
-            if '_links' not in j:
-                break
-            if 'next' not in j['_links']:
-                break
+    def __next_url(self, response):
+        """Get the URL of the next page from the body of a response"""
+
+        # Pagination is available when 'next' link exists
+        j = response.json()
+
+        if 'next' not in j.get('_links', {}):
+            return None
 
-            url = urijoin(self.base_url, j['_links']['next'])
-            params = {}
+        return urijoin(self.base_url, j['_links']['next'])
@@ -31,7 +31,10 @@ from grimoirelab.toolkit.uris import urijoin
 from ...backend import (Backend,
                         BackendCommand,
                         BackendCommandArgumentParser)
-from ...client import HttpClient
+from ...client import (DEFAULT_POOL_SIZE,
+                       DEFAULT_WORKERS,
+                       HttpClient,
+                       fetch_concurrently)
 from ...utils import DEFAULT_DATETIME
 
 
@@ -51,17 +54,25 @@ class Discourse(Backend):
     :param api_token: Discourse API access token
     :param tag: label used to mark the data
     :param archive: archive to store/retrieve items
+    :param workers: number of threads used to fetch the posts of
+        several topics at the same time
+    :param pool_size: number of connections kept open for each host
+    :param keep_alive: reuse connections between requests
     """
-    version = '0.9.3'
+    version = '0.11.0'
 
     CATEGORIES = [CATEGORY_TOPIC]
 
-    def __init__(self, url, api_token=None, tag=None, archive=None):
+    def __init__(self, url, api_token=None, tag=None, archive=None,
+                 workers=DEFAULT_WORKERS, pool_size=DEFAULT_POOL_SIZE, keep_alive=True):
         origin = url
 
         super().__init__(origin, tag=tag, archive=archive)
         self.url = url
         self.api_token = api_token
+        self.workers = workers
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive
         self.client = None
 
     def fetch(self, category=CATEGORY_TOPIC, from_date=DEFAULT_DATETIME):
@@ -102,9 +113,10 @@ class Discourse(Backend):
         ntopics = 0
 
         topics_ids = self.__fetch_and_parse_topics_ids(from_date)
+        topics = fetch_concurrently(self.__fetch_and_parse_topic, topics_ids,
+                                    workers=self.workers)
 
-        for topic_id in topics_ids:
-            topic = self.__fetch_and_parse_topic(topic_id)
+        for topic in topics:
             ntopics += 1
             yield topic
 
@@ -162,7 +174,8 @@ class Discourse(Backend):
     def _init_client(self, from_archive=False):
         """Init client"""
 
-        return DiscourseClient(self.url, self.api_token, archive=self.archive, from_archive=from_archive)
+        return DiscourseClient(self.url, self.api_token, archive=self.archive, from_archive=from_archive,
+                               pool_size=self.pool_size, keep_alive=self.keep_alive)
 
     def __fetch_and_parse_topics_ids(self, from_date):
         logger.debug("Fetching and parsing topics ids from %s",
@@ -269,6 +282,8 @@ class DiscourseClient(HttpClient):
     :param api_key: Discourse API access token
     :param archive: an archive to store/read fetched data
     :param from_archive: it tells whether to write/read the archive
+    :param pool_size: number of connections kept open for each host
+    :param keep_alive: reuse connections between requests
 
     :raises HTTPError: when an error occurs doing the request
     """
@@ -285,8 +300,10 @@ class DiscourseClient(HttpClient):
     # Data type
     TJSON = '.json'
 
-    def __init__(self, base_url, api_key=None, archive=None, from_archive=False):
-        super().__init__(base_url, archive=archive, from_archive=from_archive)
+    def __init__(self, base_url, api_key=None, archive=None, from_archive=False,
+                 pool_size=DEFAULT_POOL_SIZE, keep_alive=True):
+        super().__init__(base_url, archive=archive, from_archive=from_archive,
+                         pool_size=pool_size, keep_alive=keep_alive)
         self.api_key = api_key
 
     def topics_page(self, page=None):
@@ -384,7 +401,14 @@ class DiscourseCommand(BackendCommand):
 
         parser = BackendCommandArgumentParser(from_date=True,
                                               token_auth=True,
-                                              archive=True)
+                                              archive=True,
+                                              connection=True)
+
+        # Discourse options
+        group = parser.parser.add_argument_group('Discourse arguments')
+        group.add_argument('--workers', dest='workers',
+                           type=int, default=DEFAULT_WORKERS,
+                           help="Number of threads used to fetch the posts of the topics")
 
         # Required arguments
         parser.parser.add_argument('url',
@@ -21,10 +21,18 @@
 #     Santiago Dueñas <sduenas@bitergia.com>
 #
 
+import collections
+import datetime
+import io
+import itertools
 import json
 import logging
+import os
 import re
+import shlex
+import shutil
 import subprocess
+import tempfile
 import time
 
 from grimoirelab.toolkit.datetime import datetime_to_utc
@@ -32,6 +40,7 @@ from grimoirelab.toolkit.datetime import datetime_to_utc
 from ...backend import (Backend,
                         BackendCommand,
                         BackendCommandArgumentParser)
+from ...client import DEFAULT_WORKERS, read_concurrently
 from ...errors import BackendError
 from ...utils import DEFAULT_DATETIME
 
@@ -39,6 +48,8 @@ CATEGORY_REVIEW = "review"
 
 MAX_REVIEWS = 500  # Maximum number of reviews per query
 PORT = '29418'
+CONTROL_PERSIST = 300  # Seconds the shared SSH connection is kept open when idle
+CHECKPOINT_INTERVAL = 100  # Number of fetched projects between checkpoint saves
 
 logger = logging.getLogger(__name__)
 
@@ -58,8 +69,16 @@ class Gerrit(Backend):
     :param disable_host_key_check: disable host key controls
     :param tag: label used to mark the data
     :param archive: archive to store/retrieve items
+    :param ssh_multiplexing: send the queries over a single shared
+        SSH connection
+    :param shard_by_project: fetch the reviews of each project of
+        the server with its own queries
+    :param workers: number of projects fetched at the same time
+        when the reviews are sharded by project
+    :param checkpoint_path: path of the file where the resume points
+        of the projects are stored when the reviews are sharded
     """
-    version = '0.11.0'
+    version = '0.14.0'
 
     CATEGORIES = [CATEGORY_REVIEW]
 
@@ -67,7 +86,9 @@ class Gerrit(Backend):
                  user=None, port=PORT, max_reviews=MAX_REVIEWS,
                  blacklist_reviews=None,
                  disable_host_key_check=False,
-                 tag=None, archive=None):
+                 tag=None, archive=None, ssh_multiplexing=False,
+                 shard_by_project=False, workers=DEFAULT_WORKERS,
+                 checkpoint_path=None):
         origin = hostname
 
         super().__init__(origin, tag=tag, archive=archive)
@@ -78,6 +99,10 @@ class Gerrit(Backend):
         self.blacklist_reviews = blacklist_reviews
         self.disable_host_key_check = disable_host_key_check
         self.archive = archive
+        self.ssh_multiplexing = ssh_multiplexing
+        self.shard_by_project = shard_by_project
+        self.workers = workers
+        self.checkpoint_path = checkpoint_path
         self.client = None
 
     def fetch(self, category=CATEGORY_REVIEW, from_date=DEFAULT_DATETIME):
@@ -86,6 +111,21 @@ class Gerrit(Backend):
         The method retrieves, from a Gerrit repository, the reviews
         updated since the given date.
 
+        When `shard_by_project` is set, the projects of the server are
+        listed and the reviews of each one are fetched with its own
+        queries, using a pool of `workers` threads. Reviews are returned
+        project by project, following the order of the list; at most
+        `max_reviews` reviews of each project in progress are kept in
+        memory until they are returned.
+
+        If a `checkpoint_path` is also given, the update time of the
+        newest review of each project is saved there once all its
+        reviews were returned. Points are saved every
+        `CHECKPOINT_INTERVAL` projects and when the process finishes
+        or fails. The next fetch will start every project from its
+        resume point, so when a process is interrupted only the
+        projects not finished are fetched again from the beginning.
+
         :param category: the category of items to fetch
         :param from_date: obtain reviews updated since this date
 
@@ -95,6 +135,10 @@ class Gerrit(Backend):
             from_date = DEFAULT_DATETIME
 
         kwargs = {'from_date': from_date}
+
+        if self.shard_by_project and self.checkpoint_path:
+            kwargs['resume_points'] = GerritCheckpoint(self.checkpoint_path).load()
+
         items = super().fetch(category, **kwargs)
 
         return items
@@ -108,14 +152,18 @@ class Gerrit(Backend):
         :returns: a generator of items
         """
         from_date = kwargs['from_date']
+        resume_points = kwargs.get('resume_points', None)
 
-        if self.client.version[0] == 2 and self.client.version[1] == 8:
-            fetcher = self._fetch_gerrit28(from_date)
-        else:
-            fetcher = self._fetch_gerrit(from_date)
+        try:
+            if self.shard_by_project:
+                fetcher = self._fetch_projects(from_date, resume_points)
+            else:
+                fetcher = self._fetch_project(from_date)
 
-        for review in fetcher:
-            yield review
+            for review in fetcher:
+                yield review
+        finally:
+            self.client.close()
 
     @classmethod
     def has_archiving(cls):
@@ -165,25 +213,117 @@ class Gerrit(Backend):
     def parse_reviews(raw_data):
         """Parse a Gerrit reviews list."""
 
-        # Join isolated reviews in JSON in array for parsing
-        items_raw = "[" + raw_data.replace("\n", ",") + "]"
-        items_raw = items_raw.replace(",]", "]")
-        items = json.loads(items_raw)
-        reviews = []
-
-        for item in items:
-            if 'project' in item.keys():
-                reviews.append(item)
+        reviews = [review for review in Gerrit.parse_reviews_lines(raw_data.splitlines())]
 
         return reviews
 
+    @staticmethod
+    def parse_reviews_lines(lines):
+        """Parse the lines of a Gerrit reviews list.
+
+        Each line of the output of a query stores a review in JSON,
+        except the last one that stores the stats of the query.
+        Reviews are returned as soon as their line is parsed.
+
+        :param lines: iterable of lines
+
+        :returns: a generator of reviews
+        """
+        for line in lines:
+            if not line.strip():
+                continue
+
+            item = json.loads(line)
+
+            if 'project' in item:
+                yield item
+
     def _init_client(self, from_archive=False):
 
         return GerritClient(self.hostname, self.user, self.max_reviews,
                             self.blacklist_reviews, self.disable_host_key_check,
-                            self.port, self.archive, from_archive)
+                            self.port, self.archive, from_archive,
+                            ssh_multiplexing=self.ssh_multiplexing)
+
+    def _fetch_projects(self, from_date=DEFAULT_DATETIME, resume_points=None):
+        """Fetch the reviews of every project of the server"""
+
+        # The version is requested before starting the threads
+        # that share the client
+        _ = self.client.version
+
+        projects = self.client.projects()
+
+        logger.info("Fetching reviews of %s projects with %s workers",
+                    len(projects), self.workers)
+
+        # Resume points are read from the archive params
+        # and only updated when fetching from the server
+        checkpoint = None
+        if resume_points is not None and not self.client.from_archive:
+            checkpoint = GerritCheckpoint(self.checkpoint_path)
+
+        from_date = datetime_to_utc(from_date)
+
+        def fetch_project(project):
+            project_from_date = from_date
+
+            if resume_points and project in resume_points:
+                resume_date = datetime.datetime.fromtimestamp(resume_points[project],
+                                                              tz=datetime.timezone.utc)
+                project_from_date = max(from_date, resume_date)
+
+            for review in self._fetch_project(project_from_date, project):
+                yield project, review
+
+            # Mark the end of the project
+            yield project, None
+
+        # Shards are streamed; at most a page of reviews
+        # of each project is kept waiting to be returned
+        shards = (fetch_project(project) for project in projects)
+        entries = read_concurrently(shards, workers=self.workers, size=self.max_reviews)
+
+        nreviews = 0
+        updated = None
+        points = {}
+
+        try:
+            for project, review in entries:
+                if review is not None:
+                    nreviews += 1
+                    updated = max(updated or 0, review['lastUpdated'])
+                    yield review
+                    continue
+
+                logger.debug("%s reviews fetched from project %s", nreviews, project)
+
+                if checkpoint and updated is not None:
+                    points[project] = updated
+
+                    if len(points) >= CHECKPOINT_INTERVAL:
+                        checkpoint.save(points)
+                        points = {}
+
+                nreviews = 0
+                updated = None
+        finally:
+            # Points of the projects fully fetched are
+            # saved even when the process fails
+            if points:
+                checkpoint.save(points)
+
+    def _fetch_project(self, from_date=DEFAULT_DATETIME, project=None):
+        """Fetch the reviews of a project or, by default, of the whole server"""
+
+        if self.client.version[0] == 2 and self.client.version[1] == 8:
+            fetcher = self._fetch_gerrit28(from_date, project)
+        else:
+            fetcher = self._fetch_gerrit(from_date, project)
 
-    def _fetch_gerrit28(self, from_date=DEFAULT_DATETIME):
+        return fetcher
+
+    def _fetch_gerrit28(self, from_date=DEFAULT_DATETIME, project=None):
         """ Specific fetch for gerrit 2.8 version.
 
         Get open and closed reviews in different queries.
@@ -197,79 +337,106 @@ class Gerrit(Backend):
         filter_open = "status:open"
         filter_closed = "status:closed"
 
-        last_item_open = self.client.next_retrieve_group_item()
-        last_item_closed = self.client.next_retrieve_group_item()
-        reviews_open = self._get_reviews(last_item_open, filter_open)
-        reviews_closed = self._get_reviews(last_item_closed, filter_closed)
-        last_nreviews_open = len(reviews_open)
-        last_nreviews_closed = len(reviews_closed)
-
-        while reviews_open or reviews_closed:
-            if reviews_open and reviews_closed:
-                if reviews_open[0]['lastUpdated'] >= reviews_closed[0]['lastUpdated']:
-                    review_open = reviews_open.pop(0)
-                    review = review_open
-                else:
-                    review_closed = reviews_closed.pop(0)
-                    review = review_closed
-            elif reviews_closed:
-                review_closed = reviews_closed.pop(0)
-                review = review_closed
-            else:
-                review_open = reviews_open.pop(0)
-                review = review_open
+        reviews_open = self._fetch_reviews(filter_open, project)
+        reviews_closed = self._fetch_reviews(filter_closed, project)
 
-            updated = review['lastUpdated']
-            if updated <= from_ut:
-                logger.debug("No more updates for %s" % (self.hostname))
-                break
-            else:
-                yield review
+        # Only the next review of each list is kept
+        # in memory while the lists are merged
+        next_open = collections.deque()
+        next_closed = collections.deque()
 
-            if not reviews_open and last_nreviews_open >= self.max_reviews:
-                last_item_open = self.client.next_retrieve_group_item(last_item_open, review_open)
-                reviews_open = self._get_reviews(last_item_open, filter_open)
-                last_nreviews_open = len(reviews_open)
-            if not reviews_closed and last_nreviews_closed >= self.max_reviews:
-                last_item_closed = self.client.next_retrieve_group_item(last_item_closed, review_closed)
-                reviews_closed = self._get_reviews(last_item_closed, filter_closed)
-                last_nreviews_closed = len(reviews_closed)
+        def peek(reviews, next_review):
+            if not next_review:
+                next_review.extend(itertools.islice(reviews, 1))
+            return next_review[0] if next_review else None
 
-    def _fetch_gerrit(self, from_date=DEFAULT_DATETIME):
-        last_item = self.client.next_retrieve_group_item()
-        reviews = self._get_reviews(last_item)
-        last_nreviews = len(reviews)
+        try:
+            while True:
+                review_open = peek(reviews_open, next_open)
+                review_closed = peek(reviews_closed, next_closed)
+
+                if review_open is None and review_closed is None:
+                    break
+                elif review_closed is None:
+                    review = next_open.popleft()
+                elif review_open is None:
+                    review = next_closed.popleft()
+                elif review_open['lastUpdated'] >= review_closed['lastUpdated']:
+                    review = next_open.popleft()
+                else:
+                    review = next_closed.popleft()
+
+                updated = review['lastUpdated']
+                if updated <= from_ut:
+                    logger.debug("No more updates for %s" % (self.hostname))
+                    break
+                else:
+                    yield review
+        finally:
+            reviews_open.close()
+            reviews_closed.close()
+
+    def _fetch_gerrit(self, from_date=DEFAULT_DATETIME, project=None):
+        reviews = self._fetch_reviews(project=project)
 
         # Convert date to Unix time
         from_ut = datetime_to_utc(from_date)
         from_ut = from_ut.timestamp()
 
-        while reviews:
-            review = reviews.pop(0)
+        try:
+            for review in reviews:
+                updated = review['lastUpdated']
+                if updated <= from_ut:
+                    logger.debug("No more updates for %s" % (self.hostname))
+                    break
+                else:
+                    yield review
+        finally:
+            reviews.close()
+
+    def _fetch_reviews(self, filter_=None, project=None):
+        """Fetch the reviews of every group, one group after the other"""
+
+        last_item = self.client.next_retrieve_group_item()
+
+        while True:
+            review = None
+            nreviews = 0
+
+            reviews = self._get_reviews(last_item, filter_, project)
+
             try:
-                last_item += 1
-            except Exception:
-                pass  # last_item is a string in old gerrits
-            updated = review['lastUpdated']
-            if updated <= from_ut:
-                logger.debug("No more updates for %s" % (self.hostname))
+                for review in reviews:
+                    nreviews += 1
+                    try:
+                        last_item += 1
+                    except Exception:
+                        pass  # last_item is a string in old gerrits
+                    yield review
+            finally:
+                reviews.close()
+
+            if nreviews < self.max_reviews:
                 break
-            else:
-                yield review
 
-            if not reviews and last_nreviews >= self.max_reviews:
-                logger.debug("GETTING MORE REVIEWS %i >= %i " % (last_nreviews, self.max_reviews))
-                last_item = self.client.next_retrieve_group_item(last_item, review)
-                reviews = self._get_reviews(last_item)
-                last_nreviews = len(reviews)
+            logger.debug("GETTING MORE REVIEWS %i >= %i " % (nreviews, self.max_reviews))
+            last_item = self.client.next_retrieve_group_item(last_item, review)
 
-    def _get_reviews(self, last_item, filter_=None):
+    def _get_reviews(self, last_item, filter_=None, project=None):
         task_init = time.time()
-        raw_data = self.client.reviews(last_item, filter_)
-        reviews = self.parse_reviews(raw_data)
-        logger.info("Received %i reviews in %.2fs" % (len(reviews),
+        nreviews = 0
+
+        lines = self.client.reviews_lines(last_item, filter_, project)
+
+        try:
+            for review in self.parse_reviews_lines(lines):
+                nreviews += 1
+                yield review
+        finally:
+            lines.close()
+
+        logger.info("Received %i reviews in %.2fs" % (nreviews,
                                                       time.time() - task_init))
-        return reviews
 
 
 class GerritClient():
@@ -282,6 +449,15 @@ class GerritClient():
     Check the next link for more info:
     https://gerrit-documentation.storage.googleapis.com/Documentation/2.12/cmd-query.html
 
+    When `ssh_multiplexing` is set, the first command opens a master
+    SSH connection (OpenSSH `ControlMaster`) and the next ones are
+    sent over it, so the connection and authentication handshakes
+    are done only once. The master connection is closed calling
+    `close` or after `CONTROL_PERSIST` seconds of inactivity.
+
+    Commands can be run from several threads at the same time once
+    the version of the server was requested.
+
     :param repository: Hostname of the Gerrit server
     :param user: SSH user to be used to connect to gerrit server
     :param max_reviews: max number of reviews per query
@@ -290,16 +466,19 @@ class GerritClient():
     :param port: SSH port
     :param archive: collect issues already retrieved from an archive
     :param from_archive: it tells whether to write/read the archive
+    :param ssh_multiplexing: send the commands over a single shared
+        SSH connection
     """
     VERSION_REGEX = re.compile(r'gerrit version (\d+)\.(\d+).*')
     CMD_GERRIT = 'gerrit'
     CMD_VERSION = 'version'
+    CMD_PROJECTS = 'ls-projects'
     MAX_RETRIES = 3  # max number of retries when a command fails
     RETRY_WAIT = 60  # number of seconds when retrying a ssh command
 
     def __init__(self, repository, user=None, max_reviews=MAX_REVIEWS, blacklist_reviews=None,
                  disable_host_key_check=False, port=PORT,
-                 archive=None, from_archive=False):
+                 archive=None, from_archive=False, ssh_multiplexing=False):
         self.gerrit_user = user
         self.max_reviews = max_reviews
 
@@ -310,17 +489,27 @@ class GerritClient():
         self.port = port
         self.archive = archive
         self.from_archive = from_archive
+        self.ssh_multiplexing = ssh_multiplexing
+
+        # The directory of the control socket is created here,
+        # so concurrent commands share the same one
+        if self.ssh_multiplexing:
+            self._control_dir = tempfile.mkdtemp(prefix='perceval-gerrit-')
+        else:
+            self._control_dir = None
+        self._master_opened = False
 
         ssh_opts = ''
         if disable_host_key_check:
             ssh_opts += "-o StrictHostKeyChecking=no "
 
         if self.port:
-            self.gerrit_cmd = "ssh %s -p %s %s@%s" % (ssh_opts, self.port,
-                                                      self.gerrit_user, self.repository)
+            self.ssh_target = "%s -p %s %s@%s" % (ssh_opts, self.port,
+                                                  self.gerrit_user, self.repository)
         else:
-            self.gerrit_cmd = "ssh %s %s@%s" % (ssh_opts, self.gerrit_user, self.repository)
+            self.ssh_target = "%s %s@%s" % (ssh_opts, self.gerrit_user, self.repository)
 
+        self.gerrit_cmd = "ssh " + self.ssh_target
         self.gerrit_cmd += " %s " % (GerritClient.CMD_GERRIT)
 
     @property
@@ -354,10 +543,23 @@ class GerritClient():
         self._version = [mayor, minor]
         return self._version
 
-    def reviews(self, last_item, filter_=None):
+    def projects(self):
+        """Get the names of the projects of the server."""
+
+        cmd = self.gerrit_cmd + " %s " % (GerritClient.CMD_PROJECTS)
+
+        logger.debug("Getting projects: %s", cmd)
+        raw_data = self.__execute(cmd)
+        raw_data = str(raw_data, "UTF-8")
+
+        projects = [project.strip() for project in raw_data.splitlines() if project.strip()]
+
+        return projects
+
+    def reviews(self, last_item, filter_=None, project=None):
         """Get the reviews starting from last_item."""
 
-        cmd = self._get_gerrit_cmd(last_item, filter_)
+        cmd = self._get_gerrit_cmd(last_item, filter_, project)
 
         logger.debug("Getting reviews with command: %s", cmd)
         raw_data = self.__execute(cmd)
@@ -365,6 +567,26 @@ class GerritClient():
 
         return raw_data
 
+    def reviews_lines(self, last_item, filter_=None, project=None):
+        """Get the reviews starting from last_item, line by line.
+
+        Lines are returned while the command is running, so the
+        output of the query is never loaded at once. When the
+        generator is closed before the output is read, the rest
+        of it is only read when it has to be archived.
+        """
+        cmd = self._get_gerrit_cmd(last_item, filter_, project)
+
+        logger.debug("Getting reviews with command: %s", cmd)
+
+        lines = self.__execute_lines(cmd)
+
+        try:
+            for line in lines:
+                yield str(line, "UTF-8")
+        finally:
+            lines.close()
+
     def next_retrieve_group_item(self, last_item=None, entry=None):
         """Return the item to start from in next reviews group."""
 
@@ -387,6 +609,29 @@ class GerritClient():
 
         return next_item
 
+    def close(self):
+        """Close the master SSH connection, if any.
+
+        Once closed, the next commands are sent over their own
+        SSH connections.
+        """
+        if not self._control_dir:
+            return
+
+        if self._master_opened:
+            cmd = "ssh %s -O exit %s" % (self.__multiplexing_opts(), self.ssh_target)
+
+            logger.debug("Closing shared SSH connection: %s", cmd)
+
+            try:
+                subprocess.check_output(cmd, shell=True, stderr=subprocess.STDOUT)
+            except subprocess.CalledProcessError as ex:
+                logger.warning("Shared SSH connection not closed: %s", ex)
+
+        shutil.rmtree(self._control_dir, ignore_errors=True)
+        self._control_dir = None
+        self._master_opened = False
+
     @staticmethod
     def sanitize_for_archive(cmd):
         """Sanitize the Gerrit command by removing username information
@@ -410,6 +655,17 @@ class GerritClient():
 
         return response
 
+    def __execute_lines(self, cmd):
+        """Execute gerrit command returning an iterator of output lines"""
+
+        if self.from_archive:
+            response = self.__execute_from_archive(cmd)
+            lines = io.BytesIO(response)
+        else:
+            lines = self.__execute_from_remote_lines(cmd)
+
+        return lines
+
     def __execute_from_archive(self, cmd):
         """Execute gerrit command against the archive"""
 
@@ -427,9 +683,11 @@ class GerritClient():
         result = None  # data result from the cmd execution
         retries = 0
 
+        remote_cmd = self.__remote_cmd(cmd)
+
         while retries < self.MAX_RETRIES:
             try:
-                result = subprocess.check_output(cmd, shell=True)
+                result = subprocess.check_output(remote_cmd, shell=True)
                 break
             except subprocess.CalledProcessError as ex:
                 logger.error("gerrit cmd %s failed: %s", cmd, ex)
@@ -448,15 +706,116 @@ class GerritClient():
 
         return result
 
-    def _get_gerrit_cmd(self, last_item, filter_=None):
+    def __execute_from_remote_lines(self, cmd):
+        """Execute gerrit command returning its output while it runs.
+
+        The command is retried when it fails before writing any
+        output; once some lines were returned, a failure raises
+        an exception. The output is archived when the command
+        finishes.
+        """
+        result = None  # data result from the cmd execution
+        output = []  # lines of the output to archive
+        retries = 0
+
+        remote_cmd = self.__remote_cmd(cmd)
+
+        while retries < self.MAX_RETRIES:
+            nlines = 0
+            closed = False
+
+            proc = subprocess.Popen(remote_cmd, shell=True, stdout=subprocess.PIPE)
+
+            try:
+                for line in proc.stdout:
+                    nlines += 1
+                    if self.archive:
+                        output.append(line)
+                    yield line
+            except GeneratorExit:
+                # The rest of the output is read only when
+                # it has to be archived
+                closed = True
+                if self.archive:
+                    output.extend(proc.stdout)
+                else:
+                    proc.kill()
+            finally:
+                proc.stdout.close()
+                proc.wait()
+
+            if closed and not self.archive:
+                return
+            elif proc.returncode == 0:
+                result = b''.join(output)
+                break
+
+            ex = subprocess.CalledProcessError(proc.returncode, cmd)
+            logger.error("gerrit cmd %s failed: %s", cmd, ex)
+
+            if nlines:
+                result = RuntimeError(cmd + " failed after returning part of its output. Giving up!")
+                break
+
+            time.sleep(self.RETRY_WAIT * retries)
+            retries += 1
+
+        if result is None:
+            result = RuntimeError(cmd + " failed " + str(self.MAX_RETRIES) + " times. Giving up!")
+
+        if self.archive:
+            cmd = self.sanitize_for_archive(cmd)
+            self.archive.store(cmd, None, None, result)
+
+        if isinstance(result, RuntimeError) and not closed:
+            raise result
+
+    def __remote_cmd(self, cmd):
+        """Command to run on the remote server"""
+
+        # Multiplexing options are not part of the command
+        # stored in the archive, so they do not change its key
+        if self._control_dir:
+            remote_cmd = cmd.replace("ssh ", "ssh " + self.__multiplexing_opts(), 1)
+            self._master_opened = True
+        else:
+            remote_cmd = cmd
+
+        return remote_cmd
+
+    def __multiplexing_opts(self):
+        """SSH options to share a master connection between commands"""
+
+        # Each client connects to a single host; a short path
+        # keeps it under the length limit of socket paths
+        control_path = os.path.join(self._control_dir, 'ssh')
+
+        opts = "-o ControlMaster=auto -o ControlPath='%s' -o ControlPersist=%s " % \
+            (control_path, CONTROL_PERSIST)
+        return opts
+
+    @staticmethod
+    def __project_term(project):
+        """Query term to filter the reviews of a project.
+
+        Project names are set by the server and they can include
+        spaces, quotes or shell metacharacters; the name is quoted
+        for the query and the term is escaped for the local shell.
+        """
+        name = project.replace('\\', '\\\\').replace('"', '\\"')
+        return shlex.quote('project:"%s"' % name)
+
+    def _get_gerrit_cmd(self, last_item, filter_=None, project=None):
+
+        project = project or self.project
 
         if filter_ and filter_ not in ['status:open', 'status:closed']:
             cause = "Filter not supported in gerrit %s" % (filter_)
             raise BackendError(cause=cause)
 
         cmd = self.gerrit_cmd + " query "
-        if self.project:
-            cmd += "project:" + self.project + " "
+        if project:
+            cmd += self.__project_term(project) + " "
         cmd += "limit:" + str(self.max_reviews)
 
         if not filter_:
@@ -486,6 +845,60 @@ class GerritClient():
         return cmd
 
 
+class GerritCheckpoint:
+    """Store the resume points of the projects of a Gerrit server.
+
+    The checkpoint is a JSON file that maps the names of the projects
+    to the update time, as a UNIX timestamp, of the newest review
+    fetched from them. The points of the projects not included in
+    a fetch process are kept.
+
+    :param path: path of the checkpoint file
+    """
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        """Load the resume points of the projects.
+
+        An invalid checkpoint is ignored, so the reviews of all
+        the projects will be fetched again.
+
+        :returns: a dict of resume points; empty when there is
+            no checkpoint
+        """
+        return self._read()
+
+    def save(self, points):
+        """Save the resume points of a set of projects.
+
+        The file is replaced atomically, so the checkpoint is never
+        left in an inconsistent state.
+
+        :param points: dict with the resume points of the projects
+        """
+        projects = self._read()
+        projects.update(points)
+
+        tmp_path = self.path + '.tmp'
+
+        with open(tmp_path, 'w') as f:
+            json.dump({'projects': projects}, f, indent=4, sort_keys=True)
+
+        os.replace(tmp_path, self.path)
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return {}
+
+        try:
+            with open(self.path, 'r') as f:
+                return dict(json.load(f)['projects'])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning("Invalid checkpoint %s ignored; %s", self.path, str(e))
+            return {}
+
+
 class GerritCommand(BackendCommand):
     """Class to run Gerrit backend from the command line."""
 
@@ -513,6 +926,15 @@ class GerritCommand(BackendCommand):
         group.add_argument('--ssh-port', dest='port',
                            default=PORT, type=int,
                            help="Set SSH port of the Gerrit server")
+        group.add_argument('--ssh-multiplexing', dest='ssh_multiplexing', action='store_true',
+                           help="Send the queries over a single shared SSH connection")
+        group.add_argument('--shard-by-project', dest='shard_by_project', action='store_true',
+                           help="Fetch the reviews of each project with its own queries")
+        group.add_argument('--workers', dest='workers',
+                           type=int, default=DEFAULT_WORKERS,
+                           help="Number of projects fetched at the same time")
+        group.add_argument('--checkpoint-path', dest='checkpoint_path',
+                           help="File storing the resume points of the projects")
 
         # Required arguments
         parser.parser.add_argument('hostname',
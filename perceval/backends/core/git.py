@@ -21,7 +21,9 @@
 #
 
 import collections
+import concurrent.futures
 import io
+import json
 import logging
 import os
 import re
@@ -64,7 +66,7 @@ class Git(Backend):
     :raises RepositoryError: raised when there was an error cloning or
         updating the repository.
     """
-    version = '0.10.2'
+    version = '0.11.0'
 
     CATEGORIES = [CATEGORY_COMMIT]
 
@@ -76,7 +78,7 @@ class Git(Backend):
         self.gitpath = gitpath
 
     def fetch(self, category=CATEGORY_COMMIT, from_date=DEFAULT_DATETIME, to_date=DEFAULT_LAST_DATETIME,
-              branches=None, latest_items=False):
+              branches=None, latest_items=False, workers=1, checkpoint=False):
         """Fetch commits.
 
         The method retrieves from a Git repository or a log file
@@ -98,6 +100,18 @@ class Git(Backend):
         when the commits are fetched from a Git log file or when
         `latest_items` flag is set.
 
+        When `workers` is greater than one, the log is parsed in parallel
+        by that number of processes. Commits are returned in the same
+        order anyway.
+
+        When `checkpoint` is set, the tips of the references fetched are
+        stored in the repository once all the commits were returned. The
+        next time, only those commits reachable from the new tips and not
+        from the stored ones will be returned. The checkpoint is not
+        updated when `to_date` is given, and it is ignored when the
+        commits are fetched from a Git log file or when `latest_items`
+        flag is set.
+
         The class raises a `RepositoryError` exception when an error
         occurs accessing the repository.
 
@@ -108,6 +122,9 @@ class Git(Backend):
         :param branches: names of branches to fetch from (default: None)
         :param latest_items: sync with the repository to fetch only the
             newest commits
+        :param workers: number of processes used to parse the log
+        :param checkpoint: fetch only the commits added since the last
+            checkpoint and update it
 
         :returns: a generator of commits
         """
@@ -120,7 +137,9 @@ class Git(Backend):
             'from_date': from_date,
             'to_date': to_date,
             'branches': branches,
-            'latest_items': latest_items
+            'latest_items': latest_items,
+            'workers': workers,
+            'checkpoint': checkpoint
         }
         items = super().fetch(category, **kwargs)
 
@@ -138,15 +157,17 @@ class Git(Backend):
         to_date = kwargs['to_date']
         branches = kwargs['branches']
         latest_items = kwargs['latest_items']
+        workers = kwargs.get('workers', 1)
+        checkpoint = kwargs.get('checkpoint', False)
 
         ncommits = 0
 
         try:
             if os.path.isfile(self.gitpath):
-                commits = self.__fetch_from_log()
+                commits = self.__fetch_from_log(workers)
             else:
                 commits = self.__fetch_from_repo(from_date, to_date, branches,
-                                                 latest_items)
+                                                 latest_items, workers, checkpoint)
 
             for commit in commits:
                 yield commit
@@ -206,13 +227,14 @@ class Git(Backend):
         return CATEGORY_COMMIT
 
     @staticmethod
-    def parse_git_log_from_file(filepath):
+    def parse_git_log_from_file(filepath, workers=1):
         """Parse a Git log file.
 
         The method parses the Git log file and returns an iterator of
         dictionaries. Each one of this, contains a commit.
 
         :param filepath: path to the log file
+        :param workers: number of processes used to parse the log
 
         :returns: a generator of parsed commits
 
@@ -223,13 +245,13 @@ class Git(Backend):
         """
         with open(filepath, 'r', errors='surrogateescape',
                   newline=os.linesep) as f:
-            parser = GitParser(f)
+            parser = GitParser(f, workers=workers)
 
             for commit in parser.parse():
                 yield commit
 
     @staticmethod
-    def parse_git_log_from_iter(iterator):
+    def parse_git_log_from_iter(iterator, workers=1):
         """Parse a Git log obtained from an iterator.
 
         The method parses the Git log fetched from an iterator, where
@@ -237,11 +259,12 @@ class Git(Backend):
         dictionaries. Each dictionary contains a commit.
 
         :param iterator: iterator of Git log lines
+        :param workers: number of processes used to parse the log
 
         :raises ParseError: raised when the format of the Git log
             is invalid
         """
-        parser = GitParser(iterator)
+        parser = GitParser(iterator, workers=workers)
 
         for commit in parser.parse():
             yield commit
@@ -249,12 +272,13 @@ class Git(Backend):
     def _init_client(self, from_archive=False):
         pass
 
-    def __fetch_from_log(self):
+    def __fetch_from_log(self, workers):
         logger.info("Fetching commits: '%s' git repository from log file %s",
                     self.uri, self.gitpath)
-        return self.parse_git_log_from_file(self.gitpath)
+        return self.parse_git_log_from_file(self.gitpath, workers=workers)
 
-    def __fetch_from_repo(self, from_date, to_date, branches, latest_items=False):
+    def __fetch_from_repo(self, from_date, to_date, branches, latest_items=False,
+                          workers=1, checkpoint=False):
         # When no latest items are set or the repository has not
         # been cloned use the default mode
         default_mode = not latest_items or not os.path.exists(self.gitpath)
@@ -262,13 +286,15 @@ class Git(Backend):
         repo = self.__create_git_repository()
 
         if default_mode:
-            commits = self.__fetch_commits_from_repo(repo, from_date, to_date, branches)
+            commits = self.__fetch_commits_from_repo(repo, from_date, to_date, branches,
+                                                     workers, checkpoint)
         else:
-            commits = self.__fetch_newest_commits_from_repo(repo)
+            commits = self.__fetch_newest_commits_from_repo(repo, workers)
 
         return commits
 
-    def __fetch_commits_from_repo(self, repo, from_date, to_date, branches):
+    def __fetch_commits_from_repo(self, repo, from_date, to_date, branches, workers,
+                                  checkpoint):
         if branches is None:
             branches_text = "all"
         elif len(branches) == 0:
@@ -293,10 +319,38 @@ class Git(Backend):
 
         repo.update()
 
-        gitlog = repo.log(from_date, to_date, branches)
-        return self.parse_git_log_from_iter(gitlog)
+        exclude = None
+
+        if checkpoint:
+            store = GitCheckpoint(self.gitpath)
+            tips = repo.tips(branches)
+            exclude = store.load()
+
+            logger.info("Fetching commits since checkpoint: %s tips already fetched",
+                        len(exclude))
 
-    def __fetch_newest_commits_from_repo(self, repo):
+        gitlog = repo.log(from_date, to_date, branches, exclude=exclude)
+        commits = self.parse_git_log_from_iter(gitlog, workers=workers)
+
+        if not checkpoint:
+            return commits
+        elif to_date:
+            logger.warning("Checkpoint of '%s' git repository not updated; 'to_date' is set",
+                           self.uri)
+            return commits
+        else:
+            return self.__update_checkpoint(commits, store, tips)
+
+    def __update_checkpoint(self, commits, store, tips):
+        for commit in commits:
+            yield commit
+
+        store.save(tips)
+
+        logger.debug("Checkpoint of '%s' git repository updated with %s tips",
+                     self.uri, len(tips))
+
+    def __fetch_newest_commits_from_repo(self, repo, workers):
         logger.info("Fetching latest commits: '%s' git repository",
                     self.uri)
 
@@ -305,7 +359,7 @@ class Git(Backend):
             return []
 
         gitshow = repo.show(hashes)
-        return self.parse_git_log_from_iter(gitshow)
+        return self.parse_git_log_from_iter(gitshow, workers=workers)
 
     def __create_git_repository(self):
         if not os.path.exists(self.gitpath):
@@ -348,6 +402,12 @@ class GitCommand(BackendCommand):
         group.add_argument('--latest-items', dest='latest_items',
                            action='store_true',
                            help="Fetch latest commits added to the repository")
+        group.add_argument('--workers', dest='workers',
+                           type=int, default=1,
+                           help="Number of processes used to parse the log")
+        group.add_argument('--checkpoint', dest='checkpoint',
+                           action='store_true',
+                           help="Fetch commits added since the last checkpoint")
 
         # Mutual exclusive parameters
         exgroup = group.add_mutually_exclusive_group()
@@ -451,7 +511,19 @@ class GitParser:
         git log --raw --numstat --pretty=fuller --decorate=full \
                 --parents -M -C -c --remotes=origin --all
 
+    The stream can be parsed by a pool of `workers` processes. In
+    that case, the log is split in chunks of `chunk_size` commits.
+    A chunk starts on a commit line preceded by an empty line.
+    Chunks are parsed in parallel but their commits are returned
+    in the same order they were found on the stream. To keep memory
+    bounded, no more than `max_chunks` chunks are sent to the
+    pool at the same time.
+
     :param stream: a file object which stores the log
+    :param workers: number of processes used to parse the log
+    :param chunk_size: number of commits on each chunk
+    :param max_chunks: maximum number of chunks being parsed at
+        the same time; by default, twice the number of workers
     """
     COMMIT_PATTERN = r"""^commit[ \t](?P<commit>[a-f0-9]{40})
                      (?:[ \t](?P<parents>[a-f0-9][a-f0-9 \t]+))?
@@ -491,11 +563,18 @@ class GitParser:
     # Git trailers
     TRAILERS = ['Signed-off-by']
 
-    def __init__(self, stream):
+    # Number of commits of the chunks parsed in parallel
+    CHUNK_SIZE = 1000
+
+    def __init__(self, stream, workers=1, chunk_size=CHUNK_SIZE, max_chunks=None):
         self.stream = stream
         self.nline = 0
         self.state = self.INIT
 
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.max_chunks = max_chunks or 2 * workers
+
         # Aux vars to store the commit that is being parsed
         self.commit = None
         self.commit_files = {}
@@ -511,6 +590,11 @@ class GitParser:
     def parse(self):
         """Parse the Git log stream."""
 
+        if self.workers > 1:
+            for commit in self._parse_parallel():
+                yield commit
+            return
+
         for line in self.stream:
             line = line.rstrip('\n')
             parsed = False
@@ -530,6 +614,70 @@ class GitParser:
             logger.debug("Commit %s parsed", commit['commit'])
             yield commit
 
+    def _parse_parallel(self):
+        """Parse the chunks of the stream using a pool of processes"""
+
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers)
+        pending = collections.deque()
+
+        try:
+            for offset, lines in self._split_chunks():
+                future = executor.submit(_parse_git_log_chunk, lines, offset)
+                pending.append(future)
+
+                if len(pending) < self.max_chunks:
+                    continue
+
+                for commit in self._read_chunk(pending.popleft()):
+                    yield commit
+
+            while pending:
+                for commit in self._read_chunk(pending.popleft()):
+                    yield commit
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+    def _split_chunks(self):
+        """Split the stream in chunks of commits.
+
+        Returns tuples with the number of lines read before the
+        chunk and the list of lines of the chunk.
+        """
+        lines = []
+        offset = 0
+        ncommits = 0
+        empty_line = True
+
+        for line in self.stream:
+            line = line.rstrip('\n')
+            self.nline += 1
+
+            if empty_line and self.GIT_COMMIT_REGEXP.match(line):
+                if ncommits == self.chunk_size:
+                    yield offset, lines
+                    lines = []
+                    offset = self.nline - 1
+                    ncommits = 0
+                ncommits += 1
+
+            lines.append(line)
+            empty_line = not line
+
+        if lines:
+            yield offset, lines
+
+    def _read_chunk(self, future):
+        commits, error = future.result()
+
+        for commit in commits:
+            logger.debug("Commit %s parsed", commit['commit'])
+            yield commit
+
+        if error:
+            raise ParseError(cause=error)
+
     def _build_commit(self):
         def remove_none_values(d):
             return {k: v for k, v in d.items() if v is not None}
@@ -713,6 +861,30 @@ class GitParser:
             return f
 
 
+def _parse_git_log_chunk(lines, offset):
+    """Parse a chunk of a Git log.
+
+    This function runs on the processes of the pool. It returns the
+    list of commits parsed and the message of the error found while
+    parsing, if any. Parsing errors are raised again by the parent.
+
+    :param lines: lines of the chunk
+    :param offset: number of lines read before this chunk
+    """
+    parser = GitParser(lines)
+    parser.nline = offset
+
+    commits = []
+
+    try:
+        for commit in parser.parse():
+            commits.append(commit)
+    except ParseError as e:
+        return commits, str(e)
+
+    return commits, None
+
+
 class EmptyRepositoryError(RepositoryError):
     """Exception raised when a repository is empty"""
 
@@ -927,7 +1099,8 @@ class GitRepository:
 
         return commits
 
-    def log(self, from_date=None, to_date=None, branches=None, encoding='utf-8'):
+    def log(self, from_date=None, to_date=None, branches=None, encoding='utf-8',
+            exclude=None):
         """Read the commit log from the repository.
 
         The method returns the Git log of the repository using the
@@ -945,10 +1118,15 @@ class GitRepository:
         is fetched. If the list of branches is None, all commits
         for all branches will be fetched.
 
+        Commits reachable from any of the hashes in `exclude` are
+        not included in the log, like `git log <ref> ^<hash>` does.
+        Hashes not found in the repository are ignored.
+
         :param from_date: fetch commits newer than a specific
             date (inclusive)
         :param branches: names of branches to fetch from (default: None)
         :param encoding: encode the log using this format
+        :param exclude: list of hashes of the commits to exclude
 
         :returns: a generator where each item is a line from the log
 
@@ -980,12 +1158,59 @@ class GitRepository:
             branches = ['refs/heads/' + branch for branch in branches]
             cmd_log.extend(branches)
 
+        if exclude:
+            cmd_log.append('--ignore-missing')
+            cmd_log.extend(['^' + sha for sha in exclude])
+
         for line in self._exec_nb(cmd_log, cwd=self.dirpath, env=self.gitenv):
             yield line
 
         logger.debug("Git log fetched from %s repository (%s)",
                      self.uri, self.dirpath)
 
+    def tips(self, branches=None):
+        """Get the references where the log starts.
+
+        The method returns the references `log` reads for the same
+        list of `branches`: heads, tags and remote references of
+        'origin' when `branches` is None; only the heads of the given
+        branches otherwise.
+
+        :param branches: names of branches (default: None)
+
+        :returns: a list of `GitRef` objects
+
+        :raises EmptyRepositoryError: when the repository is empty and
+            the action cannot be performed
+        :raises RepositoryError: when an error occurs reading the references
+        """
+        if self.is_empty():
+            logger.warning("Git %s repository is empty; unable to get the tips",
+                           self.uri)
+            raise EmptyRepositoryError(repository=self.uri)
+
+        if branches is None:
+            patterns = ['refs/heads/', 'refs/tags/', 'refs/remotes/origin/']
+        elif len(branches) == 0:
+            return []
+        else:
+            patterns = ['refs/heads/' + branch for branch in branches]
+
+        cmd_refs = ['git', 'for-each-ref', '--format=%(objectname) %(refname)']
+        cmd_refs.extend(patterns)
+
+        outs = self._exec(cmd_refs, cwd=self.dirpath, env=self.gitenv)
+        outs = outs.decode('utf-8', errors='surrogateescape').rstrip()
+        outs = outs.split('\n') if outs else []
+
+        refs = []
+
+        for line in outs:
+            data = line.split(' ', 1)
+            refs.append(GitRef(data[0], data[1]))
+
+        return refs
+
     def show(self, commits=None, encoding='utf-8'):
         """Show the data of a set of commits.
 
@@ -1277,3 +1502,61 @@ class GitRepository:
             logger.debug(errs.decode(encoding, errors='surrogateescape'))
 
         return outs
+
+
+class GitCheckpoint:
+    """Store the tips of the references fetched from a Git repository.
+
+    The checkpoint is a JSON file saved in the directory of the
+    repository. It maps the names of the references to the hashes
+    they pointed to when their commits were fetched. The tips of
+    references not included in a fetch process are kept, so the
+    commits reachable from them are not fetched again.
+
+    :param dirpath: directory of the repository
+    """
+    FILENAME = 'perceval-checkpoint.json'
+
+    def __init__(self, dirpath):
+        self.dirpath = dirpath
+        self.path = os.path.join(dirpath, self.FILENAME)
+
+    def load(self):
+        """Load the hashes of the tips already fetched.
+
+        An invalid checkpoint is ignored, so all the commits
+        will be fetched again.
+
+        :returns: a list of hashes; empty when there is no checkpoint
+        """
+        refs = self._read()
+        return sorted(set(refs.values()))
+
+    def save(self, refs):
+        """Save the tips of a list of references.
+
+        The file is replaced atomically, so the checkpoint is never
+        left in an inconsistent state.
+
+        :param refs: list of `GitRef` objects
+        """
+        tips = self._read()
+        tips.update({ref.refname: ref.hash for ref in refs})
+
+        tmp_path = self.path + '.tmp'
+
+        with open(tmp_path, 'w') as f:
+            json.dump({'tips': tips}, f, indent=4, sort_keys=True)
+
+        os.replace(tmp_path, self.path)
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return {}
+
+        try:
+            with open(self.path, 'r') as f:
+                return dict(json.load(f)['tips'])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning("Invalid checkpoint %s ignored; %s", self.path, str(e))
+            return {}
@@ -22,8 +22,11 @@
 #     Alberto Martín <alberto.martin@bitergia.com>
 #
 
+import collections
+import hashlib
 import json
 import logging
+import threading
 
 import requests
 from grimoirelab.toolkit.datetime import (datetime_to_utc,
@@ -34,7 +37,15 @@ from grimoirelab.toolkit.uris import urijoin
 from ...backend import (Backend,
                         BackendCommand,
                         BackendCommandArgumentParser)
-from ...client import HttpClient, RateLimitHandler
+from ...cache import DEFAULT_MAX_SIZE, DEFAULT_TTL, MemoryCache, SQLiteCache
+from ...client import (DEFAULT_POOL_SIZE,
+                       DEFAULT_PREFETCH_PAGES,
+                       DEFAULT_WORKERS,
+                       HttpClient,
+                       LinkPaginator,
+                       RateLimitHandler,
+                       fetch_concurrently)
+from ...errors import BackendError
 
 from ...utils import DEFAULT_DATETIME
 
@@ -52,9 +63,131 @@ MAX_RATE_LIMIT = 500
 DEFAULT_SLEEP_TIME = 1
 MAX_RETRIES = 5
 
+# Number of items per page of the REST API
+MAX_ITEMS = 30
+
 TARGET_ISSUE_FIELDS = ['user', 'assignee', 'assignees', 'comments', 'reactions']
 TARGET_PULL_FIELDS = ['user', 'review_comments', 'requested_reviewers', "merged_by"]
 
+# Number of items and nested items requested in each GraphQL query
+GRAPHQL_ITEMS_PER_PAGE = 25
+GRAPHQL_PULLS_PER_PAGE = 10
+GRAPHQL_NESTED_PER_PAGE = 25
+GRAPHQL_REACTIONS_PER_PAGE = 10
+
+# Reactions contents in GraphQL and REST APIs
+REACTIONS = {
+    'THUMBS_UP': '+1',
+    'THUMBS_DOWN': '-1',
+    'LAUGH': 'laugh',
+    'HOORAY': 'hooray',
+    'CONFUSED': 'confused',
+    'HEART': 'heart',
+    'ROCKET': 'rocket',
+    'EYES': 'eyes'
+}
+
+GRAPHQL_FRAGMENTS = """
+fragment actor on Actor {
+  __typename login avatarUrl url
+  ... on User { id databaseId isSiteAdmin }
+  ... on Bot { id databaseId }
+  ... on Organization { id databaseId }
+}
+fragment reaction on Reaction {
+  id databaseId content createdAt
+  user { ...actor }
+}
+fragment reactionGroups on Reactable {
+  reactionGroups { content reactors { totalCount } }
+}
+"""
+
+GRAPHQL_COMMENT_FRAGMENT = """
+fragment comment on IssueComment {
+  id databaseId body url createdAt updatedAt authorAssociation
+  author { ...actor }
+  ...reactionGroups
+  reactions(first: %(reactions)s) { totalCount nodes { ...reaction } }
+}
+"""
+
+GRAPHQL_REVIEW_COMMENT_FRAGMENT = """
+fragment reviewComment on PullRequestReviewComment {
+  id databaseId body url createdAt updatedAt authorAssociation
+  diffHunk path position originalPosition
+  commit { oid } originalCommit { oid }
+  pullRequestReview { databaseId }
+  replyTo { databaseId }
+  author { ...actor }
+  ...reactionGroups
+  reactions(first: %(reactions)s) { totalCount nodes { ...reaction } }
+}
+"""
+
+GRAPHQL_ISSUE_FIELDS = """
+  __typename id databaseId number title body state locked url
+  createdAt updatedAt closedAt authorAssociation
+  author { ...actor }
+  assignees(first: %(nested)s) { totalCount nodes { ...actor } }
+  labels(first: %(nested)s) { nodes { id name color description isDefault url } }
+  milestone { id number title description state url createdAt updatedAt dueOn closedAt }
+  ...reactionGroups
+"""
+
+GRAPHQL_ISSUES_QUERY = GRAPHQL_FRAGMENTS + GRAPHQL_COMMENT_FRAGMENT + """
+query($search: String!, $first: Int!, $after: String) {
+  search(query: $search, type: ISSUE, first: $first, after: $after) {
+    issueCount
+    pageInfo { hasNextPage endCursor }
+    nodes {
+      ... on Issue {
+        %(fields)s
+        comments(first: %(nested)s) { totalCount nodes { ...comment } }
+        reactions(first: %(reactions)s) { totalCount nodes { ...reaction } }
+      }
+      ... on PullRequest {
+        %(fields)s
+        comments(first: %(nested)s) { totalCount nodes { ...comment } }
+        reactions(first: %(reactions)s) { totalCount nodes { ...reaction } }
+      }
+    }
+  }
+}
+"""
+
+GRAPHQL_PULLS_QUERY = GRAPHQL_FRAGMENTS + GRAPHQL_REVIEW_COMMENT_FRAGMENT + """
+query($search: String!, $first: Int!, $after: String) {
+  search(query: $search, type: ISSUE, first: $first, after: $after) {
+    issueCount
+    pageInfo { hasNextPage endCursor }
+    nodes {
+      ... on PullRequest {
+        %(fields)s
+        merged mergedAt mergeable
+        mergeCommit { oid }
+        mergedBy { ...actor }
+        additions deletions changedFiles
+        commits { totalCount }
+        comments { totalCount }
+        headRefName headRefOid
+        headRepository { id databaseId name nameWithOwner url owner { ...actor } }
+        baseRefName baseRefOid
+        baseRepository { id databaseId name nameWithOwner url owner { ...actor } }
+        reviewRequests(first: %(nested)s) {
+          totalCount
+          nodes { requestedReviewer { ... on User { ...actor } } }
+        }
+        reviews(first: %(nested)s) {
+          totalCount
+          nodes { comments(first: %(nested)s) { totalCount nodes { ...reviewComment } } }
+        }
+      }
+    }
+  }
+}
+"""
+
 logger = logging.getLogger(__name__)
 
 
@@ -66,7 +199,8 @@ class GitHub(Backend):
 
     :param owner: GitHub owner
     :param repository: GitHub repository from the owner
-    :param api_token: GitHub auth token to access the API
+    :param api_token: list of GitHub auth tokens to access the API;
+        a single token can be given as a string
     :param base_url: GitHub URL in enterprise edition case;
         when no value is set the backend will be fetch the data
         from the GitHub public site.
@@ -79,8 +213,22 @@ class GitHub(Backend):
         before raising a RetryError exception
     :param sleep_time: time to sleep in case
         of connection problems
+    :param workers: number of threads used to fetch the comments,
+        reactions and users of several items at the same time
+    :param user_cache: `Cache` object to store the data of the users
+        and their organizations; by default, users are cached in memory
+    :param http_cache: `Cache` object to store the validators and
+        bodies of the responses, used to send conditional requests
+    :param graphql: fetch the items, their comments and reactions
+        using GraphQL queries instead of the REST API
+    :param max_items: maximum number of items requested on the same
+        query of the REST API
+    :param prefetch_pages: number of pages fetched while the previous
+        ones are processed
+    :param pool_size: number of connections kept open for each host
+    :param keep_alive: reuse connections between requests
     """
-    version = '0.16.1'
+    version = '0.23.0'
 
     CATEGORIES = [CATEGORY_ISSUE, CATEGORY_PULL_REQUEST]
 
@@ -88,7 +236,10 @@ class GitHub(Backend):
                  api_token=None, base_url=None,
                  tag=None, archive=None,
                  sleep_for_rate=False, min_rate_to_sleep=MIN_RATE_LIMIT,
-                 max_retries=MAX_RETRIES, sleep_time=DEFAULT_SLEEP_TIME):
+                 max_retries=MAX_RETRIES, sleep_time=DEFAULT_SLEEP_TIME,
+                 workers=DEFAULT_WORKERS, user_cache=None, http_cache=None,
+                 graphql=False, max_items=MAX_ITEMS, prefetch_pages=DEFAULT_PREFETCH_PAGES,
+                 pool_size=DEFAULT_POOL_SIZE, keep_alive=True):
         origin = base_url if base_url else GITHUB_URL
         origin = urijoin(origin, owner, repository)
 
@@ -103,6 +254,14 @@ class GitHub(Backend):
         self.min_rate_to_sleep = min_rate_to_sleep
         self.max_retries = max_retries
         self.sleep_time = sleep_time
+        self.workers = workers
+        self.user_cache = user_cache
+        self.http_cache = http_cache
+        self.graphql = graphql
+        self.max_items = max_items
+        self.prefetch_pages = prefetch_pages
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive
 
         self.client = None
         self._users = {}  # internal users cache
@@ -138,7 +297,11 @@ class GitHub(Backend):
         """
         from_date = kwargs['from_date']
 
-        if category == CATEGORY_ISSUE:
+        if self.graphql and category == CATEGORY_ISSUE:
+            items = self.__fetch_graphql_issues(from_date)
+        elif self.graphql:
+            items = self.__fetch_graphql_pull_requests(from_date)
+        elif category == CATEGORY_ISSUE:
             items = self.__fetch_issues(from_date)
         else:
             items = self.__fetch_pull_requests(from_date)
@@ -205,58 +368,113 @@ class GitHub(Backend):
         return GitHubClient(self.owner, self.repository, self.api_token, self.base_url,
                             self.sleep_for_rate, self.min_rate_to_sleep,
                             self.max_retries, self.sleep_time,
-                            self.archive, from_archive)
+                            self.archive, from_archive, self.user_cache,
+                            self.http_cache, max_items=self.max_items,
+                            prefetch_pages=self.prefetch_pages,
+                            pool_size=self.pool_size, keep_alive=self.keep_alive)
 
     def __fetch_issues(self, from_date):
         """Fetch the issues"""
 
+        issues = self.__read_issues(from_date)
+
+        for issue in self.__enrich(issues, self.__enrich_issue):
+            yield issue
+
+        self.__log_user_cache_stats()
+
+    def __fetch_pull_requests(self, from_date):
+        """Fetch the pull requests"""
+
+        pulls = (json.loads(raw_pull) for raw_pull in self.client.pulls(from_date=from_date))
+
+        for pull in self.__enrich(pulls, self.__enrich_pull):
+            yield pull
+
+        self.__log_user_cache_stats()
+
+    def __fetch_graphql_issues(self, from_date):
+        """Fetch the issues using GraphQL queries"""
+
+        nodes = (node for page in self.client.graphql_issues(from_date=from_date) for node in page)
+
+        for issue in self.__enrich(nodes, self.__build_graphql_issue):
+            yield issue
+
+        self.__log_user_cache_stats()
+
+    def __fetch_graphql_pull_requests(self, from_date):
+        """Fetch the pull requests using GraphQL queries"""
+
+        nodes = (node for page in self.client.graphql_pulls(from_date=from_date) for node in page)
+
+        for pull in self.__enrich(nodes, self.__build_graphql_pull):
+            yield pull
+
+        self.__log_user_cache_stats()
+
+    def __log_user_cache_stats(self):
+        stats = self.client.user_cache.stats()
+        logger.info("Users cache: %s hits, %s misses",
+                    stats['hits'], stats['misses'])
+
+    def __read_issues(self, from_date):
+        """Read the issues from the pages"""
+
         issues_groups = self.client.issues(from_date=from_date)
 
         for raw_issues in issues_groups:
             issues = json.loads(raw_issues)
             for issue in issues:
-                self.__init_extra_issue_fields(issue)
-                for field in TARGET_ISSUE_FIELDS:
-
-                    if not issue[field]:
-                        continue
-
-                    if field == 'user':
-                        issue[field + '_data'] = self.__get_user(issue[field]['login'])
-                    elif field == 'assignee':
-                        issue[field + '_data'] = self.__get_issue_assignee(issue[field])
-                    elif field == 'assignees':
-                        issue[field + '_data'] = self.__get_issue_assignees(issue[field])
-                    elif field == 'comments':
-                        issue[field + '_data'] = self.__get_issue_comments(issue['number'])
-                    elif field == 'reactions':
-                        issue[field + '_data'] = \
-                            self.__get_issue_reactions(issue['number'], issue['reactions']['total_count'])
-
                 yield issue
 
-    def __fetch_pull_requests(self, from_date):
-        """Fetch the pull requests"""
+    def __enrich(self, items, enrich):
+        """Enrich a set of items keeping their order"""
 
-        raw_pulls = self.client.pulls(from_date=from_date)
-        for raw_pull in raw_pulls:
-            pull = json.loads(raw_pull)
-            self.__init_extra_pull_fields(pull)
-            for field in TARGET_PULL_FIELDS:
+        return fetch_concurrently(enrich, items, workers=self.workers)
 
-                if not pull[field]:
-                    continue
+    def __enrich_issue(self, issue):
+        """Get the data related to an issue"""
 
-                if field == 'user':
-                    pull[field + '_data'] = self.__get_user(pull[field]['login'])
-                elif field == 'merged_by':
-                    pull[field + '_data'] = self.__get_user(pull[field]['login'])
-                elif field == 'review_comments':
-                    pull[field + '_data'] = self.__get_pull_review_comments(pull['number'])
-                elif field == 'requested_reviewers':
-                    pull[field + '_data'] = self.__get_pull_requested_reviewers(pull['number'])
+        self.__init_extra_issue_fields(issue)
+        for field in TARGET_ISSUE_FIELDS:
 
-            yield pull
+            if not issue[field]:
+                continue
+
+            if field == 'user':
+                issue[field + '_data'] = self.__get_user(issue[field]['login'])
+            elif field == 'assignee':
+                issue[field + '_data'] = self.__get_issue_assignee(issue[field])
+            elif field == 'assignees':
+                issue[field + '_data'] = self.__get_issue_assignees(issue[field])
+            elif field == 'comments':
+                issue[field + '_data'] = self.__get_issue_comments(issue['number'])
+            elif field == 'reactions':
+                issue[field + '_data'] = \
+                    self.__get_issue_reactions(issue['number'], issue['reactions']['total_count'])
+
+        return issue
+
+    def __enrich_pull(self, pull):
+        """Get the data related to a pull request"""
+
+        self.__init_extra_pull_fields(pull)
+        for field in TARGET_PULL_FIELDS:
+
+            if not pull[field]:
+                continue
+
+            if field == 'user':
+                pull[field + '_data'] = self.__get_user(pull[field]['login'])
+            elif field == 'merged_by':
+                pull[field + '_data'] = self.__get_user(pull[field]['login'])
+            elif field == 'review_comments':
+                pull[field + '_data'] = self.__get_pull_review_comments(pull['number'])
+            elif field == 'requested_reviewers':
+                pull[field + '_data'] = self.__get_pull_requested_reviewers(pull['number'])
+
+        return pull
 
     def __get_issue_reactions(self, issue_number, total_count):
         """Get issue reactions"""
@@ -393,6 +611,379 @@ class GitHub(Backend):
 
         return user
 
+    def __build_graphql_issue(self, node):
+        """Build an issue, as the REST API does, from a GraphQL node.
+
+        Comments and reactions are taken from the node. When the node
+        does not include all of them, they are fetched using the REST
+        API, as in `__enrich_issue`.
+        """
+        issue = self.__graphql_issue(node)
+
+        self.__init_extra_issue_fields(issue)
+
+        if issue['user']:
+            issue['user_data'] = self.__get_user(issue['user']['login'])
+        if issue['assignee']:
+            issue['assignee_data'] = self.__get_issue_assignee(issue['assignee'])
+        if issue['assignees']:
+            issue['assignees_data'] = self.__get_issue_assignees(issue['assignees'])
+        if issue['comments']:
+            if self.__is_complete(node['comments']):
+                issue['comments_data'] = [self.__graphql_issue_comment(comment, issue)
+                                          for comment in node['comments']['nodes']]
+            else:
+                issue['comments_data'] = self.__get_issue_comments(issue['number'])
+
+        issue['reactions_data'] = self.__graphql_reactions(node['reactions'],
+                                                           self.__get_issue_reactions,
+                                                           issue['number'])
+        return issue
+
+    def __build_graphql_pull(self, node):
+        """Build a pull request, as the REST API does, from a GraphQL node.
+
+        Review comments, their reactions and requested reviewers are
+        taken from the node. When the node does not include all of
+        them, they are fetched using the REST API, as in `__enrich_pull`.
+        """
+        pull = self.__graphql_pull(node)
+
+        reviews = node['reviews']
+        if self.__is_complete(reviews) and \
+                all(self.__is_complete(review['comments']) for review in reviews['nodes']):
+            comments = [comment for review in reviews['nodes'] for comment in review['comments']['nodes']]
+            comments.sort(key=lambda comment: comment['updatedAt'])
+            pull['review_comments'] = len(comments)
+        else:
+            comments = None
+
+        self.__init_extra_pull_fields(pull)
+
+        if pull['user']:
+            pull['user_data'] = self.__get_user(pull['user']['login'])
+        if pull['merged_by']:
+            pull['merged_by_data'] = self.__get_user(pull['merged_by']['login'])
+
+        if comments is None:
+            comments_data = self.__get_pull_review_comments(pull['number'])
+            pull['review_comments'] = len(comments_data)
+            if comments_data:
+                pull['review_comments_data'] = comments_data
+        elif comments:
+            pull['review_comments_data'] = [self.__graphql_review_comment(comment, pull)
+                                            for comment in comments]
+
+        if not self.__is_complete(node['reviewRequests']):
+            pull['requested_reviewers_data'] = self.__get_pull_requested_reviewers(pull['number'])
+        elif pull['requested_reviewers']:
+            pull['requested_reviewers_data'] = [self.__get_user(reviewer['login'])
+                                                for reviewer in pull['requested_reviewers']]
+        return pull
+
+    def __graphql_issue(self, node):
+        """Convert a GraphQL issue or pull request node to a REST issue"""
+
+        repo_url = self.__repo_api_url()
+        number = node['number']
+        issue_url = urijoin(repo_url, 'issues', number)
+
+        assignees = [self.__graphql_user(assignee) for assignee in node['assignees']['nodes']]
+
+        issue = {
+            'url': issue_url,
+            'repository_url': repo_url,
+            'labels_url': issue_url + '/labels{/name}',
+            'comments_url': urijoin(issue_url, 'comments'),
+            'events_url': urijoin(issue_url, 'events'),
+            'html_url': node['url'],
+            'id': node['databaseId'],
+            'node_id': node['id'],
+            'number': number,
+            'title': node['title'],
+            'user': self.__graphql_user(node['author']),
+            'labels': [self.__graphql_label(label) for label in node['labels']['nodes']],
+            'state': 'open' if node['state'] == 'OPEN' else 'closed',
+            'locked': node['locked'],
+            'assignee': assignees[0] if assignees else None,
+            'assignees': assignees,
+            'milestone': self.__graphql_milestone(node['milestone']),
+            'comments': node['comments']['totalCount'],
+            'reactions': self.__graphql_reactions_summary(node, urijoin(issue_url, 'reactions')),
+            'created_at': node['createdAt'],
+            'updated_at': node['updatedAt'],
+            'closed_at': node['closedAt'],
+            'author_association': node['authorAssociation'],
+            'body': node['body']
+        }
+
+        if node['__typename'] == 'PullRequest':
+            issue['pull_request'] = {
+                'url': urijoin(repo_url, 'pulls', number),
+                'html_url': node['url'],
+                'diff_url': node['url'] + '.diff',
+                'patch_url': node['url'] + '.patch'
+            }
+
+        return issue
+
+    def __graphql_pull(self, node):
+        """Convert a GraphQL pull request node to a REST pull request"""
+
+        issue = self.__graphql_issue(node)
+
+        repo_url = self.__repo_api_url()
+        pull_url = urijoin(repo_url, 'pulls', issue['number'])
+
+        reviewers = [self.__graphql_user(request['requestedReviewer'])
+                     for request in node['reviewRequests']['nodes']
+                     if request['requestedReviewer']]
+        mergeable = {'MERGEABLE': True, 'CONFLICTING': False}
+
+        pull = {
+            'url': pull_url,
+            'id': issue['id'],
+            'node_id': issue['node_id'],
+            'html_url': issue['html_url'],
+            'diff_url': issue['pull_request']['diff_url'],
+            'patch_url': issue['pull_request']['patch_url'],
+            'issue_url': issue['url'],
+            'number': issue['number'],
+            'state': issue['state'],
+            'locked': issue['locked'],
+            'title': issue['title'],
+            'user': issue['user'],
+            'body': issue['body'],
+            'labels': issue['labels'],
+            'milestone': issue['milestone'],
+            'created_at': issue['created_at'],
+            'updated_at': issue['updated_at'],
+            'closed_at': issue['closed_at'],
+            'merged_at': node['mergedAt'],
+            'merge_commit_sha': node['mergeCommit']['oid'] if node['mergeCommit'] else None,
+            'assignee': issue['assignee'],
+            'assignees': issue['assignees'],
+            'requested_reviewers': reviewers,
+            'commits_url': urijoin(pull_url, 'commits'),
+            'review_comments_url': urijoin(pull_url, 'comments'),
+            'review_comment_url': urijoin(repo_url, 'pulls', 'comments') + '{/number}',
+            'comments_url': issue['comments_url'],
+            'statuses_url': urijoin(repo_url, 'statuses', node['headRefOid']),
+            'head': self.__graphql_pull_ref(node['headRefName'], node['headRefOid'],
+                                            node['headRepository']),
+            'base': self.__graphql_pull_ref(node['baseRefName'], node['baseRefOid'],
+                                            node['baseRepository']),
+            'author_association': issue['author_association'],
+            'merged': node['merged'],
+            'mergeable': mergeable.get(node['mergeable'], None),
+            'merged_by': self.__graphql_user(node['mergedBy']),
+            'comments': issue['comments'],
+            'review_comments': None,
+            'commits': node['commits']['totalCount'],
+            'additions': node['additions'],
+            'deletions': node['deletions'],
+            'changed_files': node['changedFiles']
+        }
+
+        return pull
+
+    def __graphql_pull_ref(self, ref, sha, repo):
+        """Convert a GraphQL branch of a pull request to a REST one"""
+
+        if repo:
+            owner = self.__graphql_user(repo['owner'])
+            repo = {
+                'id': repo['databaseId'],
+                'node_id': repo['id'],
+                'name': repo['name'],
+                'full_name': repo['nameWithOwner'],
+                'owner': owner,
+                'html_url': repo['url'],
+                'url': urijoin(self.client.base_url, 'repos', repo['nameWithOwner'])
+            }
+        else:
+            owner = None
+
+        return {
+            'label': owner['login'] + ':' + ref if owner else ref,
+            'ref': ref,
+            'sha': sha,
+            'user': owner,
+            'repo': repo
+        }
+
+    def __graphql_issue_comment(self, node, issue):
+        """Convert a GraphQL issue comment node and get its data"""
+
+        url = urijoin(self.__repo_api_url(), 'issues', 'comments', node['databaseId'])
+
+        comment = {
+            'url': url,
+            'html_url': node['url'],
+            'issue_url': issue['url'],
+            'id': node['databaseId'],
+            'node_id': node['id'],
+            'user': self.__graphql_user(node['author']),
+            'created_at': node['createdAt'],
+            'updated_at': node['updatedAt'],
+            'author_association': node['authorAssociation'],
+            'body': node['body'],
+            'reactions': self.__graphql_reactions_summary(node, urijoin(url, 'reactions'))
+        }
+
+        login = comment['user']['login'] if comment['user'] else None
+        comment['user_data'] = self.__get_user(login)
+        comment['reactions_data'] = self.__graphql_reactions(node['reactions'],
+                                                             self.__get_issue_comment_reactions,
+                                                             comment['id'])
+        return comment
+
+    def __graphql_review_comment(self, node, pull):
+        """Convert a GraphQL review comment node and get its data"""
+
+        url = urijoin(self.__repo_api_url(), 'pulls', 'comments', node['databaseId'])
+
+        comment = {
+            'url': url,
+            'pull_request_review_id': node['pullRequestReview']['databaseId']
+            if node['pullRequestReview'] else None,
+            'id': node['databaseId'],
+            'node_id': node['id'],
+            'diff_hunk': node['diffHunk'],
+            'path': node['path'],
+            'position': node['position'],
+            'original_position': node['originalPosition'],
+            'commit_id': node['commit']['oid'] if node['commit'] else None,
+            'original_commit_id': node['originalCommit']['oid'] if node['originalCommit'] else None,
+            'user': self.__graphql_user(node['author']),
+            'body': node['body'],
+            'created_at': node['createdAt'],
+            'updated_at': node['updatedAt'],
+            'html_url': node['url'],
+            'pull_request_url': pull['url'],
+            'author_association': node['authorAssociation'],
+            'reactions': self.__graphql_reactions_summary(node, urijoin(url, 'reactions'))
+        }
+
+        if node['replyTo']:
+            comment['in_reply_to_id'] = node['replyTo']['databaseId']
+
+        login = comment['user']['login'] if comment['user'] else None
+        comment['user_data'] = self.__get_user(login)
+        comment['reactions_data'] = self.__graphql_reactions(node['reactions'],
+                                                             self.__get_pull_review_comment_reactions,
+                                                             comment['id'])
+        return comment
+
+    def __graphql_reactions(self, reactions, get_reactions, target_id):
+        """Convert GraphQL reaction nodes and get their data.
+
+        When the nodes do not include all the reactions, they are
+        fetched using `get_reactions`.
+        """
+        if not self.__is_complete(reactions):
+            return get_reactions(target_id, reactions['totalCount'])
+
+        result = []
+
+        for node in reactions['nodes']:
+            reaction = {
+                'id': node['databaseId'],
+                'node_id': node['id'],
+                'user': self.__graphql_user(node['user']),
+                'content': REACTIONS.get(node['content'], node['content'].lower()),
+                'created_at': node['createdAt']
+            }
+            login = reaction['user']['login'] if reaction['user'] else None
+            reaction['user_data'] = self.__get_user(login)
+            result.append(reaction)
+
+        return result
+
+    @staticmethod
+    def __graphql_reactions_summary(node, url):
+        """Count the reactions of a GraphQL node by their content"""
+
+        summary = {
+            'url': url,
+            'total_count': 0
+        }
+        summary.update({content: 0 for content in REACTIONS.values()})
+
+        for group in node['reactionGroups'] or []:
+            content = REACTIONS.get(group['content'], None)
+            if not content:
+                continue
+
+            count = group['reactors']['totalCount']
+            summary[content] = count
+            summary['total_count'] += count
+
+        return summary
+
+    def __graphql_user(self, actor):
+        """Convert a GraphQL actor to a REST user"""
+
+        if not actor:
+            return None
+
+        login = actor['login']
+
+        return {
+            'login': login,
+            'id': actor.get('databaseId', None),
+            'node_id': actor.get('id', None),
+            'avatar_url': actor['avatarUrl'],
+            'gravatar_id': '',
+            'url': urijoin(self.client.base_url, 'users', login),
+            'html_url': actor['url'],
+            'type': actor['__typename'],
+            'site_admin': actor.get('isSiteAdmin', False)
+        }
+
+    def __graphql_label(self, node):
+        """Convert a GraphQL label to a REST label"""
+
+        return {
+            'node_id': node['id'],
+            'url': urijoin(self.__repo_api_url(), 'labels', node['name']),
+            'name': node['name'],
+            'color': node['color'],
+            'default': node['isDefault'],
+            'description': node['description']
+        }
+
+    def __graphql_milestone(self, node):
+        """Convert a GraphQL milestone to a REST milestone"""
+
+        if not node:
+            return None
+
+        return {
+            'url': urijoin(self.__repo_api_url(), 'milestones', node['number']),
+            'html_url': node['url'],
+            'node_id': node['id'],
+            'number': node['number'],
+            'title': node['title'],
+            'description': node['description'],
+            'state': node['state'].lower(),
+            'created_at': node['createdAt'],
+            'updated_at': node['updatedAt'],
+            'due_on': node['dueOn'],
+            'closed_at': node['closedAt']
+        }
+
+    def __repo_api_url(self):
+        """Get the REST API URL of the repository"""
+
+        return urijoin(self.client.base_url, 'repos', self.owner, self.repository)
+
+    @staticmethod
+    def __is_complete(connection):
+        """Check whether a GraphQL connection includes all its nodes"""
+
+        return len(connection['nodes']) >= connection['totalCount']
+
     def __init_extra_issue_fields(self, issue):
         """Add fields to an issue"""
 
@@ -416,7 +1007,8 @@ class GitHubClient(HttpClient, RateLimitHandler):
 
     :param owner: GitHub owner
     :param repository: GitHub repository from the owner
-    :param token: GitHub auth token to access the API
+    :param tokens: list of GitHub auth tokens to access the API;
+        a single token can be given as a string
     :param base_url: GitHub URL in enterprise edition case;
         when no value is set the backend will be fetch the data
         from the GitHub public site.
@@ -429,26 +1021,98 @@ class GitHubClient(HttpClient, RateLimitHandler):
         before raising a RetryError exception
     :param archive: collect issues already retrieved from an archive
     :param from_archive: it tells whether to write/read the archive
+    :param user_cache: `Cache` object to store the data of the users
+        and their organizations
+    :param http_cache: `Cache` object to store the validators and
+        bodies of the responses
+    :param max_items: maximum number of items per page
+    :param prefetch_pages: number of pages fetched while the previous
+        ones are processed
+    :param pool_size: number of connections kept open for each host
+    :param keep_alive: reuse connections between requests
+
+    Users and their organizations are stored in `user_cache`. When
+    it is not given, they are kept in memory, in a cache shared by
+    all the clients of the process. When the client writes an archive,
+    the users found in the cache are stored in the archive too, as
+    if they were fetched, so all the users it needs are found there.
+    When the client reads an archive, a cache for that client is used
+    instead.
+
+    When `http_cache` is given, the `ETag` and `Last-Modified` headers
+    of the responses are stored together with their bodies. Next
+    requests to the same URL are sent with `If-None-Match` and
+    `If-Modified-Since` headers; when the server replies with
+    `304 Not Modified`, which does not count against the rate limit,
+    the stored body is returned. Responses are cached for each token,
+    because tokens can have access to different resources. When the
+    client writes an archive, the rebuilt responses are archived, so
+    the archive can be read without the cache.
+
+    When several tokens are given, each request is sent using the
+    token with the highest remaining rate limit. The remaining rate
+    of each token is tracked from the headers of its responses. The
+    client only sleeps, or raises a `RateLimitError`, when the rate
+    of every token is below `min_rate_to_sleep`; then, it waits for
+    the token whose rate is reset first.
+
+    The client can be used by several threads at the same time. Users
+    and their organizations are fetched only once, even when they are
+    requested by several threads.
     """
 
-    _users = {}       # users cache
-    _users_orgs = {}  # users orgs cache
+    _users_cache = MemoryCache()  # users and orgs cache of the process
 
-    def __init__(self, owner, repository, token,
+    def __init__(self, owner, repository, tokens,
                  base_url=None, sleep_for_rate=False, min_rate_to_sleep=MIN_RATE_LIMIT,
                  sleep_time=DEFAULT_SLEEP_TIME, max_retries=MAX_RETRIES,
-                 archive=None, from_archive=False):
+                 archive=None, from_archive=False, user_cache=None, http_cache=None,
+                 max_items=MAX_ITEMS, prefetch_pages=DEFAULT_PREFETCH_PAGES,
+                 pool_size=DEFAULT_POOL_SIZE, keep_alive=True):
         self.owner = owner
         self.repository = repository
-        self.token = token
+        self.max_items = max_items
+        self.prefetch_pages = prefetch_pages
+
+        if from_archive:
+            self.user_cache = MemoryCache()
+        elif user_cache is not None:
+            self.user_cache = user_cache
+        else:
+            self.user_cache = self._users_cache
+
+        self.http_cache = None if from_archive else http_cache
+
+        if isinstance(tokens, str):
+            tokens = [tokens]
+        self.tokens = [token for token in tokens or [] if token]
+
+        # Remaining rate and reset time of each token;
+        # anonymous requests are tracked using `None`
+        self.current_token = None
+        self._token_rates = {token: (None, None) for token in self.tokens or [None]}
+
+        # GraphQL requests have their own rate limit
+        self._graphql_rates = {token: (None, None) for token in self._token_rates}
+
+        self._cache_locks = collections.defaultdict(threading.Lock)
+        self._cache_locks_lock = threading.Lock()
+
+        # Users and orgs already stored in the archive
+        self._archived_users = set()
 
         if base_url:
+            self.graphql_url = urijoin(base_url, 'api', 'graphql')
             base_url = urijoin(base_url, 'api', 'v3')
         else:
+            self.graphql_url = urijoin(GITHUB_API_URL, 'graphql')
             base_url = GITHUB_API_URL
 
+        self.rate_limit_url = urijoin(base_url, 'rate_limit')
+
         super().__init__(base_url, sleep_time=sleep_time, max_retries=max_retries,
-                         extra_headers=self._set_extra_headers(), archive=archive, from_archive=from_archive)
+                         extra_headers=self._set_extra_headers(), archive=archive, from_archive=from_archive,
+                         pool_size=pool_size, keep_alive=keep_alive)
         super().setup_rate_limit_handler(sleep_for_rate=sleep_for_rate, min_rate_to_sleep=min_rate_to_sleep)
 
         self._init_rate_limit()
@@ -469,7 +1133,7 @@ class GitHubClient(HttpClient, RateLimitHandler):
         """Get reactions of an issue"""
 
         payload = {
-            'per_page': 30,
+            'per_page': self.max_items,
             'direction': 'asc',
             'sort': 'updated'
         }
@@ -481,7 +1145,7 @@ class GitHubClient(HttpClient, RateLimitHandler):
         """Get reactions of an issue comment"""
 
         payload = {
-            'per_page': 30,
+            'per_page': self.max_items,
             'direction': 'asc',
             'sort': 'updated'
         }
@@ -493,7 +1157,7 @@ class GitHubClient(HttpClient, RateLimitHandler):
         """Get the issue comments from pagination"""
 
         payload = {
-            'per_page': 30,
+            'per_page': self.max_items,
             'direction': 'asc',
             'sort': 'updated'
         }
@@ -506,7 +1170,7 @@ class GitHubClient(HttpClient, RateLimitHandler):
 
         payload = {
             'state': 'all',
-            'per_page': 30,
+            'per_page': self.max_items,
             'direction': 'asc',
             'sort': 'updated'}
 
@@ -536,6 +1200,20 @@ class GitHubClient(HttpClient, RateLimitHandler):
 
                 yield pull
 
+    def graphql_issues(self, from_date=None):
+        """Get the issues, including pull requests, using GraphQL queries"""
+
+        search = "repo:%s/%s sort:updated-asc" % (self.owner, self.repository)
+        return self.fetch_graphql_items(GRAPHQL_ISSUES_QUERY, search,
+                                        GRAPHQL_ITEMS_PER_PAGE, from_date)
+
+    def graphql_pulls(self, from_date=None):
+        """Get only pull requests using GraphQL queries"""
+
+        search = "repo:%s/%s is:pr sort:updated-asc" % (self.owner, self.repository)
+        return self.fetch_graphql_items(GRAPHQL_PULLS_QUERY, search,
+                                        GRAPHQL_PULLS_PER_PAGE, from_date)
+
     def pull_requested_reviewers(self, pr_number):
         """Get pull requested reviewers"""
 
@@ -546,7 +1224,7 @@ class GitHubClient(HttpClient, RateLimitHandler):
         """Get pull request review comments"""
 
         payload = {
-            'per_page': 30,
+            'per_page': self.max_items,
             'direction': 'asc',
             'sort': 'updated'
         }
@@ -558,7 +1236,7 @@ class GitHubClient(HttpClient, RateLimitHandler):
         """Get reactions of a review comment"""
 
         payload = {
-            'per_page': 30,
+            'per_page': self.max_items,
             'direction': 'asc',
             'sort': 'updated'
         }
@@ -569,40 +1247,49 @@ class GitHubClient(HttpClient, RateLimitHandler):
     def user(self, login):
         """Get the user information and update the user cache"""
 
-        user = None
+        key = 'users/' + login
+        url_user = urijoin(self.base_url, 'users', login)
 
-        if login in self._users:
-            return self._users[login]
+        with self._cache_lock(key):
+            user = self._get_cached_user(key, url_user)
 
-        url_user = urijoin(self.base_url, 'users', login)
+            if user is not None:
+                return user
 
-        logging.info("Getting info for %s" % (url_user))
+            logging.info("Getting info for %s" % (url_user))
 
-        r = self.fetch(url_user)
-        user = r.text
-        self._users[login] = user
+            r = self.fetch(url_user)
+            user = r.text
+            self.user_cache.set(key, user)
+            self._archived_users.add(key)
 
         return user
 
     def user_orgs(self, login):
         """Get the user public organizations"""
 
-        if login in self._users_orgs:
-            return self._users_orgs[login]
-
+        key = 'orgs/' + login
         url = urijoin(self.base_url, 'users', login, 'orgs')
-        try:
-            r = self.fetch(url)
-            orgs = r.text
-        except requests.exceptions.HTTPError as error:
-            # 404 not found is wrongly received sometimes
-            if error.response.status_code == 404:
-                logger.error("Can't get github login orgs: %s", error)
-                orgs = '[]'
-            else:
-                raise error
 
-        self._users_orgs[login] = orgs
+        with self._cache_lock(key):
+            orgs = self._get_cached_user(key, url)
+
+            if orgs is not None:
+                return orgs
+
+            try:
+                r = self.fetch(url)
+                orgs = r.text
+            except requests.exceptions.HTTPError as error:
+                # 404 not found is wrongly received sometimes
+                if error.response.status_code == 404:
+                    logger.error("Can't get github login orgs: %s", error)
+                    orgs = '[]'
+                else:
+                    raise error
+
+            self.user_cache.set(key, orgs)
+            self._archived_users.add(key)
 
         return orgs
 
@@ -617,48 +1304,316 @@ class GitHubClient(HttpClient, RateLimitHandler):
 
         :returns a response object
         """
-        if not self.from_archive:
+        if self.from_archive:
+            return super().fetch(url, payload, headers, method, stream, verify)
+
+        rates = self._graphql_rates if url == self.graphql_url else self._token_rates
+
+        with self.rate_limit_lock:
+            token = self._choose_token(rates)
             self.sleep_for_rate_limit()
 
-        response = super().fetch(url, payload, headers, method, stream, verify)
+            # Count the request in advance, so concurrent
+            # requests do not exceed the limit
+            if self.rate_limit is not None:
+                self.rate_limit -= 1
+                rates[token] = (self.rate_limit, self.rate_limit_reset_ts)
+
+        # Requests are archived without the headers added here
+        archive_headers = headers
+
+        if token:
+            headers = dict(headers) if headers else {}
+            headers['Authorization'] = 'token ' + token
+
+        cache_key = None
+        cached = None
+
+        # Rate limits are different for each token and run,
+        # so they are neither cached nor archived
+        is_rate_limit = url == self.rate_limit_url
+
+        if self.http_cache is not None and method == HttpClient.GET and not stream and not is_rate_limit:
+            cache_key, cached = self._get_cached_response(url, payload, token)
+
+            if cached:
+                headers = dict(headers) if headers else {}
+                if cached['etag']:
+                    headers['If-None-Match'] = cached['etag']
+                if cached['last_modified']:
+                    headers['If-Modified-Since'] = cached['last_modified']
+
+        if is_rate_limit:
+            response = self._send_request(url, payload, headers, method, stream, verify)
+        elif cache_key:
+            # Responses are archived once they were rebuilt
+            try:
+                response = self._send_request(url, payload, headers, method, stream, verify)
+            except requests.exceptions.HTTPError as e:
+                if self.archive:
+                    self._store_in_archive(url, payload, archive_headers, e)
+                raise e
+        else:
+            response = super().fetch(url, payload, headers, method, stream, verify)
 
-        if not self.from_archive:
+        with self.rate_limit_lock:
             self.update_rate_limit(response)
+            rates[token] = (self.rate_limit, self.rate_limit_reset_ts)
+
+        if cache_key:
+            response = self._update_cached_response(cache_key, cached, response)
+
+            if self.archive:
+                self._store_in_archive(url, payload, archive_headers, response)
 
         return response
 
+    @staticmethod
+    def sanitize_for_archive(url, headers, payload):
+        """Sanitize the headers of a request before storing/retrieving items.
+
+        Authorization headers are removed, so the archived items do not
+        depend on the token used to fetch them.
+
+        :param: url: HTTP url request
+        :param: headers: HTTP headers request
+        :param: payload: HTTP payload request
+
+        :returns url, headers and payload sanitized
+        """
+        if headers and 'Authorization' in headers:
+            headers = {k: v for k, v in headers.items() if k != 'Authorization'}
+            headers = headers or None
+
+        return url, headers, payload
+
     def fetch_items(self, path, payload):
         """Return the items from github API using links pagination"""
 
-        page = 0  # current page
         last_page = None  # last page
-        url_next = urijoin(self.base_url, 'repos', self.owner, self.repository, path)
+        url = urijoin(self.base_url, 'repos', self.owner, self.repository, path)
+
+        logger.debug("Get GitHub paginated items from " + url)
 
-        logger.debug("Get GitHub paginated items from " + url_next)
+        pages = LinkPaginator(self, url, payload=payload, prefetch=self.prefetch_pages)
 
-        response = self.fetch(url_next, payload=payload)
+        for page, response in enumerate(pages, start=1):
+            if page == 1 and 'last' in response.links:
+                last_url = response.links['last']['url']
+                last_page = last_url.split('&page=')[1].split('&')[0]
+                last_page = int(last_page)
 
-        items = response.text
-        page += 1
+            logger.debug("Page: %s/%s", page, last_page)
 
-        if 'last' in response.links:
-            last_url = response.links['last']['url']
-            last_page = last_url.split('&page=')[1].split('&')[0]
-            last_page = int(last_page)
-            logger.debug("Page: %i/%i" % (page, last_page))
+            items = response.text
+
+            if not items:
+                break
 
-        while items:
             yield items
 
-            items = None
+    def fetch_graphql_items(self, query, search, per_page, from_date=None):
+        """Return the nodes of a GraphQL search using cursor pagination.
+
+        The search API only returns the first 1000 results of a query.
+        When that limit is reached, a new query is sent for the items
+        updated since the last one returned; the items already returned
+        that were updated at that time are skipped.
+
+        :param query: GraphQL query of the search
+        :param search: search string, sorted by update date
+        :param per_page: number of nodes per page
+        :param from_date: obtain items updated since this date
+
+        :returns: a generator of lists of nodes
+        """
+        sizes = {
+            'nested': GRAPHQL_NESTED_PER_PAGE,
+            'reactions': GRAPHQL_REACTIONS_PER_PAGE
+        }
+        sizes['fields'] = GRAPHQL_ISSUE_FIELDS % sizes
+        query = query % sizes
+
+        since = from_date.strftime('%Y-%m-%dT%H:%M:%SZ') if from_date else None
+        seen = set()  # items updated at `since` already returned
+
+        while True:
+            variables = {
+                'search': search + ' updated:>=' + since if since else search,
+                'first': per_page,
+                'after': None
+            }
+            fetched = 0
+            new_items = False
+
+            while True:
+                data = self.__fetch_graphql(query, variables)
+                result = data['search']
+
+                fetched += len(result['nodes'])
+                nodes = [node for node in result['nodes'] if node and node['id'] not in seen]
+
+                for node in nodes:
+                    if node['updatedAt'] != since:
+                        since = node['updatedAt']
+                        seen = set()
+                    seen.add(node['id'])
+
+                if nodes:
+                    new_items = True
+                    yield nodes
+
+                if not result['pageInfo']['hasNextPage']:
+                    break
+
+                variables['after'] = result['pageInfo']['endCursor']
+
+            if fetched >= result['issueCount']:
+                break
+            elif not new_items:
+                logger.warning("Too many items updated at %s; some of them were not fetched", since)
+                break
+
+            logger.debug("Search limit reached; fetching items updated since %s", since)
+
+    def __fetch_graphql(self, query, variables):
+        """Send a GraphQL query and return its data"""
+
+        payload = json.dumps({'query': query, 'variables': variables}, sort_keys=True)
+        response = self.fetch(self.graphql_url, payload=payload, method=HttpClient.POST)
+        content = response.json()
+
+        if content.get('errors', None):
+            cause = "GraphQL query failed: " + \
+                "; ".join(error.get('message', '') for error in content['errors'])
+            raise BackendError(cause=cause)
+
+        return content['data']
 
-            if 'next' in response.links:
-                url_next = response.links['next']['url']
-                response = self.fetch(url_next, payload=payload)
-                page += 1
+    def _get_cached_response(self, url, payload, token):
+        """Get the key and the stored response of a request.
 
-                items = response.text
-                logger.debug("Page: %i/%i" % (page, last_page))
+        The key includes a hash of the token, so each token has
+        its own entries and tokens are not stored in the cache.
+        """
+        token_id = hashlib.sha256(token.encode('utf-8')).hexdigest() if token else 'anonymous'
+        url = requests.Request(HttpClient.GET, url, params=payload).prepare().url
+
+        key = token_id + ' ' + url
+        cached = self.http_cache.get(key)
+
+        if cached is not None:
+            cached = json.loads(cached)
+
+        return key, cached
+
+    def _update_cached_response(self, key, cached, response):
+        """Store a response or rebuild it when it was not modified.
+
+        When the status of `response` is 304, a copy of it is returned
+        with the status, body and `Link` header of the stored response.
+        Otherwise, the response is stored when it includes validators.
+        """
+        if response.status_code == 304 and cached:
+            logger.debug("Not modified: %s", response.url)
+
+            not_modified = response
+            response = requests.Response()
+            response.status_code = 200
+            response.reason = 'OK'
+            response.url = not_modified.url
+            response.request = not_modified.request
+            response.headers = requests.structures.CaseInsensitiveDict(not_modified.headers)
+            response.encoding = 'utf-8'
+            response._content = cached['body'].encode('utf-8')
+
+            if cached['link']:
+                response.headers['Link'] = cached['link']
+            else:
+                response.headers.pop('Link', None)
+
+            return response
+
+        etag = response.headers.get('ETag', None)
+        last_modified = response.headers.get('Last-Modified', None)
+
+        if response.status_code == 200 and (etag or last_modified):
+            cached = {
+                'etag': etag,
+                'last_modified': last_modified,
+                'link': response.headers.get('Link', None),
+                'body': response.text
+            }
+            self.http_cache.set(key, json.dumps(cached))
+
+        return response
+
+    def _get_cached_user(self, key, url):
+        """Get a user or their orgs from the cache.
+
+        When the client writes an archive, the first time an entry
+        is found it is stored in the archive as the response of `url`,
+        so the archive can be read without the cache.
+        """
+        data = self.user_cache.get(key)
+
+        if data is None or not self.archive or self.from_archive or key in self._archived_users:
+            return data
+
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = 'OK'
+        response.url = url
+        response.encoding = 'utf-8'
+        response._content = data.encode('utf-8')
+
+        self._store_in_archive(url, None, None, response)
+        self._archived_users.add(key)
+
+        return data
+
+    def _cache_lock(self, key):
+        """Get the lock that protects an entry of the cache"""
+
+        with self._cache_locks_lock:
+            return self._cache_locks[key]
+
+    def _choose_token(self, rates=None):
+        """Choose the token with the highest remaining rate.
+
+        Tokens without rate limit information are preferred. When
+        the rate of every token is exhausted, the one that will be
+        reset first is chosen. The rate limit of the client is set
+        to the values of the chosen token.
+
+        :param rates: remaining rate and reset time of each token;
+            by default, the rates of the REST API
+        """
+        if rates is None:
+            rates = self._token_rates
+
+        def remaining(token):
+            rate = rates[token][0]
+            return float('inf') if rate is None else rate
+
+        def reset_ts(token):
+            ts = rates[token][1]
+            return float('inf') if ts is None else ts
+
+        tokens = list(rates)
+        token = max(tokens, key=remaining)
+
+        if remaining(token) <= self.min_rate_to_sleep:
+            token = min(tokens, key=reset_ts)
+
+        if token != self.current_token and len(tokens) > 1:
+            logger.debug("Switching to token #%s; remaining rate: %s",
+                         tokens.index(token), rates[token][0])
+
+        self.current_token = token
+        self.rate_limit, self.rate_limit_reset_ts = rates[token]
+
+        return token
 
     def _set_extra_headers(self):
         """Set extra headers for session"""
@@ -666,23 +1621,30 @@ class GitHubClient(HttpClient, RateLimitHandler):
         headers = {}
         headers.update({'Accept': 'application/vnd.github.squirrel-girl-preview'})
 
-        if self.token:
-            headers.update({'Authorization': 'token ' + self.token})
-
         return headers
 
     def _init_rate_limit(self):
-        """Initialize rate limit information"""
+        """Initialize rate limit information of each token.
 
-        url = urijoin(self.base_url, "rate_limit")
-        try:
-            response = super().fetch(url)
-            self.update_rate_limit(response)
-        except requests.exceptions.HTTPError as error:
-            if error.response.status_code == 404:
-                logger.warning("Rate limit not initialized: %s", error)
-            else:
-                raise error
+        Rate limits are not stored in the archive, as they are
+        different for each token and run. Tokens without rate limit
+        information are chosen first, so each request initializes
+        the rate of a new token.
+        """
+        if self.from_archive:
+            return
+
+        for _ in self._token_rates:
+            try:
+                self.fetch(self.rate_limit_url)
+            except requests.exceptions.HTTPError as error:
+                if error.response.status_code == 404:
+                    logger.warning("Rate limit not initialized: %s", error)
+                    break
+                else:
+                    raise error
+
+        self._choose_token()
 
 
 class GitHubCommand(BackendCommand):
@@ -690,16 +1652,41 @@ class GitHubCommand(BackendCommand):
 
     BACKEND = GitHub
 
+    def _pre_init(self):
+        """Initialize the users and HTTP caches"""
+
+        if self.parsed_args.user_cache_path:
+            user_cache = SQLiteCache(self.parsed_args.user_cache_path,
+                                     ttl=self.parsed_args.user_cache_ttl,
+                                     max_size=self.parsed_args.user_cache_size)
+        else:
+            user_cache = None
+
+        # Validators are checked by the server, so entries never expire
+        if self.parsed_args.http_cache_path:
+            http_cache = SQLiteCache(self.parsed_args.http_cache_path,
+                                     ttl=None,
+                                     max_size=self.parsed_args.http_cache_size)
+        else:
+            http_cache = None
+
+        setattr(self.parsed_args, 'user_cache', user_cache)
+        setattr(self.parsed_args, 'http_cache', http_cache)
+
     @staticmethod
     def setup_cmd_parser():
         """Returns the GitHub argument parser."""
 
         parser = BackendCommandArgumentParser(from_date=True,
-                                              token_auth=True,
-                                              archive=True)
+                                              archive=True,
+                                              pagination=True,
+                                              connection=True)
 
         # GitHub options
         group = parser.parser.add_argument_group('GitHub arguments')
+        group.add_argument('-t', '--api-token', dest='api_token',
+                           action='append', default=[],
+                           help="GitHub API token; repeat it to use several tokens")
         group.add_argument('--enterprise-url', dest='base_url',
                            help="Base URL for GitHub Enterprise instance")
         group.add_argument('--sleep-for-rate', dest='sleep_for_rate',
@@ -708,6 +1695,28 @@ class GitHubCommand(BackendCommand):
         group.add_argument('--min-rate-to-sleep', dest='min_rate_to_sleep',
                            default=MIN_RATE_LIMIT, type=int,
                            help="sleep until reset when the rate limit reaches this value")
+        group.add_argument('--workers', dest='workers',
+                           default=DEFAULT_WORKERS, type=int,
+                           help="number of threads used to fetch the data of the items")
+        group.add_argument('--user-cache', dest='user_cache_path',
+                           help="path to a database to cache users between runs")
+        group.add_argument('--user-cache-ttl', dest='user_cache_ttl',
+                           default=DEFAULT_TTL, type=int,
+                           help="seconds a cached user is valid")
+        group.add_argument('--user-cache-size', dest='user_cache_size',
+                           default=DEFAULT_MAX_SIZE, type=int,
+                           help="maximum number of entries in the users cache")
+        group.add_argument('--http-cache', dest='http_cache_path',
+                           help="path to a database to cache responses for conditional requests")
+        group.add_argument('--http-cache-size', dest='http_cache_size',
+                           default=DEFAULT_MAX_SIZE, type=int,
+                           help="maximum number of entries in the HTTP cache")
+        group.add_argument('--graphql', dest='graphql',
+                           action='store_true',
+                           help="fetch the items using the GraphQL API")
+        group.add_argument('--max-items', dest='max_items',
+                           default=MAX_ITEMS, type=int,
+                           help="maximum number of items requested on the same query")
 
         # Generic client options
         group.add_argument('--max-retries', dest='max_retries',
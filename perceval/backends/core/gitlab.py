@@ -35,10 +35,17 @@ from grimoirelab.toolkit.uris import urijoin
 from ...backend import (Backend,
                         BackendCommand,
                         BackendCommandArgumentParser)
-from ...client import HttpClient, RateLimitHandler
+from ...client import (DEFAULT_POOL_SIZE,
+                       DEFAULT_PREFETCH_PAGES,
+                       DEFAULT_WORKERS,
+                       HttpClient,
+                       LinkPaginator,
+                       RateLimitHandler,
+                       fetch_concurrently)
 from ...utils import DEFAULT_DATETIME
 
 CATEGORY_ISSUE = "issue"
+CATEGORY_MERGE_REQUEST = "merge_request"
 
 GITLAB_URL = "https://gitlab.com/"
 GITLAB_API_URL = "https://gitlab.com/api/v4"
@@ -53,14 +60,18 @@ MAX_RETRIES = 5
 
 TARGET_ISSUE_FIELDS = ['user_notes_count', 'award_emoji']
 
+# Types of the items stored in a project
+ISSUES = 'issues'
+MERGE_REQUESTS = 'merge_requests'
+
 logger = logging.getLogger(__name__)
 
 
 class GitLab(Backend):
     """GitLab backend for Perceval.
 
-    This class allows the fetch the issues stored in GitLab
-    repository.
+    This class allows the fetch the issues and merge requests
+    stored in GitLab repository.
 
     :param owner: GitLab owner
     :param repository: GitLab repository from the owner
@@ -73,14 +84,22 @@ class GitLab(Backend):
     :param sleep_for_rate: sleep until rate limit is reset
     :param min_rate_to_sleep: minimun rate needed to sleep until
          it will be reset
+    :param prefetch_pages: number of pages fetched while the previous
+        ones are processed
+    :param workers: number of threads used to fetch the notes and
+        emojis of several issues or merge requests at the same time
+    :param pool_size: number of connections kept open for each host
+    :param keep_alive: reuse connections between requests
     """
-    version = '0.3.4'
+    version = '0.7.0'
 
-    CATEGORIES = [CATEGORY_ISSUE]
+    CATEGORIES = [CATEGORY_ISSUE, CATEGORY_MERGE_REQUEST]
 
     def __init__(self, owner=None, repository=None,
                  api_token=None, base_url=None, tag=None, archive=None,
-                 sleep_for_rate=False, min_rate_to_sleep=MIN_RATE_LIMIT):
+                 sleep_for_rate=False, min_rate_to_sleep=MIN_RATE_LIMIT,
+                 prefetch_pages=DEFAULT_PREFETCH_PAGES, workers=DEFAULT_WORKERS,
+                 pool_size=DEFAULT_POOL_SIZE, keep_alive=True):
 
         origin = base_url if base_url else GITLAB_URL
         origin = urijoin(origin, owner, repository)
@@ -92,19 +111,23 @@ class GitLab(Backend):
         self.api_token = api_token
         self.sleep_for_rate = sleep_for_rate
         self.min_rate_to_sleep = min_rate_to_sleep
+        self.prefetch_pages = prefetch_pages
+        self.workers = workers
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive
         self.client = None
         self._users = {}  # internal users cache
 
     def fetch(self, category=CATEGORY_ISSUE, from_date=DEFAULT_DATETIME):
-        """Fetch the issues from the repository.
+        """Fetch the issues or merge requests from the repository.
 
         The method retrieves, from a GitLab repository, the issues
-        updated since the given date.
+        or merge requests updated since the given date.
 
         :param category: the category of items to fetch
-        :param from_date: obtain issues updated since this date
+        :param from_date: obtain items updated since this date
 
-        :returns: a generator of issues
+        :returns: a generator of items
         """
         if not from_date:
             from_date = DEFAULT_DATETIME
@@ -117,7 +140,7 @@ class GitLab(Backend):
         return items
 
     def fetch_items(self, category, **kwargs):
-        """Fetch the issues
+        """Fetch the items (issues or merge requests)
 
         :param category: the category of items to fetch
         :param kwargs: backend arguments
@@ -126,19 +149,22 @@ class GitLab(Backend):
         """
         from_date = kwargs['from_date']
 
-        issues_groups = self.client.issues(from_date=from_date)
+        if category == CATEGORY_ISSUE:
+            item_type = ISSUES
+        else:
+            item_type = MERGE_REQUESTS
 
-        for raw_issues in issues_groups:
-            issues = json.loads(raw_issues)
-            for issue in issues:
-                self.__init_extra_issue_fields(issue)
+        items = self.__read_items(item_type, from_date)
 
-                issue['notes_data'] = \
-                    self.__get_issue_notes(issue['iid'])
-                issue['award_emoji_data'] = \
-                    self.__get_issue_award_emoji(issue['iid'])
+        # Notes and emojis are fetched in a pipeline: while the notes
+        # of some items are fetched, the emojis of the notes of the
+        # previous items are fetched by a second pool of threads
+        items = fetch_concurrently(lambda item: self.__enrich_item(item_type, item),
+                                   items, workers=self.workers)
+        items = self.__enrich_notes(item_type, items)
 
-                yield issue
+        for item in items:
+            yield item
 
     @classmethod
     def has_archiving(cls):
@@ -183,41 +209,103 @@ class GitLab(Backend):
     def metadata_category(item):
         """Extracts the category from a GitLab item.
 
-        This backend only generates one type of item which is
-        'issue'.
+        This backend generates two types of item which are
+        'issue' and 'merge_request'.
         """
-        return CATEGORY_ISSUE
+        if 'merge_status' in item:
+            category = CATEGORY_MERGE_REQUEST
+        else:
+            category = CATEGORY_ISSUE
+
+        return category
 
     def _init_client(self, from_archive=False):
         """Init client"""
 
         return GitLabClient(self.owner, self.repository, self.api_token, self.base_url,
                             self.sleep_for_rate, self.min_rate_to_sleep,
-                            self.archive, from_archive)
+                            self.archive, from_archive,
+                            prefetch_pages=self.prefetch_pages,
+                            pool_size=self.pool_size, keep_alive=self.keep_alive)
+
+    def __read_items(self, item_type, from_date):
+        """Read the issues or merge requests from the pages"""
+
+        if item_type == ISSUES:
+            items_groups = self.client.issues(from_date=from_date)
+        else:
+            items_groups = self.client.merge_requests(from_date=from_date)
+
+        for raw_items in items_groups:
+            items = json.loads(raw_items)
+            for item in items:
+                yield item
+
+    def __enrich_item(self, item_type, item):
+        """Get the notes and emojis of an issue or merge request"""
+
+        self.__init_extra_item_fields(item)
+
+        item['notes_data'] = \
+            self.__get_item_notes(item_type, item['iid'])
+        item['award_emoji_data'] = \
+            self.__get_item_award_emoji(item_type, item['iid'])
+
+        return item
+
+    def __enrich_notes(self, item_type, items):
+        """Get the emojis of the notes of several items at the same time"""
+
+        # Each item is followed by a task with no note; its
+        # result is returned once the emojis of all the notes
+        # of the item were fetched
+        def read_notes():
+            for item in items:
+                for note in item['notes_data']:
+                    yield item, note
+                yield item, None
+
+        def fetch_note_emoji(task):
+            item, note = task
+
+            if note is None:
+                return item
 
-    def __get_issue_notes(self, issue_id):
-        """Get issue notes"""
+            note['award_emoji_data'] = \
+                self.__get_note_award_emoji(item_type, item['iid'], note['id'])
+
+        for item in fetch_concurrently(fetch_note_emoji, read_notes(), workers=self.workers):
+            if item is not None:
+                yield item
+
+    def __get_item_notes(self, item_type, item_id):
+        """Get notes of an issue or merge request"""
 
         notes = []
 
-        group_notes = self.client.issue_notes(issue_id)
+        if item_type == ISSUES:
+            group_notes = self.client.issue_notes(item_id)
+        else:
+            group_notes = self.client.merge_request_notes(item_id)
 
         for raw_notes in group_notes:
 
             for note in json.loads(raw_notes):
-                note_id = note['id']
-                note['award_emoji_data'] = \
-                    self.__get_note_award_emoji(issue_id, note_id)
+                note['award_emoji_data'] = []
                 notes.append(note)
 
         return notes
 
-    def __get_issue_award_emoji(self, issue_id):
-        """Get award emojis for issue"""
+    def __get_item_award_emoji(self, item_type, item_id):
+        """Get award emojis for an issue or merge request"""
 
         emojis = []
 
-        group_emojis = self.client.issue_emojis(issue_id)
+        if item_type == ISSUES:
+            group_emojis = self.client.issue_emojis(item_id)
+        else:
+            group_emojis = self.client.merge_request_emojis(item_id)
+
         for raw_emojis in group_emojis:
 
             for emoji in json.loads(raw_emojis):
@@ -225,12 +313,16 @@ class GitLab(Backend):
 
         return emojis
 
-    def __get_note_award_emoji(self, issue_id, note_id):
+    def __get_note_award_emoji(self, item_type, item_id, note_id):
         """Fetch emojis for note"""
 
         emojis = []
 
-        group_emojis = self.client.note_emojis(issue_id, note_id)
+        if item_type == ISSUES:
+            group_emojis = self.client.note_emojis(item_id, note_id)
+        else:
+            group_emojis = self.client.merge_request_note_emojis(item_id, note_id)
+
         for raw_emojis in group_emojis:
 
             for emoji in json.loads(raw_emojis):
@@ -238,11 +330,11 @@ class GitLab(Backend):
 
         return emojis
 
-    def __init_extra_issue_fields(self, issue):
-        """Add fields to an issue"""
+    def __init_extra_item_fields(self, item):
+        """Add fields to an issue or merge request"""
 
-        issue['notes_data'] = []
-        issue['award_emoji_data'] = []
+        item['notes_data'] = []
+        item['award_emoji_data'] = []
 
 
 class GitLabClient(HttpClient, RateLimitHandler):
@@ -263,6 +355,10 @@ class GitLabClient(HttpClient, RateLimitHandler):
          before raising a RetryError exception
     :param archive: an archive to store/read fetched data
     :param from_archive: it tells whether to write/read the archive
+    :param prefetch_pages: number of pages fetched while the previous
+        ones are processed
+    :param pool_size: number of connections kept open for each host
+    :param keep_alive: reuse connections between requests
     """
 
     RATE_LIMIT_HEADER = "RateLimit-Remaining"
@@ -273,10 +369,12 @@ class GitLabClient(HttpClient, RateLimitHandler):
     def __init__(self, owner, repository, token, base_url=None,
                  sleep_for_rate=False, min_rate_to_sleep=MIN_RATE_LIMIT,
                  sleep_time=DEFAULT_SLEEP_TIME, max_retries=MAX_RETRIES,
-                 archive=None, from_archive=False):
+                 archive=None, from_archive=False, prefetch_pages=DEFAULT_PREFETCH_PAGES,
+                 pool_size=DEFAULT_POOL_SIZE, keep_alive=True):
         self.owner = owner
         self.repository = repository
         self.token = token
+        self.prefetch_pages = prefetch_pages
         self.rate_limit = None
         self.sleep_for_rate = sleep_for_rate
 
@@ -288,7 +386,8 @@ class GitLabClient(HttpClient, RateLimitHandler):
 
         super().__init__(base_url, sleep_time=sleep_time, max_retries=max_retries,
                          extra_headers=self._set_extra_headers(),
-                         archive=archive, from_archive=from_archive)
+                         archive=archive, from_archive=from_archive,
+                         pool_size=pool_size, keep_alive=keep_alive)
         super().setup_rate_limit_handler(rate_limit_header=self.RATE_LIMIT_HEADER,
                                          rate_limit_reset_header=self.RATE_LIMIT_RESET_HEADER,
                                          sleep_for_rate=sleep_for_rate,
@@ -369,6 +468,58 @@ class GitLabClient(HttpClient, RateLimitHandler):
 
         return self.fetch_items(path, payload)
 
+    def merge_requests(self, from_date=None):
+        """Get the merge requests from pagination"""
+
+        payload = {
+            'state': 'all',
+            'order_by': 'updated_at',
+            'sort': 'asc'
+        }
+
+        if from_date:
+            from_date = from_date.isoformat()
+
+        path = urijoin("merge_requests")
+
+        return self.fetch_items(path, payload, from_date=from_date)
+
+    def merge_request_notes(self, merge_id):
+        """Get the merge request notes from pagination"""
+
+        payload = {
+            'order_by': 'updated_at',
+            'sort': 'asc'
+        }
+
+        path = urijoin("merge_requests", str(merge_id), "notes")
+
+        return self.fetch_items(path, payload)
+
+    def merge_request_emojis(self, merge_id):
+        """Get emojis of a merge request"""
+
+        payload = {
+            'order_by': 'updated_at',
+            'sort': 'asc'
+        }
+
+        path = urijoin("merge_requests", str(merge_id), "award_emoji")
+
+        return self.fetch_items(path, payload)
+
+    def merge_request_note_emojis(self, merge_id, note_id):
+        """Get emojis of a merge request note"""
+
+        payload = {
+            'order_by': 'updated_at',
+            'sort': 'asc'
+        }
+
+        path = urijoin("merge_requests", str(merge_id), "notes", str(note_id), "award_emoji")
+
+        return self.fetch_items(path, payload)
+
     def calculate_time_to_reset(self):
         """Calculate the seconds to reset the token requests, by obtaining the different
         between the current date and the next date when the token is fully regenerated.
@@ -417,52 +568,32 @@ class GitLabClient(HttpClient, RateLimitHandler):
     def fetch_items(self, path, payload, from_date=None):
         """Return the items from gitalb API using links pagination"""
 
-        page = 0  # current page
         last_page = None  # last page
-        url_next = urijoin(self.base_url, 'projects', self.owner + '%2F' + self.repository, path)
+        url = urijoin(self.base_url, 'projects', self.owner + '%2F' + self.repository, path)
 
-        logger.debug("Get GitLab paginated items from " + url_next)
+        logger.debug("Get GitLab paginated items from " + url)
 
-        response = self.fetch(url_next, payload=payload)
+        pages = LinkPaginator(self, url, payload=payload, prefetch=self.prefetch_pages)
 
-        items = response.text
+        for page, response in enumerate(pages, start=1):
+            if page == 1 and 'last' in response.links:
+                last_url = response.links['last']['url']
+                last_page = last_url.split('&page=')[1].split('&')[0]
+                last_page = int(last_page)
 
-        if from_date:
-            filtered_items = self.process_page_issues(items, from_date)
-
-        page += 1
-
-        if 'last' in response.links:
-            last_url = response.links['last']['url']
-            last_page = last_url.split('&page=')[1].split('&')[0]
-            last_page = int(last_page)
+            items = response.text
 
-            if from_date:
-                logger.debug("Page: %i/%i - issues after filtering %i" % (page, last_page, len(filtered_items)))
-            else:
-                logger.debug("Page: %i/%i" % (page, last_page))
+            if not items:
+                break
 
-        while items:
             if from_date:
+                filtered_items = self.process_page_issues(items, from_date)
+                logger.debug("Page: %s/%s - issues after filtering %i", page, last_page, len(filtered_items))
                 yield json.dumps(filtered_items)
             else:
+                logger.debug("Page: %s/%s", page, last_page)
                 yield items
 
-            items = None
-
-            if 'next' in response.links:
-                url_next = response.links['next']['url']  # Loving requests :)
-                response = self.fetch(url_next, payload=payload)
-                page += 1
-
-                items = response.text
-
-                if from_date:
-                    filtered_items = self.process_page_issues(items, from_date)
-                    logger.debug("Page: %i/%i - issues after filtering %i" % (page, last_page, len(filtered_items)))
-                else:
-                    logger.debug("Page: %i/%i" % (page, last_page))
-
 
 class GitLabCommand(BackendCommand):
     """Class to run GitLab backend from the command line."""
@@ -475,7 +606,9 @@ class GitLabCommand(BackendCommand):
 
         parser = BackendCommandArgumentParser(from_date=True,
                                               token_auth=True,
-                                              archive=True)
+                                              archive=True,
+                                              pagination=True,
+                                              connection=True)
 
         # GitLab options
         group = parser.parser.add_argument_group('GitLab arguments')
@@ -488,6 +621,9 @@ class GitLabCommand(BackendCommand):
                            default=MIN_RATE_LIMIT, type=int,
                            help="sleep until reset when the rate limit \
                                reaches this value")
+        group.add_argument('--workers', dest='workers',
+                           default=DEFAULT_WORKERS, type=int,
+                           help="number of threads used to fetch the data of the issues and merge requests")
 
         # Positional arguments
         parser.parser.add_argument('owner',
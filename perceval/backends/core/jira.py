@@ -28,13 +28,19 @@ import requests
 
 from requests.packages.urllib3.exceptions import InsecureRequestWarning
 
-from grimoirelab.toolkit.datetime import datetime_to_utc, str_to_datetime
+from grimoirelab.toolkit.datetime import (datetime_to_utc,
+                                          datetime_utcnow,
+                                          str_to_datetime)
 from grimoirelab.toolkit.uris import urijoin
 
 from ...backend import (Backend,
                         BackendCommand,
                         BackendCommandArgumentParser)
-from ...client import HttpClient
+from ...client import (DEFAULT_PREFETCH_PAGES,
+                       DEFAULT_WORKERS,
+                       HttpClient,
+                       OffsetPaginator,
+                       fetch_concurrently)
 from ...utils import DEFAULT_DATETIME
 
 CATEGORY_ISSUE = "issue"
@@ -96,8 +102,12 @@ class Jira(Backend):
     :param max_issues: max number of issues per query
     :param tag: label used to mark the data
     :param archive: archive to store/retrieve items
+    :param prefetch_pages: number of pages of issues fetched while
+        the previous ones are processed
+    :param workers: number of threads used to fetch the pages of
+        issues at the same time
     """
-    version = '0.11.4'
+    version = '0.13.0'
 
     CATEGORIES = [CATEGORY_ISSUE]
 
@@ -105,7 +115,8 @@ class Jira(Backend):
                  user=None, password=None,
                  verify=True, cert=None,
                  max_issues=MAX_ISSUES, tag=None,
-                 archive=None):
+                 archive=None, prefetch_pages=DEFAULT_PREFETCH_PAGES,
+                 workers=DEFAULT_WORKERS):
         origin = url
 
         super().__init__(origin, tag=tag, archive=archive)
@@ -116,6 +127,8 @@ class Jira(Backend):
         self.verify = verify
         self.cert = cert
         self.max_issues = max_issues
+        self.prefetch_pages = prefetch_pages
+        self.workers = workers
         self.client = None
 
     def fetch(self, category=CATEGORY_ISSUE, from_date=DEFAULT_DATETIME):
@@ -124,6 +137,11 @@ class Jira(Backend):
         The method retrieves, from a JIRA site, the
         issues updated since the given date.
 
+        When `workers` is greater than one, only the issues updated
+        before the fetch process starts are retrieved, so the issues
+        updated meanwhile do not change the pages of the query. They
+        will be retrieved by the next fetch.
+
         :param category: the category of items to fetch
         :param from_date: retrieve issues updated from this date
 
@@ -135,6 +153,10 @@ class Jira(Backend):
         from_date = datetime_to_utc(from_date)
 
         kwargs = {'from_date': from_date}
+
+        if self.workers > 1:
+            kwargs['to_date'] = datetime_utcnow()
+
         items = super().fetch(category, **kwargs)
 
         return items
@@ -148,11 +170,12 @@ class Jira(Backend):
         :returns: a generator of items
         """
         from_date = kwargs['from_date']
+        to_date = kwargs.get('to_date', None)
 
         logger.info("Looking for issues at site '%s', in project '%s' and updated from '%s'",
                     self.url, self.project, str(from_date))
 
-        whole_pages = self.client.get_issues(from_date)
+        whole_pages = self.client.get_issues(from_date, to_date)
 
         fields = json.loads(self.client.get_fields())
         custom_fields = filter_custom_fields(fields)
@@ -234,7 +257,9 @@ class Jira(Backend):
 
         return JiraClient(self.url, self.project, self.user, self.password,
                           self.verify, self.cert, self.max_issues,
-                          self.archive, from_archive)
+                          self.archive, from_archive,
+                          prefetch_pages=self.prefetch_pages,
+                          workers=self.workers)
 
 
 class JiraClient(HttpClient):
@@ -252,6 +277,10 @@ class JiraClient(HttpClient):
     :param max_issues: max number of issues per query
     :param archive: an archive to store/read fetched data
     :param from_archive: it tells whether to write/read the archive
+    :param prefetch_pages: number of pages of issues fetched while
+        the previous ones are processed
+    :param workers: number of threads used to fetch the pages of
+        issues at the same time
 
     :raises HTTPError: when an error occurs doing the request
     """
@@ -261,7 +290,8 @@ class JiraClient(HttpClient):
     RESOURCE = 'rest/api'
 
     def __init__(self, url, project, user, password, verify, cert, max_issues=MAX_ISSUES,
-                 archive=None, from_archive=False):
+                 archive=None, from_archive=False, prefetch_pages=DEFAULT_PREFETCH_PAGES,
+                 workers=DEFAULT_WORKERS):
         super().__init__(url, archive=archive, from_archive=from_archive)
         self.project = project
         self.user = user
@@ -269,39 +299,49 @@ class JiraClient(HttpClient):
         self.verify = verify
         self.cert = cert
         self.max_issues = max_issues
+        self.prefetch_pages = prefetch_pages
+        self.workers = workers
 
         if not from_archive:
             self.__init_session()
 
-    def get_issues(self, from_date):
+    def get_issues(self, from_date, to_date=None):
         """Retrieve all the issues from a given date.
 
+        When `workers` is greater than one, the number of issues
+        and the size of the pages are read from the first page and
+        the rest of them are requested at the same time. Pages are
+        returned in order. The requests are the same, so archives
+        can be read using any number of workers.
+
         :param from_date: obtain issues updated since this date
+        :param to_date: obtain issues updated until this date
+            (inclusive)
         """
-        start_at = 0
-
         url = urijoin(self.base_url, self.RESOURCE, self.VERSION_API, 'search')
-        req = self.fetch(url, payload=self.__build_payload(start_at, from_date))
-        issues = req.text
+        payload = self.__build_payload(0, from_date, to_date)
 
-        data = req.json()
-        tissues = data['total']
-        nissues = data['maxResults']
+        if self.workers > 1:
+            pages = self.__fetch_pages_concurrently(url, payload)
+        else:
+            pages = OffsetPaginator(self, url, payload,
+                                    'startAt', self.__page_info,
+                                    prefetch=self.prefetch_pages)
 
-        start_at += min(nissues, tissues)
-        self.__log_status(start_at, tissues)
+        total = None
 
-        while issues:
-            yield issues
-            issues = None
+        for req in pages:
+            data = req.json()
+            self.__log_status(data['startAt'] + data['maxResults'], data['total'])
 
-            if data['startAt'] + nissues < tissues:
-                req = self.fetch(url, payload=self.__build_payload(start_at, from_date))
+            if total is None:
+                total = data['total']
+            elif data['total'] != total and self.workers > 1:
+                logger.warning("Number of issues changed from %s to %s while fetching; "
+                               "some issues might be missing", total, data['total'])
+                total = data['total']
 
-                data = req.json()
-                start_at += nissues
-                issues = req.text
-                self.__log_status(start_at, tissues)
+            yield req.text
 
     def get_fields(self):
         """Retrieve all the fields available."""
@@ -311,9 +351,33 @@ class JiraClient(HttpClient):
 
         return req.text
 
-    def __build_jql_query(self, from_date):
+    def __fetch_pages_concurrently(self, url, payload):
+        """Fetch the first page and then the rest of them concurrently"""
+
+        # Clients may sanitize the payload once it is sent
+        response = self.fetch(url, payload=dict(payload))
+        yield response
+
+        data = response.json()
+        page_size = data['maxResults']
+
+        if not page_size:
+            return
+
+        def fetch_page(start_at):
+            params = dict(payload)
+            params['startAt'] = start_at
+            return self.fetch(url, payload=params)
+
+        offsets = range(data['startAt'] + page_size, data['total'], page_size)
+
+        for response in fetch_concurrently(fetch_page, offsets, workers=self.workers):
+            yield response
+
+    def __build_jql_query(self, from_date, to_date=None):
         AND_OP = 'AND'
         UPDATED_OP = 'updated >'
+        UPDATED_UNTIL_OP = 'updated <='
         PROJECT_OP = 'project ='
         ORDER_BY_OP = 'order by'
         ASC_OP = 'asc'
@@ -328,19 +392,32 @@ class JiraClient(HttpClient):
         else:
             jql_query = ' '.join([UPDATED_OP, strdate])
 
+        if to_date:
+            strdate = str(int(to_date.timestamp() * 1000))
+            jql_query += ' '.join(['', AND_OP, UPDATED_UNTIL_OP, strdate])
+
         jql_query += ' '.join(['', ORDER_BY_OP, 'updated', ASC_OP])
 
         return jql_query
 
-    def __build_payload(self, start_at, from_date):
+    def __build_payload(self, start_at, from_date, to_date=None):
         payload = {
-            'jql': self.__build_jql_query(from_date),
+            'jql': self.__build_jql_query(from_date, to_date),
             'startAt': start_at,
             'expand': self.EXPAND,
             'maxResults': self.max_issues
         }
         return payload
 
+    @staticmethod
+    def __page_info(response):
+        """Get the size of a page of issues and whether more pages follow"""
+
+        data = response.json()
+        more = data['startAt'] + data['maxResults'] < data['total']
+
+        return data['maxResults'], more
+
     def __log_status(self, max_issues, total):
         if (total != 0):
             nissues = min(max_issues, total)
@@ -372,7 +449,8 @@ class JiraCommand(BackendCommand):
 
         parser = BackendCommandArgumentParser(from_date=True,
                                               basic_auth=True,
-                                              archive=True)
+                                              archive=True,
+                                              pagination=True)
 
         # JIRA options
         group = parser.parser.add_argument_group('JIRA arguments')
@@ -385,6 +463,9 @@ class JiraCommand(BackendCommand):
         group.add_argument('--max-issues', dest='max_issues',
                            type=int, default=MAX_ISSUES,
                            help="Maximum number of issues requested in the same query")
+        group.add_argument('--workers', dest='workers',
+                           type=int, default=DEFAULT_WORKERS,
+                           help="Number of threads used to fetch the pages of issues")
 
         # Required arguments
         parser.parser.add_argument('url',
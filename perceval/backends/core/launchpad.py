@@ -20,8 +20,11 @@
 #     Valerio Cosentino <valcos@bitergia.com>
 #
 
+import collections
 import json
 import logging
+import threading
+
 import requests
 
 from grimoirelab.toolkit.datetime import (datetime_to_utc,
@@ -31,7 +34,10 @@ from grimoirelab.toolkit.uris import urijoin
 from ...backend import (Backend,
                         BackendCommand,
                         BackendCommandArgumentParser)
-from ...client import HttpClient
+from ...client import (DEFAULT_POOL_SIZE,
+                       DEFAULT_WORKERS,
+                       HttpClient,
+                       fetch_concurrently)
 from ...utils import DEFAULT_DATETIME
 
 CATEGORY_ISSUE = "issue"
@@ -57,14 +63,19 @@ class Launchpad(Backend):
     :param sleep_time: time to sleep in case of connection problems
     :param tag: label used to mark the data
     :param archive: archive to store/retrieve items
+    :param workers: number of threads used to fetch the data of
+        several issues at the same time
+    :param pool_size: number of connections kept open for each host
+    :param keep_alive: reuse connections between requests
     """
-    version = '0.6.2'
+    version = '0.8.0'
 
     CATEGORIES = [CATEGORY_ISSUE]
 
     def __init__(self, distribution, package=None,
                  items_per_page=ITEMS_PER_PAGE, sleep_time=SLEEP_TIME,
-                 tag=None, archive=None):
+                 tag=None, archive=None, workers=DEFAULT_WORKERS,
+                 pool_size=DEFAULT_POOL_SIZE, keep_alive=True):
 
         origin = urijoin(LAUNCHPAD_URL, distribution)
 
@@ -73,6 +84,9 @@ class Launchpad(Backend):
         self.package = package
         self.items_per_page = items_per_page
         self.sleep_time = sleep_time
+        self.workers = workers
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive
 
         self.client = None
         self._users = {}  # internal users cache
@@ -172,7 +186,8 @@ class Launchpad(Backend):
         """Init client"""
 
         return LaunchpadClient(self.distribution, self.package, self.items_per_page,
-                               self.sleep_time, self.archive, from_archive)
+                               self.sleep_time, self.archive, from_archive,
+                               pool_size=self.pool_size, keep_alive=self.keep_alive)
 
     def __init_extra_issue_fields(self, issue):
         """Add fields to an issue"""
@@ -191,31 +206,44 @@ class Launchpad(Backend):
     def _fetch_issues(self, from_date):
         """Fetch the issues from a project (distribution/package)"""
 
+        issues = self.__read_issues(from_date)
+
+        for issue in fetch_concurrently(self.__enrich_issue, issues, workers=self.workers):
+            yield issue
+
+    def __read_issues(self, from_date):
+        """Read the issues from the pages"""
+
         issues_groups = self.client.issues(start=from_date)
 
         for raw_issues in issues_groups:
 
             issues = json.loads(raw_issues)['entries']
             for issue in issues:
-                issue = self.__init_extra_issue_fields(issue)
-                issue_id = self.__extract_issue_id(issue['bug_link'])
+                yield issue
 
-                for field in TARGET_ISSUE_FIELDS:
+    def __enrich_issue(self, issue):
+        """Get the data related to an issue"""
 
-                    if not issue[field]:
-                        continue
+        issue = self.__init_extra_issue_fields(issue)
+        issue_id = self.__extract_issue_id(issue['bug_link'])
 
-                    if field == 'bug_link':
-                        issue['bug_data'] = self.__fetch_issue_data(issue_id)
-                        issue['activity_data'] = [activity for activity in self.__fetch_issue_activities(issue_id)]
-                        issue['messages_data'] = [message for message in self.__fetch_issue_messages(issue_id)]
-                        issue['attachments_data'] = [attachment for attachment in self.__fetch_issue_attachments(issue_id)]
-                    elif field == 'assignee_link':
-                        issue['assignee_data'] = self.__fetch_user_data('{ASSIGNEE}', issue[field])
-                    elif field == 'owner_link':
-                        issue['owner_data'] = self.__fetch_user_data('{OWNER}', issue[field])
+        for field in TARGET_ISSUE_FIELDS:
 
-                yield issue
+            if not issue[field]:
+                continue
+
+            if field == 'bug_link':
+                issue['bug_data'] = self.__fetch_issue_data(issue_id)
+                issue['activity_data'] = [activity for activity in self.__fetch_issue_activities(issue_id)]
+                issue['messages_data'] = [message for message in self.__fetch_issue_messages(issue_id)]
+                issue['attachments_data'] = [attachment for attachment in self.__fetch_issue_attachments(issue_id)]
+            elif field == 'assignee_link':
+                issue['assignee_data'] = self.__fetch_user_data('{ASSIGNEE}', issue[field])
+            elif field == 'owner_link':
+                issue['owner_data'] = self.__fetch_user_data('{OWNER}', issue[field])
+
+        return issue
 
     def __fetch_issue_data(self, issue_id):
         """Get data associated to an issue"""
@@ -279,21 +307,30 @@ class LaunchpadClient(HttpClient):
     :param sleep_time: time to sleep in case of connection problems
     :param archive: an archive to store/read fetched data
     :param from_archive: it tells whether to write/read the archive
+    :param pool_size: number of connections kept open for each host
+    :param keep_alive: reuse connections between requests
     """
 
     _users = {}
 
     def __init__(self, distribution, package=None,
                  items_per_page=ITEMS_PER_PAGE, sleep_time=SLEEP_TIME,
-                 archive=None, from_archive=False):
+                 archive=None, from_archive=False,
+                 pool_size=DEFAULT_POOL_SIZE, keep_alive=True):
 
         self.distribution = distribution
         self.package = package
         self.items_per_page = items_per_page
 
+        # Locks to fetch each user only once when the
+        # client is shared by several threads
+        self._user_locks = collections.defaultdict(threading.Lock)
+        self._user_locks_lock = threading.Lock()
+
         extra_headers = self.__define_headers()
         super().__init__(LAUNCHPAD_API_URL, sleep_time=sleep_time, extra_headers=extra_headers,
-                         archive=archive, from_archive=from_archive)
+                         archive=archive, from_archive=from_archive,
+                         pool_size=pool_size, keep_alive=keep_alive)
 
     def issues(self, start=None):
         """Get the issues from pagination"""
@@ -307,24 +344,25 @@ class LaunchpadClient(HttpClient):
 
         user = None
 
-        if user_name in self._users:
-            return self._users[user_name]
+        with self.__user_lock(user_name):
+            if user_name in self._users:
+                return self._users[user_name]
 
-        url_user = self.__get_url("~" + user_name)
+            url_user = self.__get_url("~" + user_name)
 
-        logger.info("Getting info for %s" % (url_user))
+            logger.info("Getting info for %s" % (url_user))
 
-        try:
-            raw_user = self.__send_request(url_user)
-            user = raw_user
-        except requests.exceptions.HTTPError as e:
-            if e.response.status_code in [404, 410]:
-                logger.warning("Data is not available - %s", url_user)
-                user = '{}'
-            else:
-                raise e
+            try:
+                raw_user = self.__send_request(url_user)
+                user = raw_user
+            except requests.exceptions.HTTPError as e:
+                if e.response.status_code in [404, 410]:
+                    logger.warning("Data is not available - %s", url_user)
+                    user = '{}'
+                else:
+                    raise e
 
-        self._users[user_name] = user
+            self._users[user_name] = user
 
         return user
 
@@ -353,6 +391,12 @@ class LaunchpadClient(HttpClient):
 
         return raw_items
 
+    def __user_lock(self, user_name):
+        """Get the lock of a user"""
+
+        with self._user_locks_lock:
+            return self._user_locks[user_name]
+
     def __get_url_project(self):
         """Build URL project"""
 
@@ -455,7 +499,8 @@ class LaunchpadCommand(BackendCommand):
 
         parser = BackendCommandArgumentParser(from_date=True,
                                               archive=True,
-                                              token_auth=False)
+                                              token_auth=False,
+                                              connection=True)
 
         # Optional arguments
         group = parser.parser.add_argument_group('Launchpad arguments')
@@ -463,6 +508,9 @@ class LaunchpadCommand(BackendCommand):
                            help="Items per page")
         group.add_argument('--sleep-time', dest='sleep_time',
                            help="Sleep time in case of connection lost")
+        group.add_argument('--workers', dest='workers',
+                           default=DEFAULT_WORKERS, type=int,
+                           help="number of threads used to fetch the data of the issues")
 
         # Required arguments
         parser.parser.add_argument('distribution',
@@ -31,7 +31,7 @@ from grimoirelab.toolkit.uris import urijoin
 from ...backend import (Backend,
                         BackendCommand,
                         BackendCommandArgumentParser)
-from ...client import HttpClient
+from ...client import DEFAULT_PREFETCH_PAGES, HttpClient, OffsetPaginator
 from ...utils import DEFAULT_DATETIME
 
 CATEGORY_QUESTION = "question"
@@ -54,13 +54,16 @@ class StackExchange(Backend):
     :param max_questions: max of questions per page retrieved
     :param tag: label used to mark the data
     :param archive: archive to store/retrieve items
+    :param prefetch_pages: number of pages of questions fetched while
+        the previous ones are processed
     """
-    version = '0.10.4'
+    version = '0.11.0'
 
     CATEGORIES = [CATEGORY_QUESTION]
 
     def __init__(self, site, tagged=None, api_token=None,
-                 max_questions=MAX_QUESTIONS, tag=None, archive=None):
+                 max_questions=MAX_QUESTIONS, tag=None, archive=None,
+                 prefetch_pages=DEFAULT_PREFETCH_PAGES):
         origin = site
 
         super().__init__(origin, tag=tag, archive=archive)
@@ -68,6 +71,7 @@ class StackExchange(Backend):
         self.api_token = api_token
         self.tagged = tagged
         self.max_questions = max_questions
+        self.prefetch_pages = prefetch_pages
 
         self.client = None
 
@@ -176,7 +180,8 @@ class StackExchange(Backend):
         """Init client"""
 
         return StackExchangeClient(self.site, self.tagged, self.api_token, self.max_questions,
-                                   self.archive, from_archive)
+                                   self.archive, from_archive,
+                                   prefetch_pages=self.prefetch_pages)
 
 
 class StackExchangeClient(HttpClient):
@@ -191,6 +196,8 @@ class StackExchangeClient(HttpClient):
     :param max_questions: max number of questions per query
     :param archive: an archive to store/read fetched data
     :param from_archive: it tells whether to write/read the archive
+    :param prefetch_pages: number of pages of questions fetched while
+        the previous ones are processed
 
     :raises HTTPError: when an error occurs doing the request
     """
@@ -204,12 +211,14 @@ class StackExchangeClient(HttpClient):
     STACKEXCHANGE_API_URL = 'https://api.stackexchange.com'
     VERSION_API = '2.2'
 
-    def __init__(self, site, tagged, token, max_questions=MAX_QUESTIONS, archive=None, from_archive=False):
+    def __init__(self, site, tagged, token, max_questions=MAX_QUESTIONS, archive=None, from_archive=False,
+                 prefetch_pages=DEFAULT_PREFETCH_PAGES):
         super().__init__(self.STACKEXCHANGE_API_URL, archive=archive, from_archive=from_archive)
         self.site = site
         self.tagged = tagged
         self.token = token
         self.max_questions = max_questions
+        self.prefetch_pages = prefetch_pages
 
     def get_questions(self, from_date):
         """Retrieve all the questions from a given date.
@@ -217,42 +226,28 @@ class StackExchangeClient(HttpClient):
         :param from_date: obtain questions updated since this date
         """
 
-        page = 1
         url = urijoin(self.base_url, self.VERSION_API, "questions")
 
-        req = self.fetch(url, payload=self.__build_payload(page, from_date))
-        questions = req.text
+        pages = OffsetPaginator(self, url, self.__build_payload(1, from_date),
+                                'page', self.__page_info,
+                                prefetch=self.prefetch_pages, by_page=True)
 
-        data = req.json()
-        tquestions = data['total']
-        nquestions = data['page_size']
+        tquestions = None
+        nquestions = 0
 
-        self.__log_status(data['quota_remaining'],
-                          data['quota_max'],
-                          nquestions,
-                          tquestions)
+        for req in pages:
+            data = req.json()
 
-        while questions:
-            yield questions
-            questions = None
+            if tquestions is None:
+                tquestions = data['total']
+            nquestions += data['page_size']
 
-            if data['has_more']:
-                page += 1
+            self.__log_status(data['quota_remaining'],
+                              data['quota_max'],
+                              nquestions,
+                              tquestions)
 
-                backoff = data.get('backoff', None)
-                if backoff:
-                    logger.debug("Expensive query. Wait %s secs to send a new request",
-                                 backoff)
-                    time.sleep(float(backoff))
-
-                req = self.fetch(url, payload=self.__build_payload(page, from_date))
-                data = req.json()
-                questions = req.text
-                nquestions += data['page_size']
-                self.__log_status(data['quota_remaining'],
-                                  data['quota_max'],
-                                  nquestions,
-                                  tquestions)
+            yield req.text
 
     @staticmethod
     def sanitize_for_archive(url, headers, payload):
@@ -270,6 +265,24 @@ class StackExchangeClient(HttpClient):
 
         return url, headers, payload
 
+    @staticmethod
+    def __page_info(response):
+        """Get the size of a page and whether more pages follow.
+
+        When the API asks for a backoff, this method waits before
+        the next page is requested.
+        """
+        data = response.json()
+
+        if data['has_more']:
+            backoff = data.get('backoff', None)
+            if backoff:
+                logger.debug("Expensive query. Wait %s secs to send a new request",
+                             backoff)
+                time.sleep(float(backoff))
+
+        return data['page_size'], data['has_more']
+
     def __build_payload(self, page, from_date, order='desc', sort='activity'):
         payload = {'page': page,
                    'pagesize': self.max_questions,
@@ -307,7 +320,8 @@ class StackExchangeCommand(BackendCommand):
 
         parser = BackendCommandArgumentParser(from_date=True,
                                               token_auth=True,
-                                              archive=True)
+                                              archive=True,
+                                              pagination=True)
 
         # StackExchange options
         group = parser.parser.add_argument_group('StackExchange arguments')
@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2018 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Fifth Floor, Boston, MA 02110-1335, USA.
+#
+# Authors:
+#     Santiago Dueñas <sduenas@bitergia.com>
+#
+
+import collections
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from .errors import CacheError
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 7 * 24 * 60 * 60
+DEFAULT_MAX_SIZE = 100000
+
+
+class Cache:
+    """Abstract class for caching the data fetched by the clients.
+
+    A cache stores string values identified by string keys. Entries
+    older than `ttl` seconds are considered expired and are not
+    returned. When the cache has more than `max_size` entries, the
+    least recently used ones are evicted.
+
+    The number of hits and misses are counted on `hits` and `misses`
+    attributes. Derived classes have to implement `_get`, `_set`
+    and `clear` methods.
+
+    :param ttl: seconds an entry is valid; when `None`, entries
+        never expire
+    :param max_size: maximum number of entries; when `None`, the
+        size is not limited
+    """
+    def __init__(self, ttl=None, max_size=None):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.RLock()
+
+    def get(self, key):
+        """Get the value of an entry.
+
+        :param key: key of the entry
+
+        :returns: the value or `None` when the entry is not
+            found or it expired
+        """
+        with self._lock:
+            value = self._get(key)
+
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        return value
+
+    def set(self, key, value):
+        """Set the value of an entry.
+
+        :param key: key of the entry
+        :param value: value to store
+        """
+        with self._lock:
+            self._set(key, value)
+
+    def clear(self):
+        raise NotImplementedError
+
+    def stats(self):
+        """Get the hit and miss counters.
+
+        :returns: a dict with `hits` and `misses` keys
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+    def close(self):
+        pass
+
+    def _get(self, key):
+        raise NotImplementedError
+
+    def _set(self, key, value):
+        raise NotImplementedError
+
+    def _is_expired(self, created_on, now):
+        return self.ttl is not None and now - created_on > self.ttl
+
+
+class MemoryCache(Cache):
+    """Cache entries in memory.
+
+    Entries are lost when the process finishes.
+
+    :param ttl: seconds an entry is valid; when `None`, entries
+        never expire
+    :param max_size: maximum number of entries; when `None`, the
+        size is not limited
+    """
+    def __init__(self, ttl=None, max_size=None):
+        super().__init__(ttl=ttl, max_size=max_size)
+        self._entries = collections.OrderedDict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _get(self, key):
+        entry = self._entries.get(key, None)
+
+        if entry is None:
+            return None
+
+        value, created_on = entry
+
+        if self._is_expired(created_on, time.time()):
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+
+        return value
+
+    def _set(self, key, value):
+        self._entries[key] = (value, time.time())
+        self._entries.move_to_end(key)
+
+        if self.max_size is not None:
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+class SQLiteCache(Cache):
+    """Cache entries in a SQLite database.
+
+    The database is created when it does not exist. It can be
+    shared by several processes at the same time, so the data
+    fetched by one of them is available for the rest.
+
+    To avoid a write on every hit, access times are kept in memory
+    and stored every `ACCESS_BATCH_SIZE` hits. The least recently
+    used entries are evicted every `EVICTION_INTERVAL` inserts, so
+    the database can hold up to `max_size + EVICTION_INTERVAL`
+    entries between evictions.
+
+    :param cache_path: path to the database
+    :param ttl: seconds an entry is valid; when `None`, entries
+        never expire
+    :param max_size: maximum number of entries; when `None`, the
+        size is not limited
+
+    :raises CacheError: when the database cannot be opened
+    """
+    CACHE_TABLE = 'cache'
+    CACHE_CREATE_STMT = "CREATE TABLE IF NOT EXISTS " + CACHE_TABLE + " ( " \
+                        "key TEXT PRIMARY KEY, " \
+                        "value TEXT, " \
+                        "created_on REAL, " \
+                        "accessed_on REAL)"
+    CACHE_INDEX_STMT = "CREATE INDEX IF NOT EXISTS cache_accessed_on " \
+                       "ON " + CACHE_TABLE + " (accessed_on)"
+
+    # Seconds to wait for the locks of other processes
+    TIMEOUT = 30
+
+    # Number of access times kept in memory before storing them
+    ACCESS_BATCH_SIZE = 100
+
+    # Number of inserts between evictions
+    EVICTION_INTERVAL = 100
+
+    def __init__(self, cache_path, ttl=DEFAULT_TTL, max_size=DEFAULT_MAX_SIZE):
+        super().__init__(ttl=ttl, max_size=max_size)
+
+        self.cache_path = cache_path
+        self._accesses = {}
+        self._ninserts = 0
+
+        dirpath = os.path.dirname(cache_path)
+        if dirpath and not os.path.exists(dirpath):
+            os.makedirs(dirpath)
+
+        try:
+            self._db = sqlite3.connect(self.cache_path, timeout=self.TIMEOUT,
+                                       check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode = WAL")
+            self._db.execute(self.CACHE_CREATE_STMT)
+            self._db.execute(self.CACHE_INDEX_STMT)
+            self._db.commit()
+        except sqlite3.DatabaseError as e:
+            msg = "cache %s cannot be opened; cause: %s" % (self.cache_path, str(e))
+            raise CacheError(cause=msg)
+
+    def __del__(self):
+        self.close()
+
+    def clear(self):
+        with self._lock:
+            self._accesses.clear()
+            self._execute("DELETE FROM " + self.CACHE_TABLE)
+
+    def close(self):
+        """Store the pending access times and close the database."""
+
+        conn = getattr(self, '_db', None)
+
+        if conn:
+            try:
+                with self._lock:
+                    self._store_accesses()
+            finally:
+                conn.close()
+                self._db = None
+
+    def _get(self, key):
+        now = time.time()
+
+        select_stmt = "SELECT value, created_on " \
+                      "FROM " + self.CACHE_TABLE + " " \
+                      "WHERE key = ?"
+        rows = self._execute(select_stmt, (key,), commit=False)
+
+        if not rows:
+            return None
+
+        value, created_on = rows[0]
+
+        if self._is_expired(created_on, now):
+            self._accesses.pop(key, None)
+            delete_stmt = "DELETE FROM " + self.CACHE_TABLE + " WHERE key = ?"
+            self._execute(delete_stmt, (key,))
+            return None
+
+        self._accesses[key] = now
+
+        if len(self._accesses) >= self.ACCESS_BATCH_SIZE:
+            self._store_accesses()
+
+        return value
+
+    def _set(self, key, value):
+        now = time.time()
+
+        insert_stmt = "INSERT OR REPLACE INTO " + self.CACHE_TABLE + " (" \
+                      "key, value, created_on, accessed_on) " \
+                      "VALUES (?, ?, ?, ?)"
+        self._execute(insert_stmt, (key, value, now, now), commit=False)
+        self._accesses.pop(key, None)
+        self._ninserts += 1
+
+        if self.max_size is not None and self._ninserts >= self.EVICTION_INTERVAL:
+            # Access times must be up to date before evicting
+            self._store_accesses(commit=False)
+            self._ninserts = 0
+
+            # Remove the least recently used entries
+            evict_stmt = "DELETE FROM " + self.CACHE_TABLE + " " \
+                         "WHERE key IN (" \
+                         "SELECT key FROM " + self.CACHE_TABLE + " " \
+                         "ORDER BY accessed_on DESC LIMIT -1 OFFSET ?)"
+            self._execute(evict_stmt, (self.max_size,), commit=False)
+
+        self._commit()
+
+    def _store_accesses(self, commit=True):
+        if not self._accesses:
+            return
+
+        update_stmt = "UPDATE " + self.CACHE_TABLE + " " \
+                      "SET accessed_on = ? WHERE key = ?"
+        params = [(accessed_on, key) for key, accessed_on in self._accesses.items()]
+        self._execute(update_stmt, params, commit=commit, many=True)
+        self._accesses.clear()
+
+    def _execute(self, stmt, params=(), commit=True, many=False):
+        try:
+            cursor = self._db.cursor()
+            if many:
+                cursor.executemany(stmt, params)
+            else:
+                cursor.execute(stmt, params)
+            rows = cursor.fetchall()
+            cursor.close()
+        except sqlite3.DatabaseError as e:
+            self._db.rollback()
+            msg = "cache %s error; cause: %s" % (self.cache_path, str(e))
+            raise CacheError(cause=msg)
+
+        if commit:
+            self._commit()
+
+        return rows
+
+    def _commit(self):
+        try:
+            self._db.commit()
+        except sqlite3.DatabaseError as e:
+            msg = "cache %s error; cause: %s" % (self.cache_path, str(e))
+            raise CacheError(cause=msg)
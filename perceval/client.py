@@ -20,7 +20,11 @@
 #     Valerio Cosentino <valcos@bitergia.com>
 #
 
+import collections
+import concurrent.futures
 import logging
+import queue
+import threading
 import time
 
 import requests
@@ -31,6 +35,15 @@ from ._version import __version__
 
 logger = logging.getLogger(__name__)
 
+# Number of pages fetched in advance by paginators
+DEFAULT_PREFETCH_PAGES = 0
+
+# Number of threads used to fetch the data of several items
+DEFAULT_WORKERS = 1
+
+# Number of connections kept open for each host
+DEFAULT_POOL_SIZE = 10
+
 
 class HttpClient:
     """Abstract class for HTTP clients.
@@ -43,6 +56,13 @@ class HttpClient:
     Sub-classes can use the methods fetch to obtain data
     from the data source.
 
+    Connections are kept open and reused by the requests sent
+    to the same host. When the client is shared by several
+    threads, `pool_size` should be, at least, the number of
+    threads; otherwise, the connections that do not fit in
+    the pool are closed after each request. Connections are
+    closed after each request when `keep_alive` is not set.
+
     To track which version of the client was used during
     the fetching process, this class provides a `version`
     attribute that each client may override.
@@ -52,8 +72,10 @@ class HttpClient:
         before raising a RetryError exception
     :param sleep_time: time to sleep in case
         of connection problems
+    :param pool_size: number of connections kept open for each host
+    :param keep_alive: reuse connections between requests
     """
-    version = '0.1.5'
+    version = '0.2.0'
 
     DEFAULT_SLEEP_TIME = 1
 
@@ -78,7 +100,8 @@ class HttpClient:
 
     def __init__(self, base_url, max_retries=MAX_RETRIES, sleep_time=DEFAULT_SLEEP_TIME,
                  extra_headers=None, extra_status_forcelist=None, extra_retry_after_status=None,
-                 archive=None, from_archive=False):
+                 archive=None, from_archive=False,
+                 pool_size=DEFAULT_POOL_SIZE, keep_alive=True):
 
         self.base_url = base_url
 
@@ -105,6 +128,8 @@ class HttpClient:
         self.raise_on_status = self.DEFAULT_RAISE_ON_STATUS
         self.respect_retry_after_header = self.DEFAULT_RESPECT_RETRY_AFTER_HEADER
         self.sleep_time = sleep_time
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive
 
         self.archive = archive
         self.from_archive = from_archive
@@ -133,6 +158,31 @@ class HttpClient:
 
         return response
 
+    def connection_stats(self):
+        """Get the number of connections opened and reused by the session.
+
+        Connections of hosts removed from the pool are not counted.
+
+        :returns: a dict with the number of `new` and `reused` connections
+        """
+        nrequests = 0
+        nconnections = 0
+
+        for adapter in self.session.adapters.values():
+            pools = adapter.poolmanager.pools
+
+            for key in pools.keys():
+                pool = pools[key]
+                nrequests += pool.num_requests
+                nconnections += pool.num_connections
+
+        stats = {
+            'new': nconnections,
+            'reused': max(nrequests - nconnections, 0)
+        }
+
+        return stats
+
     @staticmethod
     def sanitize_for_archive(url, headers, payload):
         """Sanitize the URL, headers and payload of a HTTP request before storing/retrieving items.
@@ -159,22 +209,33 @@ class HttpClient:
 
     def _fetch_from_remote(self, url, payload, headers, method, stream, verify):
 
+        try:
+            response = self._send_request(url, payload, headers, method, stream, verify)
+        except requests.exceptions.HTTPError as e:
+            if self.archive:
+                self._store_in_archive(url, payload, headers, e)
+            raise e
+
+        if self.archive:
+            self._store_in_archive(url, payload, headers, response)
+        return response
+
+    def _store_in_archive(self, url, payload, headers, data):
+        """Store the response, or the error, of a request in the archive"""
+
+        url, headers, payload = self.sanitize_for_archive(url, headers, payload)
+        self.archive.store(url, payload, headers, data)
+
+    def _send_request(self, url, payload, headers, method, stream, verify):
+        """Send a request, retrying it when it fails, and check its status"""
+
         if method == self.GET:
             response = self.session.get(url, params=payload, headers=headers, stream=stream, verify=verify)
         else:
             response = self.session.post(url, data=payload, headers=headers, stream=stream, verify=verify)
 
-        try:
-            response.raise_for_status()
-        except Exception as e:
-            if self.archive:
-                url, headers, payload = self.sanitize_for_archive(url, headers, payload)
-                self.archive.store(url, payload, headers, e)
-            raise e
+        response.raise_for_status()
 
-        if self.archive:
-            url, headers, payload = self.sanitize_for_archive(url, headers, payload)
-            self.archive.store(url, payload, headers, response)
         return response
 
     def _create_http_session(self):
@@ -185,6 +246,9 @@ class HttpClient:
         if self.headers:
             self.session.headers.update(self.headers)
 
+        if not self.keep_alive:
+            self.session.headers['Connection'] = 'close'
+
         retries = urllib3.util.Retry(total=self.max_retries,
                                      connect=self.max_retries_on_connect,
                                      read=self.max_retries_on_read,
@@ -197,19 +261,25 @@ class HttpClient:
                                      raise_on_status=self.raise_on_status,
                                      respect_retry_after_header=self.respect_retry_after_header)
 
-        self.session.mount('http://', requests.adapters.HTTPAdapter(max_retries=retries))
-        self.session.mount('https://', requests.adapters.HTTPAdapter(max_retries=retries))
+        for prefix in ['http://', 'https://']:
+            adapter = requests.adapters.HTTPAdapter(pool_maxsize=self.pool_size,
+                                                    max_retries=retries)
+            self.session.mount(prefix, adapter)
 
     def _close_http_session(self):
-        """Close the http session."""
+        """Close the http session and its open connections."""
 
         if self.session:
-            self.session.keep_alive = False
+            self.session.close()
 
 
 class RateLimitHandler:
     """Class to handle rate limit for HTTP clients.
 
+    The handler can be shared by several threads. Checking and
+    updating the rate limit are serialized, so when the limit is
+    exhausted only one thread sleeps while the rest wait for it.
+
     :param sleep_for_rate: sleep until rate limit is reset
     :param min_rate_to_sleep: minimun rate needed to sleep until it will be rese
     :param rate_limit_header: header to know the current rate limit
@@ -234,6 +304,7 @@ class RateLimitHandler:
         """
         self.rate_limit = None
         self.rate_limit_reset_ts = None
+        self.rate_limit_lock = threading.RLock()
         self.sleep_for_rate = sleep_for_rate
         self.rate_limit_header = rate_limit_header
         self.rate_limit_reset_header = rate_limit_reset_header
@@ -251,19 +322,20 @@ class RateLimitHandler:
         """The fetching process sleeps until the rate limit is restored or
            raises a RateLimitError exception if sleep_for_rate flag is disabled.
         """
-        if self.rate_limit is not None and self.rate_limit <= self.min_rate_to_sleep:
-            seconds_to_reset = self.calculate_time_to_reset()
+        with self.rate_limit_lock:
+            if self.rate_limit is not None and self.rate_limit <= self.min_rate_to_sleep:
+                seconds_to_reset = self.calculate_time_to_reset()
 
-            if seconds_to_reset < 0:
-                logger.warning("Value of sleep for rate limit is negative, reset it to 0")
-                seconds_to_reset = 0
+                if seconds_to_reset < 0:
+                    logger.warning("Value of sleep for rate limit is negative, reset it to 0")
+                    seconds_to_reset = 0
 
-            cause = "Rate limit exhausted."
-            if self.sleep_for_rate:
-                logger.info("%s Waiting %i secs for rate limit reset.", cause, seconds_to_reset)
-                time.sleep(seconds_to_reset)
-            else:
-                raise RateLimitError(cause=cause, seconds_to_reset=seconds_to_reset)
+                cause = "Rate limit exhausted."
+                if self.sleep_for_rate:
+                    logger.info("%s Waiting %i secs for rate limit reset.", cause, seconds_to_reset)
+                    time.sleep(seconds_to_reset)
+                else:
+                    raise RateLimitError(cause=cause, seconds_to_reset=seconds_to_reset)
 
     def calculate_time_to_reset(self):
         """Calculate the seconds to reset the token requests."""
@@ -276,14 +348,383 @@ class RateLimitHandler:
 
         :param: response: the response object
         """
-        if self.rate_limit_header in response.headers:
-            self.rate_limit = int(response.headers[self.rate_limit_header])
-            logger.debug("Rate limit: %s", self.rate_limit)
+        with self.rate_limit_lock:
+            if self.rate_limit_header in response.headers:
+                self.rate_limit = int(response.headers[self.rate_limit_header])
+                logger.debug("Rate limit: %s", self.rate_limit)
+            else:
+                self.rate_limit = None
+
+            if self.rate_limit_reset_header in response.headers:
+                self.rate_limit_reset_ts = int(response.headers[self.rate_limit_reset_header])
+                logger.debug("Rate limit reset: %s", self.calculate_time_to_reset())
+            else:
+                self.rate_limit_reset_ts = None
+
+
+class Paginator:
+    """Base class to iterate over the pages of a resource.
+
+    Paginators fetch the pages of a resource using a `HttpClient`,
+    so the requests are retried, rate limited and archived as any
+    other request of that client. Iterating over a paginator returns
+    the response of each page. Sub-classes set how the request of
+    the next page is built overriding `next_page`.
+
+    When `prefetch` is greater than zero, the pages are fetched by
+    a thread while the previous ones are processed. At most,
+    `prefetch` pages are kept waiting to be returned. The requests
+    of the pages are the same, so the archives created with and
+    without prefetching are compatible.
+
+    :param client: `HttpClient` used to fetch the pages
+    :param url: URL of the first page
+    :param payload: parameters of the first page
+    :param headers: headers sent with every page
+    :param prefetch: number of pages fetched in advance
+    """
+    def __init__(self, client, url, payload=None, headers=None,
+                 prefetch=DEFAULT_PREFETCH_PAGES):
+        self.client = client
+        self.url = url
+        self.payload = payload
+        self.headers = headers
+        self.prefetch = prefetch
+
+    def __iter__(self):
+        pages = self._fetch_pages()
+
+        if self.prefetch > 0:
+            pages = read_ahead(pages, self.prefetch)
+
+        for response in pages:
+            yield response
+
+    def next_page(self, response, url, payload):
+        """Get the request of the page that follows a response.
+
+        :param response: response of the current page
+        :param url: URL of the current page
+        :param payload: parameters of the current page
+
+        :returns: a tuple with the URL and parameters of the next
+            page or `None` when there are no more pages
+        """
+        raise NotImplementedError
+
+    def _fetch_pages(self):
+        url, payload = self.url, self.payload
+
+        while True:
+            # Clients may sanitize the payload once it is sent
+            params = dict(payload) if payload else payload
+            response = self.client.fetch(url, payload=params, headers=self.headers)
+            yield response
+
+            next_page = self.next_page(response, url, payload)
+
+            if not next_page:
+                break
+
+            url, payload = next_page
+
+
+class LinkPaginator(Paginator):
+    """Paginator that follows the links to the next pages.
+
+    By default, the link is read from the `Link` header of the
+    responses. Use `next_url` to read it from somewhere else,
+    such as the body of the responses.
+
+    :param client: `HttpClient` used to fetch the pages
+    :param url: URL of the first page
+    :param payload: parameters of the first page
+    :param headers: headers sent with every page
+    :param prefetch: number of pages fetched in advance
+    :param next_url: function that returns the URL of the next page
+        of a response or `None` when it is the last one
+    :param keep_payload: send the parameters with every page; when
+        it is not set, they are only sent with the first page
+    """
+    def __init__(self, client, url, payload=None, headers=None,
+                 prefetch=DEFAULT_PREFETCH_PAGES, next_url=None, keep_payload=True):
+        super().__init__(client, url, payload=payload, headers=headers, prefetch=prefetch)
+        self.next_url = next_url or self.next_link
+        self.keep_payload = keep_payload
+
+    def next_page(self, response, url, payload):
+        url = self.next_url(response)
+
+        if not url:
+            return None
+
+        return url, payload if self.keep_payload else {}
+
+    @staticmethod
+    def next_link(response):
+        """Get the URL of the `next` link of the `Link` header"""
+
+        if 'next' not in response.links:
+            return None
+
+        return response.links['next']['url']
+
+
+class OffsetPaginator(Paginator):
+    """Paginator that moves an offset parameter over the pages.
+
+    The offset is increased by the number of items of each page or,
+    when `by_page` is set, by one, for those APIs that number their
+    pages. `page_info` returns, for a response, the number of items
+    of its page and whether there are more pages.
+
+    :param client: `HttpClient` used to fetch the pages
+    :param url: URL of the pages
+    :param payload: parameters of the first page, including the offset
+    :param offset_param: name of the offset parameter
+    :param page_info: function that returns a tuple with the number of
+        items of a response and whether there are more pages
+    :param headers: headers sent with every page
+    :param prefetch: number of pages fetched in advance
+    :param by_page: the offset is the number of the page
+    """
+    def __init__(self, client, url, payload, offset_param, page_info,
+                 headers=None, prefetch=DEFAULT_PREFETCH_PAGES, by_page=False):
+        super().__init__(client, url, payload=payload, headers=headers, prefetch=prefetch)
+        self.offset_param = offset_param
+        self.page_info = page_info
+        self.by_page = by_page
+
+    def next_page(self, response, url, payload):
+        nitems, more = self.page_info(response)
+
+        if not more or not nitems:
+            return None
+
+        payload = dict(payload)
+        payload[self.offset_param] += 1 if self.by_page else nitems
+
+        return url, payload
+
+
+class CursorPaginator(Paginator):
+    """Paginator that sends the cursor returned by each page.
+
+    :param client: `HttpClient` used to fetch the pages
+    :param url: URL of the pages
+    :param payload: parameters of the first page
+    :param cursor_param: name of the cursor parameter
+    :param next_cursor: function that returns the cursor of the next
+        page of a response or `None` when it is the last one
+    :param headers: headers sent with every page
+    :param prefetch: number of pages fetched in advance
+    """
+    def __init__(self, client, url, payload, cursor_param, next_cursor,
+                 headers=None, prefetch=DEFAULT_PREFETCH_PAGES):
+        super().__init__(client, url, payload=payload, headers=headers, prefetch=prefetch)
+        self.cursor_param = cursor_param
+        self.next_cursor = next_cursor
+
+    def next_page(self, response, url, payload):
+        cursor = self.next_cursor(response)
+
+        if cursor is None:
+            return None
+
+        payload = dict(payload) if payload else {}
+        payload[self.cursor_param] = cursor
+
+        return url, payload
+
+
+def fetch_concurrently(fetch, items, workers=DEFAULT_WORKERS):
+    """Fetch the data of a set of items using a pool of threads.
+
+    The function `fetch` is called for each item in a pool of
+    `workers` threads, so the requests needed by several items
+    are sent at the same time. `HttpClient`, `RateLimitHandler`
+    and `Archive` can be shared by these threads; requests are
+    retried, rate limited and archived as if they were sent one
+    after the other. Functions that cache the data they fetch must
+    avoid requesting the same resource twice at the same time,
+    because an archive cannot store duplicated requests.
+
+    The results are returned in the same order as the items. To
+    limit the memory used, at most twice the number of workers
+    items are fetched at the same time; the next item is not read
+    until the oldest one is returned. Errors are raised when the
+    result of their item should be returned. With a single worker,
+    `fetch` is called in the current thread.
+
+    :param fetch: function that returns the data of an item
+    :param items: iterable of items
+    :param workers: number of threads
+
+    :returns: a generator of the results of `fetch`
+    """
+    if workers <= 1:
+        for item in items:
+            yield fetch(item)
+        return
+
+    max_pending = 2 * workers
+    pending = collections.deque()
+
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+
+    try:
+        for item in items:
+            pending.append(executor.submit(fetch, item))
+
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+def read_concurrently(iterables, workers=DEFAULT_WORKERS, size=1):
+    """Read a set of iterables using a pool of threads.
+
+    Each iterable is read by one of the `workers` threads, so the
+    requests needed by several of them are sent at the same time.
+    The items are returned in the same order as the iterables, one
+    iterable after the other. At most, `size` items of each iterable
+    are kept waiting to be returned, so the memory used does not
+    depend on the length of the iterables. Errors are raised when
+    their position is reached. The threads stop when the generator
+    is closed. With a single worker, the iterables are read in the
+    current thread.
+
+    :param iterables: iterable of iterables
+    :param workers: number of threads
+    :param size: number of items of each iterable read in advance
+
+    :returns: a generator of the items
+    """
+    if workers <= 1:
+        for iterable in iterables:
+            for item in iterable:
+                yield item
+        return
+
+    stopped = threading.Event()
+    done = object()
+
+    def put(entries, entry):
+        while not stopped.is_set():
+            try:
+                entries.put(entry, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def produce(iterable, entries):
+        if stopped.is_set():
+            return
+
+        try:
+            for item in iterable:
+                put(entries, (item, None))
+                if stopped.is_set():
+                    return
+        except Exception as e:
+            put(entries, (None, e))
         else:
-            self.rate_limit = None
+            put(entries, (done, None))
+
+    iterables = iter(iterables)
+    pending = collections.deque()
+
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+
+    def submit_next():
+        iterable = next(iterables, None)
+
+        if iterable is None:
+            return
+
+        entries = queue.Queue(maxsize=size)
+        pending.append((executor.submit(produce, iterable, entries), entries))
+
+    try:
+        for _ in range(workers):
+            submit_next()
 
-        if self.rate_limit_reset_header in response.headers:
-            self.rate_limit_reset_ts = int(response.headers[self.rate_limit_reset_header])
-            logger.debug("Rate limit reset: %s", self.calculate_time_to_reset())
+        while pending:
+            _, entries = pending.popleft()
+            submit_next()
+
+            while True:
+                item, error = entries.get()
+
+                if error:
+                    raise error
+                if item is done:
+                    break
+
+                yield item
+    finally:
+        stopped.set()
+        for future, _ in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+def read_ahead(items, size):
+    """Read the items of an iterable in a thread.
+
+    The items are read by a thread while the previous ones are
+    processed. At most, `size` items are kept waiting to be
+    returned. Errors raised reading the items are raised when
+    their position is reached. The thread stops when the
+    generator is closed.
+
+    :param items: iterable of items
+    :param size: number of items read in advance
+
+    :returns: a generator of the items
+    """
+    entries = queue.Queue(maxsize=size)
+    stopped = threading.Event()
+    done = object()
+
+    def put(entry):
+        while not stopped.is_set():
+            try:
+                entries.put(entry, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def produce():
+        try:
+            for item in items:
+                put((item, None))
+                if stopped.is_set():
+                    return
+        except Exception as e:
+            put((None, e))
         else:
-            self.rate_limit_reset_ts = None
+            put((done, None))
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+
+    try:
+        while True:
+            item, error = entries.get()
+
+            if error:
+                raise error
+            if item is done:
+                break
+
+            yield item
+    finally:
+        stopped.set()
+        producer.join()
@@ -55,6 +55,12 @@ class BackendError(BaseError):
     message = "%(cause)s"
 
 
+class CacheError(BaseError):
+    """Generic error for cache objects"""
+
+    message = "%(cause)s"
+
+
 class HttpClientError(BaseError):
     """Generic error for HTTP Cient"""
 
@@ -0,0 +1,418 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2018 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Fifth Floor, Boston, MA 02110-1335, USA.
+#
+# Authors:
+#     Santiago Dueñas <sduenas@bitergia.com>
+#
+
+import json
+import logging
+import zlib
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+logger = logging.getLogger(__name__)
+
+JSON_FORMAT = 'json'
+JSON_LINES_FORMAT = 'jsonl'
+ARROW_FORMAT = 'arrow'
+PARQUET_FORMAT = 'parquet'
+
+GZIP_COMPRESSION = 'gzip'
+ZSTD_COMPRESSION = 'zstd'
+LZ4_COMPRESSION = 'lz4'
+COMPRESSIONS = [GZIP_COMPRESSION, ZSTD_COMPRESSION, LZ4_COMPRESSION]
+
+
+class OutputSink:
+    """Abstract class for writing the items generated by a backend.
+
+    Derived classes have to implement `write` method. Pending
+    data must be written when `close` method is called. Closing
+    a sink does not close the output file.
+
+    The compression algorithms supported by a sink are listed
+    in `COMPRESSIONS` attribute.
+
+    :param outfile: file object where the items will be written
+    :param compression: compress the output using this algorithm
+
+    :raises ValueError: when the compression is not supported
+    """
+    COMPRESSIONS = []
+
+    def __init__(self, outfile, compression=None):
+        if compression and compression not in self.COMPRESSIONS:
+            msg = "%s compression not supported by %s"
+            raise ValueError(msg % (compression, self.__class__.__name__))
+
+        self.outfile = outfile
+        self.compression = compression
+
+    def write(self, item):
+        raise NotImplementedError
+
+    def close(self):
+        self.outfile.flush()
+
+
+class JSONSink(OutputSink):
+    """Write items as indented JSON documents.
+
+    Items are separated by a new line. Keys are sorted.
+
+    :param outfile: file object where the items will be written
+    """
+    def write(self, item):
+        obj = json.dumps(item, indent=4, sort_keys=True)
+        self.outfile.write(obj)
+        self.outfile.write('\n')
+
+
+class JSONLinesSink(OutputSink):
+    """Write items in JSON Lines format.
+
+    Each item is written as a compact JSON document in a single line.
+    Items are encoded using `orjson` or `ujson` packages when they
+    are available. Encoded items are written in blocks of `buffer_size`
+    bytes, optionally compressed with `gzip` or `zstd`.
+
+    :param outfile: file object where the items will be written
+    :param compression: compress the output; either `gzip` or `zstd`
+    :param buffer_size: size of the blocks written to `outfile`
+
+    :raises ValueError: when the compression is not supported
+    """
+    BUFFER_SIZE = 1024 * 1024
+    COMPRESSIONS = [GZIP_COMPRESSION, ZSTD_COMPRESSION]
+
+    def __init__(self, outfile, compression=None, buffer_size=BUFFER_SIZE):
+        super().__init__(outfile, compression=compression)
+
+        self.buffer_size = buffer_size
+        self._buffer = []
+        self._buffer_len = 0
+
+        # Write bytes to the underlying binary stream when available
+        self._stream = getattr(outfile, 'buffer', None)
+
+        if compression and not self._stream:
+            raise ValueError("compressed output needs a binary stream")
+
+        # Text written so far must be sent before writing bytes
+        if self._stream:
+            self.outfile.flush()
+
+        self._compressor = self._create_compressor(compression)
+
+    def write(self, item):
+        line = encode_json_line(item)
+        self._buffer.append(line)
+        self._buffer_len += len(line)
+
+        if self._buffer_len >= self.buffer_size:
+            self._flush_buffer()
+
+    def close(self):
+        self._flush_buffer()
+
+        if self._compressor:
+            self._write_block(self._compressor.flush())
+
+        self.outfile.flush()
+
+        if self._stream:
+            self._stream.flush()
+
+    def _flush_buffer(self):
+        if not self._buffer:
+            return
+
+        data = b''.join(self._buffer)
+        self._buffer = []
+        self._buffer_len = 0
+
+        if self._compressor:
+            data = self._compressor.compress(data)
+
+        self._write_block(data)
+
+    def _write_block(self, data):
+        if self._stream:
+            self._stream.write(data)
+        else:
+            self.outfile.write(data.decode('utf-8'))
+
+    def _create_compressor(self, compression):
+        if compression == GZIP_COMPRESSION:
+            # wbits 31 generates gzip headers and trailer
+            return zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, 31)
+        elif compression == ZSTD_COMPRESSION:
+            if not zstandard:
+                raise ValueError("zstd compression needs 'zstandard' package")
+            return zstandard.ZstdCompressor().compressobj()
+        else:
+            return None
+
+
+class ArrowSink(OutputSink):
+    """Write items as Arrow record batches.
+
+    Items are written using the Arrow IPC streaming format. The common
+    metadata fields of the items are stored in typed columns while the
+    contents of `data` are stored as JSON documents in a string column.
+    `updated_on` and `timestamp` fields are stored as UTC timestamps.
+
+    Items are kept in memory until `batch_size` items are collected;
+    then, a new record batch is written. The sink needs `pyarrow`
+    package.
+
+    :param outfile: file object where the items will be written
+    :param compression: compress the batches; either `zstd` or `lz4`
+    :param batch_size: number of items written on each batch
+
+    :raises ValueError: when the compression is not supported or
+        `pyarrow` is not available
+    """
+    BATCH_SIZE = 10000
+    COMPRESSIONS = [ZSTD_COMPRESSION, LZ4_COMPRESSION]
+
+    METADATA_FIELDS = ['uuid', 'origin', 'updated_on', 'category', 'tag',
+                       'backend_name', 'backend_version', 'perceval_version',
+                       'timestamp']
+    TIMESTAMP_FIELDS = ['updated_on', 'timestamp']
+
+    def __init__(self, outfile, compression=None, batch_size=BATCH_SIZE):
+        super().__init__(outfile, compression=compression)
+
+        if not pyarrow:
+            raise ValueError("%s needs 'pyarrow' package" % self.__class__.__name__)
+
+        self.batch_size = batch_size
+        self.schema = self._create_schema()
+
+        # Write bytes to the underlying binary stream when available
+        self._stream = getattr(outfile, 'buffer', outfile)
+        self.outfile.flush()
+
+        self._columns = self._empty_columns()
+        self._nrows = 0
+        self._writer = None
+
+    def write(self, item):
+        for field in self.METADATA_FIELDS:
+            value = item[field]
+
+            # Timestamps are stored in microseconds
+            if field in self.TIMESTAMP_FIELDS:
+                value = int(value * 1000000)
+
+            self._columns[field].append(value)
+
+        self._columns['data'].append(encode_json_line(item['data'])[:-1].decode('utf-8'))
+        self._nrows += 1
+
+        if self._nrows >= self.batch_size:
+            self._write_batch()
+
+    def close(self):
+        self._write_batch()
+
+        if not self._writer:
+            self._writer = self._create_writer()
+
+        self._writer.close()
+        self._stream.flush()
+
+    def _write_batch(self):
+        if not self._nrows:
+            return
+
+        arrays = [pyarrow.array(self._columns[field.name], type=field.type)
+                  for field in self.schema]
+        batch = pyarrow.RecordBatch.from_arrays(arrays, schema=self.schema)
+
+        if not self._writer:
+            self._writer = self._create_writer()
+
+        self._write_record_batch(batch)
+
+        self._columns = self._empty_columns()
+        self._nrows = 0
+
+    def _create_writer(self):
+        options = pyarrow.ipc.IpcWriteOptions(compression=self.compression)
+        return pyarrow.ipc.new_stream(self._stream, self.schema, options=options)
+
+    def _write_record_batch(self, batch):
+        self._writer.write_batch(batch)
+
+    def _create_schema(self):
+        fields = []
+
+        for field in self.METADATA_FIELDS:
+            if field in self.TIMESTAMP_FIELDS:
+                field_type = pyarrow.timestamp('us', tz='UTC')
+            else:
+                field_type = pyarrow.string()
+            fields.append(pyarrow.field(field, field_type))
+
+        fields.append(pyarrow.field('data', pyarrow.string()))
+
+        return pyarrow.schema(fields)
+
+    def _empty_columns(self):
+        return {field.name: [] for field in self.schema}
+
+
+class ParquetSink(ArrowSink):
+    """Write items in Parquet format.
+
+    The columns are the same used by `ArrowSink`. Each batch of
+    `batch_size` items is written as a row group.
+
+    :param outfile: file object where the items will be written
+    :param compression: compress the columns; either `gzip` or `zstd`;
+        when it is not set, columns are compressed with `snappy`
+    :param batch_size: number of items written on each row group
+
+    :raises ValueError: when the compression is not supported or
+        `pyarrow` is not available
+    """
+    COMPRESSIONS = [GZIP_COMPRESSION, ZSTD_COMPRESSION]
+
+    def _create_writer(self):
+        compression = self.compression or 'snappy'
+        return pyarrow.parquet.ParquetWriter(self._stream, self.schema,
+                                             compression=compression)
+
+    def _write_record_batch(self, batch):
+        table = pyarrow.Table.from_batches([batch], schema=self.schema)
+        self._writer.write_table(table, row_group_size=self.batch_size)
+
+
+def encode_json_line(item):
+    """Encode an item as a compact JSON document.
+
+    The function uses the fastest encoder available: `orjson`,
+    `ujson` or the standard `json` module. When the item cannot be
+    encoded by the fast encoders (i.e. strings with surrogates or
+    big integers), the standard module is used instead.
+
+    :param item: item to encode
+
+    :returns: the UTF-8 document ended with a new line
+    """
+    if orjson:
+        try:
+            return orjson.dumps(item, option=orjson.OPT_APPEND_NEWLINE)
+        except TypeError:
+            pass
+    elif ujson:
+        try:
+            return (ujson.dumps(item, ensure_ascii=False) + '\n').encode('utf-8')
+        except (TypeError, OverflowError, UnicodeEncodeError):
+            pass
+
+    obj = json.dumps(item, separators=(',', ':'))
+    return (obj + '\n').encode('utf-8')
+
+
+OUTPUT_SINKS = {
+    JSON_FORMAT: JSONSink,
+    JSON_LINES_FORMAT: JSONLinesSink,
+    ARROW_FORMAT: ArrowSink,
+    PARQUET_FORMAT: ParquetSink
+}
+
+
+def register_output_sink(output_format, sink_class):
+    """Register a sink for an output format.
+
+    Registered formats are available in the output arguments
+    of the backend commands.
+
+    :param output_format: name of the format
+    :param sink_class: `OutputSink` class which writes the format
+    """
+    OUTPUT_SINKS[output_format] = sink_class
+
+
+def create_output_sink(output_format, outfile, compression=None):
+    """Create a sink for the given output format.
+
+    :param output_format: format of the output
+    :param outfile: file object where the items will be written
+    :param compression: compression of the output
+
+    :returns: an `OutputSink` object
+
+    :raises ValueError: when the format or the compression are not
+        supported
+    """
+    if output_format not in OUTPUT_SINKS:
+        raise ValueError("%s output format not supported" % output_format)
+
+    return OUTPUT_SINKS[output_format](outfile, compression=compression)
+
+
+def write_items(items, sink):
+    """Write a set of items to a sink.
+
+    The sink is closed once all the items were written, so
+    this function can be used together with `perceval.fetch`
+    to store the items in any of the available formats. The
+    sink is also closed when reading the items fails, so the
+    items written until then are not lost.
+
+    :param items: iterable of items
+    :param sink: `OutputSink` where the items will be written
+
+    :returns: number of items written
+    """
+    nitems = 0
+
+    try:
+        for item in items:
+            sink.write(item)
+            nitems += 1
+    finally:
+        sink.close()
+
+    return nitems
@@ -47,6 +47,13 @@ DEFAULT_DATETIME = datetime.datetime(1970, 1, 1, 0, 0, 0,
 DEFAULT_LAST_DATETIME = datetime.datetime(2100, 1, 1, 0, 0, 0,
                                           tzinfo=dateutil.tz.tzutc())
 
+ILLEGAL_XML_CHARS = [(0x00, 0x08), (0x0B, 0x1F),
+                     (0x7F, 0x84), (0x86, 0x9F)]
+ILLEGAL_XML_CHARS_RE = re.compile('[%s]' % ''.join(['%s-%s' % (chr(low), chr(high))
+                                                    for (low, high) in ILLEGAL_XML_CHARS
+                                                    if low < sys.maxunicode]))
+XML_CHUNK_SIZE = 64 * 1024
+
 
 def check_compressed_file_type(filepath):
     """Check if filename is a compressed file supported by the tool.
@@ -202,23 +209,7 @@ def remove_invalid_xml_chars(raw_xml):
 
     :returns: a purged XML stream
     """
-    illegal_unichrs = [(0x00, 0x08), (0x0B, 0x1F),
-                       (0x7F, 0x84), (0x86, 0x9F)]
-
-    illegal_ranges = ['%s-%s' % (chr(low), chr(high))
-                      for (low, high) in illegal_unichrs
-                      if low < sys.maxunicode]
-
-    illegal_xml_re = re.compile('[%s]' % ''.join(illegal_ranges))
-
-    purged_xml = ''
-
-    for c in raw_xml:
-        if illegal_xml_re.search(c) is not None:
-            c = ' '
-        purged_xml += c
-
-    return purged_xml
+    return ILLEGAL_XML_CHARS_RE.sub(' ', raw_xml)
 
 
 def xml_to_dict(raw_xml):
@@ -240,31 +231,82 @@ def xml_to_dict(raw_xml):
     :raises ParseError: raised when an error occurs parsing the given
         XML stream
     """
-    def node_to_dict(node):
-        d = {}
-        d.update(node.items())
+    purged_xml = remove_invalid_xml_chars(raw_xml)
 
-        text = getattr(node, 'text', None)
+    try:
+        tree = xml.etree.ElementTree.fromstring(purged_xml)
+    except xml.etree.ElementTree.ParseError as e:
+        cause = "XML stream %s" % (str(e))
+        raise ParseError(cause=cause)
+
+    d = _xml_node_to_dict(tree)
 
-        if text is not None:
-            d['__text__'] = text
+    return d
 
-        childs = {}
-        for child in node:
-            childs.setdefault(child.tag, []).append(node_to_dict(child))
 
-        d.update(childs.items())
+def xml_iter_dicts(raw_xml, tag):
+    """Convert the children of the root of a XML stream into dictionaries.
 
-        return d
+    The stream is parsed incrementally. Each child of the root node
+    named `tag` is converted into a dictionary, using the same format
+    than `xml_to_dict`, as soon as its closing tag is parsed. Once
+    converted, the node is removed from the tree so large streams
+    do not need to be kept in memory as a whole.
 
-    purged_xml = remove_invalid_xml_chars(raw_xml)
+    :param raw_xml: XML stream
+    :param tag: name of the nodes to convert
+
+    :returns: a generator of dicts with the data of the nodes
+
+    :raises ParseError: raised when an error occurs parsing the given
+        XML stream
+    """
+    parser = xml.etree.ElementTree.XMLPullParser(events=('start', 'end'))
+    root = None
+    depth = 0
+
+    for i in range(0, len(raw_xml), XML_CHUNK_SIZE):
+        chunk = remove_invalid_xml_chars(raw_xml[i:i + XML_CHUNK_SIZE])
+
+        try:
+            parser.feed(chunk)
+
+            for event, node in parser.read_events():
+                if event == 'start':
+                    if root is None:
+                        root = node
+                    depth += 1
+                    continue
+
+                depth -= 1
+
+                if depth == 1 and node.tag == tag:
+                    yield _xml_node_to_dict(node)
+                    root.remove(node)
+        except xml.etree.ElementTree.ParseError as e:
+            cause = "XML stream %s" % (str(e))
+            raise ParseError(cause=cause)
 
     try:
-        tree = xml.etree.ElementTree.fromstring(purged_xml)
+        parser.close()
     except xml.etree.ElementTree.ParseError as e:
         cause = "XML stream %s" % (str(e))
         raise ParseError(cause=cause)
 
-    d = node_to_dict(tree)
+
+def _xml_node_to_dict(node):
+    d = {}
+    d.update(node.items())
+
+    text = getattr(node, 'text', None)
+
+    if text is not None:
+        d['__text__'] = text
+
+    childs = {}
+    for child in node:
+        childs.setdefault(child.tag, []).append(_xml_node_to_dict(child))
+
+    d.update(childs.items())
 
     return d
@@ -105,7 +105,8 @@ setup(name="perceval",
           'grimoirelab-toolkit>=0.1.4'
       ],
       scripts=[
-          'bin/perceval'
+          'bin/perceval',
+          'bin/perceval-archive'
       ],
       cmdclass=cmdclass,
       zip_safe=False)
@@ -35,7 +35,12 @@ import requests
 
 from grimoirelab.toolkit.datetime import datetime_utcnow, datetime_to_utc
 
-from perceval.archive import Archive, ArchiveManager
+from perceval.archive import (Archive,
+                              ArchiveCatalog,
+                              ArchiveManager,
+                              ArchivedResponse,
+                              decode_archived_data,
+                              encode_archived_data)
 from perceval.errors import ArchiveError, ArchiveManagerError
 
 
@@ -48,6 +53,19 @@ def count_number_rows(db, table_name):
     return nrows
 
 
+def create_legacy_archive(archive_path):
+    """Create an archive using the first version of the format"""
+
+    Archive.create(archive_path)
+
+    conn = sqlite3.connect(archive_path)
+    conn.execute("PRAGMA user_version = 0")
+    conn.commit()
+    conn.close()
+
+    return Archive(archive_path)
+
+
 class TestArchive(unittest.TestCase):
     """Archive tests"""
 
@@ -74,6 +92,7 @@ class TestArchive(unittest.TestCase):
         self.assertEqual(archive.backend_version, None)
         self.assertEqual(archive.category, None)
         self.assertEqual(archive.backend_params, None)
+        self.assertEqual(archive.format_version, Archive.FORMAT_VERSION)
 
         # Tables are empty
         nrows = count_number_rows(archive_path, Archive.ARCHIVE_TABLE)
@@ -125,6 +144,29 @@ class TestArchive(unittest.TestCase):
         with self.assertRaisesRegex(ArchiveError, "invalid archive file"):
             _ = Archive(archive_path)
 
+    def test_init_legacy_archive(self):
+        """Test whether archives without format version are supported"""
+
+        archive_path = os.path.join(self.test_path, 'myarchive')
+        _ = create_legacy_archive(archive_path)
+
+        archive = Archive(archive_path)
+        self.assertEqual(archive.format_version, 1)
+
+    def test_init_not_supported_version(self):
+        """Test if an exception is raised when the format version is not supported"""
+
+        archive_path = os.path.join(self.test_path, 'myarchive')
+        Archive.create(archive_path)
+
+        conn = sqlite3.connect(archive_path)
+        conn.execute("PRAGMA user_version = 1000")
+        conn.commit()
+        conn.close()
+
+        with self.assertRaisesRegex(ArchiveError, "format version 1000 not supported"):
+            _ = Archive(archive_path)
+
     def test_init_metadata(self):
         """Test whether metadata information is properly initialized"""
 
@@ -189,7 +231,7 @@ class TestArchive(unittest.TestCase):
         ds = data_stored[0]
         dr = data_requests[0]
         self.assertEqual(ds[0], '0fa4ce047340780f08efca92f22027514263521d')
-        self.assertEqual(pickle.loads(ds[1]).url, responses[0].url)
+        self.assertEqual(decode_archived_data(ds[1]).url, responses[0].url)
         self.assertEqual(ds[2], dr[0])
         self.assertEqual(pickle.loads(ds[3]), dr[1])
         self.assertEqual(pickle.loads(ds[4]), dr[2])
@@ -197,7 +239,7 @@ class TestArchive(unittest.TestCase):
         ds = data_stored[1]
         dr = data_requests[1]
         self.assertEqual(ds[0], '3879a6f12828b7ac3a88b7167333e86168f2f5d2')
-        self.assertEqual(pickle.loads(ds[1]).url, responses[1].url)
+        self.assertEqual(decode_archived_data(ds[1]).url, responses[1].url)
         self.assertEqual(ds[2], dr[0])
         self.assertEqual(pickle.loads(ds[3]), dr[1])
         self.assertEqual(pickle.loads(ds[4]), dr[2])
@@ -205,11 +247,134 @@ class TestArchive(unittest.TestCase):
         ds = data_stored[2]
         dr = data_requests[2]
         self.assertEqual(ds[0], 'ef38f574a0745b63a056e7befdb7a06e7cf1549b')
-        self.assertEqual(pickle.loads(ds[1]).url, responses[2].url)
+        self.assertEqual(decode_archived_data(ds[1]).url, responses[2].url)
         self.assertEqual(ds[2], dr[0])
         self.assertEqual(pickle.loads(ds[3]), dr[1])
         self.assertEqual(pickle.loads(ds[4]), dr[2])
 
+    @httpretty.activate
+    def test_store_buffered(self):
+        """Test whether buffered data is committed in transactions"""
+
+        httpretty.register_uri(httpretty.GET,
+                               "https://example.com/tasks",
+                               body='{"task": "my task"}',
+                               status=200)
+
+        archive_path = os.path.join(self.test_path, 'myarchive')
+        archive = Archive.create(archive_path)
+        archive.set_buffered_writes(buffer_size=3, buffer_timeout=None)
+
+        self.assertEqual(archive.buffer_size, 3)
+        self.assertEqual(archive.buffer_timeout, None)
+
+        url = "https://example.com/tasks"
+        response = requests.get(url)
+
+        # Items are not visible until the buffer is full
+        archive.store(url, {'task_id': 1}, {}, response)
+        archive.store(url, {'task_id': 2}, {}, response)
+
+        nrows = count_number_rows(archive_path, Archive.ARCHIVE_TABLE)
+        self.assertEqual(nrows, 0)
+
+        # Pending items can be retrieved using the same archive
+        data = archive.retrieve(url, {'task_id': 2}, {})
+        self.assertEqual(data.url, response.url)
+
+        archive.store(url, {'task_id': 3}, {}, response)
+
+        nrows = count_number_rows(archive_path, Archive.ARCHIVE_TABLE)
+        self.assertEqual(nrows, 3)
+
+        # Pending items are written when flushing the buffer
+        archive.store(url, {'task_id': 4}, {}, response)
+
+        nrows = count_number_rows(archive_path, Archive.ARCHIVE_TABLE)
+        self.assertEqual(nrows, 3)
+
+        archive.flush()
+
+        nrows = count_number_rows(archive_path, Archive.ARCHIVE_TABLE)
+        self.assertEqual(nrows, 4)
+
+        # And when the archive is closed
+        archive.store(url, {'task_id': 5}, {}, response)
+        archive.close()
+
+        nrows = count_number_rows(archive_path, Archive.ARCHIVE_TABLE)
+        self.assertEqual(nrows, 5)
+
+    @httpretty.activate
+    @unittest.mock.patch('perceval.archive.time.time')
+    def test_store_buffered_timeout(self, mock_time):
+        """Test whether buffered data is committed when the timeout expires"""
+
+        mock_time.return_value = 1000
+
+        httpretty.register_uri(httpretty.GET,
+                               "https://example.com/tasks",
+                               body='{"task": "my task"}',
+                               status=200)
+
+        archive_path = os.path.join(self.test_path, 'myarchive')
+        archive = Archive.create(archive_path)
+        archive.set_buffered_writes(buffer_size=10, buffer_timeout=5)
+
+        url = "https://example.com/tasks"
+        response = requests.get(url)
+
+        archive.store(url, {'task_id': 1}, {}, response)
+
+        nrows = count_number_rows(archive_path, Archive.ARCHIVE_TABLE)
+        self.assertEqual(nrows, 0)
+
+        mock_time.return_value = 1005
+        archive.store(url, {'task_id': 2}, {}, response)
+
+        nrows = count_number_rows(archive_path, Archive.ARCHIVE_TABLE)
+        self.assertEqual(nrows, 2)
+
+    def test_set_buffered_writes(self):
+        """Test whether the database settings are updated"""
+
+        archive_path = os.path.join(self.test_path, 'myarchive')
+        archive = Archive.create(archive_path)
+        archive.set_buffered_writes(synchronous='off')
+
+        self.assertEqual(archive.buffer_size, Archive.DEFAULT_BUFFER_SIZE)
+        self.assertEqual(archive.buffer_timeout, Archive.DEFAULT_BUFFER_TIMEOUT)
+
+        cursor = archive._db.cursor()
+        cursor.execute("PRAGMA journal_mode")
+        self.assertEqual(cursor.fetchone()[0], 'wal')
+        cursor.execute("PRAGMA synchronous")
+        self.assertEqual(cursor.fetchone()[0], 0)
+        cursor.close()
+
+    def test_set_buffered_writes_invalid_params(self):
+        """Test whether an exception is raised with invalid settings"""
+
+        archive_path = os.path.join(self.test_path, 'myarchive')
+        archive = Archive.create(archive_path)
+
+        with self.assertRaisesRegex(ArchiveError, "buffer size must be greater than 0"):
+            archive.set_buffered_writes(buffer_size=0)
+
+        with self.assertRaisesRegex(ArchiveError, "invalid synchronous flag"):
+            archive.set_buffered_writes(synchronous='sometimes')
+
+        with self.assertRaisesRegex(ArchiveError, "invalid journal mode"):
+            archive.set_buffered_writes(journal_mode='WAL; DROP TABLE archive')
+
+        # Valid modes are case insensitive
+        archive.set_buffered_writes(journal_mode='truncate')
+
+        cursor = archive._db.cursor()
+        cursor.execute("PRAGMA journal_mode")
+        self.assertEqual(cursor.fetchone()[0], 'truncate')
+        cursor.close()
+
     @httpretty.activate
     def test_store_duplicate(self):
         """Test whether the insertion of duplicated data throws an error"""
@@ -255,6 +420,97 @@ class TestArchive(unittest.TestCase):
 
         self.assertEqual(data.url, response.url)
 
+    @httpretty.activate
+    def test_retrieve_legacy_archive(self):
+        """Test whether data is properly stored and retrieved using the first format"""
+
+        url = "https://example.com/tasks"
+        payload = {'task_id': 10}
+        headers = {'Accept': 'application/json'}
+
+        httpretty.register_uri(httpretty.GET,
+                               url,
+                               body='{"hey": "there"}',
+                               status=200)
+        response = requests.get(url, params=payload, headers=headers)
+
+        archive_path = os.path.join(self.test_path, 'myarchive')
+        archive = create_legacy_archive(archive_path)
+        archive.store(url, payload, headers, response)
+
+        db = sqlite3.connect(archive.archive_path)
+        cursor = db.cursor()
+        cursor.execute("SELECT data FROM archive")
+        ds = cursor.fetchone()
+        cursor.close()
+
+        self.assertIsInstance(pickle.loads(ds[0]), requests.Response)
+
+        data = archive.retrieve(url, payload, headers)
+        self.assertEqual(data.url, response.url)
+        self.assertEqual(data.json(), {"hey": "there"})
+
+    def test_retrieve_prefetching(self):
+        """Test whether data is retrieved from prefetched entries"""
+
+        archive_path = os.path.join(self.test_path, 'myarchive')
+        archive = Archive.create(archive_path)
+
+        for x in range(25):
+            archive.store(str(x), None, None, {'item': x})
+
+        archive.start_prefetching(batch_size=4, max_batches=2)
+
+        with unittest.mock.patch.object(archive, '_db', wraps=archive._db) as mock_db:
+            for x in range(25):
+                data = archive.retrieve(str(x), None, None)
+                self.assertDictEqual(data, {'item': x})
+
+            # All the entries were read by the prefetcher
+            mock_db.cursor.assert_not_called()
+
+        archive.stop_prefetching()
+
+    def test_retrieve_prefetching_miss(self):
+        """Test whether entries out of order are retrieved from the archive"""
+
+        archive_path = os.path.join(self.test_path, 'myarchive')
+        archive = Archive.create(archive_path)
+
+        for x in range(25):
+            archive.store(str(x), None, None, {'item': x})
+
+        archive.start_prefetching(batch_size=4, max_batches=2)
+
+        # Entry beyond the read-ahead window
+        data = archive.retrieve('20', None, None)
+        self.assertDictEqual(data, {'item': 20})
+
+        # Memory is bounded to the read-ahead window
+        self.assertLessEqual(len(archive._prefetched), 8)
+
+        # Entries discarded from memory are still available
+        for x in range(25):
+            data = archive.retrieve(str(x), None, None)
+            self.assertDictEqual(data, {'item': x})
+
+        with self.assertRaisesRegex(ArchiveError, "not found in archive"):
+            _ = archive.retrieve("http://wrong", payload={}, headers={})
+
+        archive.close()
+
+    def test_start_prefetching_invalid_params(self):
+        """Test whether an exception is raised with invalid prefetching settings"""
+
+        archive_path = os.path.join(self.test_path, 'myarchive')
+        archive = Archive.create(archive_path)
+
+        with self.assertRaisesRegex(ArchiveError, "must be greater than 0"):
+            archive.start_prefetching(batch_size=0)
+
+        with self.assertRaisesRegex(ArchiveError, "must be greater than 0"):
+            archive.start_prefetching(max_batches=0)
+
     def test_retrieve_missing(self):
         """Test whether the retrieval of non archived data throws an error
 
@@ -268,6 +524,135 @@ class TestArchive(unittest.TestCase):
         with self.assertRaisesRegex(ArchiveError, "not found in archive"):
             _ = archive.retrieve("http://wrong", payload={}, headers={})
 
+    @httpretty.activate
+    def test_migrate(self):
+        """Test whether an archive is converted to the current format"""
+
+        url = "https://example.com/tasks"
+        headers = {'Accept': 'application/json'}
+
+        httpretty.register_uri(httpretty.GET,
+                               url,
+                               body='{"hey": "there"}',
+                               status=200)
+
+        archive_path = os.path.join(self.test_path, 'myarchive')
+        archive = create_legacy_archive(archive_path)
+        archive.init_metadata('marvel.com', 'marvel-comics-backend', '0.1.0',
+                              'issue', {'category': 'issue'})
+
+        for task_id in range(3):
+            response = requests.get(url, params={'task_id': task_id}, headers=headers)
+            archive.store(url, {'task_id': task_id}, headers, response)
+        archive.store('error', None, None, ValueError('invalid task'))
+        archive.close()
+
+        archive = Archive.migrate(archive_path)
+
+        self.assertEqual(archive.format_version, Archive.FORMAT_VERSION)
+        self.assertEqual(archive.origin, 'marvel.com')
+        self.assertEqual(archive.backend_name, 'marvel-comics-backend')
+        self.assertEqual(archive.backend_version, '0.1.0')
+        self.assertEqual(archive.category, 'issue')
+        self.assertDictEqual(archive.backend_params, {'category': 'issue'})
+        self.assertEqual(os.path.exists(archive_path + '.migration'), False)
+
+        nrows = count_number_rows(archive_path, Archive.ARCHIVE_TABLE)
+        self.assertEqual(nrows, 4)
+
+        for task_id in range(3):
+            data = archive.retrieve(url, {'task_id': task_id}, headers)
+            self.assertIsInstance(data, ArchivedResponse)
+            self.assertEqual(data.json(), {"hey": "there"})
+
+        data = archive.retrieve('error', None, None)
+        self.assertIsInstance(data, ValueError)
+
+        # Migrating again does not modify the archive
+        archive = Archive.migrate(archive_path)
+        self.assertEqual(archive.format_version, Archive.FORMAT_VERSION)
+
+        nrows = count_number_rows(archive_path, Archive.ARCHIVE_TABLE)
+        self.assertEqual(nrows, 4)
+
+
+class TestArchivedData(unittest.TestCase):
+    """Tests for the functions which encode and decode archived data"""
+
+    @httpretty.activate
+    def test_response(self):
+        """Test whether responses are encoded and decoded"""
+
+        httpretty.register_uri(httpretty.GET,
+                               "https://example.com/tasks",
+                               body='{"task": "my task"}',
+                               adding_headers={'Link': '<https://example.com/tasks?page=2>; rel="next"'},
+                               status=200)
+        response = requests.get("https://example.com/tasks")
+
+        data = encode_archived_data(response)
+        self.assertLess(len(data), len(pickle.dumps(response, 0)))
+
+        decoded = decode_archived_data(data)
+        self.assertIsInstance(decoded, ArchivedResponse)
+        self.assertEqual(decoded.status_code, 200)
+        self.assertEqual(decoded.url, response.url)
+        self.assertEqual(decoded.encoding, response.encoding)
+        self.assertEqual(decoded.headers['link'], response.headers['Link'])
+        self.assertEqual(decoded.links, response.links)
+
+        # Body is not decompressed until it is needed
+        self.assertEqual(decoded._content, False)
+        self.assertEqual(decoded.text, '{"task": "my task"}')
+        self.assertEqual(decoded.json(), {"task": "my task"})
+        self.assertEqual(b''.join(decoded.iter_content(4)), b'{"task": "my task"}')
+
+    @httpretty.activate
+    def test_http_error(self):
+        """Test whether HTTP errors are encoded and decoded"""
+
+        httpretty.register_uri(httpretty.GET,
+                               "https://example.com/tasks",
+                               body="Not found",
+                               status=404)
+        response = requests.get("https://example.com/tasks")
+
+        try:
+            response.raise_for_status()
+        except requests.exceptions.HTTPError as e:
+            error = e
+
+        decoded = decode_archived_data(encode_archived_data(error))
+        self.assertIsInstance(decoded, requests.exceptions.HTTPError)
+        self.assertEqual(str(decoded), str(error))
+        self.assertEqual(decoded.response.status_code, 404)
+        self.assertEqual(decoded.response.text, "Not found")
+
+    def test_object(self):
+        """Test whether other objects are encoded and decoded"""
+
+        obj = {'data': [1, 2, 3], 'error': ValueError('error')}
+
+        decoded = decode_archived_data(encode_archived_data(obj))
+        self.assertEqual(decoded['data'], [1, 2, 3])
+        self.assertIsInstance(decoded['error'], ValueError)
+
+    def test_invalid_codec(self):
+        """Test if an exception is raised when the codec is not supported"""
+
+        with self.assertRaisesRegex(ArchiveError, "codec lzma not supported"):
+            encode_archived_data({}, codec='lzma')
+
+        with self.assertRaisesRegex(ArchiveError, "unknown codec"):
+            decode_archived_data(b'Px0000')
+
+    @unittest.mock.patch('perceval.archive.zstandard', None)
+    def test_zstd_not_available(self):
+        """Test if an exception is raised when zstd is not available"""
+
+        with self.assertRaisesRegex(ArchiveError, "zstd codec needs 'zstandard' package"):
+            encode_archived_data({}, codec='zstd')
+
 
 ARCHIVE_TEST_DIR = 'archivedir'
 
@@ -353,6 +738,22 @@ class TestArchiveManager(unittest.TestCase):
         manager.remove_archive(archive.archive_path)
         self.assertEqual(os.path.exists(archive.archive_path), False)
 
+    def test_remove_archive_wal(self):
+        """Test if journal files of an archive are removed too"""
+
+        archive_mng_path = os.path.join(self.test_path, ARCHIVE_TEST_DIR)
+        manager = ArchiveManager(archive_mng_path)
+
+        archive = manager.create_archive()
+        archive.set_buffered_writes()
+        archive.init_metadata('https://example.com', 'git', '0.8', 'commit', {})
+        self.assertEqual(os.path.exists(archive.archive_path + '-wal'), True)
+
+        manager.remove_archive(archive.archive_path)
+        self.assertEqual(os.path.exists(archive.archive_path), False)
+        self.assertEqual(os.path.exists(archive.archive_path + '-wal'), False)
+        self.assertEqual(os.path.exists(archive.archive_path + '-shm'), False)
+
     def test_remove_archive_not_found(self):
         """Test if an exception is raised when the archive is not found"""
 
@@ -362,6 +763,157 @@ class TestArchiveManager(unittest.TestCase):
         with self.assertRaisesRegex(ArchiveManagerError, 'archive mockarchive does not exist'):
             manager.remove_archive('mockarchive')
 
+    def test_migrate_archives(self):
+        """Test if the archives are converted to the current format"""
+
+        archive_mng_path = os.path.join(self.test_path, ARCHIVE_TEST_DIR)
+        manager = ArchiveManager(archive_mng_path)
+
+        archive = manager.create_archive()
+        archive.init_metadata('https://example.com', 'git', '0.8', 'commit', {})
+        current_path = archive.archive_path
+
+        archive = manager.create_archive()
+        legacy_path = archive.archive_path
+        os.remove(legacy_path)
+        archive = create_legacy_archive(legacy_path)
+        archive.init_metadata('https://example.com', 'git', '0.8', 'commit', {})
+        archive.store('https://example.com', {}, {}, {'commit': 'abcdef'})
+        archive.close()
+
+        migrated = manager.migrate_archives()
+        self.assertListEqual(migrated, [legacy_path])
+
+        archive = Archive(legacy_path)
+        self.assertEqual(archive.format_version, Archive.FORMAT_VERSION)
+        self.assertEqual(archive.retrieve('https://example.com', {}, {}),
+                         {'commit': 'abcdef'})
+
+        archive = Archive(current_path)
+        self.assertEqual(archive.format_version, Archive.FORMAT_VERSION)
+
+    def test_catalog(self):
+        """Test if the catalog is updated when archives are created and removed"""
+
+        archive_mng_path = os.path.join(self.test_path, ARCHIVE_TEST_DIR)
+        manager = ArchiveManager(archive_mng_path)
+
+        catalog_path = os.path.join(archive_mng_path, ArchiveCatalog.CATALOG_NAME)
+        self.assertEqual(os.path.exists(catalog_path), True)
+
+        archive = manager.create_archive()
+        self.assertEqual(archive.catalog, manager.catalog)
+
+        nrows = count_number_rows(catalog_path, ArchiveCatalog.CATALOG_TABLE)
+        self.assertEqual(nrows, 1)
+
+        archive.init_metadata('https://example.com', 'git', '0.8', 'commit', {})
+
+        conn = sqlite3.connect(catalog_path)
+        cursor = conn.cursor()
+        cursor.execute("SELECT archive_path, origin, backend_name, category, created_on FROM catalog")
+        row = cursor.fetchone()
+        cursor.close()
+        conn.close()
+
+        self.assertEqual(row[0], os.path.relpath(archive.archive_path, archive_mng_path))
+        self.assertEqual(row[1], 'https://example.com')
+        self.assertEqual(row[2], 'git')
+        self.assertEqual(row[3], 'commit')
+        self.assertEqual(row[4], archive.created_on.timestamp())
+
+        manager.remove_archive(archive.archive_path)
+
+        nrows = count_number_rows(catalog_path, ArchiveCatalog.CATALOG_TABLE)
+        self.assertEqual(nrows, 0)
+
+    def test_rebuild_catalog(self):
+        """Test if the catalog is built from the archive files"""
+
+        archive_mng_path = os.path.join(self.test_path, ARCHIVE_TEST_DIR)
+        manager = ArchiveManager(archive_mng_path)
+
+        dt = datetime_utcnow()
+
+        archive_a = manager.create_archive()
+        archive_a.init_metadata('https://example.com', 'git', '0.8', 'commit', {})
+        archive_b = manager.create_archive()
+        archive_b.init_metadata('https://example.com', 'git', '0.8', 'commit', {})
+
+        # Invalid files are not registered
+        with open(os.path.join(archive_mng_path, 'invalid.sqlite3'), 'w') as fd:
+            fd.write("Invalid archive file")
+
+        # Remove the catalog; the new manager will build it again
+        catalog_path = os.path.join(archive_mng_path, ArchiveCatalog.CATALOG_NAME)
+        del manager
+        os.remove(catalog_path)
+
+        manager = ArchiveManager(archive_mng_path)
+
+        nrows = count_number_rows(catalog_path, ArchiveCatalog.CATALOG_TABLE)
+        self.assertEqual(nrows, 2)
+
+        archives = manager.search('https://example.com', 'git', 'commit', dt)
+        self.assertListEqual(archives, [archive_a.archive_path, archive_b.archive_path])
+
+        # Archives created without the manager are registered when
+        # the catalog is rebuilt
+        archive_path = os.path.join(archive_mng_path, 'custom', 'myarchive.sqlite3')
+        os.makedirs(os.path.dirname(archive_path))
+        archive_c = Archive.create(archive_path)
+        archive_c.init_metadata('https://example.com', 'git', '0.8', 'commit', {})
+
+        archives = manager.search('https://example.com', 'git', 'commit', dt)
+        self.assertListEqual(archives, [archive_a.archive_path, archive_b.archive_path])
+
+        narchives = manager.rebuild_catalog()
+        self.assertEqual(narchives, 3)
+
+        archives = manager.search('https://example.com', 'git', 'commit', dt)
+        self.assertListEqual(archives, [archive_a.archive_path, archive_b.archive_path,
+                                        archive_c.archive_path])
+
+    def test_search_removed_archive(self):
+        """Test if archives removed without the manager are not returned"""
+
+        archive_mng_path = os.path.join(self.test_path, ARCHIVE_TEST_DIR)
+        manager = ArchiveManager(archive_mng_path)
+
+        dt = datetime_utcnow()
+
+        archive_a = manager.create_archive()
+        archive_a.init_metadata('https://example.com', 'git', '0.8', 'commit', {})
+        archive_b = manager.create_archive()
+        archive_b.init_metadata('https://example.com', 'git', '0.8', 'commit', {})
+
+        os.remove(archive_a.archive_path)
+
+        archives = manager.search('https://example.com', 'git', 'commit', dt)
+        self.assertListEqual(archives, [archive_b.archive_path])
+
+        catalog_path = os.path.join(archive_mng_path, ArchiveCatalog.CATALOG_NAME)
+        nrows = count_number_rows(catalog_path, ArchiveCatalog.CATALOG_TABLE)
+        self.assertEqual(nrows, 1)
+
+    def test_search_removed_archive_error(self):
+        """Test if an exception is raised when a removed archive cannot be removed from the catalog"""
+
+        archive_mng_path = os.path.join(self.test_path, ARCHIVE_TEST_DIR)
+        manager = ArchiveManager(archive_mng_path)
+
+        dt = datetime_utcnow()
+
+        archive = manager.create_archive()
+        archive.init_metadata('https://example.com', 'git', '0.8', 'commit', {})
+
+        os.remove(archive.archive_path)
+
+        with unittest.mock.patch.object(manager.catalog, 'remove',
+                                        side_effect=ArchiveError(cause="database is locked")):
+            with self.assertRaisesRegex(ArchiveManagerError, "database is locked"):
+                _ = manager.search('https://example.com', 'git', 'commit', dt)
+
     def test_search(self):
         """Test if a set of archives is found based on the given criteria"""
 
@@ -22,6 +22,7 @@
 #
 
 import argparse
+import concurrent.futures
 import datetime
 import io
 import json
@@ -34,6 +35,12 @@ import unittest.mock
 
 import dateutil.tz
 
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
 from grimoirelab.toolkit.datetime import (InvalidDateError,
                                           datetime_utcnow,
                                           str_to_datetime)
@@ -46,6 +53,7 @@ from perceval.backend import (Backend,
                               uuid,
                               fetch,
                               fetch_from_archive)
+from perceval.client import HttpClient
 from perceval.errors import ArchiveError, BackendError
 from perceval.utils import DEFAULT_DATETIME
 from base import TestCaseBackendArchive
@@ -94,6 +102,14 @@ class MockedBackend(Backend):
         return MockedBackend.CATEGORY
 
 
+class HttpClientBackend(MockedBackend):
+    """Mocked backend that uses a HTTP client"""
+
+    def _init_client(self, from_archive=False):
+        super()._init_client(from_archive=from_archive)
+        return HttpClient('http://example.com')
+
+
 class CommandBackend(MockedBackend):
     """Backend used for testing in BackendCommand tests"""
 
@@ -113,6 +129,30 @@ class ErrorCommandBackend(CommandBackend):
             raise BackendError(cause="Unhandled exception")
 
 
+class ShiftedCommandBackend(CommandBackend):
+    """Backend which generates items updated on shifted dates"""
+
+    SHIFT = 0
+
+    def fetch_items(self, category, **kwargs):
+        for x in range(MockedBackend.ITEMS):
+            if self._fetch_from_archive:
+                item = self.archive.retrieve(str(x), None, None)
+            else:
+                item = {'item': x, 'updated': x * 10 + self.SHIFT}
+                if self.archive:
+                    self.archive.store(str(x), None, None, item)
+            yield item
+
+    @staticmethod
+    def metadata_id(item):
+        return str(item['updated'])
+
+    @staticmethod
+    def metadata_updated_on(item):
+        return item['updated']
+
+
 class MockedBackendCommand(BackendCommand):
     """Mocked backend command class used for testing"""
 
@@ -275,6 +315,51 @@ class TestBackend(unittest.TestCase):
         self.assertEqual(b.archive.origin, b.origin)
         self.assertEqual(b.archive.category, MockedBackend.CATEGORY)
 
+    def test_fetch_archive_buffered(self):
+        """Test whether archived data is written when the fetch process ends"""
+
+        archive_path = os.path.join(self.test_path, 'myarchive')
+        archive = Archive.create(archive_path)
+        b = MockedBackend('test', archive=archive)
+
+        items = b.fetch()
+        _ = next(items)
+
+        self.assertEqual(archive.buffer_size, Archive.DEFAULT_BUFFER_SIZE)
+
+        # Consume the remaining items
+        _ = [item for item in items]
+
+        # Data is visible from other connections
+        alt_archive = Archive(archive_path)
+        for x in range(MockedBackend.ITEMS):
+            item = alt_archive.retrieve(str(x), None, None)
+            self.assertDictEqual(item, {'item': x})
+
+    def test_fetch_archive_buffered_error(self):
+        """Test whether archived data is written when the fetch process fails"""
+
+        archive_path = os.path.join(self.test_path, 'myarchive')
+        archive = Archive.create(archive_path)
+        b = ErrorCommandBackend('test', archive=archive)
+
+        with self.assertRaises(BackendError):
+            _ = [item for item in b.fetch()]
+
+        alt_archive = Archive(archive_path)
+        item = alt_archive.retrieve('0', None, None)
+        self.assertDictEqual(item, {'item': 0})
+
+    def test_fetch_connection_stats(self):
+        """Test whether the HTTP connections stats are logged when the fetch process ends"""
+
+        b = HttpClientBackend('test')
+
+        with self.assertLogs('perceval.backend', level='INFO') as cm:
+            _ = [item for item in b.fetch()]
+
+        self.assertIn('INFO:perceval.backend:HTTP connections: 0 new, 0 reused', cm.output)
+
     def test_fetch_wrong_category(self):
         """Check that an error is thrown if the category is not valid"""
 
@@ -362,6 +447,42 @@ class TestBackendCommandArgumentParser(unittest.TestCase):
         self.assertIsInstance(parsed_args, argparse.Namespace)
         self.assertEqual(parsed_args.tag, 'test')
 
+    def test_parse_output_args(self):
+        """Test if output arguments are parsed"""
+
+        parser = BackendCommandArgumentParser()
+
+        parsed_args = parser.parse()
+        self.assertEqual(parsed_args.output_format, 'json')
+        self.assertEqual(parsed_args.output_compression, None)
+
+        args = ['--output-format', 'jsonl', '--output-compression', 'gzip']
+        parsed_args = parser.parse(*args)
+        self.assertEqual(parsed_args.output_format, 'jsonl')
+        self.assertEqual(parsed_args.output_compression, 'gzip')
+
+        args = ['--output-format', 'parquet', '--output-compression', 'zstd']
+        parsed_args = parser.parse(*args)
+        self.assertEqual(parsed_args.output_format, 'parquet')
+        self.assertEqual(parsed_args.output_compression, 'zstd')
+
+        args = ['--output-compression', 'gzip']
+        with self.assertRaises(AttributeError):
+            _ = parser.parse(*args)
+
+        args = ['--output-format', 'arrow', '--output-compression', 'lz4']
+        parsed_args = parser.parse(*args)
+        self.assertEqual(parsed_args.output_format, 'arrow')
+        self.assertEqual(parsed_args.output_compression, 'lz4')
+
+        args = ['--output-format', 'arrow', '--output-compression', 'gzip']
+        with self.assertRaises(AttributeError):
+            _ = parser.parse(*args)
+
+        args = ['--output-format', 'jsonl', '--output-compression', 'lz4']
+        with self.assertRaises(AttributeError):
+            _ = parser.parse(*args)
+
     def test_parse_with_aliases(self):
         """Test if a set of aliases is created after parsing"""
 
@@ -505,6 +626,65 @@ class TestBackendCommandArgumentParser(unittest.TestCase):
         self.assertEqual(parsed_args.fetch_archive, True)
         self.assertEqual(parsed_args.no_archive, False)
         self.assertEqual(parsed_args.archived_since, expected_dt)
+        self.assertEqual(parsed_args.archive_workers, 1)
+        self.assertEqual(parsed_args.archive_order, 'archive')
+
+    def test_parse_archive_workers_args(self):
+        """Test if parallel archive arguments are parsed"""
+
+        args = ['--fetch-archive',
+                '--archive-workers', '4',
+                '--archive-order', 'updated_on',
+                '--category', 'mocked']
+
+        parser = BackendCommandArgumentParser(archive=True)
+        parsed_args = parser.parse(*args)
+
+        self.assertEqual(parsed_args.archive_workers, 4)
+        self.assertEqual(parsed_args.archive_order, 'updated_on')
+
+        args = ['--fetch-archive', '--archive-workers', '0',
+                '--category', 'mocked']
+
+        with self.assertRaises(AttributeError):
+            _ = parser.parse(*args)
+
+    def test_parse_pagination_args(self):
+        """Test if pagination arguments are parsed"""
+
+        parser = BackendCommandArgumentParser(pagination=True)
+        parsed_args = parser.parse()
+        self.assertEqual(parsed_args.prefetch_pages, 0)
+
+        parsed_args = parser.parse('--prefetch-pages', '2')
+        self.assertEqual(parsed_args.prefetch_pages, 2)
+
+        with self.assertRaises(AttributeError):
+            _ = parser.parse('--prefetch-pages', '-1')
+
+        parser = BackendCommandArgumentParser()
+        parsed_args = parser.parse()
+        self.assertNotIn('prefetch_pages', parsed_args)
+
+    def test_parse_connection_args(self):
+        """Test if HTTP connection arguments are parsed"""
+
+        parser = BackendCommandArgumentParser(connection=True)
+        parsed_args = parser.parse()
+        self.assertEqual(parsed_args.pool_size, 10)
+        self.assertEqual(parsed_args.keep_alive, True)
+
+        parsed_args = parser.parse('--pool-size', '20', '--no-keep-alive')
+        self.assertEqual(parsed_args.pool_size, 20)
+        self.assertEqual(parsed_args.keep_alive, False)
+
+        with self.assertRaises(AttributeError):
+            _ = parser.parse('--pool-size', '0')
+
+        parser = BackendCommandArgumentParser()
+        parsed_args = parser.parse()
+        self.assertNotIn('pool_size', parsed_args)
+        self.assertNotIn('keep_alive', parsed_args)
 
     def test_incompatible_fetch_archive_and_no_archive(self):
         """Test if fetch-archive and no-archive arguments are incompatible"""
@@ -676,6 +856,57 @@ class TestBackendCommand(unittest.TestCase):
             self.assertEqual(item['uuid'], expected_uuid)
             self.assertEqual(item['tag'], 'test')
 
+    def test_run_json_lines(self):
+        """Test whether the command writes items in JSON Lines format"""
+
+        args = ['--no-archive', '--from-date', '2015-01-01', '--tag', 'test',
+                '--output-format', 'jsonl',
+                '--output', self.fout_path, 'http://example.com/']
+
+        cmd = MockedBackendCommand(*args)
+        cmd.run()
+        cmd.outfile.close()
+
+        with open(self.fout_path) as fd:
+            items = [json.loads(line) for line in fd]
+
+        self.assertEqual(len(items), 5)
+
+        for x in range(5):
+            item = items[x]
+            expected_uuid = uuid('http://example.com/', str(x))
+
+            self.assertEqual(item['data']['item'], x)
+            self.assertEqual(item['uuid'], expected_uuid)
+            self.assertEqual(item['tag'], 'test')
+
+    @unittest.skipIf(not pyarrow, "pyarrow not installed")
+    @unittest.mock.patch.object(MockedBackendCommand, 'BACKEND', ShiftedCommandBackend)
+    def test_run_parquet(self):
+        """Test whether the command writes items in Parquet format"""
+
+        args = ['--no-archive', '--from-date', '2015-01-01', '--tag', 'test',
+                '--output-format', 'parquet',
+                '--output', self.fout_path, 'http://example.com/']
+
+        cmd = MockedBackendCommand(*args)
+        cmd.run()
+        cmd.outfile.close()
+
+        table = pyarrow.parquet.read_table(self.fout_path)
+        self.assertEqual(table.num_rows, 5)
+
+        items = table.to_pylist()
+
+        for x in range(5):
+            item = items[x]
+            expected_uuid = uuid('http://example.com/', str(x * 10))
+
+            self.assertEqual(json.loads(item['data'])['item'], x)
+            self.assertEqual(item['uuid'], expected_uuid)
+            self.assertEqual(item['updated_on'].timestamp(), x * 10)
+            self.assertEqual(item['tag'], 'test')
+
     def test_run_fetch_from_archive(self):
         """Test whether the command runs when fetch from archive is set"""
 
@@ -718,6 +949,36 @@ class TestBackendCommand(unittest.TestCase):
             self.assertEqual(item['uuid'], expected_uuid)
             self.assertEqual(item['tag'], 'test')
 
+    def test_run_fetch_from_archive_parallel(self):
+        """Test whether the command fetches items from several archives in parallel"""
+
+        args = ['--archive-path', self.test_path,
+                '--from-date', '2015-01-01', '--tag', 'test',
+                '--category', 'mock_item',
+                '--output', self.fout_path, 'http://example.com/']
+
+        for _ in range(2):
+            cmd = MockedBackendCommand(*args)
+            cmd.run()
+            cmd.outfile.close()
+
+        args = ['--archive-path', self.test_path, '--fetch-archive',
+                '--archive-workers', '2',
+                '--from-date', '2015-01-01', '--tag', 'test', '--category', 'mock_item',
+                '--output', self.fout_path, 'http://example.com/']
+
+        cmd = MockedBackendCommand(*args)
+        cmd.run()
+        cmd.outfile.close()
+
+        items = [item for item in convert_cmd_output_to_json(self.fout_path)]
+        self.assertEqual(len(items), 10)
+
+        for x in range(10):
+            item = items[x]
+            self.assertEqual(item['data']['item'], x % 5)
+            self.assertEqual(item['data']['archive'], True)
+
     def test_run_no_archive(self):
         """Test whether the command runs when archive is not set"""
 
@@ -1033,6 +1294,132 @@ class TestFetchFromArchive(unittest.TestCase):
         items = [item for item in items]
         self.assertEqual(len(items), 0)
 
+    def test_parallel(self):
+        """Test whether items are fetched from several archives in parallel"""
+
+        manager = ArchiveManager(self.test_path)
+
+        args = {
+            'origin': 'http://example.com/',
+            'category': 'mock_item',
+            'tag': 'test',
+            'subtype': 'mocksubtype',
+            'from-date': str_to_datetime('2015-01-01')
+        }
+
+        for shift in range(3):
+            ShiftedCommandBackend.SHIFT = shift
+            items = fetch(ShiftedCommandBackend, args, manager=manager)
+            items = [item for item in items]
+            self.assertEqual(len(items), 5)
+        ShiftedCommandBackend.SHIFT = 0
+
+        # Items are returned in the order of the archives
+        items = fetch_from_archive(ShiftedCommandBackend, args, manager,
+                                   'mock_item', str_to_datetime('1970-01-01'),
+                                   workers=2)
+        items = [item['updated_on'] for item in items]
+
+        expected = [x * 10 + shift for shift in range(3) for x in range(5)]
+        self.assertListEqual(items, expected)
+
+        # Items are merged by their update date
+        items = fetch_from_archive(ShiftedCommandBackend, args, manager,
+                                   'mock_item', str_to_datetime('1970-01-01'),
+                                   workers=2, order='updated_on')
+        items = [item['updated_on'] for item in items]
+
+        self.assertListEqual(items, sorted(expected))
+
+    def test_parallel_invalid_order(self):
+        """Test if an exception is raised when the merge order is not valid"""
+
+        manager = ArchiveManager(self.test_path)
+
+        args = {
+            'origin': 'http://example.com/',
+            'category': 'mock_item',
+            'tag': 'test'
+        }
+
+        with self.assertRaisesRegex(ValueError, "not a valid archive merge order"):
+            items = fetch_from_archive(CommandBackend, args, manager,
+                                       'mock_item', str_to_datetime('1970-01-01'),
+                                       workers=2, order='uuid')
+            _ = [item for item in items]
+
+    def test_parallel_bounded_archives(self):
+        """Check if no more archives than workers are replayed at the same time"""
+
+        manager = ArchiveManager(self.test_path)
+
+        args = {
+            'origin': 'http://example.com/',
+            'category': 'mock_item',
+            'tag': 'test',
+            'subtype': 'mocksubtype',
+            'from-date': str_to_datetime('2015-01-01')
+        }
+
+        for _ in range(5):
+            items = fetch(CommandBackend, args, manager=manager)
+            items = [item for item in items]
+            self.assertEqual(len(items), 5)
+
+        submitted = []
+
+        class MockedExecutor(concurrent.futures.ThreadPoolExecutor):
+            def submit(self, fn, *args, **kwargs):
+                submitted.append(args[2])
+                return super().submit(fn, *args, **kwargs)
+
+        with unittest.mock.patch('concurrent.futures.ProcessPoolExecutor', MockedExecutor):
+            items = fetch_from_archive(CommandBackend, args, manager,
+                                       'mock_item', str_to_datetime('1970-01-01'),
+                                       workers=2)
+
+            # The next archive is submitted when the items
+            # of the first one are read
+            _ = next(items)
+            self.assertEqual(len(submitted), 3)
+
+            items = [item for item in items]
+            self.assertEqual(len(items), 24)
+            self.assertEqual(len(submitted), 5)
+
+    def test_parallel_ignore_corrupted_archive(self):
+        """Check if corrupted archives are ignored when fetching in parallel"""
+
+        manager = ArchiveManager(self.test_path)
+
+        args = {
+            'origin': 'http://example.com/',
+            'category': 'mock_item',
+            'tag': 'test',
+            'subtype': 'mocksubtype',
+            'from-date': str_to_datetime('2015-01-01')
+        }
+
+        for _ in range(3):
+            items = fetch(CommandBackend, args, manager=manager)
+            items = [item for item in items]
+            self.assertEqual(len(items), 5)
+
+        filepaths = manager.search('http://example.com/', 'CommandBackend',
+                                   'mock_item', str_to_datetime('1970-01-01'))
+
+        conn = sqlite3.connect(filepaths[1])
+        conn.execute("DELETE FROM archive")
+        conn.commit()
+        conn.close()
+
+        items = fetch_from_archive(CommandBackend, args, manager,
+                                   'mock_item', str_to_datetime('1970-01-01'),
+                                   workers=3)
+        items = [item for item in items]
+
+        self.assertEqual(len(items), 10)
+
     def test_ignore_corrupted_archive(self):
         """Check if a corrupted archive is ignored while fetching from archive"""
 
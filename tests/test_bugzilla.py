@@ -69,6 +69,8 @@ class TestBugzillaBackend(unittest.TestCase):
         self.assertEqual(bg.origin, BUGZILLA_SERVER_URL)
         self.assertEqual(bg.tag, 'test')
         self.assertEqual(bg.max_bugs, 5)
+        self.assertEqual(bg.workers, 1)
+        self.assertEqual(bg.prefetch_pages, 0)
         self.assertIsNone(bg.client)
 
         # When tag is empty or None it will be set to
@@ -171,18 +173,6 @@ class TestBugzillaBackend(unittest.TestCase):
                 'order': ['changeddate'],
                 'chfieldfrom': ['1970-01-01 00:00:00']
             },
-            {
-                'ctype': ['csv'],
-                'limit': ['500'],
-                'order': ['changeddate'],
-                'chfieldfrom': ['2009-07-30 11:35:33']
-            },
-            {
-                'ctype': ['csv'],
-                'limit': ['500'],
-                'order': ['changeddate'],
-                'chfieldfrom': ['2015-08-12 18:32:11']
-            },
             {
                 'ctype': ['xml'],
                 'id': ['15', '18', '17', '20', '19'],
@@ -203,6 +193,18 @@ class TestBugzillaBackend(unittest.TestCase):
             {
                 'id': ['19']
             },
+            {
+                'ctype': ['csv'],
+                'limit': ['500'],
+                'order': ['changeddate'],
+                'chfieldfrom': ['2009-07-30 11:35:33']
+            },
+            {
+                'ctype': ['csv'],
+                'limit': ['500'],
+                'order': ['changeddate'],
+                'chfieldfrom': ['2015-08-12 18:32:11']
+            },
             {
                 'ctype': ['xml'],
                 'id': ['30', '888'],
@@ -221,6 +223,150 @@ class TestBugzillaBackend(unittest.TestCase):
         for i in range(len(expected)):
             self.assertDictEqual(requests[i].querystring, expected[i])
 
+    @httpretty.activate
+    def test_fetch_workers(self):
+        """Test whether bugs fetched by several workers are returned in order"""
+
+        bodies_csv = [read_file('data/bugzilla/bugzilla_buglist.csv'),
+                      read_file('data/bugzilla/bugzilla_buglist_next.csv'),
+                      ""]
+        bodies_xml = [read_file('data/bugzilla/bugzilla_version.xml', mode='rb'),
+                      read_file('data/bugzilla/bugzilla_bugs_details.xml', mode='rb'),
+                      read_file('data/bugzilla/bugzilla_bugs_details_next.xml', mode='rb')]
+        activity = read_file('data/bugzilla/bugzilla_bug_activity.html', mode='rb')
+        activity_empty = read_file('data/bugzilla/bugzilla_bug_activity_empty.html', mode='rb')
+
+        def request_callback(request, uri, headers):
+            if uri.startswith(BUGZILLA_BUGLIST_URL):
+                body = bodies_csv.pop(0)
+            elif uri.startswith(BUGZILLA_BUG_ACTIVITY_URL):
+                bug_id = request.querystring['id'][0]
+                body = activity if bug_id in ['18', '20', '888'] else activity_empty
+            else:
+                body = bodies_xml.pop(0)
+
+            return (200, headers, body)
+
+        httpretty.register_uri(httpretty.GET,
+                               BUGZILLA_BUGLIST_URL,
+                               body=request_callback)
+        httpretty.register_uri(httpretty.GET,
+                               BUGZILLA_BUG_URL,
+                               body=request_callback)
+        httpretty.register_uri(httpretty.GET,
+                               BUGZILLA_BUG_ACTIVITY_URL,
+                               body=request_callback)
+
+        bg = Bugzilla(BUGZILLA_SERVER_URL,
+                      max_bugs=5, max_bugs_csv=500, workers=4)
+        bugs = [bug for bug in bg.fetch()]
+
+        bug_ids = [bug['data']['bug_id'][0]['__text__'] for bug in bugs]
+        nevents = [len(bug['data']['activity']) for bug in bugs]
+
+        self.assertListEqual(bug_ids, ['15', '18', '17', '20', '19', '30', '888'])
+        self.assertListEqual(nevents, [0, 14, 0, 14, 0, 0, 14])
+
+    @httpretty.activate
+    def test_fetch_stream(self):
+        """Test whether bugs are returned before the whole list of bugs is fetched"""
+
+        buglist_requests = []
+        bodies_csv = [read_file('data/bugzilla/bugzilla_buglist.csv'),
+                      read_file('data/bugzilla/bugzilla_buglist_next.csv'),
+                      ""]
+        bodies_xml = [read_file('data/bugzilla/bugzilla_version.xml', mode='rb'),
+                      read_file('data/bugzilla/bugzilla_bugs_details.xml', mode='rb'),
+                      read_file('data/bugzilla/bugzilla_bugs_details_next.xml', mode='rb')]
+        activity = read_file('data/bugzilla/bugzilla_bug_activity_empty.html', mode='rb')
+
+        def request_callback(request, uri, headers):
+            if uri.startswith(BUGZILLA_BUGLIST_URL):
+                buglist_requests.append(request.querystring['chfieldfrom'][0])
+                body = bodies_csv.pop(0)
+            elif uri.startswith(BUGZILLA_BUG_ACTIVITY_URL):
+                body = activity
+            else:
+                body = bodies_xml.pop(0)
+
+            return (200, headers, body)
+
+        httpretty.register_uri(httpretty.GET,
+                               BUGZILLA_BUGLIST_URL,
+                               body=request_callback)
+        httpretty.register_uri(httpretty.GET,
+                               BUGZILLA_BUG_URL,
+                               body=request_callback)
+        httpretty.register_uri(httpretty.GET,
+                               BUGZILLA_BUG_ACTIVITY_URL,
+                               body=request_callback)
+
+        bg = Bugzilla(BUGZILLA_SERVER_URL,
+                      max_bugs=5, max_bugs_csv=500)
+        bugs = bg.fetch()
+
+        # The first chunk of bugs is returned before
+        # the next pages of the list are requested
+        bug = next(bugs)
+        self.assertEqual(bug['data']['bug_id'][0]['__text__'], '15')
+        self.assertListEqual(buglist_requests, ['1970-01-01 00:00:00'])
+
+        bug_ids = [bug['data']['bug_id'][0]['__text__'] for bug in bugs]
+        self.assertListEqual(bug_ids, ['18', '17', '20', '19', '30', '888'])
+        self.assertListEqual(buglist_requests, ['1970-01-01 00:00:00',
+                                                '2009-07-30 11:35:33',
+                                                '2015-08-12 18:32:11'])
+
+    @httpretty.activate
+    def test_fetch_prefetch_pages(self):
+        """Test whether bugs are returned in order when the list of bugs is prefetched"""
+
+        bodies_csv = [read_file('data/bugzilla/bugzilla_buglist.csv'),
+                      read_file('data/bugzilla/bugzilla_buglist_next.csv'),
+                      ""]
+        details = {
+            '15': read_file('data/bugzilla/bugzilla_bugs_details.xml', mode='rb'),
+            '30': read_file('data/bugzilla/bugzilla_bugs_details_next.xml', mode='rb')
+        }
+        version = read_file('data/bugzilla/bugzilla_version.xml', mode='rb')
+        activity = read_file('data/bugzilla/bugzilla_bug_activity.html', mode='rb')
+        activity_empty = read_file('data/bugzilla/bugzilla_bug_activity_empty.html', mode='rb')
+
+        def request_callback(request, uri, headers):
+            if uri.startswith(BUGZILLA_BUGLIST_URL):
+                body = bodies_csv.pop(0)
+            elif uri.startswith(BUGZILLA_BUG_ACTIVITY_URL):
+                bug_id = request.querystring['id'][0]
+                body = activity if bug_id in ['18', '20', '888'] else activity_empty
+            elif 'id' in request.querystring:
+                body = details[request.querystring['id'][0]]
+            else:
+                body = version
+
+            return (200, headers, body)
+
+        httpretty.register_uri(httpretty.GET,
+                               BUGZILLA_BUGLIST_URL,
+                               body=request_callback)
+        httpretty.register_uri(httpretty.GET,
+                               BUGZILLA_BUG_URL,
+                               body=request_callback)
+        httpretty.register_uri(httpretty.GET,
+                               BUGZILLA_BUG_ACTIVITY_URL,
+                               body=request_callback)
+
+        bg = Bugzilla(BUGZILLA_SERVER_URL,
+                      max_bugs=5, max_bugs_csv=500,
+                      workers=4, prefetch_pages=2)
+        bugs = [bug for bug in bg.fetch()]
+
+        bug_ids = [bug['data']['bug_id'][0]['__text__'] for bug in bugs]
+        nevents = [len(bug['data']['activity']) for bug in bugs]
+
+        self.assertListEqual(bug_ids, ['15', '18', '17', '20', '19', '30', '888'])
+        self.assertListEqual(nevents, [0, 14, 0, 14, 0, 0, 14])
+        self.assertListEqual(bodies_csv, [])
+
     @httpretty.activate
     def test_fetch_from_date(self):
         """Test whether a list of bugs is returned from a given date"""
@@ -725,6 +871,9 @@ class TestBugzillaCommand(unittest.TestCase):
         args = ['--backend-user', 'jsmith@example.com',
                 '--backend-password', '1234',
                 '--max-bugs', '10', '--max-bugs-csv', '5',
+                '--workers', '4',
+                '--prefetch-pages', '2',
+                '--pool-size', '20', '--no-keep-alive',
                 '--tag', 'test',
                 '--from-date', '1970-01-01',
                 '--no-archive',
@@ -735,6 +884,10 @@ class TestBugzillaCommand(unittest.TestCase):
         self.assertEqual(parsed_args.password, '1234')
         self.assertEqual(parsed_args.max_bugs, 10)
         self.assertEqual(parsed_args.max_bugs_csv, 5)
+        self.assertEqual(parsed_args.workers, 4)
+        self.assertEqual(parsed_args.prefetch_pages, 2)
+        self.assertEqual(parsed_args.pool_size, 20)
+        self.assertEqual(parsed_args.keep_alive, False)
         self.assertEqual(parsed_args.tag, 'test')
         self.assertEqual(parsed_args.no_archive, True)
         self.assertEqual(parsed_args.url, BUGZILLA_SERVER_URL)
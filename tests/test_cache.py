@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2018 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Fifth Floor, Boston, MA 02110-1335, USA.
+#
+# Authors:
+#     Santiago Dueñas <sduenas@bitergia.com>
+#
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+import unittest.mock
+
+from perceval.cache import (DEFAULT_MAX_SIZE,
+                            DEFAULT_TTL,
+                            Cache,
+                            MemoryCache,
+                            SQLiteCache)
+from perceval.errors import CacheError
+
+
+class TestCache(unittest.TestCase):
+    """Cache tests"""
+
+    def test_not_implemented(self):
+        """Test whether the abstract methods raise an exception"""
+
+        cache = Cache()
+
+        with self.assertRaises(NotImplementedError):
+            cache.get('key')
+
+        with self.assertRaises(NotImplementedError):
+            cache.set('key', 'value')
+
+        with self.assertRaises(NotImplementedError):
+            cache.clear()
+
+
+class TestMemoryCache(unittest.TestCase):
+    """MemoryCache tests"""
+
+    def test_get_set(self):
+        """Test whether entries are stored and counted"""
+
+        cache = MemoryCache()
+        self.assertEqual(cache.ttl, None)
+        self.assertEqual(cache.max_size, None)
+
+        self.assertIsNone(cache.get('jsmith'))
+
+        cache.set('jsmith', '{"login": "jsmith"}')
+        self.assertEqual(cache.get('jsmith'), '{"login": "jsmith"}')
+        self.assertEqual(cache.get('jsmith'), '{"login": "jsmith"}')
+
+        self.assertEqual(cache.hits, 2)
+        self.assertEqual(cache.misses, 1)
+        self.assertDictEqual(cache.stats(), {'hits': 2, 'misses': 1})
+
+        cache.clear()
+        self.assertIsNone(cache.get('jsmith'))
+
+    @unittest.mock.patch('perceval.cache.time.time')
+    def test_ttl(self, mock_time):
+        """Test whether expired entries are not returned"""
+
+        mock_time.return_value = 1000.0
+
+        cache = MemoryCache(ttl=60)
+        cache.set('jsmith', 'value')
+
+        mock_time.return_value = 1060.0
+        self.assertEqual(cache.get('jsmith'), 'value')
+
+        mock_time.return_value = 1061.0
+        self.assertIsNone(cache.get('jsmith'))
+        self.assertDictEqual(cache.stats(), {'hits': 1, 'misses': 1})
+
+    def test_lru(self):
+        """Test whether the least recently used entries are evicted"""
+
+        cache = MemoryCache(max_size=2)
+        cache.set('a', '1')
+        cache.set('b', '2')
+
+        # 'a' is used, so 'b' is evicted
+        self.assertEqual(cache.get('a'), '1')
+        cache.set('c', '3')
+
+        self.assertEqual(cache.get('a'), '1')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), '3')
+
+
+class TestSQLiteCache(unittest.TestCase):
+    """SQLiteCache tests"""
+
+    def setUp(self):
+        self.test_path = tempfile.mkdtemp(prefix='perceval_')
+        self.cache_path = os.path.join(self.test_path, 'cache', 'users.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_path)
+
+    def test_init(self):
+        """Test whether the database is created"""
+
+        cache = SQLiteCache(self.cache_path)
+
+        self.assertTrue(os.path.exists(self.cache_path))
+        self.assertEqual(cache.cache_path, self.cache_path)
+        self.assertEqual(cache.ttl, DEFAULT_TTL)
+        self.assertEqual(cache.max_size, DEFAULT_MAX_SIZE)
+        self.assertEqual(cache.hits, 0)
+        self.assertEqual(cache.misses, 0)
+
+        cache.close()
+
+    def test_init_error(self):
+        """Test whether an exception is raised when the database cannot be opened"""
+
+        with open(os.path.join(self.test_path, 'invalid'), 'w') as f:
+            f.write("This is not a database" * 100)
+
+        with self.assertRaisesRegex(CacheError, "cannot be opened"):
+            SQLiteCache(os.path.join(self.test_path, 'invalid'))
+
+    def test_get_set(self):
+        """Test whether entries are stored, replaced and counted"""
+
+        cache = SQLiteCache(self.cache_path)
+
+        self.assertIsNone(cache.get('jsmith'))
+
+        cache.set('jsmith', '{"login": "jsmith"}')
+        self.assertEqual(cache.get('jsmith'), '{"login": "jsmith"}')
+
+        cache.set('jsmith', '{"login": "jsmith", "name": "John"}')
+        self.assertEqual(cache.get('jsmith'), '{"login": "jsmith", "name": "John"}')
+
+        self.assertDictEqual(cache.stats(), {'hits': 2, 'misses': 1})
+
+        cache.clear()
+        self.assertIsNone(cache.get('jsmith'))
+
+        cache.close()
+
+    def test_shared(self):
+        """Test whether entries are persisted and shared between caches"""
+
+        cache_a = SQLiteCache(self.cache_path)
+        cache_b = SQLiteCache(self.cache_path)
+
+        cache_a.set('jsmith', 'value')
+        self.assertEqual(cache_b.get('jsmith'), 'value')
+
+        cache_a.close()
+        cache_b.close()
+
+        cache = SQLiteCache(self.cache_path)
+        self.assertEqual(cache.get('jsmith'), 'value')
+        self.assertDictEqual(cache.stats(), {'hits': 1, 'misses': 0})
+
+        cache.close()
+
+    @unittest.mock.patch('perceval.cache.time.time')
+    def test_ttl(self, mock_time):
+        """Test whether expired entries are not returned"""
+
+        mock_time.return_value = 1000.0
+
+        cache = SQLiteCache(self.cache_path, ttl=60)
+        cache.set('jsmith', 'value')
+
+        mock_time.return_value = 1060.0
+        self.assertEqual(cache.get('jsmith'), 'value')
+
+        mock_time.return_value = 1061.0
+        self.assertIsNone(cache.get('jsmith'))
+
+        # Expired entries are removed
+        mock_time.return_value = 1000.0
+        self.assertIsNone(cache.get('jsmith'))
+
+        cache.close()
+
+    @unittest.mock.patch('perceval.cache.SQLiteCache.EVICTION_INTERVAL', 1)
+    @unittest.mock.patch('perceval.cache.time.time')
+    def test_lru(self, mock_time):
+        """Test whether the least recently used entries are evicted"""
+
+        cache = SQLiteCache(self.cache_path, max_size=2)
+
+        mock_time.return_value = 1000.0
+        cache.set('a', '1')
+        mock_time.return_value = 1001.0
+        cache.set('b', '2')
+
+        # 'a' is used, so 'b' is evicted
+        mock_time.return_value = 1002.0
+        self.assertEqual(cache.get('a'), '1')
+        mock_time.return_value = 1003.0
+        cache.set('c', '3')
+
+        self.assertEqual(cache.get('a'), '1')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), '3')
+
+        cache.close()
+
+    @unittest.mock.patch('perceval.cache.SQLiteCache.EVICTION_INTERVAL', 3)
+    @unittest.mock.patch('perceval.cache.time.time')
+    def test_eviction_interval(self, mock_time):
+        """Test whether entries are evicted only every some inserts"""
+
+        cache = SQLiteCache(self.cache_path, max_size=2)
+
+        mock_time.return_value = 1000.0
+        cache.set('a', '1')
+        mock_time.return_value = 1001.0
+        cache.set('b', '2')
+        self.assertListEqual(sorted(self.read_accesses()), ['a', 'b'])
+
+        mock_time.return_value = 1002.0
+        cache.set('c', '3')
+        self.assertListEqual(sorted(self.read_accesses()), ['b', 'c'])
+
+        # The limit is exceeded until the next eviction
+        mock_time.return_value = 1003.0
+        cache.set('d', '4')
+        mock_time.return_value = 1004.0
+        cache.set('e', '5')
+        self.assertListEqual(sorted(self.read_accesses()), ['b', 'c', 'd', 'e'])
+
+        mock_time.return_value = 1005.0
+        cache.set('f', '6')
+        self.assertListEqual(sorted(self.read_accesses()), ['e', 'f'])
+
+        cache.close()
+
+    @unittest.mock.patch('perceval.cache.SQLiteCache.ACCESS_BATCH_SIZE', 2)
+    @unittest.mock.patch('perceval.cache.time.time')
+    def test_access_times_batched(self, mock_time):
+        """Test whether access times are stored in batches"""
+
+        mock_time.return_value = 1000.0
+
+        cache = SQLiteCache(self.cache_path)
+        cache.set('a', '1')
+        cache.set('b', '2')
+
+        mock_time.return_value = 1001.0
+        self.assertEqual(cache.get('a'), '1')
+        self.assertEqual(self.read_accesses(), {'a': 1000.0, 'b': 1000.0})
+
+        mock_time.return_value = 1002.0
+        self.assertEqual(cache.get('b'), '2')
+        self.assertEqual(self.read_accesses(), {'a': 1001.0, 'b': 1002.0})
+
+        # Pending access times are stored when the cache is closed
+        mock_time.return_value = 1003.0
+        self.assertEqual(cache.get('a'), '1')
+        self.assertEqual(self.read_accesses(), {'a': 1001.0, 'b': 1002.0})
+
+        cache.close()
+        self.assertEqual(self.read_accesses(), {'a': 1003.0, 'b': 1002.0})
+
+    def test_no_limits(self):
+        """Test whether entries are kept when there are no limits"""
+
+        cache = SQLiteCache(self.cache_path, ttl=None, max_size=None)
+
+        for i in range(100):
+            cache.set(str(i), str(i))
+
+        for i in range(100):
+            self.assertEqual(cache.get(str(i)), str(i))
+
+        cache.close()
+
+    def read_accesses(self):
+        """Read the access time of each entry stored in the database"""
+
+        conn = sqlite3.connect(self.cache_path)
+        rows = conn.execute("SELECT key, accessed_on FROM cache").fetchall()
+        conn.close()
+
+        return {key: accessed_on for key, accessed_on in rows}
+
+
+if __name__ == "__main__":
+    unittest.main(warnings='ignore')
@@ -21,10 +21,13 @@
 #     Valerio Cosentino <valcos@bitergia.com>
 #
 
+import collections
+import json
 import os
 import shutil
 import time
 import tempfile
+import threading
 import unittest
 
 import httpretty
@@ -36,7 +39,16 @@ pkg_resources.declare_namespace('perceval.backends')
 from grimoirelab.toolkit.datetime import datetime_utcnow
 
 from perceval.archive import Archive
-from perceval.client import HttpClient, RateLimitHandler
+from perceval.client import (DEFAULT_POOL_SIZE,
+                             CursorPaginator,
+                             HttpClient,
+                             LinkPaginator,
+                             OffsetPaginator,
+                             Paginator,
+                             RateLimitHandler,
+                             fetch_concurrently,
+                             read_ahead,
+                             read_concurrently)
 
 
 CLIENT_API_URL = "https://gateway.marvel.com/v1/"
@@ -44,6 +56,7 @@ CLIENT_SPIDERMAN_URL = "https://gateway.marvel.com/v1/public/characters/1"
 CLIENT_SUPERMAN_URL = "https://gateway.marvel.com/v1/public/characters/2"
 CLIENT_BATMAN_URL = "https://gateway.marvel.com/v1/public/characters/3"
 CLIENT_IRONMAN_URL = "https://gateway.marvel.com/v1/public/characters/4"
+CLIENT_CHARACTERS_URL = "https://gateway.marvel.com/v1/public/characters"
 
 
 class MockedClient(HttpClient, RateLimitHandler):
@@ -107,9 +120,12 @@ class TestHttpClient(unittest.TestCase):
         self.assertEqual(client.raise_on_status, HttpClient.DEFAULT_RAISE_ON_STATUS)
         self.assertEqual(client.respect_retry_after_header, HttpClient.DEFAULT_RESPECT_RETRY_AFTER_HEADER)
         self.assertEqual(client.sleep_time, HttpClient.DEFAULT_SLEEP_TIME)
+        self.assertEqual(client.pool_size, DEFAULT_POOL_SIZE)
+        self.assertEqual(client.keep_alive, True)
 
         self.assertIsNotNone(client.session)
         self.assertEqual(client.session.headers['User-Agent'], HttpClient.DEFAULT_HEADERS.get('User-Agent'))
+        self.assertEqual(client.session.headers['Connection'], 'keep-alive')
 
         self.assertEqual(client.rate_limit, None)
         self.assertEqual(client.rate_limit_reset_ts, None)
@@ -133,6 +149,44 @@ class TestHttpClient(unittest.TestCase):
         self.assertTrue(extra_status in client.status_forcelist)
         self.assertTrue(extra_status in client.retry_after_status)
 
+    def test_connection_pool(self):
+        """Test whether the size of the connections pool is set"""
+
+        client = MockedClient(CLIENT_API_URL)
+
+        for prefix in ['http://', 'https://']:
+            adapter = client.session.get_adapter(prefix + 'example.com')
+            self.assertEqual(adapter._pool_maxsize, DEFAULT_POOL_SIZE)
+
+        client = HttpClient(CLIENT_API_URL, pool_size=32, keep_alive=False)
+
+        for prefix in ['http://', 'https://']:
+            adapter = client.session.get_adapter(prefix + 'example.com')
+            self.assertEqual(adapter._pool_maxsize, 32)
+
+        self.assertEqual(client.session.headers['Connection'], 'close')
+
+    @httpretty.activate
+    def test_connection_stats(self):
+        """Test whether the number of new and reused connections is returned"""
+
+        httpretty.register_uri(httpretty.GET,
+                               CLIENT_SPIDERMAN_URL,
+                               body="success",
+                               status=200)
+
+        client = MockedClient(CLIENT_API_URL)
+
+        stats = client.connection_stats()
+        self.assertDictEqual(stats, {'new': 0, 'reused': 0})
+
+        _ = client.fetch(CLIENT_SPIDERMAN_URL)
+        _ = client.fetch(CLIENT_SPIDERMAN_URL)
+
+        stats = client.connection_stats()
+        self.assertGreaterEqual(stats['new'], 1)
+        self.assertEqual(stats['new'] + stats['reused'], 2)
+
     @httpretty.activate
     def test_close_session(self):
         """Test wheter the session is properly closed"""
@@ -431,5 +485,332 @@ class TestRateLimitHandler(unittest.TestCase):
         self.assertEqual(before, after)
 
 
+class TestPaginators(unittest.TestCase):
+    """Paginators tests"""
+
+    @httpretty.activate
+    def test_link_paginator(self):
+        """Test whether the pages are fetched following the Link headers"""
+
+        next_url = CLIENT_CHARACTERS_URL + '?page=2'
+
+        client = MockedClient(CLIENT_API_URL, sleep_time=0.1, max_retries=1)
+
+        for prefetch in [0, 1]:
+            # Responses are consumed by each pass
+            httpretty.reset()
+            httpretty.register_uri(httpretty.GET,
+                                   CLIENT_CHARACTERS_URL,
+                                   responses=[
+                                       httpretty.Response(body='1', status=200,
+                                                          link='<' + next_url + '>; rel="next"'),
+                                       httpretty.Response(body='2', status=200)
+                                   ])
+
+            pages = LinkPaginator(client, CLIENT_CHARACTERS_URL, payload={'limit': 10},
+                                  prefetch=prefetch)
+            bodies = [response.text for response in pages]
+
+            self.assertListEqual(bodies, ['1', '2'])
+            self.assertDictEqual(httpretty.last_request().querystring,
+                                 {'page': ['2'], 'limit': ['10']})
+
+    @httpretty.activate
+    def test_link_paginator_next_url(self):
+        """Test whether the next pages are read from the body of the responses"""
+
+        next_url = CLIENT_CHARACTERS_URL + '?start=1'
+
+        httpretty.register_uri(httpretty.GET,
+                               CLIENT_CHARACTERS_URL,
+                               responses=[
+                                   httpretty.Response(body=json.dumps({'next': next_url}), status=200),
+                                   httpretty.Response(body=json.dumps({}), status=200)
+                               ])
+
+        client = MockedClient(CLIENT_API_URL, sleep_time=0.1, max_retries=1)
+        pages = LinkPaginator(client, CLIENT_CHARACTERS_URL, payload={'limit': 10},
+                              next_url=lambda response: response.json().get('next', None),
+                              keep_payload=False)
+        bodies = [response.json() for response in pages]
+
+        self.assertListEqual(bodies, [{'next': next_url}, {}])
+        self.assertDictEqual(httpretty.last_request().querystring, {'start': ['1']})
+
+    @httpretty.activate
+    def test_offset_paginator(self):
+        """Test whether the offset is moved over the pages"""
+
+        def request_callback(request, uri, headers):
+            offset = int(request.querystring['offset'][0])
+            items = list(range(offset, min(offset + 2, 5)))
+            body = json.dumps({'items': items, 'total': 5})
+            return (200, headers, body)
+
+        def page_info(response):
+            data = response.json()
+            nitems = len(data['items'])
+            return nitems, data['items'][0] + nitems < data['total']
+
+        httpretty.register_uri(httpretty.GET,
+                               CLIENT_CHARACTERS_URL,
+                               body=request_callback)
+
+        client = MockedClient(CLIENT_API_URL, sleep_time=0.1, max_retries=1)
+
+        for prefetch in [0, 2]:
+            pages = OffsetPaginator(client, CLIENT_CHARACTERS_URL, {'offset': 0, 'limit': 2},
+                                    'offset', page_info, prefetch=prefetch)
+            items = [response.json()['items'] for response in pages]
+
+            self.assertListEqual(items, [[0, 1], [2, 3], [4]])
+
+        # Page numbers are increased by one
+        pages = OffsetPaginator(client, CLIENT_CHARACTERS_URL, {'offset': 0},
+                                'offset', lambda response: (2, True), by_page=True)
+        offsets = [response.json()['items'][0] for _, response in zip(range(3), pages)]
+
+        self.assertListEqual(offsets, [0, 1, 2])
+
+    @httpretty.activate
+    def test_cursor_paginator(self):
+        """Test whether the cursor of each page is sent with the next one"""
+
+        def request_callback(request, uri, headers):
+            cursor = request.querystring.get('cursor', ['a'])[0]
+            next_cursor = {'a': 'b', 'b': 'c', 'c': None}[cursor]
+            body = json.dumps({'cursor': cursor, 'next': next_cursor})
+            return (200, headers, body)
+
+        httpretty.register_uri(httpretty.GET,
+                               CLIENT_CHARACTERS_URL,
+                               body=request_callback)
+
+        client = MockedClient(CLIENT_API_URL, sleep_time=0.1, max_retries=1)
+        pages = CursorPaginator(client, CLIENT_CHARACTERS_URL, None, 'cursor',
+                                lambda response: response.json()['next'],
+                                prefetch=1)
+        cursors = [response.json()['cursor'] for response in pages]
+
+        self.assertListEqual(cursors, ['a', 'b', 'c'])
+
+    @httpretty.activate
+    def test_prefetch_error(self):
+        """Test whether errors raised while prefetching are raised by the iterator"""
+
+        next_url = CLIENT_CHARACTERS_URL + '?page=2'
+
+        httpretty.register_uri(httpretty.GET,
+                               CLIENT_CHARACTERS_URL,
+                               responses=[
+                                   httpretty.Response(body='1', status=200,
+                                                      link='<' + next_url + '>; rel="next"'),
+                                   httpretty.Response(body='', status=404)
+                               ])
+
+        client = MockedClient(CLIENT_API_URL, sleep_time=0.1, max_retries=1)
+        pages = iter(LinkPaginator(client, CLIENT_CHARACTERS_URL, prefetch=1))
+
+        self.assertEqual(next(pages).text, '1')
+
+        with self.assertRaises(requests.exceptions.HTTPError):
+            _ = next(pages)
+
+    @httpretty.activate
+    def test_prefetch_stopped(self):
+        """Test whether no more pages are fetched when the iteration stops"""
+
+        httpretty.register_uri(httpretty.GET,
+                               CLIENT_CHARACTERS_URL,
+                               body='page')
+
+        client = MockedClient(CLIENT_API_URL, sleep_time=0.1, max_retries=1)
+        pages = OffsetPaginator(client, CLIENT_CHARACTERS_URL, {'page': 1},
+                                'page', lambda response: (1, True),
+                                prefetch=2, by_page=True)
+
+        for _, response in zip(range(3), pages):
+            self.assertEqual(response.text, 'page')
+
+        nrequests = len(httpretty.httpretty.latest_requests)
+        time.sleep(0.3)
+
+        # Three pages returned plus, at most, the prefetched ones
+        self.assertEqual(len(httpretty.httpretty.latest_requests), nrequests)
+        self.assertLessEqual(nrequests, 6)
+
+    def test_next_page_not_implemented(self):
+        """Test whether an exception is raised when next_page is not implemented"""
+
+        client = MockedClient(CLIENT_API_URL, sleep_time=0.1, max_retries=1)
+        pages = Paginator(client, CLIENT_CHARACTERS_URL)
+
+        with self.assertRaises(NotImplementedError):
+            pages.next_page(None, CLIENT_CHARACTERS_URL, None)
+
+
+class TestFetchConcurrently(unittest.TestCase):
+    """Tests for fetch_concurrently function"""
+
+    def test_order(self):
+        """Test whether the results are returned in the order of the items"""
+
+        def fetch(item):
+            time.sleep(0.01 * (10 - item))
+            return item * 2
+
+        for workers in [1, 4]:
+            results = [result for result in fetch_concurrently(fetch, range(10), workers=workers)]
+            self.assertListEqual(results, [item * 2 for item in range(10)])
+
+    def test_threads(self):
+        """Test whether the items are fetched in a pool of threads"""
+
+        threads = set()
+
+        def fetch(item):
+            threads.add(threading.current_thread())
+            time.sleep(0.05)
+            return item
+
+        _ = [result for result in fetch_concurrently(fetch, range(8), workers=1)]
+        self.assertSetEqual(threads, {threading.current_thread()})
+
+        threads.clear()
+        _ = [result for result in fetch_concurrently(fetch, range(8), workers=4)]
+        self.assertEqual(len(threads), 4)
+        self.assertNotIn(threading.current_thread(), threads)
+
+    def test_pending_items(self):
+        """Test whether the items are read as the results are returned"""
+
+        read = []
+
+        def read_items():
+            for item in range(100):
+                read.append(item)
+                yield item
+
+        results = fetch_concurrently(lambda item: item, read_items(), workers=2)
+
+        self.assertEqual(next(results), 0)
+        self.assertEqual(len(read), 4)
+
+        results.close()
+
+    def test_error(self):
+        """Test whether errors are raised in the order of the items"""
+
+        def fetch(item):
+            if item == 3:
+                raise requests.exceptions.HTTPError("error fetching item")
+            return item
+
+        results = fetch_concurrently(fetch, range(10), workers=4)
+
+        self.assertListEqual([next(results) for _ in range(3)], [0, 1, 2])
+
+        with self.assertRaises(requests.exceptions.HTTPError):
+            _ = next(results)
+
+
+class TestReadAhead(unittest.TestCase):
+    """Tests for read_ahead function"""
+
+    def test_read_ahead(self):
+        """Test whether the items are read in advance and returned in order"""
+
+        read = []
+
+        def read_items():
+            for item in range(10):
+                read.append(item)
+                yield item
+
+        items = read_ahead(read_items(), 3)
+
+        self.assertEqual(next(items), 0)
+
+        # The thread fills the queue while the item is processed
+        time.sleep(0.2)
+        self.assertEqual(len(read), 5)
+
+        self.assertListEqual([item for item in items], list(range(1, 10)))
+
+    def test_error(self):
+        """Test whether errors are raised when their position is reached"""
+
+        def read_items():
+            yield 0
+            yield 1
+            raise requests.exceptions.HTTPError("error reading item")
+
+        items = read_ahead(read_items(), 4)
+
+        self.assertListEqual([next(items) for _ in range(2)], [0, 1])
+
+        with self.assertRaises(requests.exceptions.HTTPError):
+            _ = next(items)
+
+
+class TestReadConcurrently(unittest.TestCase):
+    """Tests for read_concurrently function"""
+
+    def test_order(self):
+        """Test whether the items are returned in the order of the iterables"""
+
+        def read_items(n):
+            for item in range(3):
+                time.sleep(0.01 * (5 - n))
+                yield n, item
+
+        expected = [(n, item) for n in range(5) for item in range(3)]
+
+        for workers in [1, 3]:
+            iterables = (read_items(n) for n in range(5))
+            items = [item for item in read_concurrently(iterables, workers=workers, size=2)]
+            self.assertListEqual(items, expected)
+
+    def test_bounded(self):
+        """Test whether the items waiting to be returned are bounded"""
+
+        read = collections.defaultdict(list)
+
+        def read_items(n):
+            for item in range(100):
+                read[n].append(item)
+                yield item
+
+        iterables = (read_items(n) for n in range(10))
+        items = read_concurrently(iterables, workers=2, size=3)
+
+        self.assertEqual(next(items), 0)
+
+        # Only the first iterables are read, and only
+        # until their queues are full
+        time.sleep(0.2)
+        self.assertListEqual(sorted(read), [0, 1])
+        self.assertEqual(len(read[0]), 5)
+        self.assertEqual(len(read[1]), 4)
+
+        items.close()
+
+    def test_error(self):
+        """Test whether errors are raised when their position is reached"""
+
+        def read_items(n):
+            yield n
+            if n == 2:
+                raise requests.exceptions.HTTPError("error reading item")
+
+        iterables = (read_items(n) for n in range(5))
+        items = read_concurrently(iterables, workers=2, size=2)
+
+        self.assertListEqual([next(items) for _ in range(3)], [0, 1, 2])
+
+        with self.assertRaises(requests.exceptions.HTTPError):
+            _ = next(items)
+
+
 if __name__ == "__main__":
     unittest.main(warnings='ignore')
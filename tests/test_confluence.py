@@ -481,10 +481,14 @@ class TestConfluenceCommand(unittest.TestCase):
 
         args = ['http://example.com',
                 '--tag', 'test', '--no-archive',
-                '--from-date', '1970-01-01']
+                '--from-date', '1970-01-01',
+                '--max-contents', '10',
+                '--prefetch-pages', '2']
 
         parsed_args = parser.parse(*args)
         self.assertEqual(parsed_args.url, 'http://example.com')
+        self.assertEqual(parsed_args.max_contents, 10)
+        self.assertEqual(parsed_args.prefetch_pages, 2)
         self.assertEqual(parsed_args.tag, 'test')
         self.assertEqual(parsed_args.no_archive, True)
         self.assertEqual(parsed_args.from_date, DEFAULT_DATETIME)
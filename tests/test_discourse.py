@@ -65,6 +65,7 @@ class TestDiscourseBackend(unittest.TestCase):
         self.assertEqual(discourse.url, DISCOURSE_SERVER_URL)
         self.assertEqual(discourse.origin, DISCOURSE_SERVER_URL)
         self.assertEqual(discourse.tag, 'test')
+        self.assertEqual(discourse.workers, 1)
         self.assertIsNone(discourse.client)
 
         # When origin is empty or None it will be set to
@@ -189,6 +190,45 @@ class TestDiscourseBackend(unittest.TestCase):
         for i in range(len(expected)):
             self.assertDictEqual(requests_http[i].querystring, expected[i])
 
+    @httpretty.activate
+    def test_fetch_workers(self):
+        """Test whether topics fetched by several workers are returned in order"""
+
+        bodies_topics = [read_file('data/discourse/discourse_topics.json'),
+                         read_file('data/discourse/discourse_topics_empty.json')]
+
+        def request_callback(method, uri, headers):
+            return (200, headers, bodies_topics.pop(0))
+
+        httpretty.register_uri(httpretty.GET,
+                               DISCOURSE_TOPICS_URL,
+                               body=request_callback)
+        httpretty.register_uri(httpretty.GET,
+                               DISCOURSE_TOPIC_URL_1148,
+                               body=read_file('data/discourse/discourse_topic_1148.json'))
+        httpretty.register_uri(httpretty.GET,
+                               DISCOURSE_TOPIC_URL_1149,
+                               body=read_file('data/discourse/discourse_topic_1149.json'))
+        httpretty.register_uri(httpretty.GET,
+                               DISCOURSE_POST_URL_1,
+                               body=read_file('data/discourse/discourse_post.json'))
+        httpretty.register_uri(httpretty.GET,
+                               DISCOURSE_POST_URL_2,
+                               body=read_file('data/discourse/discourse_post.json'))
+
+        discourse = Discourse(DISCOURSE_SERVER_URL, workers=4)
+        topics = [topic for topic in discourse.fetch()]
+
+        self.assertEqual(len(topics), 2)
+
+        self.assertEqual(topics[0]['data']['id'], 1149)
+        self.assertEqual(len(topics[0]['data']['post_stream']['posts']), 2)
+        self.assertEqual(topics[0]['uuid'], '18068b95de1323a84c8e11dee8f46fd137f10c86')
+
+        self.assertEqual(topics[1]['data']['id'], 1148)
+        self.assertEqual(len(topics[1]['data']['post_stream']['posts']), 22)
+        self.assertEqual(topics[1]['uuid'], '5298e4e8383c3f73c9fa7c9599779cbe987a48e4')
+
     @httpretty.activate
     def test_fetch_from_date(self):
         """Test whether a list of topics is returned from a given date"""
@@ -809,6 +849,8 @@ class TestDiscourseCommand(unittest.TestCase):
 
         args = ['--tag', 'test', '--no-archive',
                 '--from-date', '1970-01-01',
+                '--workers', '4',
+                '--pool-size', '20', '--no-keep-alive',
                 DISCOURSE_SERVER_URL]
 
         parsed_args = parser.parse(*args)
@@ -816,6 +858,9 @@ class TestDiscourseCommand(unittest.TestCase):
         self.assertEqual(parsed_args.tag, 'test')
         self.assertEqual(parsed_args.no_archive, True)
         self.assertEqual(parsed_args.from_date, DEFAULT_DATETIME)
+        self.assertEqual(parsed_args.workers, 4)
+        self.assertEqual(parsed_args.pool_size, 20)
+        self.assertEqual(parsed_args.keep_alive, False)
 
 
 if __name__ == "__main__":
@@ -22,8 +22,13 @@
 #
 
 import datetime
+import io
 import os
+import re
+import json
+import shlex
 import shutil
+import tempfile
 import unittest.mock
 
 import pkg_resources
@@ -36,6 +41,7 @@ from perceval.utils import DEFAULT_DATETIME
 
 from perceval.backends.core.gerrit import (CATEGORY_REVIEW, MAX_REVIEWS, PORT,
                                            Gerrit,
+                                           GerritCheckpoint,
                                            GerritCommand,
                                            GerritClient)
 
@@ -50,6 +56,8 @@ VERSION_214 = 'data/gerrit/gerrit_version_214'
 REVIEWS_PAGE_1 = 'data/gerrit/gerrit_reviews_page_1'
 REVIEWS_PAGE_2 = 'data/gerrit/gerrit_reviews_page_2'
 REVIEWS_PAGE_3 = 'data/gerrit/gerrit_reviews_page_3'
+REVIEWS_EMPTY = 'data/gerrit/gerrit_reviews_empty'
+PROJECTS = 'data/gerrit/gerrit_projects'
 
 CMD_VERSION = "ssh  -p 29418 user@example.org gerrit  version "
 CMD_REVIEWS_1 = "ssh  -p 29418 user@example.org gerrit  query limit:2 " \
@@ -58,6 +66,15 @@ CMD_REVIEWS_2 = "ssh  -p 29418 user@example.org gerrit  query limit:2 " \
                 "'(status:open OR status:closed)' --all-approvals --comments --format=JSON --start=2"
 CMD_REVIEWS_3 = "ssh  -p 29418 user@example.org gerrit  query limit:2 " \
                 "'(status:open OR status:closed)' --all-approvals --comments --format=JSON --start=4"
+CMD_PROJECTS = "ssh  -p 29418 user@example.org gerrit  ls-projects "
+CMD_PROJECT_1_REVIEWS_1 = "ssh  -p 29418 user@example.org gerrit  query 'project:\"mediawiki/core\"' limit:2 " \
+                          "'(status:open OR status:closed)' --all-approvals --comments --format=JSON --start=0"
+CMD_PROJECT_1_REVIEWS_2 = "ssh  -p 29418 user@example.org gerrit  query 'project:\"mediawiki/core\"' limit:2 " \
+                          "'(status:open OR status:closed)' --all-approvals --comments --format=JSON --start=2"
+CMD_PROJECT_2_REVIEWS_1 = "ssh  -p 29418 user@example.org gerrit  query 'project:\"operations/puppet\"' limit:2 " \
+                          "'(status:open OR status:closed)' --all-approvals --comments --format=JSON --start=0"
+CMD_PROJECT_2_REVIEWS_2 = "ssh  -p 29418 user@example.org gerrit  query 'project:\"operations/puppet\"' limit:2 " \
+                          "'(status:open OR status:closed)' --all-approvals --comments --format=JSON --start=2"
 
 RESPONSES = {CMD_VERSION: VERSION_214,
              CMD_REVIEWS_1: REVIEWS_PAGE_1,
@@ -88,6 +105,78 @@ def mock_check_ouput(*args, **kwargs):
     return data
 
 
+def mock_check_ouput_projects(*args, **kwargs):
+    """Mock subprocess.check_output for queries sharded by project"""
+
+    responses = {CMD_VERSION: VERSION_214,
+                 CMD_PROJECTS: PROJECTS,
+                 CMD_PROJECT_1_REVIEWS_1: REVIEWS_PAGE_1,
+                 CMD_PROJECT_1_REVIEWS_2: REVIEWS_PAGE_3,
+                 CMD_PROJECT_2_REVIEWS_1: REVIEWS_PAGE_2,
+                 CMD_PROJECT_2_REVIEWS_2: REVIEWS_EMPTY}
+
+    cmd = args[0]
+    try:
+        data = read_file(responses[cmd], 'rb')
+    except Exception:
+        data = None
+
+    return data
+
+
+class MockPopen:
+    """Mock subprocess.Popen"""
+
+    mock_check_output = staticmethod(mock_check_ouput)
+
+    def __init__(self, *args, **kwargs):
+        data = self.mock_check_output(*args, **kwargs)
+
+        self.stdout = io.BytesIO(data if data is not None else b'')
+        self.returncode = None
+        self._returncode = 0 if data is not None else 255
+
+    def wait(self):
+        self.returncode = self._returncode
+        return self.returncode
+
+    def kill(self):
+        self._returncode = -9
+
+
+class MockPopenProjects(MockPopen):
+    """Mock subprocess.Popen for queries sharded by project"""
+
+    mock_check_output = staticmethod(mock_check_ouput_projects)
+
+
+class MockCheckOutputMultiplexing:
+    """Mock subprocess.check_output for multiplexed ssh commands"""
+
+    MULTIPLEXING_OPTS = re.compile(r"-o ControlMaster=auto -o ControlPath='([^']+)' -o ControlPersist=\d+ ")
+
+    def __init__(self):
+        self.cmds = []
+
+    def __call__(self, *args, **kwargs):
+        cmd = args[0]
+        self.cmds.append(cmd)
+
+        if ' -O exit ' in cmd:
+            return b''
+
+        return mock_check_ouput(self.MULTIPLEXING_OPTS.sub('', cmd))
+
+    def popen(self, *args, **kwargs):
+        cmd = args[0]
+        self.cmds.append(cmd)
+
+        return MockPopen(self.MULTIPLEXING_OPTS.sub('', cmd))
+
+    def control_paths(self):
+        return {m.group(1) for m in [self.MULTIPLEXING_OPTS.search(cmd) for cmd in self.cmds] if m}
+
+
 def mock_check_ouput_version_unknown(*args, **kwargs):
     """Mock subprocess.check_output"""
 
@@ -123,6 +212,15 @@ class TestGerritBackend(unittest.TestCase):
         self.assertEqual(gerrit.tag, GERRIT_REPO)
         self.assertEqual(gerrit.user, GERRIT_USER)
         self.assertIsNone(gerrit.client)
+        self.assertFalse(gerrit.shard_by_project)
+        self.assertEqual(gerrit.workers, 1)
+        self.assertIsNone(gerrit.checkpoint_path)
+
+        gerrit = Gerrit(GERRIT_REPO, GERRIT_USER, shard_by_project=True,
+                        workers=4, checkpoint_path='/tmp/checkpoint.json')
+        self.assertTrue(gerrit.shard_by_project)
+        self.assertEqual(gerrit.workers, 4)
+        self.assertEqual(gerrit.checkpoint_path, '/tmp/checkpoint.json')
 
     def test_has_archiving(self):
         """Test if it returns True when has_archiving is called"""
@@ -135,6 +233,7 @@ class TestGerritBackend(unittest.TestCase):
         self.assertEqual(Gerrit.has_resuming(), False)
 
     @unittest.mock.patch('subprocess.check_output', mock_check_ouput)
+    @unittest.mock.patch('subprocess.Popen', MockPopen)
     def test_fetch(self):
         """Test fetch method"""
 
@@ -177,6 +276,7 @@ class TestGerritBackend(unittest.TestCase):
         self.assertEqual(len(review['data']['patchSets']), 3)
 
     @unittest.mock.patch('subprocess.check_output', mock_check_ouput)
+    @unittest.mock.patch('subprocess.Popen', MockPopen)
     def test_fetch_from_date(self):
         """Test fetch method with from date"""
 
@@ -213,6 +313,174 @@ class TestGerritBackend(unittest.TestCase):
         self.assertEqual(review['data']['owner']['username'], "elukey")
         self.assertEqual(len(review['data']['patchSets']), 2)
 
+    def test_fetch_ssh_multiplexing(self):
+        """Test whether the queries are sent over a shared SSH connection"""
+
+        mock_check_output = MockCheckOutputMultiplexing()
+
+        with unittest.mock.patch('subprocess.check_output', mock_check_output), \
+                unittest.mock.patch('subprocess.Popen', mock_check_output.popen):
+            gerrit = Gerrit(GERRIT_REPO, user=GERRIT_USER, port=29418, max_reviews=2,
+                            ssh_multiplexing=True)
+            reviews = [review for review in gerrit.fetch(from_date=None)]
+
+        self.assertEqual(len(reviews), 5)
+        self.assertEqual(reviews[0]['data']['owner']['username'], 'gehel')
+        self.assertEqual(reviews[4]['data']['owner']['username'], 'jayprakash12345')
+
+        # Version and three pages of reviews
+        # are requested; then, the master
+        # connection is closed
+        self.assertEqual(len(mock_check_output.cmds), 5)
+
+        control_paths = mock_check_output.control_paths()
+        self.assertEqual(len(control_paths), 1)
+
+        exit_cmd = mock_check_output.cmds[-1]
+        self.assertRegex(exit_cmd, "^ssh .+ -O exit  -p 29418 user@example.org$")
+
+        control_path = control_paths.pop()
+        self.assertFalse(os.path.exists(os.path.dirname(control_path)))
+
+    @unittest.mock.patch('subprocess.check_output', mock_check_ouput)
+    def test_fetch_stream(self):
+        """Test whether reviews are returned while the output of the query is read"""
+
+        lines_read = []
+
+        class MockPopenLines(MockPopen):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                self.stdout = self.read_lines(self.stdout)
+
+            @staticmethod
+            def read_lines(stdout):
+                for line in stdout:
+                    lines_read.append(line)
+                    yield line
+
+        with unittest.mock.patch('subprocess.Popen', MockPopenLines):
+            gerrit = Gerrit(GERRIT_REPO, user=GERRIT_USER, port=29418, max_reviews=2)
+            reviews = gerrit.fetch(from_date=None)
+
+            review = next(reviews)
+            self.assertEqual(review['data']['owner']['username'], 'gehel')
+            self.assertEqual(len(lines_read), 1)
+
+            reviews = [review for review in reviews]
+            self.assertEqual(len(reviews), 4)
+
+        # The stats line of the third page is not read because
+        # the previous review was updated before from_date
+        self.assertEqual(len(lines_read), 8)
+
+    @unittest.mock.patch('subprocess.check_output', mock_check_ouput_projects)
+    @unittest.mock.patch('subprocess.Popen', MockPopenProjects)
+    def test_fetch_shard_by_project(self):
+        """Test whether the reviews of each project are fetched"""
+
+        for workers in [1, 2]:
+            gerrit = Gerrit(GERRIT_REPO, user=GERRIT_USER, port=29418, max_reviews=2,
+                            shard_by_project=True, workers=workers)
+            reviews = [review for review in gerrit.fetch(from_date=None)]
+
+            numbers = [review['data']['number'] for review in reviews]
+            self.assertListEqual(numbers, [416443, 415319, 416224, 416224, 415887])
+
+            for review in reviews:
+                self.assertEqual(review['origin'], 'example.org')
+                self.assertEqual(review['category'], CATEGORY_REVIEW)
+
+    @unittest.mock.patch('subprocess.check_output', mock_check_ouput_projects)
+    @unittest.mock.patch('subprocess.Popen', MockPopenProjects)
+    def test_fetch_checkpoint(self):
+        """Test whether the resume points of the projects are stored and used"""
+
+        tmp_path = tempfile.mkdtemp(prefix='perceval_')
+        checkpoint_path = os.path.join(tmp_path, 'checkpoint.json')
+
+        try:
+            gerrit = Gerrit(GERRIT_REPO, user=GERRIT_USER, port=29418, max_reviews=2,
+                            shard_by_project=True, workers=2,
+                            checkpoint_path=checkpoint_path)
+            reviews = [review for review in gerrit.fetch(from_date=None)]
+            self.assertEqual(len(reviews), 5)
+
+            expected = {
+                'mediawiki/core': 1520261099,
+                'operations/puppet': 1520261040
+            }
+            self.assertDictEqual(GerritCheckpoint(checkpoint_path).load(), expected)
+
+            # Nothing was updated since the last fetch
+            reviews = [review for review in gerrit.fetch(from_date=None)]
+            self.assertListEqual(reviews, [])
+
+            # Only the project without a resume point is fetched again
+            with open(checkpoint_path, 'w') as f:
+                json.dump({'projects': {'mediawiki/core': 1520261099}}, f)
+
+            reviews = [review for review in gerrit.fetch(from_date=None)]
+            numbers = [review['data']['number'] for review in reviews]
+            self.assertListEqual(numbers, [416224, 415887])
+            self.assertDictEqual(GerritCheckpoint(checkpoint_path).load(), expected)
+        finally:
+            shutil.rmtree(tmp_path)
+
+    @unittest.mock.patch('subprocess.check_output', mock_check_ouput_projects)
+    @unittest.mock.patch('subprocess.Popen', MockPopenProjects)
+    def test_fetch_checkpoint_interval(self):
+        """Test whether the resume points are saved in batches"""
+
+        tmp_path = tempfile.mkdtemp(prefix='perceval_')
+        checkpoint_path = os.path.join(tmp_path, 'checkpoint.json')
+
+        try:
+            gerrit = Gerrit(GERRIT_REPO, user=GERRIT_USER, port=29418, max_reviews=2,
+                            shard_by_project=True, workers=2,
+                            checkpoint_path=checkpoint_path)
+
+            with unittest.mock.patch.object(GerritCheckpoint, 'save', autospec=True) as mock_save:
+                _ = [review for review in gerrit.fetch(from_date=None)]
+
+            # Both projects are saved at the end
+            self.assertEqual(mock_save.call_count, 1)
+            self.assertDictEqual(mock_save.call_args[0][1],
+                                 {'mediawiki/core': 1520261099, 'operations/puppet': 1520261040})
+
+            with unittest.mock.patch('perceval.backends.core.gerrit.CHECKPOINT_INTERVAL', 1), \
+                    unittest.mock.patch.object(GerritCheckpoint, 'save', autospec=True) as mock_save:
+                _ = [review for review in gerrit.fetch(from_date=None)]
+
+            self.assertEqual(mock_save.call_count, 2)
+            self.assertDictEqual(mock_save.call_args_list[0][0][1], {'mediawiki/core': 1520261099})
+            self.assertDictEqual(mock_save.call_args_list[1][0][1], {'operations/puppet': 1520261040})
+        finally:
+            shutil.rmtree(tmp_path)
+
+    @unittest.mock.patch('subprocess.check_output', mock_check_ouput_projects)
+    @unittest.mock.patch('subprocess.Popen', MockPopenProjects)
+    def test_fetch_checkpoint_interrupted(self):
+        """Test whether the resume points of the finished projects are saved when the fetch stops"""
+
+        tmp_path = tempfile.mkdtemp(prefix='perceval_')
+        checkpoint_path = os.path.join(tmp_path, 'checkpoint.json')
+
+        try:
+            gerrit = Gerrit(GERRIT_REPO, user=GERRIT_USER, port=29418, max_reviews=2,
+                            shard_by_project=True, workers=2,
+                            checkpoint_path=checkpoint_path)
+
+            # The first project has three reviews
+            reviews = gerrit.fetch(from_date=None)
+            _ = [next(reviews) for _ in range(4)]
+            reviews.close()
+
+            expected = {'mediawiki/core': 1520261099}
+            self.assertDictEqual(GerritCheckpoint(checkpoint_path).load(), expected)
+        finally:
+            shutil.rmtree(tmp_path)
+
     def test_parse_reviews(self):
         """Test parse reviews method"""
 
@@ -231,6 +499,19 @@ class TestGerritBackend(unittest.TestCase):
         self.assertEqual(review['owner']['username'], "lucaswerkmeister-wmde")
         self.assertEqual(len(review['patchSets']), 1)
 
+    def test_parse_reviews_lines(self):
+        """Test whether the lines of a reviews list are parsed"""
+
+        raw_reviews = read_file('data/gerrit/gerrit_reviews_page_1')
+        reviews = Gerrit.parse_reviews_lines(raw_reviews.splitlines())
+
+        review = next(reviews)
+        self.assertEqual(review['owner']['username'], 'gehel')
+
+        reviews = [review for review in reviews]
+        self.assertEqual(len(reviews), 1)
+        self.assertEqual(reviews[0]['owner']['username'], "lucaswerkmeister-wmde")
+
 
 class TestGerritBackendArchive(TestCaseBackendArchive):
     """Gerrit backend tests using an archive"""
@@ -246,6 +527,7 @@ class TestGerritBackendArchive(TestCaseBackendArchive):
         shutil.rmtree(self.test_path)
 
     @unittest.mock.patch('subprocess.check_output', mock_check_ouput)
+    @unittest.mock.patch('subprocess.Popen', MockPopen)
     def test_fetch_from_archive(self):
         """Test whether a list of reviews is returned from the archive"""
 
@@ -254,7 +536,54 @@ class TestGerritBackendArchive(TestCaseBackendArchive):
                               archive=self.archive)
         self._test_fetch_from_archive(from_date=None)
 
+    def test_fetch_from_archive_ssh_multiplexing(self):
+        """Test whether reviews fetched over a shared SSH connection are returned from the archive"""
+
+        mock_check_output = MockCheckOutputMultiplexing()
+
+        self.backend_write_archive = Gerrit(GERRIT_REPO, user=GERRIT_USER, port=29418, max_reviews=2,
+                                            archive=self.archive, ssh_multiplexing=True)
+
+        with unittest.mock.patch('subprocess.check_output', mock_check_output), \
+                unittest.mock.patch('subprocess.Popen', mock_check_output.popen):
+            self._test_fetch_from_archive(from_date=None)
+
+    @unittest.mock.patch('subprocess.check_output', mock_check_ouput_projects)
+    @unittest.mock.patch('subprocess.Popen', MockPopenProjects)
+    def test_fetch_shard_by_project_from_archive(self):
+        """Test whether the reviews of each project are returned from the archive"""
+
+        self.backend_write_archive = Gerrit(GERRIT_REPO, user=GERRIT_USER, port=29418, max_reviews=2,
+                                            archive=self.archive, shard_by_project=True, workers=2)
+        self.backend_read_archive = Gerrit(GERRIT_REPO, user="another-user", port=29418, max_reviews=2,
+                                           archive=self.archive, shard_by_project=True, workers=2)
+        self._test_fetch_from_archive(from_date=None)
+
+    @unittest.mock.patch('subprocess.check_output', mock_check_ouput_projects)
+    @unittest.mock.patch('subprocess.Popen', MockPopenProjects)
+    def test_fetch_checkpoint_from_archive(self):
+        """Test whether the resume points are read from the archive"""
+
+        checkpoint_path = os.path.join(self.test_path, 'checkpoint.json')
+
+        with open(checkpoint_path, 'w') as f:
+            json.dump({'projects': {'mediawiki/core': 1520261099}}, f)
+
+        self.backend_write_archive = Gerrit(GERRIT_REPO, user=GERRIT_USER, port=29418, max_reviews=2,
+                                            archive=self.archive, shard_by_project=True,
+                                            checkpoint_path=checkpoint_path)
+        self.backend_read_archive = Gerrit(GERRIT_REPO, user="another-user", port=29418, max_reviews=2,
+                                           archive=self.archive, shard_by_project=True)
+        self._test_fetch_from_archive(from_date=None)
+
+        # The checkpoint is not updated when fetching from the archive
+        os.remove(checkpoint_path)
+        items = [item for item in self.backend_write_archive.fetch_from_archive()]
+        self.assertEqual(len(items), 2)
+        self.assertFalse(os.path.exists(checkpoint_path))
+
     @unittest.mock.patch('subprocess.check_output', mock_check_ouput)
+    @unittest.mock.patch('subprocess.Popen', MockPopen)
     def test_fetch_from_date_from_archive(self):
         """Test whether a list of reviews is returned from archive after a given date"""
 
@@ -265,6 +594,7 @@ class TestGerritBackendArchive(TestCaseBackendArchive):
         self._test_fetch_from_archive(from_date=from_date)
 
     @unittest.mock.patch('subprocess.check_output', mock_check_ouput)
+    @unittest.mock.patch('subprocess.Popen', MockPopen)
     def test_fetch_from_empty_archive(self):
         """Test whether no reviews are returned when the archive is empty"""
 
@@ -289,6 +619,7 @@ class TestGerritClient(unittest.TestCase):
         self.assertEqual(client.port, PORT)
         self.assertFalse(client.from_archive)
         self.assertIsNone(client.archive)
+        self.assertFalse(client.ssh_multiplexing)
 
         client = GerritClient(GERRIT_REPO, GERRIT_USER, port=1000, max_reviews=2, blacklist_reviews=["willy"])
         self.assertEqual(client.repository, GERRIT_REPO)
@@ -332,6 +663,107 @@ class TestGerritClient(unittest.TestCase):
 
         self.assertEqual(result_raw, expected_raw)
 
+    @unittest.mock.patch('subprocess.check_output', mock_check_ouput)
+    @unittest.mock.patch('subprocess.Popen', MockPopen)
+    def test_reviews_lines(self):
+        """Test reviews_lines method"""
+
+        expected = read_file('data/gerrit/gerrit_reviews_page_1').splitlines(keepends=True)
+
+        client = GerritClient(GERRIT_REPO, GERRIT_USER, max_reviews=2)
+        lines = [line for line in client.reviews_lines(0)]
+
+        self.assertListEqual(lines, expected)
+
+    @unittest.mock.patch('subprocess.check_output', mock_check_ouput)
+    def test_reviews_lines_retry(self):
+        """Test whether the query is run again when it fails without output"""
+
+        cmds = []
+
+        def mock_popen(*args, **kwargs):
+            cmds.append(args[0])
+            proc = MockPopen(*args, **kwargs)
+
+            # The first attempt fails
+            if len(cmds) == 1:
+                proc.stdout = io.BytesIO()
+                proc._returncode = 255
+
+            return proc
+
+        expected = read_file('data/gerrit/gerrit_reviews_page_1').splitlines(keepends=True)
+
+        with unittest.mock.patch('subprocess.Popen', mock_popen):
+            client = GerritClient(GERRIT_REPO, GERRIT_USER, max_reviews=2)
+            lines = [line for line in client.reviews_lines(0)]
+
+        self.assertListEqual(lines, expected)
+        self.assertEqual(len(cmds), 2)
+        self.assertEqual(cmds[0], CMD_REVIEWS_1)
+        self.assertEqual(cmds[1], CMD_REVIEWS_1)
+
+    @unittest.mock.patch('subprocess.check_output', mock_check_ouput)
+    def test_reviews_lines_error(self):
+        """Test whether an exception is thrown when the query fails after returning some data"""
+
+        def mock_popen(*args, **kwargs):
+            proc = MockPopen(*args, **kwargs)
+            proc._returncode = 255
+            return proc
+
+        with unittest.mock.patch('subprocess.Popen', mock_popen):
+            client = GerritClient(GERRIT_REPO, GERRIT_USER, max_reviews=2)
+            lines = client.reviews_lines(0)
+
+            _ = next(lines)
+
+            with self.assertRaises(RuntimeError):
+                _ = [line for line in lines]
+
+    @unittest.mock.patch('subprocess.check_output', mock_check_ouput_projects)
+    def test_projects(self):
+        """Test projects method"""
+
+        client = GerritClient(GERRIT_REPO, GERRIT_USER, max_reviews=2)
+        projects = client.projects()
+
+        self.assertListEqual(projects, ['mediawiki/core', 'operations/puppet'])
+
+    @unittest.mock.patch('subprocess.check_output', mock_check_ouput_projects)
+    @unittest.mock.patch('subprocess.Popen', MockPopenProjects)
+    def test_reviews_lines_project(self):
+        """Test whether the reviews of a project are requested"""
+
+        expected = read_file('data/gerrit/gerrit_reviews_page_2').splitlines(keepends=True)
+
+        client = GerritClient(GERRIT_REPO, GERRIT_USER, max_reviews=2)
+        lines = [line for line in client.reviews_lines(0, project='operations/puppet')]
+
+        self.assertListEqual(lines, expected)
+
+    def test_reviews_project_quoted(self):
+        """Test whether project names are quoted in the query command"""
+
+        projects = ['evil;touch /tmp/pwned;echo', 'my project', 'a"b`c$(d)\'e&f']
+
+        for project in projects:
+            with unittest.mock.patch('subprocess.check_output') as mock_check_output:
+                mock_check_output.return_value = b''
+
+                client = GerritClient(GERRIT_REPO, GERRIT_USER, max_reviews=2)
+                client._version = [2, 14]
+                client.reviews(0, project=project)
+
+            cmd = mock_check_output.call_args[0][0]
+            args = shlex.split(cmd)
+
+            # The project term is a single argument of the
+            # remote command and its value is a quoted string
+            query = project.replace('"', '\\"')
+            self.assertEqual(args[args.index('query') + 1], 'project:"%s"' % query)
+            self.assertEqual(args[args.index('query') + 2], 'limit:2')
+
     @unittest.mock.patch('subprocess.check_output', mock_check_ouput_empty_review)
     def test_empty_review(self):
         """Test whether an excepti on is thrown when no data is returned"""
@@ -369,6 +801,60 @@ class TestGerritClient(unittest.TestCase):
         result = client.next_retrieve_group_item(entry={'sortKey': 'asc'})
         self.assertEqual(result, 'asc')
 
+    def test_close(self):
+        """Test whether the shared SSH connection is closed"""
+
+        mock_check_output = MockCheckOutputMultiplexing()
+
+        with unittest.mock.patch('subprocess.check_output', mock_check_output):
+            client = GerritClient(GERRIT_REPO, GERRIT_USER, max_reviews=2, ssh_multiplexing=True)
+            result_raw = client.reviews(0)
+
+            self.assertEqual(result_raw, read_file('data/gerrit/gerrit_reviews_page_1'))
+
+            control_path = mock_check_output.control_paths().pop()
+            self.assertTrue(os.path.exists(os.path.dirname(control_path)))
+
+            client.close()
+
+            self.assertEqual(len(mock_check_output.cmds), 3)
+            self.assertIn(' -O exit ', mock_check_output.cmds[-1])
+            self.assertFalse(os.path.exists(os.path.dirname(control_path)))
+
+            # Nothing is done when the connection is already closed
+            client.close()
+            self.assertEqual(len(mock_check_output.cmds), 3)
+
+    def test_close_no_commands(self):
+        """Test whether the control directory is removed when no command was sent"""
+
+        mock_check_output = MockCheckOutputMultiplexing()
+
+        with unittest.mock.patch('subprocess.check_output', mock_check_output):
+            client = GerritClient(GERRIT_REPO, GERRIT_USER, ssh_multiplexing=True)
+
+            control_dir = client._control_dir
+            self.assertTrue(os.path.isdir(control_dir))
+
+            client.close()
+
+            self.assertListEqual(mock_check_output.cmds, [])
+            self.assertFalse(os.path.exists(control_dir))
+
+            # Next commands do not use the shared connection
+            _ = client.version
+            self.assertEqual(len(mock_check_output.cmds), 1)
+            self.assertNotIn('ControlMaster', mock_check_output.cmds[0])
+
+    def test_close_no_multiplexing(self):
+        """Test whether nothing is run on close when the connection is not shared"""
+
+        with unittest.mock.patch('subprocess.check_output') as mock_check_output:
+            client = GerritClient(GERRIT_REPO, GERRIT_USER)
+            client.close()
+
+            mock_check_output.assert_not_called()
+
     def test_sanitize_for_archive(self):
         """Test whether the sanitize method works properly"""
 
@@ -378,6 +864,45 @@ class TestGerritClient(unittest.TestCase):
         self.assertEqual("ssh -p 29418 xxxxx@example.org gerrit version", sanitized_cmd)
 
 
+class TestGerritCheckpoint(unittest.TestCase):
+    """GerritCheckpoint tests"""
+
+    def setUp(self):
+        self.tmp_path = tempfile.mkdtemp(prefix='perceval_')
+        self.path = os.path.join(self.tmp_path, 'checkpoint.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path)
+
+    def test_save_load(self):
+        """Test whether the resume points are saved and loaded"""
+
+        checkpoint = GerritCheckpoint(self.path)
+        self.assertDictEqual(checkpoint.load(), {})
+
+        checkpoint.save({'mediawiki/core': 1520261099})
+        checkpoint.save({'operations/puppet': 1520261040})
+        checkpoint.save({'mediawiki/core': 1520262000})
+
+        expected = {
+            'mediawiki/core': 1520262000,
+            'operations/puppet': 1520261040
+        }
+        self.assertDictEqual(checkpoint.load(), expected)
+        self.assertFalse(os.path.exists(self.path + '.tmp'))
+
+    def test_invalid_checkpoint(self):
+        """Test whether an invalid checkpoint is ignored"""
+
+        with open(self.path, 'w') as f:
+            f.write('{"projects": ')
+
+        checkpoint = GerritCheckpoint(self.path)
+
+        with self.assertLogs('perceval.backends.core.gerrit', level='WARNING'):
+            self.assertDictEqual(checkpoint.load(), {})
+
+
 class TestGerritCommand(unittest.TestCase):
     """GerritCommand unit tests"""
 
@@ -398,6 +923,10 @@ class TestGerritCommand(unittest.TestCase):
                 '--blacklist-reviews', '',
                 '--disable-host-key-check',
                 '--ssh-port', '1000',
+                '--ssh-multiplexing',
+                '--shard-by-project',
+                '--workers', '4',
+                '--checkpoint-path', '/tmp/checkpoint.json',
                 '--tag', 'test', '--no-archive']
 
         parsed_args = parser.parse(*args)
@@ -408,6 +937,10 @@ class TestGerritCommand(unittest.TestCase):
         self.assertEqual(parsed_args.from_date, DEFAULT_DATETIME)
         self.assertEqual(parsed_args.no_archive, True)
         self.assertEqual(parsed_args.port, 1000)
+        self.assertEqual(parsed_args.ssh_multiplexing, True)
+        self.assertEqual(parsed_args.shard_by_project, True)
+        self.assertEqual(parsed_args.workers, 4)
+        self.assertEqual(parsed_args.checkpoint_path, '/tmp/checkpoint.json')
 
 
 if __name__ == "__main__":
@@ -35,12 +35,14 @@ import pkg_resources
 pkg_resources.declare_namespace('perceval.backends')
 
 from perceval.backend import BackendCommandArgumentParser, uuid
-from perceval.errors import RepositoryError
+from perceval.errors import ParseError, RepositoryError
 from perceval.utils import DEFAULT_DATETIME, DEFAULT_LAST_DATETIME
 from perceval.backends.core.git import (EmptyRepositoryError,
                                         Git,
+                                        GitCheckpoint,
                                         GitCommand,
                                         GitParser,
+                                        GitRef,
                                         GitRepository)
 
 
@@ -613,6 +615,121 @@ class TestGitBackend(TestCaseGit):
             self.assertEqual(commit['category'], 'commit')
             self.assertEqual(commit['tag'], 'http://example.com.git')
 
+    def test_fetch_from_file_parallel(self):
+        """Test whether commits are fetched in order when the log is parsed in parallel"""
+
+        git = Git('http://example.com.git', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data/git/git_log.txt'))
+        expected = [commit for commit in git.fetch()]
+
+        with unittest.mock.patch.object(GitParser, 'CHUNK_SIZE', 3):
+            git = Git('http://example.com.git',
+                      os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data/git/git_log.txt'))
+            commits = [commit for commit in git.fetch(workers=2)]
+
+        self.assertEqual(len(commits), 10)
+
+        for x in range(len(commits)):
+            self.assertEqual(commits[x]['uuid'], expected[x]['uuid'])
+            self.assertDictEqual(commits[x]['data'], expected[x]['data'])
+
+    def test_fetch_checkpoint(self):
+        """Test whether only the commits added since the checkpoint are fetched"""
+
+        origin_path = os.path.join(self.tmp_repo_path, 'gittest')
+        editable_path = os.path.join(self.tmp_path, 'editgit')
+        new_path = os.path.join(self.tmp_path, 'newgit')
+        new_file = os.path.join(editable_path, 'newfile')
+
+        shutil.copytree(origin_path, editable_path)
+
+        git = Git(editable_path, new_path)
+        commits = [commit for commit in git.fetch(checkpoint=True)]
+        self.assertEqual(len(commits), 9)
+
+        checkpoint = GitCheckpoint(new_path)
+        self.assertListEqual(checkpoint.load(),
+                             ['456a68ee1407a77f3e804a30dff245bb6c6b872f',
+                              '51a3b654f252210572297f47597b31527c475fb8'])
+
+        # Nothing changed, so no commits are fetched
+        commits = [commit for commit in git.fetch(checkpoint=True)]
+        self.assertEqual(len(commits), 0)
+
+        # Create a new commit on a new branch
+        cmd = ['git', 'checkout', '-b', 'mybranch']
+        subprocess.check_output(cmd, stderr=subprocess.STDOUT,
+                                cwd=editable_path, env={'LANG': 'C'})
+
+        with open(new_file, 'w') as f:
+            f.write("Testing checkpoint")
+
+        cmd = ['git', 'add', new_file]
+        subprocess.check_output(cmd, stderr=subprocess.STDOUT,
+                                cwd=editable_path, env={'LANG': 'C'})
+
+        cmd = ['git', '-c', 'user.name="mock"',
+               '-c', 'user.email="mock@example.com"',
+               'commit', '-m', 'Testing checkpoint']
+        subprocess.check_output(cmd, stderr=subprocess.STDOUT,
+                                cwd=editable_path, env={'LANG': 'C'})
+
+        commits = [commit for commit in git.fetch(checkpoint=True)]
+        self.assertEqual(len(commits), 1)
+        self.assertEqual(commits[0]['data']['message'], 'Testing checkpoint')
+        self.assertEqual(len(checkpoint.load()), 3)
+
+        # Removing the branch does not fetch any commit
+        cmd = ['git', 'checkout', 'master']
+        subprocess.check_output(cmd, stderr=subprocess.STDOUT,
+                                cwd=editable_path, env={'LANG': 'C'})
+        cmd = ['git', 'branch', '-D', 'mybranch']
+        subprocess.check_output(cmd, stderr=subprocess.STDOUT,
+                                cwd=editable_path, env={'LANG': 'C'})
+
+        commits = [commit for commit in git.fetch(checkpoint=True)]
+        self.assertEqual(len(commits), 0)
+
+        # Without checkpoint, all commits are fetched
+        commits = [commit for commit in git.fetch()]
+        self.assertEqual(len(commits), 9)
+
+        # Cleanup
+        shutil.rmtree(editable_path)
+        shutil.rmtree(new_path)
+
+    def test_fetch_checkpoint_to_date(self):
+        """Test whether the checkpoint is not updated when to_date is set"""
+
+        new_path = os.path.join(self.tmp_path, 'newgit')
+
+        to_date = datetime.datetime(2014, 2, 11, 22, 7, 49)
+
+        git = Git(self.git_path, new_path)
+        commits = [commit for commit in git.fetch(to_date=to_date, checkpoint=True)]
+        self.assertEqual(len(commits), 6)
+
+        checkpoint = GitCheckpoint(new_path)
+        self.assertListEqual(checkpoint.load(), [])
+
+        commits = [commit for commit in git.fetch(checkpoint=True)]
+        self.assertEqual(len(commits), 9)
+
+        commits = [commit for commit in git.fetch(checkpoint=True)]
+        self.assertEqual(len(commits), 0)
+
+        shutil.rmtree(new_path)
+
+    def test_fetch_checkpoint_from_empty_repository(self):
+        """Test whether it fetches no items from an empty repository using a checkpoint"""
+
+        new_path = os.path.join(self.tmp_path, 'newgit')
+
+        git = Git(self.git_empty_path, new_path)
+        commits = [commit for commit in git.fetch(checkpoint=True)]
+        self.assertListEqual(commits, [])
+
+        shutil.rmtree(new_path)
+
     def test_git_parser(self):
         """Test if the static method parses a git log file"""
 
@@ -758,6 +875,22 @@ class TestGitCommand(TestCaseGit):
         self.assertEqual(parsed_args.git_path, '/tmp/gitpath')
         self.assertEqual(parsed_args.uri, 'http://example.com/')
         self.assertEqual(parsed_args.branches, ['master', 'testing'])
+        self.assertEqual(parsed_args.workers, 1)
+
+        args = ['http://example.com/',
+                '--git-path', '/tmp/gitpath',
+                '--workers', '4']
+
+        parsed_args = parser.parse(*args)
+        self.assertEqual(parsed_args.workers, 4)
+        self.assertEqual(parsed_args.checkpoint, False)
+
+        args = ['http://example.com/',
+                '--git-path', '/tmp/gitpath',
+                '--checkpoint']
+
+        parsed_args = parser.parse(*args)
+        self.assertEqual(parsed_args.checkpoint, True)
 
 
 class TestGitParser(TestCaseGit):
@@ -969,6 +1102,55 @@ class TestGitParser(TestCaseGit):
 
         self.assertDictEqual(commits[0], expected)
 
+    def test_parser_parallel(self):
+        """Test if a log parsed in parallel returns the same commits"""
+
+        for filename in ['git_log.txt', 'git_log_merge.txt', 'git_log_trailers.txt',
+                         'git_bad_encoding.txt', 'git_bad_cr.txt']:
+            filepath = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data/git', filename)
+
+            with open(filepath, 'r', errors='surrogateescape', newline=os.linesep) as f:
+                parser = GitParser(f)
+                expected = [commit for commit in parser.parse()]
+
+            for chunk_size in [1, 2, 4]:
+                with open(filepath, 'r', errors='surrogateescape', newline=os.linesep) as f:
+                    parser = GitParser(f, workers=2, chunk_size=chunk_size, max_chunks=2)
+                    commits = [commit for commit in parser.parse()]
+
+                self.assertListEqual(commits, expected)
+
+    def test_parser_parallel_empty_log(self):
+        """Test if an empty log is parsed in parallel"""
+
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "data/git/git_log_empty.txt"), 'r') as f:
+            parser = GitParser(f, workers=2)
+            commits = [commit for commit in parser.parse()]
+
+        self.assertListEqual(commits, [])
+
+    def test_parser_parallel_error(self):
+        """Test if parsing errors are raised in order when the log is parsed in parallel"""
+
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "data/git/git_log.txt"), 'r') as f:
+            lines = [line for line in f]
+
+        # Break the header of the fourth commit
+        nline = [i for i, line in enumerate(lines) if line.startswith('commit ')][3] + 1
+        lines[nline] = 'Invalid header\n'
+
+        parser = GitParser(iter(lines), workers=2, chunk_size=2)
+        commits = []
+
+        with self.assertRaisesRegex(ParseError, "invalid header format on line %s" % (nline + 1)):
+            for commit in parser.parse():
+                commits.append(commit['commit'])
+
+        self.assertListEqual(commits,
+                             ['456a68ee1407a77f3e804a30dff245bb6c6b872f',
+                              '51a3b654f252210572297f47597b31527c475fb8',
+                              'ce8e0b86a1e9877f42fe9453ede418519115f367'])
+
     def test_parser_empty_log(self):
         """Test if it parsers an empty git log stream"""
 
@@ -1541,6 +1723,62 @@ class TestGitRepository(TestCaseGit):
 
         shutil.rmtree(new_path)
 
+    def test_log_exclude(self):
+        """Test if commits reachable from the excluded ones are not returned"""
+
+        new_path = os.path.join(self.tmp_path, 'newgit')
+
+        repo = GitRepository.clone(self.git_path, new_path)
+        gitlog = repo.log(exclude=['589bb080f059834829a2a5955bebfd7c2baa110a'])
+        gitlog = [line for line in gitlog]
+
+        self.assertEqual(len(gitlog), 36)
+        self.assertEqual(gitlog[0][:14], "commit ce8e0b8")
+
+        # Unknown hashes are ignored
+        gitlog = repo.log(exclude=['0' * 40])
+        gitlog = [line for line in gitlog]
+        self.assertEqual(len(gitlog), 108)
+
+        gitlog = repo.log(exclude=['456a68ee1407a77f3e804a30dff245bb6c6b872f',
+                                   '51a3b654f252210572297f47597b31527c475fb8'])
+        gitlog = [line for line in gitlog]
+        self.assertListEqual(gitlog, [])
+
+        shutil.rmtree(new_path)
+
+    def test_tips(self):
+        """Test if it returns the references where the log starts"""
+
+        new_path = os.path.join(self.tmp_path, 'newgit')
+
+        repo = GitRepository.clone(self.git_path, new_path)
+
+        tips = repo.tips()
+        expected = [GitRef('51a3b654f252210572297f47597b31527c475fb8', 'refs/heads/lzp'),
+                    GitRef('456a68ee1407a77f3e804a30dff245bb6c6b872f', 'refs/heads/master')]
+        self.assertListEqual(tips, expected)
+
+        tips = repo.tips(branches=['master'])
+        self.assertListEqual(tips, expected[1:])
+
+        tips = repo.tips(branches=[])
+        self.assertListEqual(tips, [])
+
+        shutil.rmtree(new_path)
+
+    def test_tips_from_empty_repository(self):
+        """Test if an exception is raised when the repository is empty"""
+
+        new_path = os.path.join(self.tmp_path, 'newgit')
+
+        repo = GitRepository.clone(self.git_empty_path, new_path)
+
+        with self.assertRaises(EmptyRepositoryError):
+            repo.tips()
+
+        shutil.rmtree(new_path)
+
     def test_log_from_empty_repository(self):
         """Test if an exception is raised when the repository is empty"""
 
@@ -1603,5 +1841,51 @@ class TestGitRepository(TestCaseGit):
         shutil.rmtree(new_path)
 
 
+class TestGitCheckpoint(unittest.TestCase):
+    """GitCheckpoint tests"""
+
+    def setUp(self):
+        self.tmp_path = tempfile.mkdtemp(prefix='perceval_')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path)
+
+    def test_load_empty(self):
+        """Test whether no tips are loaded when there is no checkpoint"""
+
+        checkpoint = GitCheckpoint(self.tmp_path)
+        self.assertEqual(checkpoint.path,
+                         os.path.join(self.tmp_path, 'perceval-checkpoint.json'))
+        self.assertListEqual(checkpoint.load(), [])
+
+    def test_save(self):
+        """Test whether tips are saved and merged with the previous ones"""
+
+        checkpoint = GitCheckpoint(self.tmp_path)
+        checkpoint.save([GitRef('a' * 40, 'refs/heads/master'),
+                         GitRef('b' * 40, 'refs/heads/lzp')])
+
+        self.assertListEqual(checkpoint.load(), ['a' * 40, 'b' * 40])
+
+        checkpoint.save([GitRef('c' * 40, 'refs/heads/master'),
+                         GitRef('b' * 40, 'refs/tags/v1')])
+
+        checkpoint = GitCheckpoint(self.tmp_path)
+        self.assertListEqual(checkpoint.load(), ['b' * 40, 'c' * 40])
+        self.assertFalse(os.path.exists(checkpoint.path + '.tmp'))
+
+    def test_load_invalid(self):
+        """Test whether invalid checkpoints are ignored"""
+
+        checkpoint = GitCheckpoint(self.tmp_path)
+
+        for content in ['{"tips": ', '[]', '{"refs": {}}']:
+            with open(checkpoint.path, 'w') as f:
+                f.write(content)
+
+            with self.assertLogs(logger='perceval.backends.core.git', level='WARNING'):
+                self.assertListEqual(checkpoint.load(), [])
+
+
 if __name__ == "__main__":
     unittest.main()
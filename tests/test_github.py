@@ -22,10 +22,16 @@
 #
 
 import datetime
+import json
 import os
+import random
+import shutil
+import tempfile
 import time
 import unittest
+import unittest.mock
 
+import dateutil.tz
 import httpretty
 import pkg_resources
 import requests
@@ -33,9 +39,14 @@ import requests
 pkg_resources.declare_namespace('perceval.backends')
 
 from grimoirelab.toolkit.datetime import datetime_utcnow
+from perceval.archive import Archive
 from perceval.backend import BackendCommandArgumentParser
+from perceval.cache import (DEFAULT_MAX_SIZE,
+                            DEFAULT_TTL,
+                            MemoryCache,
+                            SQLiteCache)
 from perceval.client import RateLimitHandler
-from perceval.errors import RateLimitError
+from perceval.errors import ArchiveError, BackendError, RateLimitError
 from perceval.utils import DEFAULT_DATETIME
 from perceval.backends.core.github import (GitHub,
                                            GitHubCommand,
@@ -64,6 +75,7 @@ GITHUB_PULL_REQUEST_2_REQUESTED_REVIEWERS_URL = GITHUB_PULL_REQUEST_2_URL + "/re
 GITHUB_USER_URL = GITHUB_API_URL + "/users/zhquan_example"
 GITHUB_ORGS_URL = GITHUB_API_URL + "/users/zhquan_example/orgs"
 GITHUB_COMMAND_URL = GITHUB_API_URL + "/command"
+GITHUB_GRAPHQL_URL = GITHUB_API_URL + "/graphql"
 
 GITHUB_ENTERPRISE_URL = "https://example.com"
 GITHUB_ENTERPRISE_API_URL = "https://example.com/api/v3"
@@ -112,6 +124,10 @@ class TestGitHubBackend(unittest.TestCase):
         self.assertEqual(github.repository, 'repo')
         self.assertEqual(github.origin, 'https://github.com/zhquan_example/repo')
         self.assertEqual(github.tag, 'test')
+        self.assertEqual(github.workers, 1)
+        self.assertIsNone(github.user_cache)
+        self.assertIsNone(github.http_cache)
+        self.assertFalse(github.graphql)
 
         self.assertEqual(github.categories, [CATEGORY_ISSUE, CATEGORY_PULL_REQUEST])
 
@@ -315,6 +331,181 @@ class TestGitHubBackend(unittest.TestCase):
         self.assertEqual(len(pull['data']['review_comments_data'][1]['reactions_data']), 5)
         self.assertEqual(pull['data']['review_comments_data'][1]['reactions_data'][0]['content'], 'heart')
 
+    @httpretty.activate
+    def test_fetch_issues_graphql(self):
+        """Test whether a list of issues is returned using GraphQL queries"""
+
+        body = read_file('data/github/github_graphql_issues')
+        login = read_file('data/github/github_login')
+        orgs = read_file('data/github/github_orgs')
+        rate_limit = read_file('data/github/rate_limit')
+
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_RATE_LIMIT,
+                               body=rate_limit,
+                               status=200,
+                               forcing_headers={
+                                   'X-RateLimit-Remaining': '20',
+                                   'X-RateLimit-Reset': '15'
+                               })
+        httpretty.register_uri(httpretty.POST,
+                               GITHUB_GRAPHQL_URL,
+                               body=body,
+                               status=200,
+                               forcing_headers={
+                                   'X-RateLimit-Remaining': '20',
+                                   'X-RateLimit-Reset': '15'
+                               })
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_USER_URL,
+                               body=login, status=200,
+                               forcing_headers={
+                                   'X-RateLimit-Remaining': '20',
+                                   'X-RateLimit-Reset': '15'
+                               })
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_ORGS_URL,
+                               body=orgs, status=200,
+                               forcing_headers={
+                                   'X-RateLimit-Remaining': '20',
+                                   'X-RateLimit-Reset': '15'
+                               })
+
+        github = GitHub("zhquan_example", "repo", "aaa", graphql=True)
+        issues = [issues for issues in github.fetch(from_date=None)]
+
+        self.assertEqual(len(issues), 2)
+
+        issue = issues[0]
+        self.assertEqual(issue['origin'], 'https://github.com/zhquan_example/repo')
+        self.assertEqual(issue['uuid'], '58c073fd2a388c44043b9cc197c73c5c540270ac')
+        self.assertEqual(issue['updated_on'], 1454328801.0)
+        self.assertEqual(issue['category'], CATEGORY_ISSUE)
+        self.assertEqual(issue['data']['url'], GITHUB_ISSUES_URL + '/1')
+        self.assertEqual(issue['data']['state'], 'closed')
+        self.assertEqual(issue['data']['user']['login'], 'zhquan_example')
+        self.assertEqual(issue['data']['labels'][0]['name'], 'bug')
+        self.assertEqual(issue['data']['comments'], 1)
+        self.assertEqual(issue['data']['reactions']['total_count'], 0)
+        self.assertNotIn('pull_request', issue['data'])
+        self.assertEqual(issue['data']['user_data']['login'], 'zhquan_example')
+        self.assertEqual(issue['data']['assignee_data']['login'], 'zhquan_example')
+        self.assertEqual(len(issue['data']['assignees_data']), 1)
+        self.assertEqual(len(issue['data']['comments_data']), 1)
+        self.assertEqual(issue['data']['reactions_data'], [])
+
+        comment = issue['data']['comments_data'][0]
+        self.assertEqual(comment['id'], 1)
+        self.assertEqual(comment['issue_url'], GITHUB_ISSUES_URL + '/1')
+        self.assertEqual(comment['user_data']['login'], 'zhquan_example')
+        self.assertEqual(comment['reactions']['total_count'], 1)
+        self.assertEqual(comment['reactions']['heart'], 1)
+        self.assertEqual(len(comment['reactions_data']), 1)
+        self.assertEqual(comment['reactions_data'][0]['content'], 'heart')
+        self.assertEqual(comment['reactions_data'][0]['user_data']['login'], 'zhquan_example')
+
+        issue = issues[1]
+        self.assertEqual(issue['category'], CATEGORY_ISSUE)
+        self.assertEqual(issue['data']['state'], 'closed')
+        self.assertEqual(issue['data']['pull_request']['url'], GITHUB_PULL_REQUEST_URL + '/2')
+        self.assertIsNone(issue['data']['assignee'])
+        self.assertEqual(issue['data']['assignee_data'], {})
+        self.assertEqual(issue['data']['comments_data'], [])
+        self.assertEqual(issue['data']['reactions']['+1'], 2)
+        self.assertEqual(len(issue['data']['reactions_data']), 2)
+        self.assertEqual(issue['data']['reactions_data'][0]['content'], '+1')
+        self.assertEqual(issue['data']['reactions_data'][1]['user_data'], {})
+
+        request = httpretty.last_request()
+        self.assertEqual(request.method, 'POST')
+
+        variables = json.loads(request.body.decode('utf-8'))['variables']
+        self.assertEqual(variables['search'],
+                         'repo:zhquan_example/repo sort:updated-asc updated:>=1970-01-01T00:00:00Z')
+
+    @httpretty.activate
+    def test_fetch_pulls_graphql(self):
+        """Test whether a list of pull requests is returned using GraphQL queries"""
+
+        body = read_file('data/github/github_graphql_pulls')
+        login = read_file('data/github/github_login')
+        orgs = read_file('data/github/github_orgs')
+        pull_comment_2_reactions = read_file('data/github/github_request_pull_request_1_comment_2_reactions')
+        rate_limit = read_file('data/github/rate_limit')
+
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_RATE_LIMIT,
+                               body=rate_limit,
+                               status=200,
+                               forcing_headers={
+                                   'X-RateLimit-Remaining': '20',
+                                   'X-RateLimit-Reset': '15'
+                               })
+        httpretty.register_uri(httpretty.POST,
+                               GITHUB_GRAPHQL_URL,
+                               body=body,
+                               status=200,
+                               forcing_headers={
+                                   'X-RateLimit-Remaining': '20',
+                                   'X-RateLimit-Reset': '15'
+                               })
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_PULL_REQUEST_1_COMMENTS_2_REACTIONS,
+                               body=pull_comment_2_reactions,
+                               status=200,
+                               forcing_headers={
+                                   'X-RateLimit-Remaining': '20',
+                                   'X-RateLimit-Reset': '15'
+                               })
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_USER_URL,
+                               body=login, status=200,
+                               forcing_headers={
+                                   'X-RateLimit-Remaining': '20',
+                                   'X-RateLimit-Reset': '15'
+                               })
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_ORGS_URL,
+                               body=orgs, status=200,
+                               forcing_headers={
+                                   'X-RateLimit-Remaining': '20',
+                                   'X-RateLimit-Reset': '15'
+                               })
+
+        github = GitHub("zhquan_example", "repo", "aaa", graphql=True)
+        pulls = [pulls for pulls in github.fetch(category=CATEGORY_PULL_REQUEST, from_date=None)]
+
+        self.assertEqual(len(pulls), 1)
+
+        pull = pulls[0]
+        self.assertEqual(pull['origin'], 'https://github.com/zhquan_example/repo')
+        self.assertEqual(pull['uuid'], '58c073fd2a388c44043b9cc197c73c5c540270ac')
+        self.assertEqual(pull['updated_on'], 1451929343.0)
+        self.assertEqual(pull['category'], CATEGORY_PULL_REQUEST)
+        self.assertEqual(pull['data']['url'], GITHUB_PULL_REQUEST_1_URL)
+        self.assertEqual(pull['data']['state'], 'closed')
+        self.assertEqual(pull['data']['merged'], True)
+        self.assertIsNone(pull['data']['mergeable'])
+        self.assertEqual(pull['data']['base']['label'], 'zhquan_example:master')
+        self.assertEqual(pull['data']['head']['sha'], '53b970ee04bbc435842c14a2cbfdd623faf74a65')
+        self.assertEqual(pull['data']['review_comments'], 2)
+        self.assertEqual(pull['data']['merged_by_data']['login'], 'zhquan_example')
+        self.assertEqual(len(pull['data']['requested_reviewers_data']), 1)
+        self.assertEqual(pull['data']['requested_reviewers_data'][0]['login'], 'zhquan_example')
+
+        # Comments are sorted by update date; the reactions of the
+        # first one are not complete, so they are fetched again
+        comments = pull['data']['review_comments_data']
+        self.assertEqual(len(comments), 2)
+        self.assertEqual(comments[0]['id'], 2)
+        self.assertEqual(comments[0]['in_reply_to_id'], 1)
+        self.assertEqual(len(comments[0]['reactions_data']), 5)
+        self.assertEqual(comments[0]['reactions_data'][0]['content'], 'heart')
+        self.assertEqual(comments[1]['id'], 1)
+        self.assertEqual(comments[1]['pull_request_review_id'], 10)
+        self.assertEqual(comments[1]['user_data']['login'], 'zhquan_example')
+        self.assertEqual(len(comments[1]['reactions_data']), 0)
+
     @httpretty.activate
     def test_fetch_more_issues(self):
         """Test when return two issues"""
@@ -439,6 +630,139 @@ class TestGitHubBackend(unittest.TestCase):
         self.assertEqual(issue['data']['comments_data'][0]['reactions']['total_count'],
                          len(issue['data']['comments_data'][0]['reactions_data']))
 
+    @httpretty.activate
+    def test_fetch_issues_workers(self):
+        """Test whether issues are fetched in order using several workers"""
+
+        login = read_file('data/github/github_login')
+        orgs = read_file('data/github/github_orgs')
+        issue_1 = read_file('data/github/github_issue_1')
+        issue_2 = read_file('data/github/github_issue_2')
+        issue_2_reactions = read_file('data/github/github_issue_2_reactions')
+        issue_1_comments = read_file('data/github/github_issue_comments_1')
+        issue_2_comments = read_file('data/github/github_issue_comments_2')
+        issue_comment_1_reactions = read_file('data/github/github_issue_comment_1_reactions')
+        issue_comment_2_reactions = read_file('data/github/github_empty_request')
+        rate_limit = read_file('data/github/rate_limit')
+
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_RATE_LIMIT,
+                               body=rate_limit,
+                               status=200,
+                               forcing_headers={
+                                   'X-RateLimit-Remaining': '20',
+                                   'X-RateLimit-Reset': '15'
+                               })
+
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_ISSUES_URL,
+                               body=issue_1,
+                               status=200,
+                               forcing_headers={
+                                   'X-RateLimit-Remaining': '20',
+                                   'X-RateLimit-Reset': '5',
+                                   'Link': '<' + GITHUB_ISSUES_URL + '/?&page=2>; rel="next", <' +
+                                           GITHUB_ISSUES_URL + '/?&page=3>; rel="last"'
+                               })
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_ISSUE_1_COMMENTS_URL,
+                               body=issue_1_comments, status=200,
+                               forcing_headers={
+                                   'X-RateLimit-Remaining': '20',
+                                   'X-RateLimit-Reset': '15'
+                               })
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_ISSUE_COMMENT_1_REACTION_URL,
+                               body=issue_comment_1_reactions, status=200,
+                               forcing_headers={
+                                   'X-RateLimit-Remaining': '20',
+                                   'X-RateLimit-Reset': '15'
+                               })
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_ISSUES_URL + '/?&page=2',
+                               body=issue_2,
+                               status=200,
+                               forcing_headers={
+                                   'X-RateLimit-Remaining': '20',
+                                   'X-RateLimit-Reset': '5'
+                               })
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_ISSUE_2_REACTION_URL,
+                               body=issue_2_reactions, status=200,
+                               forcing_headers={
+                                   'X-RateLimit-Remaining': '20',
+                                   'X-RateLimit-Reset': '15'
+                               })
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_ISSUE_2_COMMENTS_URL,
+                               body=issue_2_comments, status=200,
+                               forcing_headers={
+                                   'X-RateLimit-Remaining': '20',
+                                   'X-RateLimit-Reset': '15'
+                               })
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_ISSUE_COMMENT_2_REACTION_URL,
+                               body=issue_comment_2_reactions, status=200,
+                               forcing_headers={
+                                   'X-RateLimit-Remaining': '20',
+                                   'X-RateLimit-Reset': '15'
+                               })
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_USER_URL,
+                               body=login, status=200,
+                               forcing_headers={
+                                   'X-RateLimit-Remaining': '20',
+                                   'X-RateLimit-Reset': '5'
+                               })
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_ORGS_URL,
+                               body=orgs, status=200,
+                               forcing_headers={
+                                   'X-RateLimit-Remaining': '20',
+                                   'X-RateLimit-Reset': '5'
+                               })
+
+        github = GitHub("zhquan_example", "repo", "aaa")
+        expected = [issue for issue in github.fetch()]
+
+        github = GitHub("zhquan_example", "repo", "aaa", workers=4)
+        issues = [issue for issue in github.fetch()]
+
+        self.assertEqual(len(issues), 2)
+
+        for x in range(len(issues)):
+            self.assertEqual(issues[x]['uuid'], expected[x]['uuid'])
+            self.assertDictEqual(issues[x]['data'], expected[x]['data'])
+
+    def test_enrich_keeps_order(self):
+        """Test whether items enriched by several workers are returned in order"""
+
+        def enrich(item):
+            time.sleep(random.random() / 100)
+            return item * 2
+
+        github = GitHub("zhquan_example", "repo", "aaa", workers=4)
+        items = [item for item in github._GitHub__enrich(iter(range(50)), enrich)]
+
+        self.assertListEqual(items, [x * 2 for x in range(50)])
+
+    def test_enrich_error(self):
+        """Test whether an error enriching an item is raised in order"""
+
+        def enrich(item):
+            if item == 5:
+                raise RateLimitError(cause="Rate limit exhausted.", seconds_to_reset=10)
+            return item
+
+        github = GitHub("zhquan_example", "repo", "aaa", workers=4)
+        items = []
+
+        with self.assertRaises(RateLimitError):
+            for item in github._GitHub__enrich(iter(range(50)), enrich):
+                items.append(item)
+
+        self.assertListEqual(items, [0, 1, 2, 3, 4])
+
     @httpretty.activate
     def test_fetch_more_pulls(self):
         """Test when return two pulls"""
@@ -1112,7 +1436,7 @@ class TestGitHubBackend(unittest.TestCase):
                                })
 
         # Check that 404 exception getting user orgs is managed
-        GitHubClient._users_orgs.clear()  # clean cache to get orgs using the API
+        GitHubClient._users_cache.clear()  # clean cache to get orgs using the API
         httpretty.register_uri(httpretty.GET,
                                GITHUB_ORGS_URL,
                                body=orgs, status=404,
@@ -1124,7 +1448,7 @@ class TestGitHubBackend(unittest.TestCase):
         _ = [issues for issues in github.fetch()]
 
         # Check that a no 402 exception getting user orgs is raised
-        GitHubClient._users_orgs.clear()
+        GitHubClient._users_cache.clear()
         httpretty.register_uri(httpretty.GET,
                                GITHUB_ORGS_URL,
                                body=orgs, status=402,
@@ -1241,6 +1565,60 @@ class TestGitHubBackendArchive(TestCaseBackendArchive):
 
         self._test_fetch_from_archive(from_date=None)
 
+    @httpretty.activate
+    def test_fetch_issues_from_archive_workers(self):
+        """Test whether issues fetched by several workers are returned from archive"""
+
+        issue_1 = read_file('data/github/github_issue_1')
+        issue_2 = read_file('data/github/github_issue_2')
+        login = read_file('data/github/github_login')
+        orgs = read_file('data/github/github_orgs')
+        issue_1_comments = read_file('data/github/github_issue_comments_1')
+        issue_2_comments = read_file('data/github/github_issue_comments_2')
+        issue_2_reactions = read_file('data/github/github_issue_2_reactions')
+        issue_comment_1_reactions = read_file('data/github/github_issue_comment_1_reactions')
+        issue_comment_2_reactions = read_file('data/github/github_empty_request')
+        rate_limit = read_file('data/github/rate_limit')
+
+        headers = {
+            'X-RateLimit-Remaining': '20',
+            'X-RateLimit-Reset': '15'
+        }
+        pagination = {
+            'X-RateLimit-Remaining': '20',
+            'X-RateLimit-Reset': '5',
+            'Link': '<' + GITHUB_ISSUES_URL + '/?&page=2>; rel="next", <' +
+                    GITHUB_ISSUES_URL + '/?&page=3>; rel="last"'
+        }
+
+        httpretty.register_uri(httpretty.GET, GITHUB_RATE_LIMIT,
+                               body=rate_limit, status=200, forcing_headers=headers)
+        httpretty.register_uri(httpretty.GET, GITHUB_ISSUES_URL,
+                               body=issue_1, status=200, forcing_headers=pagination)
+        httpretty.register_uri(httpretty.GET, GITHUB_ISSUES_URL + '/?&page=2',
+                               body=issue_2, status=200, forcing_headers=headers)
+        httpretty.register_uri(httpretty.GET, GITHUB_ISSUE_COMMENT_1_REACTION_URL,
+                               body=issue_comment_1_reactions, status=200, forcing_headers=headers)
+        httpretty.register_uri(httpretty.GET, GITHUB_ISSUE_COMMENT_2_REACTION_URL,
+                               body=issue_comment_2_reactions, status=200, forcing_headers=headers)
+        httpretty.register_uri(httpretty.GET, GITHUB_ISSUE_2_REACTION_URL,
+                               body=issue_2_reactions, status=200, forcing_headers=headers)
+        httpretty.register_uri(httpretty.GET, GITHUB_ISSUE_1_COMMENTS_URL,
+                               body=issue_1_comments, status=200, forcing_headers=headers)
+        httpretty.register_uri(httpretty.GET, GITHUB_ISSUE_2_COMMENTS_URL,
+                               body=issue_2_comments, status=200, forcing_headers=headers)
+        httpretty.register_uri(httpretty.GET, GITHUB_USER_URL,
+                               body=login, status=200, forcing_headers=headers)
+        httpretty.register_uri(httpretty.GET, GITHUB_ORGS_URL,
+                               body=orgs, status=200, forcing_headers=headers)
+
+        self.backend_write_archive = GitHub("zhquan_example", "repo", "aaa",
+                                            archive=self.archive, workers=4)
+        self.backend_read_archive = GitHub("zhquan_example", "repo", "aaa",
+                                           archive=self.archive, workers=4)
+
+        self._test_fetch_from_archive(from_date=None)
+
     @httpretty.activate
     def test_fetch_pulls_from_archive(self):
         """Test whether a list of pull requests is returned from archive"""
@@ -2046,10 +2424,11 @@ class TestGitHubClient(unittest.TestCase):
         self.assertEqual(response, orgs)
 
     @httpretty.activate
-    def test_http_wrong_status(self):
-        """Test if a error is raised when the http status was not 200"""
+    def test_user_cache(self):
+        """Test whether users are stored in the given cache"""
 
-        issue = ""
+        login = read_file('data/github/github_login')
+        orgs = read_file('data/github/github_orgs')
         rate_limit = read_file('data/github/rate_limit')
 
         httpretty.register_uri(httpretty.GET,
@@ -2060,17 +2439,435 @@ class TestGitHubClient(unittest.TestCase):
                                    'X-RateLimit-Remaining': '20',
                                    'X-RateLimit-Reset': '15'
                                })
-
         httpretty.register_uri(httpretty.GET,
-                               GITHUB_ISSUES_URL,
-                               body=issue,
-                               status=500,
+                               GITHUB_USER_URL,
+                               body=login, status=200,
+                               forcing_headers={
+                                   'X-RateLimit-Remaining': '20',
+                                   'X-RateLimit-Reset': '15'
+                               })
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_ORGS_URL,
+                               body=orgs, status=200,
                                forcing_headers={
                                    'X-RateLimit-Remaining': '20',
                                    'X-RateLimit-Reset': '15'
                                })
 
-        client = GitHubClient("zhquan_example", "repo", "aaa", sleep_time=1, max_retries=1)
+        tmp_path = tempfile.mkdtemp(prefix='perceval_')
+        cache_path = os.path.join(tmp_path, 'users.db')
+
+        try:
+            client = GitHubClient("zhquan_example", "repo", "aaa", None,
+                                  user_cache=SQLiteCache(cache_path))
+            self.assertEqual(client.user("zhquan_example"), login)
+            self.assertEqual(client.user_orgs("zhquan_example"), orgs)
+            self.assertDictEqual(client.user_cache.stats(), {'hits': 0, 'misses': 2})
+            client.user_cache.close()
+
+            # A new client reads the users from the same database
+            nrequests = len(httpretty.HTTPretty.latest_requests)
+
+            client = GitHubClient("zhquan_example", "repo", "aaa", None,
+                                  user_cache=SQLiteCache(cache_path))
+            self.assertEqual(client.user("zhquan_example"), login)
+            self.assertEqual(client.user_orgs("zhquan_example"), orgs)
+            self.assertDictEqual(client.user_cache.stats(), {'hits': 2, 'misses': 0})
+            client.user_cache.close()
+
+            # Only the rate limit was requested
+            requests_sent = httpretty.HTTPretty.latest_requests[nrequests:]
+            self.assertListEqual([r.path for r in requests_sent], ['/rate_limit'])
+        finally:
+            shutil.rmtree(tmp_path)
+
+    @httpretty.activate
+    def test_user_cache_from_archive(self):
+        """Test whether a cache per client is used when reading an archive"""
+
+        rate_limit = read_file('data/github/rate_limit')
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_RATE_LIMIT,
+                               body=rate_limit,
+                               status=200,
+                               forcing_headers={
+                                   'X-RateLimit-Remaining': '20',
+                                   'X-RateLimit-Reset': '15'
+                               })
+
+        archive = unittest.mock.Mock()
+        user_cache = MemoryCache()
+
+        client = GitHubClient("zhquan_example", "repo", "aaa", None,
+                              archive=archive, from_archive=True,
+                              user_cache=user_cache)
+        self.assertIsInstance(client.user_cache, MemoryCache)
+        self.assertIsNot(client.user_cache, user_cache)
+        self.assertIsNot(client.user_cache, GitHubClient._users_cache)
+
+        client = GitHubClient("zhquan_example", "repo", None, None,
+                              user_cache=user_cache)
+        self.assertIs(client.user_cache, user_cache)
+
+        client = GitHubClient("zhquan_example", "repo", None, None)
+        self.assertIs(client.user_cache, GitHubClient._users_cache)
+
+    @httpretty.activate
+    def test_user_cache_archive(self):
+        """Test whether cached users are stored in the archive"""
+
+        login = read_file('data/github/github_login')
+        orgs = read_file('data/github/github_orgs')
+        rate_limit = read_file('data/github/rate_limit')
+
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_RATE_LIMIT,
+                               body=rate_limit,
+                               status=200,
+                               forcing_headers={
+                                   'X-RateLimit-Remaining': '20',
+                                   'X-RateLimit-Reset': '15'
+                               })
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_ORGS_URL,
+                               body=orgs, status=200,
+                               forcing_headers={
+                                   'X-RateLimit-Remaining': '20',
+                                   'X-RateLimit-Reset': '15'
+                               })
+
+        tmp_path = tempfile.mkdtemp(prefix='perceval_')
+
+        try:
+            user_cache = SQLiteCache(os.path.join(tmp_path, 'users.db'))
+            user_cache.set('users/zhquan_example', login)
+
+            archive = Archive.create(os.path.join(tmp_path, 'myarchive'))
+
+            # The user is read from the cache and the
+            # orgs are fetched; both are archived
+            client = GitHubClient("zhquan_example", "repo", "aaa", None,
+                                  archive=archive, user_cache=user_cache)
+            self.assertIs(client.user_cache, user_cache)
+
+            for _ in range(2):
+                self.assertEqual(client.user("zhquan_example"), login)
+                self.assertEqual(client.user_orgs("zhquan_example"), orgs)
+
+            self.assertDictEqual(user_cache.stats(), {'hits': 3, 'misses': 1})
+            requested = [request.path for request in httpretty.httpretty.latest_requests]
+            self.assertNotIn('/users/zhquan_example', requested)
+            self.assertEqual(requested.count('/users/zhquan_example/orgs'), 1)
+            user_cache.close()
+
+            # Both are read from the archive
+            client = GitHubClient("zhquan_example", "repo", "aaa", None,
+                                  archive=archive, from_archive=True)
+            self.assertEqual(client.user("zhquan_example"), login)
+            self.assertEqual(client.user_orgs("zhquan_example"), orgs)
+        finally:
+            shutil.rmtree(tmp_path)
+
+    @httpretty.activate
+    def test_http_cache(self):
+        """Test whether conditional requests are sent and not modified responses are rebuilt"""
+
+        issue = read_file('data/github/github_request')
+        rate_limit = read_file('data/github/rate_limit')
+
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_RATE_LIMIT,
+                               body=rate_limit,
+                               status=200,
+                               forcing_headers={
+                                   'X-RateLimit-Remaining': '20',
+                                   'X-RateLimit-Reset': '15'
+                               })
+
+        next_url = GITHUB_ISSUES_URL + '?page=2'
+
+        def request_callback(request, uri, headers):
+            headers['X-RateLimit-Remaining'] = '20'
+            headers['X-RateLimit-Reset'] = '15'
+
+            if request.headers.get('If-None-Match') == '"abcd"':
+                return (304, headers, '')
+
+            headers['ETag'] = '"abcd"'
+            headers['Link'] = '<' + next_url + '>; rel="next"'
+            return (200, headers, issue)
+
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_ISSUES_URL,
+                               body=request_callback)
+
+        http_cache = MemoryCache()
+        client = GitHubClient("zhquan_example", "repo", "aaa", None,
+                              http_cache=http_cache)
+
+        response = client.fetch(GITHUB_ISSUES_URL, payload={'state': 'all'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.text, issue)
+        self.assertNotIn('If-None-Match', httpretty.last_request().headers)
+
+        response = client.fetch(GITHUB_ISSUES_URL, payload={'state': 'all'})
+        self.assertEqual(httpretty.last_request().headers['If-None-Match'], '"abcd"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.text, issue)
+        self.assertEqual(response.links['next']['url'], next_url)
+        self.assertEqual(response.headers['X-RateLimit-Remaining'], '20')
+
+        # Requests with other parameters are not conditional
+        response = client.fetch(GITHUB_ISSUES_URL, payload={'state': 'open'})
+        self.assertNotIn('If-None-Match', httpretty.last_request().headers)
+        self.assertEqual(response.text, issue)
+
+        self.assertDictEqual(http_cache.stats(), {'hits': 1, 'misses': 2})
+
+    @httpretty.activate
+    def test_http_cache_last_modified(self):
+        """Test whether requests are conditional on the last modification date"""
+
+        login = read_file('data/github/github_login')
+        rate_limit = read_file('data/github/rate_limit')
+        last_modified = 'Wed, 21 Oct 2015 07:28:00 GMT'
+
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_RATE_LIMIT,
+                               body=rate_limit,
+                               status=200,
+                               forcing_headers={
+                                   'X-RateLimit-Remaining': '20',
+                                   'X-RateLimit-Reset': '15'
+                               })
+
+        def request_callback(request, uri, headers):
+            if request.headers.get('If-Modified-Since') == last_modified:
+                return (304, headers, '')
+
+            headers['Last-Modified'] = last_modified
+            return (200, headers, login)
+
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_USER_URL,
+                               body=request_callback)
+
+        client = GitHubClient("zhquan_example", "repo", "aaa", None,
+                              http_cache=MemoryCache())
+
+        response = client.fetch(GITHUB_USER_URL)
+        self.assertEqual(response.text, login)
+
+        response = client.fetch(GITHUB_USER_URL)
+        self.assertEqual(httpretty.last_request().headers['If-Modified-Since'], last_modified)
+        self.assertNotIn('If-None-Match', httpretty.last_request().headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.text, login)
+        self.assertNotIn('Link', response.headers)
+
+    @httpretty.activate
+    def test_http_cache_archive(self):
+        """Test whether rebuilt responses are archived"""
+
+        login = read_file('data/github/github_login')
+        rate_limit = read_file('data/github/rate_limit')
+
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_RATE_LIMIT,
+                               body=rate_limit,
+                               status=200,
+                               forcing_headers={
+                                   'X-RateLimit-Remaining': '20',
+                                   'X-RateLimit-Reset': '15'
+                               })
+
+        def request_callback(request, uri, headers):
+            if request.headers.get('If-None-Match') == '"abcd"':
+                return (304, headers, '')
+
+            headers['ETag'] = '"abcd"'
+            return (200, headers, login)
+
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_USER_URL,
+                               body=request_callback)
+
+        tmp_path = tempfile.mkdtemp(prefix='perceval_')
+        http_cache = MemoryCache()
+
+        try:
+            for name in ['archive_a', 'archive_b']:
+                archive = Archive.create(os.path.join(tmp_path, name))
+
+                client = GitHubClient("zhquan_example", "repo", "aaa", None,
+                                      archive=archive, http_cache=http_cache)
+                response = client.fetch(GITHUB_USER_URL)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.text, login)
+
+                client = GitHubClient("zhquan_example", "repo", "aaa", None,
+                                      archive=archive, from_archive=True,
+                                      http_cache=http_cache)
+                self.assertIsNone(client.http_cache)
+
+                response = client.fetch(GITHUB_USER_URL)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.text, login)
+
+            # The second response was not modified
+            self.assertEqual(httpretty.last_request().headers['If-None-Match'], '"abcd"')
+            self.assertDictEqual(http_cache.stats(), {'hits': 1, 'misses': 1})
+        finally:
+            shutil.rmtree(tmp_path)
+
+    @httpretty.activate
+    def test_http_cache_tokens(self):
+        """Test whether responses are cached for each token"""
+
+        login = read_file('data/github/github_login')
+        rate_limit = read_file('data/github/rate_limit')
+
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_RATE_LIMIT,
+                               body=rate_limit,
+                               status=200,
+                               forcing_headers={
+                                   'X-RateLimit-Remaining': '20',
+                                   'X-RateLimit-Reset': '15'
+                               })
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_USER_URL,
+                               body=login, status=200,
+                               forcing_headers={
+                                   'ETag': '"abcd"'
+                               })
+
+        http_cache = MemoryCache()
+
+        client = GitHubClient("zhquan_example", "repo", "aaa", None,
+                              http_cache=http_cache)
+        client.fetch(GITHUB_USER_URL)
+
+        client = GitHubClient("zhquan_example", "repo", "bbb", None,
+                              http_cache=http_cache)
+        client.fetch(GITHUB_USER_URL)
+        self.assertNotIn('If-None-Match', httpretty.last_request().headers)
+
+        client.fetch(GITHUB_USER_URL)
+        self.assertEqual(httpretty.last_request().headers['If-None-Match'], '"abcd"')
+
+        # Tokens are not stored in the keys
+        keys = list(http_cache._entries)
+        self.assertEqual(len(keys), 2)
+
+        for key in keys:
+            self.assertNotIn('aaa', key)
+            self.assertNotIn('bbb', key)
+            self.assertTrue(key.endswith(' ' + GITHUB_USER_URL))
+
+    @httpretty.activate
+    def test_graphql_search_limit(self):
+        """Test whether the search is sent again when its results limit is reached"""
+
+        rate_limit = read_file('data/github/rate_limit')
+
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_RATE_LIMIT,
+                               body=rate_limit,
+                               status=200,
+                               forcing_headers={
+                                   'X-RateLimit-Remaining': '20',
+                                   'X-RateLimit-Reset': '15'
+                               })
+
+        def node(node_id, updated_at):
+            return {'id': node_id, 'updatedAt': updated_at}
+
+        # The first search returns only 2 of its 3 results
+        pages = [
+            {'issueCount': 3, 'pageInfo': {'hasNextPage': False, 'endCursor': 'a'},
+             'nodes': [node('1', '2016-01-01T00:00:00Z'), node('2', '2016-01-02T00:00:00Z')]},
+            {'issueCount': 2, 'pageInfo': {'hasNextPage': True, 'endCursor': 'b'},
+             'nodes': [node('2', '2016-01-02T00:00:00Z')]},
+            {'issueCount': 2, 'pageInfo': {'hasNextPage': False, 'endCursor': 'c'},
+             'nodes': [node('3', '2016-01-02T00:00:00Z')]}
+        ]
+        requests_variables = []
+
+        def request_callback(request, uri, headers):
+            requests_variables.append(json.loads(request.body.decode('utf-8'))['variables'])
+            body = json.dumps({'data': {'search': pages.pop(0)}})
+            return (200, headers, body)
+
+        httpretty.register_uri(httpretty.POST,
+                               GITHUB_GRAPHQL_URL,
+                               body=request_callback)
+
+        client = GitHubClient("zhquan_example", "repo", "aaa", None)
+        from_date = datetime.datetime(2016, 1, 1, tzinfo=dateutil.tz.tzutc())
+        groups = [group for group in client.graphql_issues(from_date=from_date)]
+
+        self.assertEqual([[n['id'] for n in group] for group in groups], [['1', '2'], ['3']])
+
+        search = 'repo:zhquan_example/repo sort:updated-asc updated:>='
+        self.assertEqual(len(requests_variables), 3)
+        self.assertEqual(requests_variables[0]['search'], search + '2016-01-01T00:00:00Z')
+        self.assertIsNone(requests_variables[0]['after'])
+        self.assertEqual(requests_variables[1]['search'], search + '2016-01-02T00:00:00Z')
+        self.assertIsNone(requests_variables[1]['after'])
+        self.assertEqual(requests_variables[2]['search'], search + '2016-01-02T00:00:00Z')
+        self.assertEqual(requests_variables[2]['after'], 'b')
+
+    @httpretty.activate
+    def test_graphql_errors(self):
+        """Test whether an exception is raised when a GraphQL query fails"""
+
+        rate_limit = read_file('data/github/rate_limit')
+
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_RATE_LIMIT,
+                               body=rate_limit,
+                               status=200,
+                               forcing_headers={
+                                   'X-RateLimit-Remaining': '20',
+                                   'X-RateLimit-Reset': '15'
+                               })
+        httpretty.register_uri(httpretty.POST,
+                               GITHUB_GRAPHQL_URL,
+                               body='{"errors": [{"message": "Field is not defined"}]}',
+                               status=200)
+
+        client = GitHubClient("zhquan_example", "repo", "aaa", None)
+
+        with self.assertRaisesRegex(BackendError, "Field is not defined"):
+            _ = [group for group in client.graphql_pulls()]
+
+    @httpretty.activate
+    def test_http_wrong_status(self):
+        """Test if a error is raised when the http status was not 200"""
+
+        issue = ""
+        rate_limit = read_file('data/github/rate_limit')
+
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_RATE_LIMIT,
+                               body=rate_limit,
+                               status=200,
+                               forcing_headers={
+                                   'X-RateLimit-Remaining': '20',
+                                   'X-RateLimit-Reset': '15'
+                               })
+
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_ISSUES_URL,
+                               body=issue,
+                               status=500,
+                               forcing_headers={
+                                   'X-RateLimit-Remaining': '20',
+                                   'X-RateLimit-Reset': '15'
+                               })
+
+        client = GitHubClient("zhquan_example", "repo", "aaa", sleep_time=1, max_retries=1)
 
         with self.assertRaises(requests.exceptions.HTTPError):
             _ = [issues for issues in client.issues()]
@@ -2210,6 +3007,290 @@ class TestGitHubClient(unittest.TestCase):
         self.assertEqual(httpretty.last_request().headers["Authorization"], "token aaa")
 
 
+class TestGitHubClientTokens(unittest.TestCase):
+    """GitHubClient tests using several tokens"""
+
+    @staticmethod
+    def _register_rate_limits(rates):
+        """Register the rate limit of each token"""
+
+        rate_limit = read_file('data/github/rate_limit')
+
+        def request_callback(request, uri, headers):
+            token = request.headers.get('Authorization', 'token ')[6:]
+            remaining, reset = rates[token]
+            headers['X-RateLimit-Remaining'] = str(remaining)
+            headers['X-RateLimit-Reset'] = str(reset)
+            return (200, headers, rate_limit)
+
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_RATE_LIMIT,
+                               body=request_callback)
+
+    @httpretty.activate
+    def test_init(self):
+        """Test whether the rate limit of each token is initialized"""
+
+        self._register_rate_limits({'aaa': (20, 15), 'bbb': (100, 30), '': (60, 45)})
+
+        client = GitHubClient("zhquan_example", "repo", ['aaa', 'bbb'])
+        self.assertListEqual(client.tokens, ['aaa', 'bbb'])
+        self.assertEqual(client.current_token, 'bbb')
+        self.assertEqual(client.rate_limit, 100)
+        self.assertEqual(client.rate_limit_reset_ts, 30)
+
+        # A single token is accepted too
+        client = GitHubClient("zhquan_example", "repo", 'aaa')
+        self.assertListEqual(client.tokens, ['aaa'])
+        self.assertEqual(client.current_token, 'aaa')
+        self.assertEqual(client.rate_limit, 20)
+
+        # No token
+        client = GitHubClient("zhquan_example", "repo", None)
+        self.assertListEqual(client.tokens, [])
+        self.assertEqual(client.current_token, None)
+        self.assertEqual(client.rate_limit, 60)
+        self.assertNotIn('Authorization', httpretty.last_request().headers)
+
+    @httpretty.activate
+    def test_init_archive(self):
+        """Test whether the rate limits are not archived"""
+
+        self._register_rate_limits({'aaa': (20, 15), 'bbb': (100, 30)})
+
+        tmp_path = tempfile.mkdtemp(prefix='perceval_')
+
+        try:
+            archive = Archive.create(os.path.join(tmp_path, 'myarchive'))
+
+            client = GitHubClient("zhquan_example", "repo", ['aaa', 'bbb'], archive=archive)
+            self.assertDictEqual(client._token_rates, {'aaa': (20, 15), 'bbb': (100, 30)})
+            self.assertEqual(client.current_token, 'bbb')
+
+            requests_auth = [request.headers['Authorization'] for request in httpretty.httpretty.latest_requests]
+            self.assertListEqual(requests_auth, ['token aaa', 'token bbb'])
+
+            with self.assertRaises(ArchiveError):
+                archive.retrieve(GITHUB_RATE_LIMIT, None, None)
+        finally:
+            shutil.rmtree(tmp_path)
+
+    @httpretty.activate
+    def test_token_with_highest_rate(self):
+        """Test whether requests use the token with the highest remaining rate"""
+
+        login = read_file('data/github/github_login')
+
+        self._register_rate_limits({'aaa': (20, 15), 'bbb': (15, 30)})
+
+        # Each request consumes 8 units of the rate
+        rates = {'aaa': 20, 'bbb': 15}
+
+        def request_callback(request, uri, headers):
+            token = request.headers['Authorization'][6:]
+            rates[token] -= 8
+            headers['X-RateLimit-Remaining'] = str(rates[token])
+            headers['X-RateLimit-Reset'] = '15' if token == 'aaa' else '30'
+            return (200, headers, login)
+
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_USER_URL,
+                               body=request_callback)
+
+        client = GitHubClient("zhquan_example", "repo", ['aaa', 'bbb'],
+                              min_rate_to_sleep=5)
+
+        tokens = []
+        for _ in range(3):
+            client.fetch(GITHUB_USER_URL)
+            tokens.append(httpretty.last_request().headers['Authorization'])
+
+        self.assertListEqual(tokens, ['token aaa', 'token bbb', 'token aaa'])
+        self.assertDictEqual(rates, {'aaa': 4, 'bbb': 7})
+
+        # 'bbb' is the only token above the minimum
+        client.fetch(GITHUB_USER_URL)
+        self.assertEqual(httpretty.last_request().headers['Authorization'], 'token bbb')
+
+        # All the tokens are exhausted; wait for the first one
+        # to be reset, which is 'aaa'
+        with unittest.mock.patch('perceval.backends.core.github.datetime_utcnow') as mock_utcnow:
+            mock_utcnow.return_value = datetime.datetime(1970, 1, 1, 0, 0, 5,
+                                                         tzinfo=dateutil.tz.tzutc())
+
+            with self.assertRaises(RateLimitError) as e:
+                client.fetch(GITHUB_USER_URL)
+
+        self.assertEqual(client.current_token, 'aaa')
+        self.assertEqual(e.exception.seconds_to_reset, 9)
+
+    @httpretty.activate
+    @unittest.mock.patch('perceval.client.time.sleep')
+    @unittest.mock.patch('perceval.backends.core.github.datetime_utcnow')
+    def test_sleep_for_rate_all_tokens(self, mock_utcnow, mock_sleep):
+        """Test whether the client sleeps only when all the tokens are exhausted"""
+
+        login = read_file('data/github/github_login')
+
+        mock_utcnow.return_value = datetime.datetime(1970, 1, 1, 0, 0, 5,
+                                                     tzinfo=dateutil.tz.tzutc())
+
+        self._register_rate_limits({'aaa': (0, 15), 'bbb': (0, 75)})
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_USER_URL,
+                               body=login, status=200,
+                               forcing_headers={
+                                   'X-RateLimit-Remaining': '20',
+                                   'X-RateLimit-Reset': '15'
+                               })
+
+        client = GitHubClient("zhquan_example", "repo", ['aaa', 'bbb'],
+                              sleep_for_rate=True)
+        client.fetch(GITHUB_USER_URL)
+
+        # It waits for the token reset first, which is 'aaa'
+        mock_sleep.assert_called_once_with(9)
+        self.assertEqual(httpretty.last_request().headers['Authorization'], 'token aaa')
+        self.assertEqual(client.rate_limit, 20)
+
+    @httpretty.activate
+    def test_graphql_rate_limit(self):
+        """Test whether the rate limit of GraphQL requests is tracked apart"""
+
+        login = read_file('data/github/github_login')
+        search = {
+            'issueCount': 0,
+            'pageInfo': {'hasNextPage': False, 'endCursor': None},
+            'nodes': []
+        }
+
+        self._register_rate_limits({'aaa': (0, 15), 'bbb': (0, 75)})
+        httpretty.register_uri(httpretty.POST,
+                               GITHUB_GRAPHQL_URL,
+                               body=json.dumps({'data': {'search': search}}),
+                               status=200,
+                               forcing_headers={
+                                   'X-RateLimit-Remaining': '4000',
+                                   'X-RateLimit-Reset': '100'
+                               })
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_USER_URL,
+                               body=login, status=200)
+
+        client = GitHubClient("zhquan_example", "repo", ['aaa', 'bbb'])
+
+        # The REST rate of the tokens is exhausted but
+        # GraphQL queries are still allowed
+        nodes = [node for page in client.graphql_issues() for node in page]
+        self.assertListEqual(nodes, [])
+        self.assertEqual(httpretty.last_request().headers['Authorization'], 'token aaa')
+        self.assertDictEqual(client._graphql_rates, {'aaa': (4000, 100), 'bbb': (None, None)})
+        self.assertDictEqual(client._token_rates, {'aaa': (0, 15), 'bbb': (0, 75)})
+
+        with self.assertRaises(RateLimitError):
+            client.fetch(GITHUB_USER_URL)
+
+        self.assertEqual(client.rate_limit, 0)
+        self.assertDictEqual(client._graphql_rates, {'aaa': (4000, 100), 'bbb': (None, None)})
+
+    def test_sanitize_for_archive(self):
+        """Test whether the authorization header is removed from the archived requests"""
+
+        url, headers, payload = GitHubClient.sanitize_for_archive(GITHUB_USER_URL,
+                                                                  {'Authorization': 'token aaa'},
+                                                                  {'a': 1})
+        self.assertEqual(url, GITHUB_USER_URL)
+        self.assertIsNone(headers)
+        self.assertDictEqual(payload, {'a': 1})
+
+        _, headers, _ = GitHubClient.sanitize_for_archive(GITHUB_USER_URL,
+                                                          {'Authorization': 'token aaa',
+                                                           'Accept': 'text/plain'},
+                                                          None)
+        self.assertDictEqual(headers, {'Accept': 'text/plain'})
+
+        _, headers, _ = GitHubClient.sanitize_for_archive(GITHUB_USER_URL, None, None)
+        self.assertIsNone(headers)
+
+
+class TestGitHubClientConcurrency(unittest.TestCase):
+    """GitHubClient tests using several threads"""
+
+    @httpretty.activate
+    def test_rate_limit_reserved(self):
+        """Test whether requests in progress are counted in the rate limit"""
+
+        rate_limit = read_file('data/github/rate_limit')
+        login = read_file('data/github/github_login')
+
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_RATE_LIMIT,
+                               body=rate_limit,
+                               status=200,
+                               forcing_headers={
+                                   'X-RateLimit-Remaining': '20',
+                                   'X-RateLimit-Reset': '15'
+                               })
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_USER_URL,
+                               body=login, status=200)
+
+        client = GitHubClient("zhquan_example", "repo", "aaa",
+                              sleep_for_rate=False, min_rate_to_sleep=10)
+        self.assertEqual(client.rate_limit, 20)
+
+        # Responses do not update the rate limit, as if
+        # they were not received yet
+        with unittest.mock.patch.object(client, 'update_rate_limit'):
+            for _ in range(10):
+                client.fetch(GITHUB_USER_URL)
+
+            self.assertEqual(client.rate_limit, 10)
+
+            with self.assertRaises(RateLimitError):
+                client.fetch(GITHUB_USER_URL)
+
+    @httpretty.activate
+    def test_user_fetched_once(self):
+        """Test whether a user requested by several threads is fetched once"""
+
+        rate_limit = read_file('data/github/rate_limit')
+        login = read_file('data/github/github_login')
+        orgs = read_file('data/github/github_orgs')
+
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_RATE_LIMIT,
+                               body=rate_limit,
+                               status=200,
+                               forcing_headers={
+                                   'X-RateLimit-Remaining': '20',
+                                   'X-RateLimit-Reset': '15'
+                               })
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_USER_URL,
+                               body=login, status=200)
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_ORGS_URL,
+                               body=orgs, status=200)
+
+        client = GitHubClient("zhquan_example", "repo", "aaa")
+
+        with unittest.mock.patch.object(client, 'user_cache', MemoryCache()):
+            github = GitHub("zhquan_example", "repo", "aaa", workers=8)
+            github.client = client
+
+            def get_user(_):
+                return client.user('zhquan_example'), client.user_orgs('zhquan_example')
+
+            users = [user for user in github._GitHub__enrich(iter(range(16)), get_user)]
+
+        self.assertListEqual(users, [(login, orgs)] * 16)
+
+        requests = [request.path for request in httpretty.httpretty.latest_requests]
+        self.assertEqual(requests.count('/users/zhquan_example'), 1)
+        self.assertEqual(requests.count('/users/zhquan_example/orgs'), 1)
+
+
 class TestGitHubCommand(unittest.TestCase):
     """GitHubCommand unit tests"""
 
@@ -2229,9 +3310,13 @@ class TestGitHubCommand(unittest.TestCase):
                 '--max-retries', '5',
                 '--sleep-time', '10',
                 '--tag', 'test', '--no-archive',
-                '--api-token', 'abcdefgh',
+                '--api-token', 'abcdefgh', '-t', 'ijklmnop',
                 '--from-date', '1970-01-01',
                 '--enterprise-url', 'https://example.com',
+                '--workers', '4',
+                '--pool-size', '20', '--no-keep-alive',
+                '--max-items', '100',
+                '--prefetch-pages', '2',
                 'zhquan_example', 'repo']
 
         parsed_args = parser.parse(*args)
@@ -2244,7 +3329,84 @@ class TestGitHubCommand(unittest.TestCase):
         self.assertEqual(parsed_args.tag, 'test')
         self.assertEqual(parsed_args.from_date, DEFAULT_DATETIME)
         self.assertEqual(parsed_args.no_archive, True)
-        self.assertEqual(parsed_args.api_token, 'abcdefgh')
+        self.assertEqual(parsed_args.api_token, ['abcdefgh', 'ijklmnop'])
+        self.assertEqual(parsed_args.workers, 4)
+        self.assertEqual(parsed_args.pool_size, 20)
+        self.assertEqual(parsed_args.keep_alive, False)
+        self.assertEqual(parsed_args.user_cache_path, None)
+        self.assertEqual(parsed_args.user_cache_ttl, DEFAULT_TTL)
+        self.assertEqual(parsed_args.user_cache_size, DEFAULT_MAX_SIZE)
+        self.assertEqual(parsed_args.http_cache_path, None)
+        self.assertEqual(parsed_args.http_cache_size, DEFAULT_MAX_SIZE)
+        self.assertEqual(parsed_args.graphql, False)
+        self.assertEqual(parsed_args.max_items, 100)
+        self.assertEqual(parsed_args.prefetch_pages, 2)
+
+    def test_setup_cmd_parser_single_token(self):
+        """Test whether a single token is parsed before the positional arguments"""
+
+        parser = GitHubCommand.setup_cmd_parser()
+
+        parsed_args = parser.parse('-t', 'abcdefgh', 'zhquan_example', 'repo')
+        self.assertEqual(parsed_args.owner, 'zhquan_example')
+        self.assertEqual(parsed_args.repository, 'repo')
+        self.assertEqual(parsed_args.api_token, ['abcdefgh'])
+
+        parsed_args = parser.parse('zhquan_example', 'repo')
+        self.assertEqual(parsed_args.api_token, [])
+
+    def test_user_cache(self):
+        """Test whether the users cache is created from the arguments"""
+
+        tmp_path = tempfile.mkdtemp(prefix='perceval_')
+        cache_path = os.path.join(tmp_path, 'users.db')
+
+        args = ['--api-token', 'abcdefgh',
+                '--user-cache', cache_path,
+                '--user-cache-ttl', '60',
+                '--user-cache-size', '10',
+                'zhquan_example', 'repo']
+
+        try:
+            cmd = GitHubCommand(*args)
+
+            user_cache = cmd.parsed_args.user_cache
+            self.assertIsInstance(user_cache, SQLiteCache)
+            self.assertEqual(user_cache.cache_path, cache_path)
+            self.assertEqual(user_cache.ttl, 60)
+            self.assertEqual(user_cache.max_size, 10)
+            user_cache.close()
+
+            cmd = GitHubCommand('zhquan_example', 'repo')
+            self.assertIsNone(cmd.parsed_args.user_cache)
+        finally:
+            shutil.rmtree(tmp_path)
+
+    def test_http_cache(self):
+        """Test whether the HTTP cache is created from the arguments"""
+
+        tmp_path = tempfile.mkdtemp(prefix='perceval_')
+        cache_path = os.path.join(tmp_path, 'http.db')
+
+        args = ['--api-token', 'abcdefgh',
+                '--http-cache', cache_path,
+                '--http-cache-size', '10',
+                'zhquan_example', 'repo']
+
+        try:
+            cmd = GitHubCommand(*args)
+
+            http_cache = cmd.parsed_args.http_cache
+            self.assertIsInstance(http_cache, SQLiteCache)
+            self.assertEqual(http_cache.cache_path, cache_path)
+            self.assertEqual(http_cache.ttl, None)
+            self.assertEqual(http_cache.max_size, 10)
+            http_cache.close()
+
+            cmd = GitHubCommand('zhquan_example', 'repo')
+            self.assertIsNone(cmd.parsed_args.http_cache)
+        finally:
+            shutil.rmtree(tmp_path)
 
 
 if __name__ == "__main__":
@@ -38,7 +38,8 @@ from grimoirelab.toolkit.datetime import datetime_utcnow
 from perceval.backend import BackendCommandArgumentParser
 from perceval.errors import RateLimitError
 from perceval.utils import DEFAULT_DATETIME
-from perceval.backends.core.gitlab import (GitLab,
+from perceval.backends.core.gitlab import (CATEGORY_MERGE_REQUEST,
+                                           GitLab,
                                            GitLabCommand,
                                            GitLabClient)
 from base import TestCaseBackendArchive
@@ -47,6 +48,7 @@ GITLAB_URL = "https://gitlab.com"
 GITLAB_API_URL = GITLAB_URL + "/api/v4"
 GITLAB_URL_PROJECT = GITLAB_API_URL + "/projects/fdroid%2Ffdroiddata"
 GITLAB_ISSUES_URL = GITLAB_API_URL + "/projects/fdroid%2Ffdroiddata/issues"
+GITLAB_MERGES_URL = GITLAB_API_URL + "/projects/fdroid%2Ffdroiddata/merge_requests"
 
 GITLAB_ENTERPRISE_URL = "https://gitlab.ow2.org"
 GITLAB_ENTERPRISE_API_URL = GITLAB_ENTERPRISE_URL + "/api/v4"
@@ -172,6 +174,62 @@ def setup_http_server(url_project, issues_url, rate_limit_headers=None):
                            forcing_headers=rate_limit_headers)
 
 
+def setup_http_server_merge_requests(url_project, merges_url):
+    project = read_file('data/gitlab/project')
+    page_1 = read_file('data/gitlab/merge_page_1')
+
+    httpretty.register_uri(httpretty.GET,
+                           url_project,
+                           body=project,
+                           status=200)
+
+    httpretty.register_uri(httpretty.GET,
+                           merges_url,
+                           body=page_1,
+                           status=200)
+
+    merge_1_notes = read_file('data/gitlab/merge_1_notes')
+    merge_2_notes = read_file('data/gitlab/merge_2_notes')
+
+    httpretty.register_uri(httpretty.GET,
+                           merges_url + "/1/notes",
+                           body=merge_1_notes,
+                           status=200)
+
+    httpretty.register_uri(httpretty.GET,
+                           merges_url + "/2/notes",
+                           body=merge_2_notes,
+                           status=200)
+
+    emoji = read_file('data/gitlab/emoji')
+    empty_emoji = read_file('data/gitlab/empty_emoji')
+
+    httpretty.register_uri(httpretty.GET,
+                           merges_url + "/1/award_emoji",
+                           body=emoji,
+                           status=200)
+
+    httpretty.register_uri(httpretty.GET,
+                           merges_url + "/2/award_emoji",
+                           body=empty_emoji,
+                           status=200)
+
+    httpretty.register_uri(httpretty.GET,
+                           merges_url + "/1/notes/1/award_emoji",
+                           body=empty_emoji,
+                           status=200)
+
+    httpretty.register_uri(httpretty.GET,
+                           merges_url + "/1/notes/2/award_emoji",
+                           body=emoji,
+                           status=200)
+
+    httpretty.register_uri(httpretty.GET,
+                           merges_url + "/2/notes/1/award_emoji",
+                           body=emoji,
+                           status=200)
+
+
 def read_file(filename, mode='r'):
     with open(os.path.join(
             os.path.dirname(os.path.abspath(__file__)), filename), mode) as f:
@@ -195,6 +253,7 @@ class TestGitLabBackend(unittest.TestCase):
         self.assertEqual(gitlab.repository, 'fdroiddata')
         self.assertEqual(gitlab.origin, GITLAB_URL + '/fdroid/fdroiddata')
         self.assertEqual(gitlab.tag, 'test')
+        self.assertEqual(gitlab.workers, 1)
         self.assertIsNone(gitlab.client)
 
         # When tag is empty or None it will be set to
@@ -249,6 +308,65 @@ class TestGitLabBackend(unittest.TestCase):
         self.assertEqual(issues[0]['data']['author']['id'], 1)
         self.assertEqual(issues[0]['data']['author']['username'], 'redfish64')
 
+    @httpretty.activate
+    def test_fetch_workers(self):
+        """Test whether issues fetched by several workers are returned in order"""
+
+        setup_http_server(GITLAB_URL_PROJECT, GITLAB_ISSUES_URL)
+
+        gitlab = GitLab("fdroid", "fdroiddata", "your-token")
+        expected = [issue['data'] for issue in gitlab.fetch()]
+
+        gitlab = GitLab("fdroid", "fdroiddata", "your-token", workers=4)
+        issues = [issue['data'] for issue in gitlab.fetch()]
+
+        self.assertEqual(len(issues), 4)
+        self.assertListEqual(issues, expected)
+
+    @httpretty.activate
+    def test_fetch_merge_requests(self):
+        """Test whether merge requests are properly fetched from GitLab"""
+
+        setup_http_server_merge_requests(GITLAB_URL_PROJECT, GITLAB_MERGES_URL)
+
+        gitlab = GitLab("fdroid", "fdroiddata", "your-token")
+
+        merges = [merge for merge in gitlab.fetch(category=CATEGORY_MERGE_REQUEST)]
+
+        self.assertEqual(len(merges), 2)
+
+        merge = merges[0]
+        self.assertEqual(merge['origin'], GITLAB_URL + '/fdroid/fdroiddata')
+        self.assertEqual(merge['category'], CATEGORY_MERGE_REQUEST)
+        self.assertEqual(merge['tag'], GITLAB_URL + '/fdroid/fdroiddata')
+        self.assertEqual(merge['data']['iid'], 1)
+        self.assertEqual(len(merge['data']['award_emoji_data']), 2)
+        self.assertEqual(len(merge['data']['notes_data']), 2)
+        self.assertEqual(len(merge['data']['notes_data'][0]['award_emoji_data']), 0)
+        self.assertEqual(len(merge['data']['notes_data'][1]['award_emoji_data']), 2)
+
+        merge = merges[1]
+        self.assertEqual(merge['category'], CATEGORY_MERGE_REQUEST)
+        self.assertEqual(merge['data']['iid'], 2)
+        self.assertEqual(len(merge['data']['award_emoji_data']), 0)
+        self.assertEqual(len(merge['data']['notes_data']), 1)
+        self.assertEqual(len(merge['data']['notes_data'][0]['award_emoji_data']), 2)
+
+    @httpretty.activate
+    def test_fetch_merge_requests_workers(self):
+        """Test whether merge requests fetched by several workers are returned in order"""
+
+        setup_http_server_merge_requests(GITLAB_URL_PROJECT, GITLAB_MERGES_URL)
+
+        gitlab = GitLab("fdroid", "fdroiddata", "your-token")
+        expected = [merge['data'] for merge in gitlab.fetch(category=CATEGORY_MERGE_REQUEST)]
+
+        gitlab = GitLab("fdroid", "fdroiddata", "your-token", workers=4)
+        merges = [merge['data'] for merge in gitlab.fetch(category=CATEGORY_MERGE_REQUEST)]
+
+        self.assertEqual(len(merges), 2)
+        self.assertListEqual(merges, expected)
+
     @httpretty.activate
     def test_fetch_from_date(self):
         """Test whether issues from a given date are properly fetched from GitLab"""
@@ -328,6 +446,30 @@ class TestGitHUbBackendArchive(TestCaseBackendArchive):
         setup_http_server(GITLAB_URL_PROJECT, GITLAB_ISSUES_URL)
         self._test_fetch_from_archive(from_date=None)
 
+    @httpretty.activate
+    def test_fetch_from_archive_workers(self):
+        """Test whether issues fetched by several workers are returned from the archive"""
+
+        setup_http_server(GITLAB_URL_PROJECT, GITLAB_ISSUES_URL)
+
+        self.backend_write_archive = GitLab("fdroid", "fdroiddata", api_token="your-token",
+                                            archive=self.archive, workers=4)
+        self.backend_read_archive = GitLab("fdroid", "fdroiddata", api_token="your-token",
+                                           archive=self.archive, workers=4)
+        self._test_fetch_from_archive(from_date=None)
+
+    @httpretty.activate
+    def test_fetch_merge_requests_from_archive(self):
+        """Test whether merge requests are properly fetched from the archive"""
+
+        setup_http_server_merge_requests(GITLAB_URL_PROJECT, GITLAB_MERGES_URL)
+
+        self.backend_write_archive = GitLab("fdroid", "fdroiddata", api_token="your-token",
+                                            archive=self.archive, workers=4)
+        self.backend_read_archive = GitLab("fdroid", "fdroiddata", api_token="your-token",
+                                           archive=self.archive, workers=4)
+        self._test_fetch_from_archive(category=CATEGORY_MERGE_REQUEST, from_date=None)
+
     @httpretty.activate
     def test_fetch_from_date(self):
         """Test whether issues from a given date are properly fetched from GitLab"""
@@ -538,6 +680,68 @@ class TestGitLabClient(unittest.TestCase):
 
         self.assertEqual(len(emojis), 0)
 
+    @httpretty.activate
+    def test_merge_requests(self):
+        """Test merge_requests API call"""
+
+        setup_http_server_merge_requests(GITLAB_URL_PROJECT, GITLAB_MERGES_URL)
+
+        client = GitLabClient("fdroid", "fdroiddata", "your-token")
+        raw_merges = [merges for merges in client.merge_requests()]
+
+        self.assertEqual(len(raw_merges), 1)
+
+        merges = json.loads(raw_merges[0])
+        self.assertEqual(len(merges), 2)
+        self.assertEqual(merges[0]['iid'], 1)
+        self.assertEqual(merges[1]['iid'], 2)
+
+        # Check requests
+        expected = {
+            'state': ['all'],
+            'sort': ['asc'],
+            'order_by': ['updated_at']
+        }
+
+        self.assertDictEqual(httpretty.last_request().querystring, expected)
+        self.assertEqual(httpretty.last_request().headers["PRIVATE-TOKEN"], "your-token")
+
+    @httpretty.activate
+    def test_merge_request_notes(self):
+        """Test merge_request_notes API call"""
+
+        setup_http_server_merge_requests(GITLAB_URL_PROJECT, GITLAB_MERGES_URL)
+
+        client = GitLabClient("fdroid", "fdroiddata", "your-token")
+        raw_notes = next(client.merge_request_notes(1))
+        notes = json.loads(raw_notes)
+
+        self.assertEqual(len(notes), 2)
+
+    @httpretty.activate
+    def test_merge_request_emojis(self):
+        """Test merge_request_emojis API call"""
+
+        setup_http_server_merge_requests(GITLAB_URL_PROJECT, GITLAB_MERGES_URL)
+
+        client = GitLabClient("fdroid", "fdroiddata", "your-token")
+        raw_emojis = next(client.merge_request_emojis(1))
+        emojis = json.loads(raw_emojis)
+
+        self.assertEqual(len(emojis), 2)
+
+    @httpretty.activate
+    def test_merge_request_note_emojis(self):
+        """Test merge_request_note_emojis API call"""
+
+        setup_http_server_merge_requests(GITLAB_URL_PROJECT, GITLAB_MERGES_URL)
+
+        client = GitLabClient("fdroid", "fdroiddata", "your-token")
+        raw_emojis = next(client.merge_request_note_emojis(2, 1))
+        emojis = json.loads(raw_emojis)
+
+        self.assertEqual(len(emojis), 2)
+
     @httpretty.activate
     def test_http_wrong_status(self):
         """Test if a error is raised when the http status was not 200"""
@@ -651,6 +855,9 @@ class TestGitLabCommand(unittest.TestCase):
                 '--api-token', 'abcdefgh',
                 '--from-date', '1970-01-01',
                 '--enterprise-url', 'https://example.com',
+                '--prefetch-pages', '2',
+                '--workers', '4',
+                '--pool-size', '20', '--no-keep-alive',
                 'zhquan_example', 'repo']
 
         parsed_args = parser.parse(*args)
@@ -663,6 +870,10 @@ class TestGitLabCommand(unittest.TestCase):
         self.assertEqual(parsed_args.from_date, DEFAULT_DATETIME)
         self.assertEqual(parsed_args.no_archive, True)
         self.assertEqual(parsed_args.api_token, 'abcdefgh')
+        self.assertEqual(parsed_args.prefetch_pages, 2)
+        self.assertEqual(parsed_args.workers, 4)
+        self.assertEqual(parsed_args.pool_size, 20)
+        self.assertEqual(parsed_args.keep_alive, False)
 
 
 if __name__ == "__main__":
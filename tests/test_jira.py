@@ -22,9 +22,12 @@
 #     Quan Zhou <quan@bitergia.com>
 #
 
+import datetime
 import json
 import os
 import unittest
+import unittest.mock
+import urllib.parse
 
 import httpretty
 import pkg_resources
@@ -48,6 +51,9 @@ JIRA_SEARCH_URL = JIRA_SERVER_URL + '/rest/api/2/search'
 JIRA_FIELDS_URL = JIRA_SERVER_URL + '/rest/api/2/field'
 
 
+SNAPSHOT_DATE = datetime.datetime(2018, 1, 1, tzinfo=datetime.timezone.utc)
+
+
 def read_file(filename, mode='r'):
     with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), filename), mode) as f:
         content = f.read()
@@ -141,8 +147,12 @@ class TestJiraBackend(unittest.TestCase):
         self.assertEqual(jira.origin, JIRA_SERVER_URL)
         self.assertEqual(jira.tag, 'test')
         self.assertEqual(jira.max_issues, 5)
+        self.assertEqual(jira.workers, 1)
         self.assertIsNone(jira.client)
 
+        jira = Jira(JIRA_SERVER_URL, workers=4)
+        self.assertEqual(jira.workers, 4)
+
         # When tag is empty or None it will be set to
         # the value in url
         jira = Jira(JIRA_SERVER_URL)
@@ -301,6 +311,66 @@ class TestJiraBackend(unittest.TestCase):
         self.assertEqual(issues[2]['data']['fields']['customfield_10603']['name'],
                          custom_fields['customfield_10603']['name'])
 
+    @httpretty.activate
+    @unittest.mock.patch('perceval.backends.core.jira.datetime_utcnow')
+    def test_fetch_workers(self, mock_utcnow):
+        """Test whether the pages of issues are fetched concurrently"""
+
+        mock_utcnow.return_value = SNAPSHOT_DATE
+
+        bodies_json = {
+            '0': read_file('data/jira/jira_issues_page_1.json'),
+            '2': read_file('data/jira/jira_issues_page_2.json')
+        }
+
+        body = read_file('data/jira/jira_fields.json')
+
+        def request_callback(method, uri, headers):
+            params = urllib.parse.parse_qs(urllib.parse.urlparse(uri).query)
+            return (200, headers, bodies_json[params['startAt'][0]])
+
+        httpretty.register_uri(httpretty.GET,
+                               JIRA_SEARCH_URL,
+                               body=request_callback)
+
+        httpretty.register_uri(httpretty.GET,
+                               JIRA_FIELDS_URL,
+                               body=body, status=200)
+
+        jira = Jira(JIRA_SERVER_URL, workers=2)
+
+        issues = [issue for issue in jira.fetch()]
+
+        self.assertEqual(len(issues), 3)
+        self.assertEqual(issues[0]['data']['key'], 'HELP-6043')
+        self.assertEqual(issues[1]['data']['key'], 'HELP-6042')
+        self.assertEqual(issues[2]['data']['key'], 'HELP-6041')
+
+        requests = [req for req in httpretty.httpretty.latest_requests
+                    if req.path.startswith('/rest/api/2/search')]
+        requests.sort(key=lambda req: int(req.querystring['startAt'][0]))
+
+        expected_req = [
+            {
+                'expand': ['renderedFields,transitions,operations,changelog'],
+                'jql': ['updated > 0 AND updated <= 1514764800000 order by updated asc'],
+                'startAt': ['0'],
+                'maxResults': ['100']
+            },
+            {
+                'expand': ['renderedFields,transitions,operations,changelog'],
+                'jql': ['updated > 0 AND updated <= 1514764800000 order by updated asc'],
+                'startAt': ['2'],
+                'maxResults': ['100']
+            }
+        ]
+
+        self.assertEqual(len(requests), 2)
+
+        for i in range(len(expected_req)):
+            self.assertEqual(requests[i].method, 'GET')
+            self.assertDictEqual(requests[i].querystring, expected_req[i])
+
     @httpretty.activate
     def test_fetch_from_date(self):
         """Test whether a list of issues is returned from a given date"""
@@ -416,6 +486,36 @@ class TestJiraBackendArchive(TestCaseBackendArchive):
         self.assertEqual(("test", "test"), self.backend_write_archive.client.session.auth)
         self.assertIsNone(self.backend_read_archive.client.session.auth)
 
+    @httpretty.activate
+    @unittest.mock.patch('perceval.backends.core.jira.datetime_utcnow')
+    def test_fetch_workers_from_archive(self, mock_utcnow):
+        """Test whether the pages fetched concurrently are returned from an archive"""
+
+        mock_utcnow.return_value = SNAPSHOT_DATE
+
+        bodies_json = {
+            '0': read_file('data/jira/jira_issues_page_1.json'),
+            '2': read_file('data/jira/jira_issues_page_2.json')
+        }
+
+        body = read_file('data/jira/jira_fields.json')
+
+        def request_callback(method, uri, headers):
+            params = urllib.parse.parse_qs(urllib.parse.urlparse(uri).query)
+            return (200, headers, bodies_json[params['startAt'][0]])
+
+        httpretty.register_uri(httpretty.GET,
+                               JIRA_SEARCH_URL,
+                               body=request_callback)
+
+        httpretty.register_uri(httpretty.GET,
+                               JIRA_FIELDS_URL,
+                               body=body, status=200)
+
+        # Archives are read using any number of workers
+        self.backend_write_archive = Jira(JIRA_SERVER_URL, archive=self.archive, workers=2)
+        self._test_fetch_from_archive(from_date=None)
+
     @httpretty.activate
     def test_fetch_from_date_from_archive(self):
         """Test whether a list of issues is returned from a given date from archive"""
@@ -505,6 +605,7 @@ class TestJiraClient(unittest.TestCase):
         self.assertEqual(client.verify, False)
         self.assertEqual(client.cert, None)
         self.assertEqual(client.max_issues, 100)
+        self.assertEqual(client.workers, 1)
 
     @httpretty.activate
     def test_get_issues(self):
@@ -564,6 +665,50 @@ class TestJiraClient(unittest.TestCase):
         self.assertEqual(pages[0], bodies_json[0])
         self.assertEqual(pages[1], bodies_json[1])
 
+    @httpretty.activate
+    def test_get_issues_workers(self):
+        """Test whether the pages of issues are fetched concurrently and returned in order"""
+
+        from_date = str_to_datetime('2015-01-01')
+        to_date = str_to_datetime('2018-01-01')
+
+        page = json.loads(read_file('data/jira/jira_issues_page_2.json'))
+        page['total'] = 7
+
+        def request_callback(method, uri, headers):
+            params = urllib.parse.parse_qs(urllib.parse.urlparse(uri).query)
+            body = dict(page, startAt=int(params['startAt'][0]))
+            return (200, headers, json.dumps(body))
+
+        httpretty.register_uri(httpretty.GET,
+                               JIRA_SEARCH_URL,
+                               body=request_callback)
+
+        client = JiraClient(url='http://example.com', project='perceval',
+                            user='user', password='password',
+                            verify=False, cert=None, max_issues=2,
+                            workers=3)
+
+        pages = [json.loads(page) for page in client.get_issues(from_date, to_date)]
+
+        offsets = [page['startAt'] for page in pages]
+        self.assertListEqual(offsets, [0, 2, 4, 6])
+
+        requests = httpretty.httpretty.latest_requests
+        self.assertEqual(len(requests), 4)
+
+        offsets = sorted([int(req.querystring['startAt'][0]) for req in requests])
+        self.assertListEqual(offsets, [0, 2, 4, 6])
+
+        expected_jql = 'project = perceval AND updated > 1420070400000 ' \
+                       'AND updated <= 1514764800000 order by updated asc'
+
+        for req in requests:
+            self.assertEqual(req.method, 'GET')
+            self.assertRegex(req.path, '/rest/api/2/search')
+            self.assertEqual(req.querystring['jql'], [expected_jql])
+            self.assertEqual(req.querystring['maxResults'], ['2'])
+
     @httpretty.activate
     def test_get_fields(self):
         """Test get fields API call"""
@@ -640,6 +785,8 @@ class TestJiraCommand(unittest.TestCase):
                 '--tag', 'test',
                 '--no-archive',
                 '--from-date', '1970-01-01',
+                '--prefetch-pages', '2',
+                '--workers', '4',
                 JIRA_SERVER_URL]
 
         parsed_args = parser.parse(*args)
@@ -653,6 +800,8 @@ class TestJiraCommand(unittest.TestCase):
         self.assertEqual(parsed_args.no_archive, True)
         self.assertEqual(parsed_args.from_date, DEFAULT_DATETIME)
         self.assertEqual(parsed_args.url, JIRA_SERVER_URL)
+        self.assertEqual(parsed_args.prefetch_pages, 2)
+        self.assertEqual(parsed_args.workers, 4)
 
 
 if __name__ == '__main__':
@@ -27,6 +27,8 @@ import json
 import os
 import pkg_resources
 import requests
+import threading
+import time
 import unittest
 
 pkg_resources.declare_namespace('perceval.backends')
@@ -53,6 +55,125 @@ def read_file(filename, mode='r'):
     return content
 
 
+def setup_http_server():
+    """Setup a mock HTTP server"""
+
+    issues_page_1 = read_file('data/launchpad/launchpad_issues_page_1')
+    issues_page_2 = read_file('data/launchpad/launchpad_issues_page_2')
+    issues_page_3 = read_file('data/launchpad/launchpad_issues_page_3')
+
+    issue_1 = read_file('data/launchpad/launchpad_issue_1')
+    issue_2 = read_file('data/launchpad/launchpad_issue_2')
+    issue_3 = read_file('data/launchpad/launchpad_issue_3')
+
+    issue_1_comments = read_file('data/launchpad/launchpad_issue_1_comments')
+    issue_1_attachments = read_file('data/launchpad/launchpad_issue_1_attachments')
+    issue_1_activities = read_file('data/launchpad/launchpad_issue_1_activities')
+
+    issue_2_activities = read_file('data/launchpad/launchpad_issue_2_activities')
+    issue_2_comments = read_file('data/launchpad/launchpad_issue_2_comments')
+
+    user_1 = read_file('data/launchpad/launchpad_user_1')
+
+    empty_issue_comments = read_file('data/launchpad/launchpad_empty_issue_comments')
+    empty_issue_attachments = read_file('data/launchpad/launchpad_empty_issue_attachments')
+    empty_issue_activities = read_file('data/launchpad/launchpad_empty_issue_activities')
+
+    httpretty.register_uri(httpretty.GET,
+                           LAUNCHPAD_PACKAGE_PROJECT_URL +
+                           "?modified_since=1970-01-01T00%3A00%3A00%2B00%3A00&ws.op=searchTasks"
+                           "&omit_duplicates=false&order_by=date_last_updated&status=Confirmed&status=Expired"
+                           "&status=Fix+Committed&status=Fix+Released"
+                           "&status=In+Progress&status=Incomplete&status=Incomplete+%28with+response%29"
+                           "&status=Incomplete+%28without+response%29"
+                           "&status=Invalid&status=New&status=Opinion&status=Triaged"
+                           "&status=Won%27t+Fix"
+                           "&ws.size=1&memo=2&ws.start=2",
+                           body=issues_page_3,
+                           status=200)
+    httpretty.register_uri(httpretty.GET,
+                           LAUNCHPAD_PACKAGE_PROJECT_URL +
+                           "?modified_since=1970-01-01T00%3A00%3A00%2B00%3A00&ws.op=searchTasks"
+                           "&omit_duplicates=false&order_by=date_last_updated&status=Confirmed&status=Expired"
+                           "&status=Fix+Committed&status=Fix+Released"
+                           "&status=In+Progress&status=Incomplete&status=Incomplete+%28with+response%29"
+                           "&status=Incomplete+%28without+response%29"
+                           "&status=Invalid&status=New&status=Opinion&status=Triaged"
+                           "&status=Won%27t+Fix"
+                           "&ws.size=1&memo=1&ws.start=1",
+                           body=issues_page_2,
+                           status=200)
+    httpretty.register_uri(httpretty.GET,
+                           LAUNCHPAD_PACKAGE_PROJECT_URL +
+                           "?modified_since=1970-01-01T00%3A00%3A00%2B00%3A00&ws.op=searchTasks"
+                           "&omit_duplicates=false&order_by=date_last_updated&status=Confirmed&status=Expired"
+                           "&status=Fix+Committed&status=Fix+Released"
+                           "&status=In+Progress&status=Incomplete&status=Incomplete+%28with+response%29"
+                           "&status=Incomplete+%28without+response%29"
+                           "&status=Invalid&status=New&status=Opinion&status=Triaged"
+                           "&status=Won%27t+Fix"
+                           "&ws.size=1",
+                           body=issues_page_1,
+                           status=200)
+
+    httpretty.register_uri(httpretty.GET,
+                           LAUNCHPAD_API_URL + "/bugs/1",
+                           body=issue_1,
+                           status=200)
+    httpretty.register_uri(httpretty.GET,
+                           LAUNCHPAD_API_URL + "/bugs/2",
+                           body=issue_2,
+                           status=200)
+    httpretty.register_uri(httpretty.GET,
+                           LAUNCHPAD_API_URL + "/bugs/3",
+                           body=issue_3,
+                           status=200)
+
+    httpretty.register_uri(httpretty.GET,
+                           LAUNCHPAD_API_URL + "/bugs/1/messages",
+                           body=issue_1_comments,
+                           status=200)
+    httpretty.register_uri(httpretty.GET,
+                           LAUNCHPAD_API_URL + "/bugs/2/messages",
+                           body=issue_2_comments,
+                           status=200)
+    httpretty.register_uri(httpretty.GET,
+                           LAUNCHPAD_API_URL + "/bugs/3/messages",
+                           body=empty_issue_comments,
+                           status=200)
+
+    httpretty.register_uri(httpretty.GET,
+                           LAUNCHPAD_API_URL + "/bugs/1/attachments",
+                           body=issue_1_attachments,
+                           status=200)
+    httpretty.register_uri(httpretty.GET,
+                           LAUNCHPAD_API_URL + "/bugs/2/attachments",
+                           body=empty_issue_attachments,
+                           status=200)
+    httpretty.register_uri(httpretty.GET,
+                           LAUNCHPAD_API_URL + "/bugs/3/attachments",
+                           body=empty_issue_attachments,
+                           status=200)
+
+    httpretty.register_uri(httpretty.GET,
+                           LAUNCHPAD_API_URL + "/bugs/1/activity",
+                           body=issue_1_activities,
+                           status=200)
+    httpretty.register_uri(httpretty.GET,
+                           LAUNCHPAD_API_URL + "/bugs/2/activity",
+                           body=issue_2_activities,
+                           status=200)
+    httpretty.register_uri(httpretty.GET,
+                           LAUNCHPAD_API_URL + "/bugs/3/activity",
+                           body=empty_issue_activities,
+                           status=200)
+
+    httpretty.register_uri(httpretty.GET,
+                           LAUNCHPAD_API_URL + "/~user",
+                           body=user_1,
+                           status=200)
+
+
 class TestLaunchpadBackend(unittest.TestCase):
     """Launchpad backend tests"""
 
@@ -64,6 +185,7 @@ class TestLaunchpadBackend(unittest.TestCase):
         self.assertEqual(launchpad.package, None)
         self.assertEqual(launchpad.origin, 'https://launchpad.net/mydistribution')
         self.assertEqual(launchpad.tag, 'test')
+        self.assertEqual(launchpad.workers, 1)
         self.assertIsNone(launchpad.client)
 
         launchpad = Launchpad('mydistribution', tag='test', package="mypackage")
@@ -98,125 +220,12 @@ class TestLaunchpadBackend(unittest.TestCase):
     def test_fetch(self):
         """Test whether a list of issues is returned"""
 
-        issues_page_1 = read_file('data/launchpad/launchpad_issues_page_1')
-        issues_page_2 = read_file('data/launchpad/launchpad_issues_page_2')
-        issues_page_3 = read_file('data/launchpad/launchpad_issues_page_3')
-
-        issue_1 = read_file('data/launchpad/launchpad_issue_1')
-        issue_2 = read_file('data/launchpad/launchpad_issue_2')
-        issue_3 = read_file('data/launchpad/launchpad_issue_3')
-
-        issue_1_comments = read_file('data/launchpad/launchpad_issue_1_comments')
-        issue_1_attachments = read_file('data/launchpad/launchpad_issue_1_attachments')
-        issue_1_activities = read_file('data/launchpad/launchpad_issue_1_activities')
-
-        issue_2_activities = read_file('data/launchpad/launchpad_issue_2_activities')
-        issue_2_comments = read_file('data/launchpad/launchpad_issue_2_comments')
-
-        user_1 = read_file('data/launchpad/launchpad_user_1')
-
-        empty_issue_comments = read_file('data/launchpad/launchpad_empty_issue_comments')
-        empty_issue_attachments = read_file('data/launchpad/launchpad_empty_issue_attachments')
-        empty_issue_activities = read_file('data/launchpad/launchpad_empty_issue_activities')
+        setup_http_server()
 
         issue_1_expected = read_file('data/launchpad/launchpad_issue_1_expected')
         issue_2_expected = read_file('data/launchpad/launchpad_issue_2_expected')
         issue_3_expected = read_file('data/launchpad/launchpad_issue_3_expected')
 
-        httpretty.register_uri(httpretty.GET,
-                               LAUNCHPAD_PACKAGE_PROJECT_URL +
-                               "?modified_since=1970-01-01T00%3A00%3A00%2B00%3A00&ws.op=searchTasks"
-                               "&omit_duplicates=false&order_by=date_last_updated&status=Confirmed&status=Expired"
-                               "&status=Fix+Committed&status=Fix+Released"
-                               "&status=In+Progress&status=Incomplete&status=Incomplete+%28with+response%29"
-                               "&status=Incomplete+%28without+response%29"
-                               "&status=Invalid&status=New&status=Opinion&status=Triaged"
-                               "&status=Won%27t+Fix"
-                               "&ws.size=1&memo=2&ws.start=2",
-                               body=issues_page_3,
-                               status=200)
-        httpretty.register_uri(httpretty.GET,
-                               LAUNCHPAD_PACKAGE_PROJECT_URL +
-                               "?modified_since=1970-01-01T00%3A00%3A00%2B00%3A00&ws.op=searchTasks"
-                               "&omit_duplicates=false&order_by=date_last_updated&status=Confirmed&status=Expired"
-                               "&status=Fix+Committed&status=Fix+Released"
-                               "&status=In+Progress&status=Incomplete&status=Incomplete+%28with+response%29"
-                               "&status=Incomplete+%28without+response%29"
-                               "&status=Invalid&status=New&status=Opinion&status=Triaged"
-                               "&status=Won%27t+Fix"
-                               "&ws.size=1&memo=1&ws.start=1",
-                               body=issues_page_2,
-                               status=200)
-        httpretty.register_uri(httpretty.GET,
-                               LAUNCHPAD_PACKAGE_PROJECT_URL +
-                               "?modified_since=1970-01-01T00%3A00%3A00%2B00%3A00&ws.op=searchTasks"
-                               "&omit_duplicates=false&order_by=date_last_updated&status=Confirmed&status=Expired"
-                               "&status=Fix+Committed&status=Fix+Released"
-                               "&status=In+Progress&status=Incomplete&status=Incomplete+%28with+response%29"
-                               "&status=Incomplete+%28without+response%29"
-                               "&status=Invalid&status=New&status=Opinion&status=Triaged"
-                               "&status=Won%27t+Fix"
-                               "&ws.size=1",
-                               body=issues_page_1,
-                               status=200)
-
-        httpretty.register_uri(httpretty.GET,
-                               LAUNCHPAD_API_URL + "/bugs/1",
-                               body=issue_1,
-                               status=200)
-        httpretty.register_uri(httpretty.GET,
-                               LAUNCHPAD_API_URL + "/bugs/2",
-                               body=issue_2,
-                               status=200)
-        httpretty.register_uri(httpretty.GET,
-                               LAUNCHPAD_API_URL + "/bugs/3",
-                               body=issue_3,
-                               status=200)
-
-        httpretty.register_uri(httpretty.GET,
-                               LAUNCHPAD_API_URL + "/bugs/1/messages",
-                               body=issue_1_comments,
-                               status=200)
-        httpretty.register_uri(httpretty.GET,
-                               LAUNCHPAD_API_URL + "/bugs/2/messages",
-                               body=issue_2_comments,
-                               status=200)
-        httpretty.register_uri(httpretty.GET,
-                               LAUNCHPAD_API_URL + "/bugs/3/messages",
-                               body=empty_issue_comments,
-                               status=200)
-
-        httpretty.register_uri(httpretty.GET,
-                               LAUNCHPAD_API_URL + "/bugs/1/attachments",
-                               body=issue_1_attachments,
-                               status=200)
-        httpretty.register_uri(httpretty.GET,
-                               LAUNCHPAD_API_URL + "/bugs/2/attachments",
-                               body=empty_issue_attachments,
-                               status=200)
-        httpretty.register_uri(httpretty.GET,
-                               LAUNCHPAD_API_URL + "/bugs/3/attachments",
-                               body=empty_issue_attachments,
-                               status=200)
-
-        httpretty.register_uri(httpretty.GET,
-                               LAUNCHPAD_API_URL + "/bugs/1/activity",
-                               body=issue_1_activities,
-                               status=200)
-        httpretty.register_uri(httpretty.GET,
-                               LAUNCHPAD_API_URL + "/bugs/2/activity",
-                               body=issue_2_activities,
-                               status=200)
-        httpretty.register_uri(httpretty.GET,
-                               LAUNCHPAD_API_URL + "/bugs/3/activity",
-                               body=empty_issue_activities,
-                               status=200)
-
-        httpretty.register_uri(httpretty.GET,
-                               LAUNCHPAD_API_URL + "/~user",
-                               body=user_1,
-                               status=200)
-
         launchpad = Launchpad('mydistribution', package="mypackage",
                               items_per_page=2)
         issues = [issues for issues in launchpad.fetch(from_date=None)]
@@ -250,6 +259,30 @@ class TestLaunchpadBackend(unittest.TestCase):
         self.assertListEqual(issues[2]['data']['messages_data'], issue_3_expected['messages_data'])
         self.assertDictEqual(issues[2]['data'], issue_3_expected)
 
+    @httpretty.activate
+    def test_fetch_workers(self):
+        """Test whether the issues fetched by several workers are returned in order"""
+
+        LaunchpadClient._users.clear()
+        setup_http_server()
+
+        issue_1_expected = read_file('data/launchpad/launchpad_issue_1_expected')
+        issue_2_expected = read_file('data/launchpad/launchpad_issue_2_expected')
+        issue_3_expected = read_file('data/launchpad/launchpad_issue_3_expected')
+
+        launchpad = Launchpad('mydistribution', package="mypackage",
+                              items_per_page=2, workers=4)
+        issues = [issues for issues in launchpad.fetch(from_date=None)]
+
+        issue_1_expected = json.loads(issue_1_expected)
+        issue_2_expected = json.loads(issue_2_expected)
+        issue_3_expected = json.loads(issue_3_expected)
+
+        self.assertEqual(len(issues), 3)
+        self.assertDictEqual(issues[0]['data'], issue_1_expected)
+        self.assertDictEqual(issues[1]['data'], issue_2_expected)
+        self.assertDictEqual(issues[2]['data'], issue_3_expected)
+
     @httpretty.activate
     def test_fetch_from_date(self):
         """Test when return from date"""
@@ -788,6 +821,36 @@ class TestLaunchpadClient(unittest.TestCase):
 
         self.assertDictEqual(json.loads(user_retrieved), json.loads(user))
 
+    @httpretty.activate
+    def test_user_threads(self):
+        """Test whether a user is fetched once when several threads ask for it"""
+
+        user = read_file('data/launchpad/launchpad_user_1')
+        nrequests = []
+
+        def request_callback(method, uri, headers):
+            nrequests.append(uri)
+            time.sleep(0.1)
+            return (200, headers, user)
+
+        httpretty.register_uri(httpretty.GET,
+                               LAUNCHPAD_API_URL + "/~user-threads",
+                               body=request_callback)
+
+        client = LaunchpadClient("mydistribution", package="mypackage")
+        users = []
+
+        threads = [threading.Thread(target=lambda: users.append(client.user("user-threads")))
+                   for _ in range(4)]
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(nrequests), 1)
+        self.assertListEqual(users, [user] * 4)
+
     @httpretty.activate
     def test_user_not_retrieved(self):
         """Test user API call"""
@@ -847,6 +910,8 @@ class TestLaunchpadCommand(unittest.TestCase):
                 '--from-date', '1970-01-01',
                 '--items-per-page', '75',
                 '--sleep-time', '600',
+                '--workers', '4',
+                '--pool-size', '20', '--no-keep-alive',
                 'mydistribution']
 
         parsed_args = parser.parse(*args)
@@ -856,6 +921,9 @@ class TestLaunchpadCommand(unittest.TestCase):
         self.assertEqual(parsed_args.no_archive, True)
         self.assertEqual(parsed_args.items_per_page, '75')
         self.assertEqual(parsed_args.sleep_time, '600')
+        self.assertEqual(parsed_args.workers, 4)
+        self.assertEqual(parsed_args.pool_size, 20)
+        self.assertEqual(parsed_args.keep_alive, False)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,454 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2018 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Fifth Floor, Boston, MA 02110-1335, USA.
+#
+# Authors:
+#     Santiago Dueñas <sduenas@bitergia.com>
+#
+
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+from perceval.output import (ArrowSink,
+                             JSONLinesSink,
+                             JSONSink,
+                             OUTPUT_SINKS,
+                             OutputSink,
+                             ParquetSink,
+                             create_output_sink,
+                             encode_json_line,
+                             register_output_sink,
+                             write_items)
+
+
+ITEMS = [
+    {'uuid': '0fa16dc4edab9130a14914a8d797f634d13b4ff4', 'data': {'number': 1, 'title': 'Ñandú'}},
+    {'uuid': '3b3e85e5b1f6a23d6dbe2d5e7e2b9e64c2e87e86', 'data': {'number': 2, 'title': 'issue'}},
+    {'uuid': 'f14b25b2f7c84c2b07e9c3d1bf6a0eac5e15f0c8', 'data': {'number': 3, 'title': None}}
+]
+
+
+def build_items(nitems):
+    """Generate items with all the common metadata fields"""
+
+    for x in range(nitems):
+        yield {
+            'backend_name': 'MockedBackend',
+            'backend_version': '0.1.0',
+            'perceval_version': '0.12.0',
+            'timestamp': 1515151515.0,
+            'origin': 'http://example.com/',
+            'uuid': str(x),
+            'updated_on': 1451606400.0 + x,
+            'category': 'mock_item',
+            'tag': 'test',
+            'data': {'number': x, 'title': 'Ñandú'}
+        }
+
+
+class TestJSONSink(unittest.TestCase):
+    """JSONSink tests"""
+
+    def test_write(self):
+        """Test whether items are written as indented JSON documents"""
+
+        outfile = io.StringIO()
+        sink = JSONSink(outfile)
+
+        for item in ITEMS:
+            sink.write(item)
+        sink.close()
+
+        expected = ''.join([json.dumps(item, indent=4, sort_keys=True) + '\n'
+                            for item in ITEMS])
+        self.assertEqual(outfile.getvalue(), expected)
+
+
+class TestJSONLinesSink(unittest.TestCase):
+    """JSONLinesSink tests"""
+
+    def setUp(self):
+        self.test_path = tempfile.mkdtemp(prefix='perceval_')
+        self.fout_path = os.path.join(self.test_path, 'output.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_path)
+
+    def test_write(self):
+        """Test whether items are written in JSON Lines format"""
+
+        with open(self.fout_path, 'w') as outfile:
+            sink = JSONLinesSink(outfile)
+
+            for item in ITEMS:
+                sink.write(item)
+
+            # Items are not written until the buffer is full
+            self.assertEqual(os.path.getsize(self.fout_path), 0)
+
+            sink.close()
+
+        with open(self.fout_path, 'r', encoding='utf-8') as fd:
+            lines = fd.readlines()
+
+        self.assertEqual(len(lines), len(ITEMS))
+
+        for line, item in zip(lines, ITEMS):
+            self.assertDictEqual(json.loads(line), item)
+
+    def test_write_buffer_size(self):
+        """Test whether items are written in blocks"""
+
+        with open(self.fout_path, 'w') as outfile:
+            sink = JSONLinesSink(outfile, buffer_size=10)
+
+            sink.write(ITEMS[0])
+            outfile.buffer.flush()
+            size = os.path.getsize(self.fout_path)
+            self.assertEqual(size, len(encode_json_line(ITEMS[0])))
+
+            sink.close()
+
+    def test_write_text_stream(self):
+        """Test whether items are written to streams without binary buffer"""
+
+        outfile = io.StringIO()
+        sink = JSONLinesSink(outfile)
+
+        for item in ITEMS:
+            sink.write(item)
+        sink.close()
+
+        lines = outfile.getvalue().splitlines()
+        self.assertEqual(len(lines), len(ITEMS))
+        self.assertDictEqual(json.loads(lines[0]), ITEMS[0])
+
+    def test_write_gzip(self):
+        """Test whether items are written compressed with gzip"""
+
+        with open(self.fout_path, 'w') as outfile:
+            sink = JSONLinesSink(outfile, compression='gzip')
+
+            for item in ITEMS:
+                sink.write(item)
+            sink.close()
+
+        with gzip.open(self.fout_path, 'rt', encoding='utf-8') as fd:
+            lines = fd.readlines()
+
+        self.assertEqual(len(lines), len(ITEMS))
+
+        for line, item in zip(lines, ITEMS):
+            self.assertDictEqual(json.loads(line), item)
+
+    def test_write_items_error(self):
+        """Test whether the items written before an error are not lost"""
+
+        def fetch_items():
+            for item in ITEMS[:2]:
+                yield item
+            raise RuntimeError("fetch failed")
+
+        with open(self.fout_path, 'w') as outfile:
+            sink = JSONLinesSink(outfile, compression='gzip')
+
+            with self.assertRaisesRegex(RuntimeError, "fetch failed"):
+                write_items(fetch_items(), sink)
+
+        with gzip.open(self.fout_path, 'rt', encoding='utf-8') as fd:
+            lines = fd.readlines()
+
+        self.assertEqual(len(lines), 2)
+
+        for line, item in zip(lines, ITEMS):
+            self.assertDictEqual(json.loads(line), item)
+
+    def test_invalid_compression(self):
+        """Test if an exception is raised when the compression is not supported"""
+
+        with open(self.fout_path, 'w') as outfile:
+            with self.assertRaisesRegex(ValueError, "lzma compression not supported"):
+                JSONLinesSink(outfile, compression='lzma')
+
+        with self.assertRaisesRegex(ValueError, "compressed output needs a binary stream"):
+            JSONLinesSink(io.StringIO(), compression='gzip')
+
+    @unittest.mock.patch('perceval.output.zstandard', None)
+    def test_zstd_not_available(self):
+        """Test if an exception is raised when zstd is not available"""
+
+        with open(self.fout_path, 'w') as outfile:
+            with self.assertRaisesRegex(ValueError, "zstd compression needs 'zstandard' package"):
+                JSONLinesSink(outfile, compression='zstd')
+
+
+@unittest.skipIf(not pyarrow, "pyarrow not installed")
+class TestArrowSink(unittest.TestCase):
+    """ArrowSink tests"""
+
+    def setUp(self):
+        self.tmp_path = tempfile.mkdtemp(prefix='perceval_')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path)
+
+    def test_write(self):
+        """Test whether items are written in record batches"""
+
+        filepath = os.path.join(self.tmp_path, 'items.arrow')
+
+        with open(filepath, 'w') as outfile:
+            sink = ArrowSink(outfile, batch_size=2)
+            write_items(build_items(5), sink)
+
+        with pyarrow.ipc.open_stream(filepath) as reader:
+            batches = [batch for batch in reader]
+
+        self.assertEqual([batch.num_rows for batch in batches], [2, 2, 1])
+
+        table = pyarrow.Table.from_batches(batches)
+        self.assertEqual(table.column_names,
+                         ['uuid', 'origin', 'updated_on', 'category', 'tag',
+                          'backend_name', 'backend_version', 'perceval_version',
+                          'timestamp', 'data'])
+        self.assertEqual(table.schema.field('updated_on').type,
+                         pyarrow.timestamp('us', tz='UTC'))
+
+        rows = table.to_pylist()
+        self.assertEqual(rows[0]['uuid'], '0')
+        self.assertEqual(rows[4]['uuid'], '4')
+        self.assertEqual(rows[4]['updated_on'].timestamp(), 1451606404.0)
+        self.assertEqual(rows[4]['timestamp'].timestamp(), 1515151515.0)
+        self.assertEqual(rows[4]['category'], 'mock_item')
+        self.assertEqual(json.loads(rows[4]['data']), {'number': 4, 'title': 'Ñandú'})
+
+    def test_write_empty(self):
+        """Test whether a valid stream is written when there are no items"""
+
+        filepath = os.path.join(self.tmp_path, 'items.arrow')
+
+        with open(filepath, 'w') as outfile:
+            sink = ArrowSink(outfile)
+            nitems = write_items([], sink)
+
+        self.assertEqual(nitems, 0)
+
+        with pyarrow.ipc.open_stream(filepath) as reader:
+            table = reader.read_all()
+
+        self.assertEqual(table.num_rows, 0)
+        self.assertEqual(len(table.column_names), 10)
+
+    def test_write_compression(self):
+        """Test whether batches are compressed"""
+
+        filepath = os.path.join(self.tmp_path, 'items.arrow')
+
+        for compression in ['zstd', 'lz4']:
+            with open(filepath, 'w') as outfile:
+                sink = ArrowSink(outfile, compression=compression)
+                write_items(build_items(5), sink)
+
+            with pyarrow.ipc.open_stream(filepath) as reader:
+                table = reader.read_all()
+
+            self.assertEqual(table.num_rows, 5)
+
+    def test_write_items_error(self):
+        """Test whether the rows collected before an error are not lost"""
+
+        def fetch_items():
+            for item in build_items(3):
+                yield item
+            raise RuntimeError("fetch failed")
+
+        filepath = os.path.join(self.tmp_path, 'items.arrow')
+
+        with open(filepath, 'w') as outfile:
+            sink = ArrowSink(outfile, batch_size=2)
+
+            with self.assertRaisesRegex(RuntimeError, "fetch failed"):
+                write_items(fetch_items(), sink)
+
+        with pyarrow.ipc.open_stream(filepath) as reader:
+            table = reader.read_all()
+
+        self.assertEqual(table.num_rows, 3)
+        self.assertEqual(table.column('uuid').to_pylist(), ['0', '1', '2'])
+
+    def test_invalid_compression(self):
+        """Test if an exception is raised with invalid compressions"""
+
+        with self.assertRaisesRegex(ValueError, "gzip compression not supported by ArrowSink"):
+            ArrowSink(io.StringIO(), compression='gzip')
+
+    @unittest.mock.patch('perceval.output.pyarrow', None)
+    def test_pyarrow_not_available(self):
+        """Test if an exception is raised when pyarrow is not installed"""
+
+        with self.assertRaisesRegex(ValueError, "ArrowSink needs 'pyarrow' package"):
+            ArrowSink(io.StringIO())
+
+
+@unittest.skipIf(not pyarrow, "pyarrow not installed")
+class TestParquetSink(unittest.TestCase):
+    """ParquetSink tests"""
+
+    def setUp(self):
+        self.tmp_path = tempfile.mkdtemp(prefix='perceval_')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path)
+
+    def test_write(self):
+        """Test whether items are written in row groups"""
+
+        filepath = os.path.join(self.tmp_path, 'items.parquet')
+
+        with open(filepath, 'w') as outfile:
+            sink = ParquetSink(outfile, batch_size=2)
+            write_items(build_items(5), sink)
+
+        parquet_file = pyarrow.parquet.ParquetFile(filepath)
+        self.assertEqual(parquet_file.metadata.num_row_groups, 3)
+        self.assertEqual(parquet_file.metadata.num_rows, 5)
+
+        column = parquet_file.metadata.row_group(0).column(0)
+        self.assertEqual(column.compression, 'SNAPPY')
+
+        table = parquet_file.read(columns=['uuid', 'updated_on', 'data'])
+        rows = table.to_pylist()
+        self.assertEqual([row['uuid'] for row in rows], ['0', '1', '2', '3', '4'])
+        self.assertEqual(rows[2]['updated_on'].timestamp(), 1451606402.0)
+        self.assertEqual(json.loads(rows[2]['data']), {'number': 2, 'title': 'Ñandú'})
+
+    def test_write_compression(self):
+        """Test whether columns are compressed using the given algorithm"""
+
+        filepath = os.path.join(self.tmp_path, 'items.parquet')
+
+        with open(filepath, 'w') as outfile:
+            sink = ParquetSink(outfile, compression='gzip')
+            write_items(build_items(5), sink)
+
+        parquet_file = pyarrow.parquet.ParquetFile(filepath)
+        self.assertEqual(parquet_file.metadata.num_rows, 5)
+
+        column = parquet_file.metadata.row_group(0).column(0)
+        self.assertEqual(column.compression, 'GZIP')
+
+
+class TestEncodeJSONLine(unittest.TestCase):
+    """Unit tests for encode_json_line"""
+
+    def test_encode(self):
+        """Test whether items are encoded in a single line"""
+
+        line = encode_json_line(ITEMS[0])
+
+        self.assertIsInstance(line, bytes)
+        self.assertEqual(line.count(b'\n'), 1)
+        self.assertEqual(line[-1:], b'\n')
+        self.assertDictEqual(json.loads(line.decode('utf-8')), ITEMS[0])
+
+    @unittest.mock.patch('perceval.output.ujson', None)
+    @unittest.mock.patch('perceval.output.orjson', None)
+    def test_encode_standard_json(self):
+        """Test whether items are encoded without fast encoders"""
+
+        line = encode_json_line(ITEMS[0])
+        self.assertDictEqual(json.loads(line.decode('utf-8')), ITEMS[0])
+
+    def test_encode_surrogates(self):
+        """Test whether strings with surrogates are encoded"""
+
+        item = {'message': 'invalid \udcf1 char'}
+
+        line = encode_json_line(item)
+        self.assertDictEqual(json.loads(line.decode('utf-8')), item)
+
+
+class TestCreateOutputSink(unittest.TestCase):
+    """Unit tests for create_output_sink"""
+
+    def test_create(self):
+        """Test whether sinks are created for each format"""
+
+        sink = create_output_sink('json', io.StringIO())
+        self.assertIsInstance(sink, JSONSink)
+
+        sink = create_output_sink('jsonl', io.StringIO())
+        self.assertIsInstance(sink, JSONLinesSink)
+
+    @unittest.skipIf(not pyarrow, "pyarrow not installed")
+    def test_create_columnar(self):
+        """Test whether columnar sinks are created"""
+
+        sink = create_output_sink('arrow', io.BytesIO())
+        self.assertIsInstance(sink, ArrowSink)
+
+        sink = create_output_sink('parquet', io.BytesIO(), compression='zstd')
+        self.assertIsInstance(sink, ParquetSink)
+        self.assertEqual(sink.compression, 'zstd')
+
+    def test_register(self):
+        """Test whether new formats can be registered"""
+
+        class ListSink(OutputSink):
+            def write(self, item):
+                self.outfile.append(item)
+
+            def close(self):
+                pass
+
+        register_output_sink('list', ListSink)
+        self.addCleanup(OUTPUT_SINKS.pop, 'list')
+
+        items = []
+        sink = create_output_sink('list', items)
+        self.assertIsInstance(sink, ListSink)
+
+        nitems = write_items(ITEMS, sink)
+        self.assertEqual(nitems, 3)
+        self.assertListEqual(items, ITEMS)
+
+    def test_invalid_format(self):
+        """Test if an exception is raised with invalid formats"""
+
+        with self.assertRaisesRegex(ValueError, "xml output format not supported"):
+            create_output_sink('xml', io.StringIO())
+
+        with self.assertRaisesRegex(ValueError, "gzip compression not supported by JSONSink"):
+            create_output_sink('json', io.StringIO(), compression='gzip')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -458,13 +458,15 @@ class TestStackExchangeCommand(unittest.TestCase):
                 '--max-questions', '1',
                 '--tag', 'test',
                 '--no-archive',
-                '--from-date', '1970-01-01']
+                '--from-date', '1970-01-01',
+                '--prefetch-pages', '2']
 
         parsed_args = parser.parse(*args)
         self.assertEqual(parsed_args.site, 'stackoverflow')
         self.assertEqual(parsed_args.tagged, 'python')
         self.assertEqual(parsed_args.api_token, 'aaa')
         self.assertEqual(parsed_args.max_questions, 1)
+        self.assertEqual(parsed_args.prefetch_pages, 2)
         self.assertEqual(parsed_args.tag, 'test')
         self.assertEqual(parsed_args.no_archive, True)
         self.assertEqual(parsed_args.from_date, DEFAULT_DATETIME)
@@ -35,6 +35,7 @@ from perceval.utils import (check_compressed_file_type,
                             message_to_dict,
                             months_range,
                             remove_invalid_xml_chars,
+                            xml_iter_dicts,
                             xml_to_dict)
 
 
@@ -219,6 +220,14 @@ class TestRemoveInvalidXMLChars(unittest.TestCase):
         self.assertNotEqual(purged_xml, raw_xml)
         self.assertEqual(len(purged_xml), len(raw_xml))
 
+    def test_replaced_chars(self):
+        """Check whether invalid characters are replaced by whitespaces"""
+
+        raw_xml = '<bug>a\x00b\x1fc\x85d\x9fe\tf\ng</bug>'
+        purged_xml = remove_invalid_xml_chars(raw_xml)
+
+        self.assertEqual(purged_xml, '<bug>a b c\x85d e\tf\ng</bug>')
+
 
 class TestXMLtoDict(unittest.TestCase):
     """Unit tests for xml_to_dict"""
@@ -267,5 +276,61 @@ class TestXMLtoDict(unittest.TestCase):
         self.assertRaises(ParseError, xml_to_dict, raw_xml)
 
 
+class TestXMLIterDicts(unittest.TestCase):
+    """Unit tests for xml_iter_dicts"""
+
+    def test_xml_iter_dicts(self):
+        """Check whether it converts the nodes of a XML file to dicts"""
+
+        raw_xml = read_file('data/bugzilla/bugzilla_bugs_details.xml')
+
+        bugs = [bug for bug in xml_iter_dicts(raw_xml, 'bug')]
+        expected = xml_to_dict(raw_xml)['bug']
+
+        self.assertEqual(len(bugs), 5)
+        self.assertListEqual(bugs, expected)
+
+    def test_iter_nodes(self):
+        """Check whether nodes are returned before the whole stream is parsed"""
+
+        raw_xml = read_file('data/utils/bugzilla_bug.xml')
+        raw_xml = raw_xml.replace('</bugzilla>', '<bug><bug_id>')
+
+        bugs = xml_iter_dicts(raw_xml, 'bug')
+
+        bug = next(bugs)
+        self.assertEqual(bug['short_desc'][0]['__text__'], 'Mock bug for testing purposes')
+        self.assertEqual(len(bug['long_desc']), 4)
+
+        with self.assertRaises(ParseError):
+            _ = next(bugs)
+
+    def test_remove_invalid_xml_chars(self):
+        """Check whether it removes invalid characters and parses the stream"""
+
+        raw_xml = read_file('data/utils/bugzilla_bugs_invalid_chars.xml')
+        bugs = [bug for bug in xml_iter_dicts(raw_xml, 'bug')]
+
+        self.assertEqual(len(bugs), 1)
+        self.assertEqual(bugs[0]['bug_id'][0]['__text__'], '25299')
+        self.assertEqual(len(bugs[0]['long_desc']), 11)
+
+    def test_no_nodes(self):
+        """Check whether it returns nothing when there are no nodes with the tag"""
+
+        raw_xml = read_file('data/utils/bugzilla_bug.xml')
+        nodes = [node for node in xml_iter_dicts(raw_xml, 'comment')]
+
+        self.assertListEqual(nodes, [])
+
+    def test_invalid_xml(self):
+        """Check whether it raises an exception when the XML is invalid"""
+
+        raw_xml = read_file('data/utils/xml_invalid.xml')
+
+        with self.assertRaises(ParseError):
+            _ = [node for node in xml_iter_dicts(raw_xml, 'bug')]
+
+
 if __name__ == "__main__":
     unittest.main()